@@ -4,7 +4,8 @@ Halaman muka untuk aplikasi dashboard analisis data Potensi Desa
 """
 
 import streamlit as st
-from modules.data_loader import load_podes_data
+from modules.manifest import load_manifest
+from modules.warmup import start_warmup
 
 # Page configuration
 st.set_page_config(
@@ -14,6 +15,31 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+def get_landing_manifest() -> dict:
+    """
+    Read the dataset manifest for the headline counts
+    
+    The full dataset is only loaded (and the manifest written for next time)
+    when no manifest has been built yet.
+    """
+    manifest = load_manifest()
+    if manifest:
+        return manifest
+    
+    from modules.data_loader import get_podes_data, dataset_source
+    from modules.manifest import build_manifest, write_manifest
+    
+    df = get_podes_data()
+    if df.empty:
+        return {}
+    manifest = build_manifest(df, source=dataset_source())
+    try:
+        write_manifest(manifest)
+    except OSError:
+        pass
+    return manifest
+
+
 def main():
     """Main landing page function"""
     
@@ -115,17 +141,20 @@ def main():
     st.markdown("### 📊 Cakupan Data Podes 2024")
     
     try:
-        df = load_podes_data()
-        if not df.empty:
+        manifest = get_landing_manifest()
+        # Dashboard caches are prepared in the background while the visitor reads this page
+        start_warmup(manifest.get('version'))
+        if manifest:
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Total Desa", len(df), help="Jumlah desa yang tercakup dalam survei")
+                st.metric("Total Desa", manifest['total_desa'], help="Jumlah desa yang tercakup dalam survei")
             with col2:
-                st.metric("Total Kecamatan", df['nama_kecamatan'].nunique(), help="Jumlah kecamatan di Kota Batu")
+                st.metric("Total Kecamatan", manifest['total_kecamatan'], help="Jumlah kecamatan di Kota Batu")
             with col3:
-                st.metric("Kategori Analisis", 4, help="Pendidikan, Kesehatan, Infrastruktur, Kebencanaan")
+                st.metric("Kategori Analisis", manifest['category_count'], help="Pendidikan, Kesehatan, Infrastruktur, Kebencanaan")
             with col4:
-                st.metric("Total Indikator", 18, help="Indikator kuantitatif dan kualitatif termasuk persampahan")
+                st.metric("Total Indikator", manifest['indicator_count'], help="Indikator kuantitatif dan kualitatif termasuk persampahan")
+            st.caption(f"Versi data: {manifest['version']} • Diperbarui: {manifest.get('source_modified_at') or manifest['built_at']}")
     except:
         st.info("Data preview akan ditampilkan setelah sistem fully loaded")
     
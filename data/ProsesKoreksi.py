@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+
+# Pastikan paket 'modules' dapat diimpor saat skrip dijalankan dari root proyek
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.aggregates import AGGREGATES_PATH
+from modules.bundles import ALL_KECAMATAN, BUNDLES_DIR, build_view_bundles, prune_view_bundles
+from modules.corrections import CORRECTIONS_LOG_PATH, apply_corrections, read_corrections
+from modules.manifest import MANIFEST_PATH, kecamatan_versions, load_manifest
+from modules.ranks import RANKS_PATH, load_rank_table, split_rank_table
+from modules.store import STORE_DIR, read_store
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Terapkan koreksi BPS (id_desa, column, value) ke data dashboard")
+    parser.add_argument('delta', help="File koreksi CSV/JSON dengan kolom id_desa, column, value")
+    parser.add_argument('--store', default=STORE_DIR,
+                        help="Direktori penyimpanan kolumnar (Parquet per kabupaten/kota)")
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help="File manifest data")
+    parser.add_argument('--aggregates', default=AGGREGATES_PATH, help="File agregat per kecamatan")
+    parser.add_argument('--ranks', default=RANKS_PATH, help="Tabel peringkat per indikator")
+    parser.add_argument('--log', default=CORRECTIONS_LOG_PATH, help="Log koreksi (JSON lines)")
+    parser.add_argument('--bundles', default=BUNDLES_DIR, help="Direktori bundel tampilan dashboard")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print(f"Menerapkan koreksi dari '{args.delta}'...")
+
+    try:
+        delta = read_corrections(args.delta)
+        print(f"-> {len(delta)} baris koreksi dibaca.")
+
+        summary = apply_corrections(delta, root=args.store, manifest_path=args.manifest,
+                                    aggregates_path=args.aggregates, ranks_path=args.ranks, log_path=args.log,
+                                    source=os.path.basename(args.delta))
+    except FileNotFoundError as e:
+        print(f"ERROR: File tidak ditemukan: {e.filename}")
+        return
+    except ValueError as e:
+        print("ERROR: Koreksi tidak diterapkan:")
+        for line in str(e).splitlines():
+            print(f"   - {line}")
+        return
+
+    if not summary['changes']:
+        print("-> Semua nilai koreksi sama dengan data saat ini; tidak ada yang diubah.")
+        return
+
+    print(f"-> {summary['changes']} sel diubah ({summary['unchanged']} sudah sesuai) "
+          f"di kecamatan: {', '.join(summary['kecamatan'])}.")
+    print(f"-> Partisi ditulis ulang: {', '.join(summary['partitions'])}.")
+    print(f"-> Versi data {summary['version_before']} -> {summary['version_after']}.")
+
+    # Hanya bundel kecamatan terkoreksi dan seluruh kota yang berganti versi; dashboard menghitung
+    # langsung sampai bundel baru siap
+    scope_versions = kecamatan_versions(load_manifest(args.manifest))
+    rank_table = load_rank_table(args.ranks, summary['version_after'])
+    written = build_view_bundles(read_store(args.store), summary['version_after'], args.bundles,
+                                 split_rank_table(rank_table) if rank_table is not None else None,
+                                 scope_versions=scope_versions, scopes=[ALL_KECAMATAN] + summary['kecamatan'])
+    prune_view_bundles(summary['version_after'], args.bundles, scope_versions)
+    print(f"-> {written} bundel tampilan dihitung ulang di '{args.bundles}'.")
+    print(f"\nKOREKSI SELESAI! Riwayat koreksi dicatat di '{args.log}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,12 +3,16 @@ Enhanced visualization functions with simplified ranking system
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import io
 from datetime import datetime
+from modules.exports import build_excel_bytes
+from modules.code_matrix import summarize_frame
+from modules.profiling import timed
+from modules.ranks import indicator_rankings
+from modules.tables import show_table
 
 def create_excel_download_button_viz(df: pd.DataFrame, filename_prefix: str, button_label: str = "📥 Download Excel"):
     """
@@ -22,25 +26,6 @@ def create_excel_download_button_viz(df: pd.DataFrame, filename_prefix: str, but
     if df.empty:
         return
     
-    # Create Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Data')
-        
-        # Auto-adjust column widths
-        worksheet = writer.sheets['Data']
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
-    
     # Generate filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{filename_prefix}_{timestamp}.xlsx"
@@ -71,11 +56,12 @@ def create_excel_download_button_viz(df: pd.DataFrame, filename_prefix: str, but
     # Create clean download button
     st.download_button(
         label=f"📥 {button_label}",
-        data=output.getvalue(),
+        # Workbook is only built when the button is clicked
+        data=lambda: build_excel_bytes(df),
         file_name=filename,
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         help=f"Download {len(df)} baris data dalam format Excel (.xlsx)",
-        use_container_width=True
+        width="stretch"
     )
     
     # Add simple info about the download
@@ -85,7 +71,227 @@ def create_excel_download_button_viz(df: pd.DataFrame, filename_prefix: str, but
     </div>
     """, unsafe_allow_html=True)
 
-def create_enhanced_quantitative_visualization(df, column, title):
+
+# Satuan fasilitas per kata kunci nama kolom, urutan sesuai pengecekan
+UNIT_KEYWORDS = [
+    ('puskesmas', 'puskesmas'),
+    ('rumah_sakit', 'rumah sakit'),
+    ('rs_', 'rumah sakit'),
+    ('dokter', 'dokter'),
+    ('bidan', 'bidan'),
+    ('apotek', 'apotek'),
+    ('posyandu', 'posyandu'),
+    ('tk', 'TK'),
+    ('sd', 'SD'),
+    ('smp', 'SMP'),
+    ('sma', 'SMA'),
+    ('smk', 'SMK'),
+    ('pasar', 'pasar'),
+    ('bank', 'bank'),
+    ('koperasi', 'koperasi')
+]
+
+
+def _facility_unit(column):
+    """Facility unit for a count column, None if the column name has no known unit"""
+    for keyword, unit in UNIT_KEYWORDS:
+        if keyword in column.lower():
+            return unit
+    return None
+
+
+def _distribution_labels(column, x_values):
+    """User-friendly X-axis labels for a discrete value distribution"""
+    # Check if data is binary (0,1) or small counts
+    is_binary = set(x_values) <= {0, 1}
+    is_small_counts = all(isinstance(x, (int, float)) and x >= 0 and x <= 20 for x in x_values)
+    
+    if is_binary:
+        # For binary data (0,1), use meaningful labels
+        return ['Tidak Ada' if x == 0 else 'Ada' for x in x_values]
+    if is_small_counts and all(isinstance(x, (int, float)) and x == int(x) for x in x_values):
+        # For small integer counts, add specific unit description based on column name
+        unit = _facility_unit(column)
+        if unit is None and 'jumlah' in column.lower():
+            # Generic fallback for other "jumlah" columns
+            unit = 'unit'
+        if unit is None:
+            return [str(int(x)) for x in x_values]
+        return [f"{int(x)} {unit}" for x in x_values]
+    return [str(x) for x in x_values]
+
+
+def quantitative_insights(column, title, table_df):
+    """
+    Insight sentences for a ranked quantitative table
+    
+    Args:
+        column: Indicator column name
+        title: Indicator label (value column of table_df)
+        table_df: Ranking table with Rank, Desa, Kecamatan and title columns
+        
+    Returns:
+        List[str]: Markdown sentences, best performer first
+    """
+    insights = []
+    top_performer = table_df.iloc[0]
+    
+    # Format insights based on data type
+    if 'jumlah' in column.lower():
+        # Check if binary data (0,1 only)
+        all_values = table_df[title].unique()
+        is_binary = set(all_values) <= {0, 1}
+        
+        if is_binary:
+            if int(top_performer[title]) == 1:
+                insights.append(f"🏆 **Memiliki Fasilitas:** {top_performer['Desa']} ({top_performer['Kecamatan']})")
+            else:
+                insights.append(f"📊 **Semua desa tidak memiliki fasilitas ini**")
+        else:
+            # Get specific unit based on column name
+            unit = _facility_unit(column) or 'unit'
+            
+            insights.append(f"🏆 **Terbanyak:** {top_performer['Desa']} ({top_performer['Kecamatan']}) dengan {int(top_performer[title])} {unit}")
+            
+            if len(table_df) > 1:
+                bottom_performer = table_df.iloc[-1]
+                if int(bottom_performer[title]) == 0:
+                    insights.append(f"📊 **Belum Memiliki:** {bottom_performer['Desa']} ({bottom_performer['Kecamatan']})")
+                else:
+                    insights.append(f"📊 **Tersedikit:** {bottom_performer['Desa']} ({bottom_performer['Kecamatan']}) dengan {int(bottom_performer[title])} {unit}")
+    else:
+        insights.append(f"🏆 **Peringkat Teratas:** {top_performer['Desa']} ({top_performer['Kecamatan']}) dengan nilai {top_performer[title]}")
+        
+        if len(table_df) > 1:
+            bottom_performer = table_df.iloc[-1]
+            insights.append(f"📈 **Potensi Pengembangan:** {bottom_performer['Desa']} ({bottom_performer['Kecamatan']}) dengan nilai {bottom_performer[title]}")
+    
+    return insights
+
+
+def build_quantitative_figures(df, column, title, rank_tables=None, summary=None):
+    """
+    Build the figures and tables of a quantitative indicator without rendering
+    
+    Shared by the dashboard and the batch reporter (tools/batch_report.py).
+    
+    Args:
+        df: Podes data for the selected scope
+        column: Indicator column name
+        title: Indicator label
+        rank_tables: Precomputed ranks from get_rank_tables(); the scope is
+            ranked on the spot when omitted
+        summary: Counts and statistics of the column over df from
+            CodeMatrix.summarize; computed here when omitted
+        
+    Returns:
+        Dict with ranking/distribution figures, ranking table, statistics and
+        insights, or None when the indicator has no valid data
+    """
+    if summary is None:
+        summary = summarize_frame(df, [column])[column]
+    
+    # Check data availability
+    stats = summary['stats']
+    if stats['valid'] == 0:
+        return None
+    
+    # Calculate enhanced metrics
+    unique_values = stats['nunique']
+    total_desa = stats['valid']
+    
+    # Ranking lookup: rows arrive best first, tied villages share a rank
+    sorted_df = indicator_rankings(df, column, rank_tables).rename(
+        columns={'nilai': column, 'peringkat': 'rank'}
+    )
+    
+    if unique_values == 1:
+        # Create a simple visualization showing all desa with same value
+        names = df.loc[df[column].notna(), 'nama_desa'].tolist()
+        fig = go.Figure(
+            go.Bar(x=[stats['min']] * len(names), y=names, orientation='h', marker_color='#2E86AB'),
+            layout=dict(
+                title=dict(text=f"Nilai Seragam: {title}"),
+                xaxis_title=title,
+                yaxis_title="Desa",
+                height=max(300, total_desa * 25),
+                showlegend=False
+            )
+        )
+    else:
+        # Enhanced ranking visualization
+        # Show top performers
+        display_df = sorted_df.head(min(12, total_desa)).copy()
+        display_df['label'] = (display_df['nama_desa'] + 
+                              ' (' + display_df['nama_kecamatan'] + ')\n' +
+                              'Rank #' + display_df['rank'].astype(str))
+        
+        # Reverse the order so rank #1 appears at the top
+        display_df = display_df.iloc[::-1]
+        
+        fig = go.Figure(
+            go.Bar(x=display_df[column], y=display_df['label'], orientation='h', marker_color='#2E86AB'),
+            layout=dict(
+                title=dict(text=f"Ranking Teratas: {title}"),
+                height=max(400, len(display_df) * 35),
+                xaxis_title=f"{title} (Nilai)",
+                yaxis_title="Desa",
+                yaxis={'categoryorder': 'array', 'categoryarray': display_df['label'].tolist()},
+                showlegend=False
+            )
+        )
+    
+    # Always use value counts for better representation of discrete data
+    value_dist = summary['values']
+    
+    if unique_values <= 10:
+        x_labels = _distribution_labels(column, value_dist.index.tolist())
+        
+        # For discrete data (like counts), use bar chart
+        fig_dist = go.Figure(
+            go.Bar(x=x_labels, y=value_dist.values, text=value_dist.values, marker_color='#A23B72',
+                   texttemplate='%{text} desa', textposition='outside'),
+            layout=dict(
+                title=dict(text=f"Distribusi {title}"),
+                xaxis_title=title,
+                yaxis_title="Jumlah Desa"
+            )
+        )
+    else:
+        # For continuous data with many values, use histogram (weighted by the value counts)
+        fig_dist = go.Figure(
+            go.Histogram(x=value_dist.index, y=value_dist.values, histfunc='sum',
+                         nbinsx=min(15, unique_values), marker_color='#A23B72'),
+            layout=dict(
+                title=dict(text=f"Distribusi {title}"),
+                xaxis_title=title,
+                yaxis_title="Jumlah Desa",
+                bargap=0.1
+            )
+        )
+    
+    # Prepare simplified display with ranking
+    table_df = sorted_df[['rank', 'nama_desa', 'nama_kecamatan', column, 'persentil']].copy()
+    table_df.columns = ['Rank', 'Desa', 'Kecamatan', title, 'Persentil']
+    
+    # Only the extremes are shown; quartiles come from the KPI sketches
+    return {
+        'ranking_figure': fig,
+        'distribution_figure': fig_dist,
+        'table': table_df,
+        'uniform_value': stats['min'] if unique_values == 1 else None,
+        'stats': {
+            'max': int(stats['max']),
+            'min': int(stats['min']),
+            'total': int(stats['sum']),
+            'total_desa': total_desa
+        },
+        'insights': quantitative_insights(column, title, table_df)
+    }
+
+
+@timed('figure.quantitative')
+def create_enhanced_quantitative_visualization(df, column, title, rank_tables=None, figures=None, summary=None):
     """Create enhanced visualizations with si        with        with perf_col    with col2:      most_common = value_counts.index[0]
             st.metric("👑 Kategori Dominan", f"{most_common}")
         
@@ -114,196 +320,52 @@ def create_enhanced_quantitative_visualization(df, column, title):
         
         with perf_cols[4]:
             st.metric("📊 Desa dengan Data", total_valid) ranking system"""
-    # Remove NaN values and check data availability
-    clean_df = df[[column, 'nama_desa', 'nama_kecamatan']].dropna()
+    # Figures may come precomputed from a view bundle (modules/bundles.py), counts from a category summary
+    if figures is None:
+        figures = build_quantitative_figures(df, column, title, rank_tables, summary)
     
-    if clean_df.empty:
+    if figures is None:
         st.warning(f"⚠️ Tidak ada data valid untuk indikator '{title}'")
         return
     
-    # Calculate enhanced metrics
-    unique_values = clean_df[column].nunique()
-    total_desa = len(clean_df)
-    
-    # Create ranking with additional context
-    sorted_df = clean_df.sort_values(column, ascending=False)
-    sorted_df = sorted_df.copy()
-    sorted_df['rank'] = range(1, len(sorted_df) + 1)
-    
-    max_val = clean_df[column].max()
-    min_val = clean_df[column].min()
+    stats = figures['stats']
+    table_df = figures['table']
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("#### 🏆 **Ranking Desa**")
         
-        if unique_values == 1:
+        if figures['uniform_value'] is not None:
             # Special handling for uniform data
-            st.info(f"✨ Semua desa memiliki nilai seragam: **{clean_df[column].iloc[0]}**")
-            
-            # Create a simple visualization showing all desa with same value
-            fig = px.bar(
-                x=[clean_df[column].iloc[0]] * len(clean_df),
-                y=[f"{row['nama_desa']}" for _, row in clean_df.iterrows()],
-                orientation='h',
-                title=f"Nilai Seragam: {title}",
-                color_discrete_sequence=['#2E86AB']
-            )
-            fig.update_layout(
-                xaxis_title=title,
-                yaxis_title="Desa",
-                height=max(300, total_desa * 25),
-                showlegend=False
-            )
-            st.plotly_chart(fig, use_container_width=True)
-            
-        else:
-            # Enhanced ranking visualization
-            # Show top performers
-            display_df = sorted_df.head(min(12, total_desa)).copy()
-            display_df['label'] = (display_df['nama_desa'] + 
-                                  ' (' + display_df['nama_kecamatan'] + ')\n' +
-                                  'Rank #' + display_df['rank'].astype(str))
-            
-            # Reverse the order so rank #1 appears at the top
-            display_df = display_df.iloc[::-1]
-            
-            fig = px.bar(
-                display_df,
-                x=column,
-                y='label',
-                orientation='h',
-                title=f"Ranking Teratas: {title}",
-                color_discrete_sequence=['#2E86AB'],
-                height=max(400, len(display_df) * 35)
-            )
-            
-            fig.update_layout(
-                xaxis_title=f"{title} (Nilai)",
-                yaxis_title="Desa",
-                yaxis={'categoryorder': 'array', 'categoryarray': display_df['label'].tolist()},
-                showlegend=False
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            st.info(f"✨ Semua desa memiliki nilai seragam: **{figures['uniform_value']}**")
+        
+        st.plotly_chart(figures['ranking_figure'], width="stretch")
         
         # Statistical insights and data summary
         st.markdown("#### 📊 **Statistik Kunci & Ringkasan Data**")
-        stats = clean_df[column].describe()
         
         # Single row with 4 columns for compact display
         stat_cols = st.columns(4)
         
         with stat_cols[0]:
-            st.metric("🎯 Tertinggi", f"{int(stats['max'])}")
+            st.metric("🎯 Tertinggi", f"{stats['max']}")
         
         with stat_cols[1]:
-            st.metric("📉 Terendah", f"{int(stats['min'])}")
+            st.metric("📉 Terendah", f"{stats['min']}")
         
         with stat_cols[2]:
-            total_value = clean_df[column].sum()
-            st.metric("🔢 Total", f"{int(total_value)}")
+            st.metric("🔢 Total", f"{stats['total']}")
             
         with stat_cols[3]:
-            st.metric("🏘️ Total Desa", total_desa)
+            st.metric("🏘️ Total Desa", stats['total_desa'])
     
     with col2:
         st.markdown("#### 📈 **Analisis Distribusi**")
-        
-        # Always use value counts for better representation of discrete data
-        value_dist = clean_df[column].value_counts().sort_index()
-        
-        if unique_values <= 10:
-            # Create user-friendly labels for X-axis
-            x_labels = []
-            x_values = value_dist.index.tolist()
-            
-            # Check if data is binary (0,1) or small counts
-            is_binary = set(x_values) <= {0, 1}
-            is_small_counts = all(isinstance(x, (int, float)) and x >= 0 and x <= 20 for x in x_values)
-            
-            if is_binary:
-                # For binary data (0,1), use meaningful labels
-                x_labels = ['Tidak Ada' if x == 0 else 'Ada' for x in x_values]
-            elif is_small_counts and all(isinstance(x, (int, float)) and x == int(x) for x in x_values):
-                # For small integer counts, add specific unit description based on column name
-                if 'puskesmas' in column.lower():
-                    x_labels = [f"{int(x)} puskesmas" if x != 1 else f"{int(x)} puskesmas" for x in x_values]
-                elif 'rumah_sakit' in column.lower() or 'rs_' in column.lower():
-                    x_labels = [f"{int(x)} rumah sakit" if x != 1 else f"{int(x)} rumah sakit" for x in x_values]
-                elif 'dokter' in column.lower():
-                    x_labels = [f"{int(x)} dokter" if x != 1 else f"{int(x)} dokter" for x in x_values]
-                elif 'bidan' in column.lower():
-                    x_labels = [f"{int(x)} bidan" if x != 1 else f"{int(x)} bidan" for x in x_values]
-                elif 'apotek' in column.lower():
-                    x_labels = [f"{int(x)} apotek" if x != 1 else f"{int(x)} apotek" for x in x_values]
-                elif 'posyandu' in column.lower():
-                    x_labels = [f"{int(x)} posyandu" if x != 1 else f"{int(x)} posyandu" for x in x_values]
-                elif 'tk' in column.lower():
-                    x_labels = [f"{int(x)} TK" if x != 1 else f"{int(x)} TK" for x in x_values]
-                elif 'sd' in column.lower():
-                    x_labels = [f"{int(x)} SD" if x != 1 else f"{int(x)} SD" for x in x_values]
-                elif 'smp' in column.lower():
-                    x_labels = [f"{int(x)} SMP" if x != 1 else f"{int(x)} SMP" for x in x_values]
-                elif 'sma' in column.lower():
-                    x_labels = [f"{int(x)} SMA" if x != 1 else f"{int(x)} SMA" for x in x_values]
-                elif 'smk' in column.lower():
-                    x_labels = [f"{int(x)} SMK" if x != 1 else f"{int(x)} SMK" for x in x_values]
-                elif 'pasar' in column.lower():
-                    x_labels = [f"{int(x)} pasar" if x != 1 else f"{int(x)} pasar" for x in x_values]
-                elif 'bank' in column.lower():
-                    x_labels = [f"{int(x)} bank" if x != 1 else f"{int(x)} bank" for x in x_values]
-                elif 'koperasi' in column.lower():
-                    x_labels = [f"{int(x)} koperasi" if x != 1 else f"{int(x)} koperasi" for x in x_values]
-                elif 'jumlah' in column.lower():
-                    # Generic fallback for other "jumlah" columns
-                    x_labels = [f"{int(x)} unit" if x != 1 else f"{int(x)} unit" for x in x_values]
-                else:
-                    x_labels = [str(int(x)) for x in x_values]
-            else:
-                x_labels = [str(x) for x in x_values]
-            
-            # For discrete data (like counts), use bar chart
-            fig_dist = px.bar(
-                x=x_labels,
-                y=value_dist.values,
-                title=f"Distribusi {title}",
-                color_discrete_sequence=['#A23B72'],
-                text=value_dist.values
-            )
-            
-            fig_dist.update_traces(texttemplate='%{text} desa', textposition='outside')
-            fig_dist.update_layout(
-                xaxis_title=title,
-                yaxis_title="Jumlah Desa"
-            )
-            
-            st.plotly_chart(fig_dist, use_container_width=True)
-        else:
-            # For continuous data with many values, use histogram
-            fig_hist = px.histogram(
-                clean_df,
-                x=column,
-                nbins=min(15, unique_values),
-                title=f"Distribusi {title}",
-                color_discrete_sequence=['#A23B72']
-            )
-            
-            fig_hist.update_layout(
-                xaxis_title=title,
-                yaxis_title="Jumlah Desa",
-                bargap=0.1
-            )
-            
-            st.plotly_chart(fig_hist, use_container_width=True)
+        st.plotly_chart(figures['distribution_figure'], width="stretch")
     
     # Enhanced data table with ranking
     with st.expander("📋 **Tabel Lengkap dengan Ranking**"):
-        # Prepare simplified display with ranking
-        table_df = sorted_df[['rank', 'nama_desa', 'nama_kecamatan', column]].copy()
-        table_df.columns = ['Rank', 'Desa', 'Kecamatan', title]
-        
         # Configure column widths for better display
         column_config = {
             'Rank': st.column_config.NumberColumn(
@@ -322,14 +384,20 @@ def create_enhanced_quantitative_visualization(df, column, title):
             title: st.column_config.NumberColumn(
                 title,
                 width='small'
+            ),
+            'Persentil': st.column_config.NumberColumn(
+                'Persentil',
+                width='small',
+                format='%.1f',
+                help='Persentase desa dengan nilai sama atau lebih rendah'
             )
         }
         
-        st.dataframe(
-            table_df, 
-            use_container_width=True, 
-            height=400, 
-            hide_index=True,
+        show_table(
+            table_df,
+            'quantitative_detail',
+            width='stretch',
+            height=400,
             column_config=column_config
         )
         
@@ -344,231 +412,227 @@ def create_enhanced_quantitative_visualization(df, column, title):
         
         # Add insights
         st.markdown("**💡 Insights:**")
-        top_performer = table_df.iloc[0]
-        
-        # Format insights based on data type
-        if 'jumlah' in column.lower():
-            # Check if binary data (0,1 only)
-            all_values = table_df[title].unique()
-            is_binary = set(all_values) <= {0, 1}
-            
-            if is_binary:
-                if int(top_performer[title]) == 1:
-                    st.write(f"🏆 **Memiliki Fasilitas:** {top_performer['Desa']} ({top_performer['Kecamatan']})")
-                else:
-                    st.write(f"📊 **Semua desa tidak memiliki fasilitas ini**")
-            else:
-                # Get specific unit based on column name
-                if 'puskesmas' in column.lower():
-                    unit = 'puskesmas'
-                elif 'rumah_sakit' in column.lower() or 'rs_' in column.lower():
-                    unit = 'rumah sakit'
-                elif 'dokter' in column.lower():
-                    unit = 'dokter'
-                elif 'bidan' in column.lower():
-                    unit = 'bidan'
-                elif 'apotek' in column.lower():
-                    unit = 'apotek'
-                elif 'posyandu' in column.lower():
-                    unit = 'posyandu'
-                elif 'tk' in column.lower():
-                    unit = 'TK'
-                elif 'sd' in column.lower():
-                    unit = 'SD'
-                elif 'smp' in column.lower():
-                    unit = 'SMP'
-                elif 'sma' in column.lower():
-                    unit = 'SMA'
-                elif 'smk' in column.lower():
-                    unit = 'SMK'
-                elif 'pasar' in column.lower():
-                    unit = 'pasar'
-                elif 'bank' in column.lower():
-                    unit = 'bank'
-                elif 'koperasi' in column.lower():
-                    unit = 'koperasi'
-                else:
-                    unit = 'unit'
-                
-                st.write(f"🏆 **Terbanyak:** {top_performer['Desa']} ({top_performer['Kecamatan']}) dengan {int(top_performer[title])} {unit}")
-                
-                if len(table_df) > 1:
-                    bottom_performer = table_df.iloc[-1]
-                    if int(bottom_performer[title]) == 0:
-                        st.write(f"📊 **Belum Memiliki:** {bottom_performer['Desa']} ({bottom_performer['Kecamatan']})")
-                    else:
-                        st.write(f"📊 **Tersedikit:** {bottom_performer['Desa']} ({bottom_performer['Kecamatan']}) dengan {int(bottom_performer[title])} {unit}")
-        else:
-            st.write(f"🏆 **Peringkat Teratas:** {top_performer['Desa']} ({top_performer['Kecamatan']}) dengan nilai {top_performer[title]}")
-            
-            if len(table_df) > 1:
-                bottom_performer = table_df.iloc[-1]
-                st.write(f"📈 **Potensi Pengembangan:** {bottom_performer['Desa']} ({bottom_performer['Kecamatan']}) dengan nilai {bottom_performer[title]}")
+        for insight in figures['insights']:
+            st.write(insight)
 
 
-def create_enhanced_qualitative_visualization(df, column, title):
-    """Create enhanced visualizations for qualitative indicators"""
-    col1, col2 = st.columns(2)
+def build_qualitative_figures(df, column, title, summary=None):
+    """
+    Build the figures and tables of a qualitative indicator without rendering
     
-    with col1:
-        # Enhanced donut chart with better styling
-        st.markdown("#### 🍩 **Distribusi Kategori**")
-        
-        # Count values and remove NaN
-        value_counts = df[column].value_counts().dropna()
-        
-        if value_counts.empty:
-            st.warning(f"⚠️ Tidak ada data valid untuk '{title}'")
-            return
-        
-        total_valid = value_counts.sum()
-        
-        # Create donut chart with Go for better control
-        colors = px.colors.qualitative.Set3[:len(value_counts)]
-        
-        fig = go.Figure(data=[go.Pie(
+    Shared by the dashboard and the batch reporter (tools/batch_report.py).
+    
+    Args:
+        df: Podes data for the selected scope
+        column: Indicator column name
+        title: Indicator label
+        summary: Counts of the column over df from CodeMatrix.summarize;
+            computed here when omitted
+        
+    Returns:
+        Dict with donut/ranking/per-kecamatan figures, value counts and detail
+        tables, or None when the indicator has no valid data
+    """
+    if summary is None:
+        summary = summarize_frame(df, [column])[column]
+    
+    # Answer counts, most frequent first
+    value_counts = summary['counts']
+    
+    if value_counts.empty:
+        return None
+    
+    total_valid = value_counts.sum()
+    
+    # Create donut chart with Go for better control
+    colors = px.colors.qualitative.Set3[:len(value_counts)]
+    
+    fig = go.Figure(
+        data=[go.Pie(
             labels=value_counts.index,
             values=value_counts.values,
             hole=.4,
             marker_colors=colors,
             textinfo='label+percent+value',
             texttemplate='%{label}<br>%{value} desa<br>(%{percent})'
-        )])
-        
-        fig.update_layout(
-            title=f"Distribusi {title}",
+        )],
+        layout=dict(
+            title=dict(text=f"Distribusi {title}"),
             showlegend=True,
             legend=dict(orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.01),
             height=400
         )
+    )
+    
+    # Create ranking bar chart, highest count at the top
+    y_categories = value_counts.index.tolist()
+    y_categories.reverse()
+    
+    fig_bar = go.Figure(
+        go.Bar(
+            x=value_counts.values,
+            y=value_counts.index,
+            orientation='h',
+            text=value_counts.values,
+            texttemplate='%{text} desa',
+            textposition='outside',
+            marker=dict(color=value_counts.values, coloraxis='coloraxis')
+        ),
+        layout=dict(
+            title=dict(text=f"Jumlah Desa per Kategori: {title}"),
+            coloraxis=dict(colorscale='viridis'),
+            xaxis_title="Jumlah Desa",
+            yaxis_title="Kategori",
+            showlegend=False,
+            yaxis={'categoryorder': 'array', 'categoryarray': y_categories}
+        )
+    )
+    
+    # Geographic distribution by kecamatan
+    fig_stack = None
+    kec_summary = pd.DataFrame()
+    if 'nama_kecamatan' in df.columns:
+        # One cross-tabulation serves both the chart and the summary table
+        kec_summary = summary['kecamatan']
+        
+        # Create stacked bar chart, one trace per answer
+        fig_stack = go.Figure(
+            [go.Bar(x=kec_summary.index, y=kec_summary[answer], name=str(answer),
+                    marker_color=colors[position % len(colors)])
+             for position, answer in enumerate(kec_summary.columns)],
+            layout=dict(
+                title=dict(text=f"Distribusi {title} per Kecamatan"),
+                barmode='relative',
+                xaxis_title="Kecamatan",
+                yaxis_title="Jumlah Desa",
+                legend_title=title
+            )
+        )
+    
+    detail_df = df[['nama_desa', 'nama_kecamatan', column]].copy()
+    detail_df.columns = ['Desa', 'Kecamatan', title]
+    
+    # Group by category for better organization: one stable sort of the codes,
+    # each category is then a contiguous slice
+    codes = summary['codes']
+    order = np.argsort(codes, kind='stable')
+    starts = np.searchsorted(codes[order], summary['count_codes'])
+    sorted_detail = detail_df.iloc[order]
+    category_tables = {
+        category: sorted_detail.iloc[start:start + count]
+        for category, start, count in zip(value_counts.index, starts, value_counts.values)
+    }
+    
+    most_common_count = value_counts.iloc[0]
+    
+    return {
+        'donut_figure': fig,
+        'ranking_figure': fig_bar,
+        'kecamatan_figure': fig_stack,
+        'value_counts': value_counts,
+        'category_tables': category_tables,
+        'detail': detail_df,
+        'kecamatan_summary': kec_summary,
+        'stats': {
+            'most_common': value_counts.index[0],
+            'most_common_count': most_common_count,
+            'most_common_pct': (most_common_count / total_valid * 100).round(1),
+            'total_categories': len(value_counts),
+            # Get total desa from original dataframe
+            'total_desa': len(df),
+            'total_valid': total_valid
+        }
+    }
+
+
+@timed('figure.qualitative')
+def create_enhanced_qualitative_visualization(df, column, title, figures=None, summary=None):
+    """Create enhanced visualizations for qualitative indicators"""
+    # Figures may come precomputed from a view bundle (modules/bundles.py), counts from a category summary
+    if figures is None:
+        figures = build_qualitative_figures(df, column, title, summary)
+    stats = figures['stats'] if figures is not None else {}
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Enhanced donut chart with better styling
+        st.markdown("#### 🍩 **Distribusi Kategori**")
         
-        st.plotly_chart(fig, use_container_width=True)
+        if figures is None:
+            st.warning(f"⚠️ Tidak ada data valid untuk '{title}'")
+            return
+        
+        st.plotly_chart(figures['donut_figure'], width="stretch")
         
         # Enhanced statistics section with balanced layout
         st.markdown("#### 📊 **Statistik Kunci & Ringkasan Data**")
         
-        # Get total desa from original dataframe
-        total_desa = len(df)
-        
         # Single row with 4 columns for compact display
         perf_cols = st.columns(4)
         with perf_cols[0]:
-            most_common = value_counts.index[0]
-            most_common_count = value_counts.iloc[0]
-            st.metric("� Kategori Dominan", f"{most_common}")
+            st.metric("� Kategori Dominan", f"{stats['most_common']}")
         
         with perf_cols[1]:
-            most_common_pct = (most_common_count / total_valid * 100).round(1)
-            st.metric("📈 Persentase Dominan", f"{most_common_pct}%")
+            st.metric("📈 Persentase Dominan", f"{stats['most_common_pct']}%")
         
         # Second row - summary metrics (3 columns for better balance)
         summary_cols = st.columns(3)
         with summary_cols[0]:
-            st.metric("🎯 Total Kategori", len(value_counts))
+            st.metric("🎯 Total Kategori", stats['total_categories'])
             
         with summary_cols[1]:
-            st.metric("🏘️ Total Desa", total_desa)
+            st.metric("🏘️ Total Desa", stats['total_desa'])
         
         with summary_cols[2]:
-            st.metric("� Desa dengan Data", total_valid)
+            st.metric("� Desa dengan Data", stats['total_valid'])
 
     with col2:
         # Enhanced bar chart with ranking
         st.markdown("#### 📊 **Ranking Kategori**")
-        
-        # Create ranking bar chart with proper ordering
-        # Sort in descending order (highest count first)
-        sorted_counts = value_counts.sort_values(ascending=False)
-        
-        fig_bar = px.bar(
-            x=sorted_counts.values,
-            y=sorted_counts.index,
-            orientation='h',
-            title=f"Jumlah Desa per Kategori: {title}",
-            color=sorted_counts.values,
-            color_continuous_scale='viridis',
-            text=sorted_counts.values
-        )
-        
-        # Reverse order so highest count appears at top
-        y_categories = sorted_counts.index.tolist()
-        y_categories.reverse()
-        
-        fig_bar.update_traces(texttemplate='%{text} desa', textposition='outside')
-        fig_bar.update_layout(
-            xaxis_title="Jumlah Desa",
-            yaxis_title="Kategori",
-            showlegend=False,
-            yaxis={'categoryorder': 'array', 'categoryarray': y_categories}
-        )
-        
-        st.plotly_chart(fig_bar, use_container_width=True)
+        st.plotly_chart(figures['ranking_figure'], width="stretch")
         
         # Geographic distribution by kecamatan
         st.markdown("#### 🗺️ **Distribusi per Kecamatan**")
         
-        if 'nama_kecamatan' in df.columns:
-            # Cross-tabulation
-            crosstab = pd.crosstab(df['nama_kecamatan'], df[column], margins=True)
-            
-            # Create stacked bar chart
-            fig_stack = px.bar(
-                crosstab.iloc[:-1, :-1],  # Exclude margins
-                title=f"Distribusi {title} per Kecamatan",
-                color_discrete_sequence=colors
-            )
-            
-            fig_stack.update_layout(
-                xaxis_title="Kecamatan",
-                yaxis_title="Jumlah Desa",
-                legend_title=title
-            )
-            
-            st.plotly_chart(fig_stack, use_container_width=True)
+        if figures['kecamatan_figure'] is not None:
+            st.plotly_chart(figures['kecamatan_figure'], width="stretch")
         
     # Enhanced data table with geographic context
     with st.expander("📋 **Data Detail per Desa**"):
-        # Group by category for better organization
-        for category in value_counts.index:
-            category_df = df[df[column] == category][['nama_desa', 'nama_kecamatan', column]].copy()
-            category_df.columns = ['Desa', 'Kecamatan', title]
+        for category, category_df in figures['category_tables'].items():
+            st.markdown(f"**{category}** ({len(category_df)} desa)")
             
-            if not category_df.empty:
-                st.markdown(f"**{category}** ({len(category_df)} desa)")
-                
-                # Configure column widths for qualitative data
-                qual_column_config = {
-                    'Desa': st.column_config.TextColumn(
-                        'Desa',
-                        width='medium'
-                    ),
-                    'Kecamatan': st.column_config.TextColumn(
-                        'Kecamatan', 
-                        width='medium'
-                    ),
-                    title: st.column_config.TextColumn(
-                        title,
-                        width='medium'
-                    )
-                }
-                
-                st.dataframe(
-                    category_df, 
-                    use_container_width=True, 
-                    height=150,
-                    hide_index=True,
-                    column_config=qual_column_config
+            # Configure column widths for qualitative data
+            qual_column_config = {
+                'Desa': st.column_config.TextColumn(
+                    'Desa',
+                    width='medium'
+                ),
+                'Kecamatan': st.column_config.TextColumn(
+                    'Kecamatan', 
+                    width='medium'
+                ),
+                title: st.column_config.TextColumn(
+                    title,
+                    width='medium'
                 )
-                st.write("")  # Space between categories
+            }
+            
+            show_table(
+                category_df,
+                'qualitative_detail',
+                width='stretch',
+                height=150,
+                column_config=qual_column_config
+            )
+            st.write("")  # Space between categories
         
         # Add dedicated download section for all qualitative data
         st.markdown("---")  # Separator line
-        complete_qual_df = df[['nama_desa', 'nama_kecamatan', column]].copy()
-        complete_qual_df.columns = ['Desa', 'Kecamatan', title]
-        
         filename_prefix = f"Data_Detail_{title.replace(' ', '_')}"
         create_excel_download_button_viz(
-            complete_qual_df, 
+            figures['detail'], 
             filename_prefix, 
             f"Download Data Detail {title}"
         )
@@ -576,6 +640,6 @@ def create_enhanced_qualitative_visualization(df, column, title):
         # Summary by kecamatan
         if 'nama_kecamatan' in df.columns:
             st.markdown("**📊 Ringkasan per Kecamatan:**")
-            kec_summary = df.groupby('nama_kecamatan')[column].value_counts().unstack(fill_value=0)
+            kec_summary = figures['kecamatan_summary']
             if not kec_summary.empty:
-                st.dataframe(kec_summary, use_container_width=True)
+                show_table(kec_summary, 'kecamatan_summary', width='stretch')
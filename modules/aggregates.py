@@ -0,0 +1,181 @@
+"""
+Aggregates module for Podes 2024 dashboard
+Per-kecamatan village counts, indicator sums, answer counts and quantile
+sketches that can be built once from the full dataset and then patched
+"""
+
+import json
+import os
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+from modules.sketches import QuantileSketch
+from modules.store import kecamatan_code
+
+
+AGGREGATES_PATH = 'data/aggregates.json'
+AGGREGATES_FORMAT = 3
+
+# Kolom identitas, bukan indikator
+ID_COLUMNS = ('id_desa', 'nama_kecamatan', 'nama_desa')
+
+
+def build_aggregates(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Build the per-kecamatan aggregates of the full dataset
+
+    Kecamatan are keyed on their 7-digit code, since the same name can be
+    used in several kabupaten/kota.
+
+    Args:
+        df: Cleaned Podes dataframe
+
+    Returns:
+        Dict: {format, kecamatan: {code: {nama, jumlah_desa, sums, counts, sketches}}}
+    """
+    indicators = [col for col in df.columns if col not in ID_COLUMNS]
+    numeric = [col for col in indicators if pd.api.types.is_numeric_dtype(df[col])]
+    categorical = [col for col in indicators if col not in numeric]
+
+    codes = kecamatan_code(df['id_desa'])
+    groups = df.groupby(codes, sort=True)
+    names = groups['nama_kecamatan'].first()
+    sizes = groups.size()
+    sums = groups[numeric].sum()
+
+    kecamatan = {}
+    for code, size in sizes.items():
+        kecamatan[str(code)] = {
+            'nama': str(names.at[code]),
+            'jumlah_desa': int(size),
+            'sums': {col: int(sums.at[code, col]) for col in numeric},
+            'counts': {},
+            'sketches': {}
+        }
+    update_sketches({'kecamatan': kecamatan}, df)
+    for col in categorical:
+        counts = df.groupby([codes, df[col]], sort=True).size()
+        for (code, value), count in counts.items():
+            kecamatan[str(code)]['counts'].setdefault(col, {})[str(value)] = int(count)
+
+    return {'format': AGGREGATES_FORMAT, 'kecamatan': kecamatan}
+
+
+def _sum_term(value: Any) -> int:
+    """Contribution of one cell to a sum; missing values count as 0, as in build_aggregates"""
+    return 0 if pd.isna(value) else int(value)
+
+
+def apply_cell_changes(aggregates: Dict[str, Any], changes: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Patch aggregates in place with changed cells, O(changed cells)
+
+    Sums and counts only; sketches are rebuilt with update_sketches.
+
+    Args:
+        aggregates: Aggregates from build_aggregates
+        changes: Rows with id_desa, column, old_value, new_value
+
+    Returns:
+        Dict: The same aggregates object, updated
+    """
+    codes = kecamatan_code(changes['id_desa'])
+    for code, change in zip(codes, changes.itertuples(index=False)):
+        entry = aggregates['kecamatan'][code]
+        if change.column in entry['sums']:
+            entry['sums'][change.column] += _sum_term(change.new_value) - _sum_term(change.old_value)
+        else:
+            counts = entry['counts'].setdefault(change.column, {})
+            old_value, new_value = str(change.old_value), str(change.new_value)
+            counts[old_value] = counts.get(old_value, 0) - 1
+            if counts[old_value] <= 0:
+                del counts[old_value]
+            counts[new_value] = counts.get(new_value, 0) + 1
+    return aggregates
+
+
+def update_sketches(aggregates: Dict[str, Any], df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Rebuild the quantile sketches of the kecamatan present in df
+
+    Sketches cannot drop a value, so corrections rebuild them from all
+    villages of each affected kecamatan instead of patching cells.
+
+    Args:
+        aggregates: Aggregates to update in place
+        df: Every village of the kecamatan to rebuild
+
+    Returns:
+        Dict: The same aggregates object, updated
+    """
+    numeric = [
+        col for col in df.columns
+        if col not in ID_COLUMNS and pd.api.types.is_numeric_dtype(df[col])
+    ]
+    for code, rows in df.groupby(kecamatan_code(df['id_desa']), sort=True):
+        aggregates['kecamatan'][str(code)]['sketches'] = {
+            col: QuantileSketch.from_values(rows[col].to_numpy()).to_dict() for col in numeric
+        }
+    return aggregates
+
+
+def merge_sketches(aggregates: Dict[str, Any], column: str,
+                   kecamatan: Optional[List[str]] = None) -> Optional[QuantileSketch]:
+    """
+    Quantile sketch of an indicator over a set of kecamatan
+
+    Args:
+        aggregates: Aggregates from build_aggregates
+        column: Numeric indicator column
+        kecamatan: Kecamatan codes; None for the whole dataset
+
+    Returns:
+        QuantileSketch: Merged sketch, or None when a sketch is missing
+    """
+    entries = aggregates.get('kecamatan', {})
+    codes = list(entries) if kecamatan is None else kecamatan
+    merged = None
+    for code in codes:
+        data = entries.get(code, {}).get('sketches', {}).get(column)
+        if data is None:
+            return None
+        sketch = QuantileSketch.from_dict(data)
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged
+
+
+def write_aggregates(aggregates: Dict[str, Any], path: str = AGGREGATES_PATH) -> str:
+    """
+    Write the aggregates atomically
+
+    Args:
+        aggregates: Aggregates to write
+        path: Output file path
+
+    Returns:
+        str: Path of the written file
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(aggregates, file, indent=1, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_aggregates(path: str = AGGREGATES_PATH) -> Dict[str, Any]:
+    """
+    Read the aggregates file
+
+    Args:
+        path: Aggregates file path
+
+    Returns:
+        Dict: Aggregates, or empty dict if missing or of another format
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            aggregates = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return aggregates if aggregates.get('format') == AGGREGATES_FORMAT else {}
@@ -5,7 +5,20 @@ Handles data analysis, filtering, and comparison operations
 
 import pandas as pd
 import streamlit as st
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Optional
+
+from modules.aggregates import merge_sketches
+from modules.hierarchy import AdminHierarchy
+from modules.profiling import timed
+from modules.ranks import indicator_rankings
+from modules.sketches import QuantileSketch
+from modules.store import kecamatan_code
+
+
+# The dataset passed to these helpers is the read-only frame shared by every
+# session (modules.data_loader.get_podes_data, see freeze_frame). Helpers never
+# write into their input; an accidental in-place write raises instead of
+# changing the data other sessions see. No global pandas option is set here.
 
 
 def get_updated_category_indicators() -> Dict[str, Dict[str, str]]:
@@ -50,7 +63,24 @@ def get_updated_category_indicators() -> Dict[str, Dict[str, str]]:
     }
 
 
-def calculate_kpi_metrics(df: pd.DataFrame, indicator_key: str, indicator_label: str) -> Dict[str, Any]:
+def is_quantitative(series: pd.Series) -> bool:
+    """
+    Whether an indicator is shown as quantitative (ranking, distribution)
+    rather than qualitative (category proportions)
+    
+    Args:
+        series: Indicator column
+        
+    Returns:
+        bool: True for numeric columns and columns with more than 10 values
+    """
+    return series.nunique() > 10 or series.dtype in ['int64', 'float64']
+
+
+@timed('analysis.calculate_kpi_metrics')
+def calculate_kpi_metrics(df: pd.DataFrame, indicator_key: str, indicator_label: str,
+                          sketch: Optional[QuantileSketch] = None,
+                          rollup: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Calculate KPI metrics for the selected indicator
     
@@ -58,6 +88,10 @@ def calculate_kpi_metrics(df: pd.DataFrame, indicator_key: str, indicator_label:
         df: DataFrame containing the data
         indicator_key: The column key for the indicator
         indicator_label: Human-readable label for the indicator
+        sketch: Quantile sketch of the indicator over df; median and
+            quartiles are computed from the rows when omitted
+        rollup: Precomputed totals of the indicator over df (see
+            AdminHierarchy.indicator_rollup); computed from the rows when omitted
         
     Returns:
         Dict: KPI metrics including totals and top performers
@@ -67,15 +101,22 @@ def calculate_kpi_metrics(df: pd.DataFrame, indicator_key: str, indicator_label:
     
     kpis = {}
     data_series = df[indicator_key]
+    rollup = rollup or {}
     
     # Check if indicator is numeric or categorical
     if pd.api.types.is_numeric_dtype(data_series):
         # Quantitative indicators
         kpis['type'] = 'quantitative'
-        kpis['total'] = int(data_series.sum())
-        kpis['median'] = round(data_series.median(), 1)
-        kpis['max_value'] = int(data_series.max())
-        kpis['min_value'] = int(data_series.min())
+        kpis['total'] = int(rollup['total'] if 'total' in rollup else data_series.sum())
+        if sketch is not None:
+            quartiles = [sketch.quantile(q) for q in (0.25, 0.5, 0.75)]
+            kpis['median_exact'] = sketch.is_exact
+        else:
+            quartiles = data_series.quantile([0.25, 0.5, 0.75]).tolist()
+            kpis['median_exact'] = True
+        kpis['q1'], kpis['median'], kpis['q3'] = (round(value, 1) for value in quartiles)
+        kpis['max_value'] = int(rollup['max_value'] if 'max_value' in rollup else data_series.max())
+        kpis['min_value'] = int(rollup['min_value'] if 'min_value' in rollup else data_series.min())
         
         # Find top performing village
         if kpis['max_value'] > 0:
@@ -89,7 +130,7 @@ def calculate_kpi_metrics(df: pd.DataFrame, indicator_key: str, indicator_label:
     else:
         # Qualitative indicators
         kpis['type'] = 'qualitative'
-        value_counts = data_series.value_counts()
+        value_counts = rollup['value_counts'] if 'value_counts' in rollup else data_series.value_counts()
         kpis['value_counts'] = value_counts.to_dict()
         
         # Calculate percentages
@@ -105,26 +146,30 @@ def calculate_kpi_metrics(df: pd.DataFrame, indicator_key: str, indicator_label:
     return kpis
 
 
-def filter_and_analyze_data(df: pd.DataFrame, 
-                           selected_kecamatan: str,
-                           selected_desa: List[str],
-                           selected_indicator: str,
-                           category_indicators: Dict[str, Dict[str, str]],
-                           selected_category: str = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+@timed('analysis.filter_rows')
+def filter_rows(df: pd.DataFrame,
+                selected_kecamatan: str,
+                selected_desa: List[str],
+                hierarchy: Optional[AdminHierarchy] = None) -> pd.DataFrame:
     """
-    Filter data and perform analysis
+    Rows of the sidebar filter, without any analysis
     
     Args:
-        df: Source dataframe
+        df: Source dataframe (read-only)
         selected_kecamatan: Selected kecamatan filter
         selected_desa: List of selected villages
-        selected_indicator: Selected indicator key
-        category_indicators: Category indicator mapping
+        hierarchy: Administrative tree of df; when the filter is a single
+            region its rows are a slice of the tree
         
     Returns:
-        Tuple of filtered dataframe and analysis results
+        pd.DataFrame: Filtered rows
     """
-    filtered_df = df.copy()
+    # A kecamatan or a single desa is one node of the tree: slice, no masking
+    scope_code = hierarchy.scope_code(selected_kecamatan, selected_desa) if hierarchy is not None else None
+    if scope_code is not None:
+        return hierarchy.rows(scope_code)
+    
+    filtered_df = df
     
     # Apply kecamatan filter
     if selected_kecamatan != "Semua Kecamatan":
@@ -137,6 +182,43 @@ def filter_and_analyze_data(df: pd.DataFrame,
             filtered_df = filtered_df[filtered_df['nama_desa'] == selected_desa]
         elif isinstance(selected_desa, list) and len(selected_desa) > 0:
             filtered_df = filtered_df[filtered_df['nama_desa'].isin(selected_desa)]
+    return filtered_df
+
+
+@timed('analysis.filter_and_analyze_data')
+def filter_and_analyze_data(df: pd.DataFrame, 
+                           selected_kecamatan: str,
+                           selected_desa: List[str],
+                           selected_indicator: str,
+                           category_indicators: Dict[str, Dict[str, str]],
+                           selected_category: str = None,
+                           aggregates: Optional[Dict[str, Any]] = None,
+                           exact_median: bool = False,
+                           hierarchy: Optional[AdminHierarchy] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Filter data and perform analysis
+    
+    The source frame is not copied: the filters below build new frames and
+    never write into the shared, read-only dataset.
+    
+    Args:
+        df: Source dataframe (read-only)
+        selected_kecamatan: Selected kecamatan filter
+        selected_desa: List of selected villages
+        selected_indicator: Selected indicator key
+        category_indicators: Category indicator mapping
+        aggregates: Per-kecamatan aggregates; when given, the median of a
+            kecamatan or city scope is merged from their quantile sketches
+        exact_median: Compute the median from the filtered rows instead
+        hierarchy: Administrative tree of df; when the filter is a single
+            region its rows are a slice of the tree and the totals come
+            from the precomputed rollups
+        
+    Returns:
+        Tuple of filtered dataframe and analysis results
+    """
+    scope_code = hierarchy.scope_code(selected_kecamatan, selected_desa) if hierarchy is not None else None
+    filtered_df = filter_rows(df, selected_kecamatan, selected_desa, hierarchy)
     
     # Handle "Semua" case for indicators
     if selected_indicator == "Semua":
@@ -147,7 +229,10 @@ def filter_and_analyze_data(df: pd.DataFrame,
         kpis = {
             'type': 'summary',
             'total_villages': len(filtered_df),
-            'total_kecamatan': filtered_df['nama_kecamatan'].nunique() if len(filtered_df) > 0 else 0,
+            'total_kecamatan': (
+                len(hierarchy.descendants(scope_code, 'kecamatan')) if scope_code is not None
+                else kecamatan_code(filtered_df['id_desa']).nunique() if len(filtered_df) > 0 else 0
+            ),
             'indicator_type': 'multiple',
             'category': selected_category,
             'indicators_count': len(current_indicators)
@@ -165,13 +250,24 @@ def filter_and_analyze_data(df: pd.DataFrame,
     if indicator_label is None:
         indicator_label = selected_indicator
     
+    # Median from merged per-kecamatan sketches; a desa selection is not a
+    # union of kecamatan, so it always uses the rows. A kecamatan name can
+    # select several kecamatan codes, whose sketches are all merged.
+    sketch = None
+    if aggregates and not exact_median and not selected_desa:
+        scope = (None if selected_kecamatan == "Semua Kecamatan"
+                 else kecamatan_code(filtered_df['id_desa']).unique().tolist())
+        sketch = merge_sketches(aggregates, selected_indicator, scope)
+    
+    rollup = hierarchy.indicator_rollup(scope_code, selected_indicator) if scope_code is not None else None
+    
     # Calculate KPIs for single indicator
-    kpis = calculate_kpi_metrics(filtered_df, selected_indicator, indicator_label)
-    kpis = calculate_kpi_metrics(filtered_df, selected_indicator, indicator_label)
+    kpis = calculate_kpi_metrics(filtered_df, selected_indicator, indicator_label, sketch, rollup)
     
     return filtered_df, kpis
 
 
+@timed('analysis.create_comparison_analysis')
 def create_comparison_analysis(df: pd.DataFrame, 
                              selected_villages: List[str],
                              indicator_columns: List[str],
@@ -216,26 +312,34 @@ def create_comparison_analysis(df: pd.DataFrame,
     return comparison_data
 
 
+@timed('analysis.get_ranking_data')
 def get_ranking_data(df: pd.DataFrame, 
                     indicator_key: str, 
-                    top_n: int = 5) -> pd.DataFrame:
+                    top_n: int = 5,
+                    rank_tables: Optional[Dict[str, pd.DataFrame]] = None) -> pd.DataFrame:
     """
     Get top N villages for a specific indicator
     
+    Villages tied with the N-th place are all included, so the result can
+    have more than top_n rows.
+    
     Args:
         df: Source dataframe
         indicator_key: Indicator column to rank by
-        top_n: Number of top villages to return
+        top_n: Number of top ranks to return
+        rank_tables: Precomputed ranks from get_rank_tables()
         
     Returns:
-        DataFrame: Top N villages
+        DataFrame: Top N villages with their rank
     """
     if df.empty or indicator_key not in df.columns:
         return pd.DataFrame()
     
-    # For numeric data, get top values
+    # For numeric data, look up the top ranks
     if pd.api.types.is_numeric_dtype(df[indicator_key]):
-        ranking_df = df.nlargest(top_n, indicator_key)[['nama_desa', 'nama_kecamatan', indicator_key]]
+        rankings = indicator_rankings(df, indicator_key, rank_tables)
+        ranking_df = rankings[rankings['peringkat'] <= top_n].rename(columns={'nilai': indicator_key})
+        ranking_df = ranking_df[['peringkat', 'nama_desa', 'nama_kecamatan', indicator_key]]
     else:
         # For categorical data, show distribution
         ranking_df = df[['nama_desa', 'nama_kecamatan', indicator_key]]
@@ -254,5 +358,6 @@ def reset_filters() -> Dict[str, Any]:
         'kategori': 'Pendidikan',
         'indikator': 'Semua',
         'kecamatan': 'Semua Kecamatan',
-        'desa': []
+        'desa': [],
+        'median_eksak': False
     }
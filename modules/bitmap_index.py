@@ -0,0 +1,262 @@
+"""
+Bitmap index module for Podes 2024 dashboard
+One bitset per answer of every categorical column and range-encoded bitsets
+over the count columns, built once per dataset version, so any AND/OR/NOT
+combination of conditions is a handful of bitwise operations over packed
+bytes; rows are only materialized when asked for
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.pivot import encode_dimension
+
+
+# Kolom nama desa hampir unik per baris; tidak berguna sebagai kondisi
+EXCLUDED_COLUMNS = ('id_desa', 'nama_desa')
+
+# Kolom angka dengan nilai unik sebanyak ini atau kurang diindeks per nilai (eksak);
+# selebihnya per bin kuantil, baris di bin batas dicek dengan nilai aslinya
+MAX_RANGE_BINS = 64
+
+CATEGORICAL_OPERATORS = ('in', 'not in')
+NUMERIC_OPERATORS = ('==', '!=', '>=', '>', '<=', '<', 'between')
+
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+# Container bitset: padat (bit terkemas) atau jarang (posisi baris), mana yang lebih kecil
+_Container = Tuple[str, np.ndarray]
+
+
+class BitmapIndex:
+    """
+    Bitmap indexes over the Podes data
+
+    Categorical columns get one bitset per value, stored packed (one bit per
+    village) or, when few villages have the value (e.g. one kecamatan among
+    thousands), as a sorted position list. Count columns get range-encoded
+    bitsets: ge[k] holds the villages with a value >= edges[k], so every
+    comparison is one or two bitsets plus, for binned columns, a check of
+    the boundary bin.
+
+    Queries are nested dicts:
+        {'column': 'status_tps', 'op': 'in', 'values': ['Tidak Ada']}
+        {'column': 'jumlah_puskesmas', 'op': '==', 'value': 0}
+        {'column': 'jumlah_sd', 'op': 'between', 'value': [1, 3]}
+        {'and': [...]}, {'or': [...]}, {'not': {...}}
+    """
+
+    def __init__(self, df: pd.DataFrame, encoded: Optional[Dict[str, Tuple[np.ndarray, pd.Index]]] = None):
+        """
+        Build the bitsets of every column
+
+        Args:
+            df: Podes data; row positions of query results refer to this frame
+            encoded: Integer-coded columns of df (see modules/pivot.py), reused
+                instead of encoding the categorical columns again
+        """
+        encoded = encoded or {}
+        self.frame = df
+        self.size = len(df)
+        self._nbytes = (self.size + 7) // 8
+        self._all = self._pack(np.ones(self.size, dtype=bool))
+
+        self.labels: Dict[str, pd.Index] = {}
+        self._values: Dict[str, List[_Container]] = {}
+        self.edges: Dict[str, np.ndarray] = {}
+        self._ge: Dict[str, np.ndarray] = {}
+        self._numbers: Dict[str, np.ndarray] = {}
+        self._exact: Dict[str, bool] = {}
+
+        for col in df.columns:
+            if col in EXCLUDED_COLUMNS:
+                continue
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+                self._index_numeric(col, df[col].to_numpy(dtype='float64', na_value=np.nan))
+            else:
+                self._index_categorical(col, *(encoded.get(col) or encode_dimension(df[col])))
+
+    def _pack(self, mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask)
+
+    def _compress(self, positions: np.ndarray) -> _Container:
+        if positions.size * 4 < self._nbytes:
+            return 'sparse', positions.astype('uint32')
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions] = True
+        return 'dense', self._pack(mask)
+
+    def _dense(self, container: _Container) -> np.ndarray:
+        kind, data = container
+        if kind == 'dense':
+            return data
+        mask = np.zeros(self.size, dtype=bool)
+        mask[data] = True
+        return self._pack(mask)
+
+    def _index_categorical(self, col: str, codes: np.ndarray, labels: pd.Index) -> None:
+        # Posisi baris per kode dengan satu argsort, bukan satu perbandingan per nilai
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        starts = np.searchsorted(codes[order], np.arange(len(labels)))
+        self.labels[col] = labels
+        self._values[col] = [
+            self._compress(np.sort(order[start:start + count])) for start, count in zip(starts, counts)
+        ]
+
+    def _index_numeric(self, col: str, values: np.ndarray) -> None:
+        present = values[~np.isnan(values)]
+        uniques = np.unique(present)
+        exact = len(uniques) <= MAX_RANGE_BINS
+        edges = uniques if exact else np.unique(np.quantile(present, np.linspace(0, 1, MAX_RANGE_BINS + 1)[:-1]))
+
+        # ge[k]: nilai >= edges[k]; ge[len(edges)] kosong. NaN tidak masuk bin mana pun
+        bins = np.searchsorted(edges, values, side='right') - 1
+        bins[np.isnan(values)] = -1
+        counts = np.bincount(bins[bins >= 0], minlength=len(edges))
+        ge = np.zeros((len(edges) + 1, self._nbytes), dtype=np.uint8)
+        mask = np.zeros(self.size, dtype=bool)
+        order = np.argsort(bins, kind='stable')
+        stop = len(order)
+        for k in range(len(edges) - 1, -1, -1):
+            start = stop - counts[k]
+            mask[order[start:stop]] = True
+            ge[k] = self._pack(mask)
+            stop = start
+
+        self.edges[col] = edges
+        self._ge[col] = ge
+        self._numbers[col] = values
+        self._exact[col] = exact
+
+    @property
+    def columns(self) -> List[str]:
+        """Indexed columns"""
+        return list(self.labels) + list(self.edges)
+
+    def is_numeric(self, column: str) -> bool:
+        """True for range-indexed count columns"""
+        return column in self.edges
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the bitsets"""
+        total = sum(data.nbytes for containers in self._values.values() for _, data in containers)
+        return total + sum(ge.nbytes for ge in self._ge.values())
+
+    def _refine(self, col: str, k: int, predicate) -> np.ndarray:
+        """Rows of bin k that satisfy a predicate on the raw values"""
+        edges = self.edges[col]
+        if self._exact[col] or k < 0 or k >= len(edges):
+            return np.zeros(self._nbytes, dtype=np.uint8)
+        in_bin = self._ge[col][k] & ~self._ge[col][k + 1]
+        positions = np.flatnonzero(np.unpackbits(in_bin, count=self.size))
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions[predicate(self._numbers[col][positions])]] = True
+        return self._pack(mask)
+
+    def _at_least(self, col: str, value: float) -> np.ndarray:
+        k = int(np.searchsorted(self.edges[col], value, side='left'))
+        return self._ge[col][k] | self._refine(col, k - 1, lambda v: v >= value)
+
+    def _above(self, col: str, value: float) -> np.ndarray:
+        k = int(np.searchsorted(self.edges[col], value, side='right'))
+        return self._ge[col][k] | self._refine(col, k - 1, lambda v: v > value)
+
+    def _numeric(self, col: str, op: str, value: Any) -> np.ndarray:
+        present = self._ge[col][0]
+        if op == 'between':
+            low, high = value
+            return self._at_least(col, float(low)) & present & ~self._above(col, float(high))
+        if op == 'in':
+            result = np.zeros(self._nbytes, dtype=np.uint8)
+            for item in value:
+                result |= self._numeric(col, '==', item)
+            return result
+        value = float(value)
+        if op == '>=':
+            return self._at_least(col, value)
+        if op == '>':
+            return self._above(col, value)
+        if op == '<':
+            return present & ~self._at_least(col, value)
+        if op == '<=':
+            return present & ~self._above(col, value)
+        equal = self._at_least(col, value) & ~self._above(col, value)
+        if op == '==':
+            return equal
+        if op == '!=':
+            return present & ~equal
+        raise ValueError(f"Operator '{op}' tidak dikenal untuk kolom angka '{col}'")
+
+    def _categorical(self, col: str, op: str, values: List[Any]) -> np.ndarray:
+        result = np.zeros(self._nbytes, dtype=np.uint8)
+        positions = self.labels[col].get_indexer(pd.Index(values))
+        for position in positions[positions >= 0]:
+            result |= self._dense(self._values[col][position])
+        if op in ('in', '=='):
+            return result
+        if op in ('not in', '!='):
+            # Nilai kosong tidak memenuhi "bukan X", seperti di SQL
+            present = np.zeros(self._nbytes, dtype=np.uint8)
+            for container in self._values[col]:
+                present |= self._dense(container)
+            return present & ~result
+        raise ValueError(f"Operator '{op}' tidak dikenal untuk kolom kategori '{col}'")
+
+    def evaluate(self, query: Optional[Dict[str, Any]]) -> np.ndarray:
+        """
+        Packed bitset of the villages matching a query
+
+        Args:
+            query: Condition tree (see class docstring); None matches every village
+
+        Returns:
+            np.ndarray: uint8 bitset, one bit per row of the frame
+        """
+        if query is None:
+            return self._all
+        if 'and' in query:
+            result = self._all.copy()
+            for part in query['and']:
+                result &= self.evaluate(part)
+            return result
+        if 'or' in query:
+            result = np.zeros(self._nbytes, dtype=np.uint8)
+            for part in query['or']:
+                result |= self.evaluate(part)
+            return result
+        if 'not' in query:
+            return self._all & ~self.evaluate(query['not'])
+
+        col, op = query['column'], query.get('op', 'in')
+        if col in self.edges:
+            return self._numeric(col, op, query['values'] if op == 'in' else query['value'])
+        if col in self.labels:
+            values = query['values'] if 'values' in query else [query['value']]
+            return self._categorical(col, op, values)
+        raise KeyError(f"Kolom '{col}' tidak diindeks")
+
+    def count(self, bitset: np.ndarray) -> int:
+        """Number of villages in a bitset"""
+        return int(_POPCOUNT[bitset].sum(dtype=np.int64))
+
+    def positions(self, bitset: np.ndarray) -> np.ndarray:
+        """Row positions of a bitset, in frame order"""
+        return np.flatnonzero(np.unpackbits(bitset, count=self.size))
+
+    def rows(self, bitset: np.ndarray, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Villages of a bitset
+
+        Args:
+            bitset: Result of evaluate
+            columns: Columns to return; all when omitted
+
+        Returns:
+            pd.DataFrame: Matching rows of the frame
+        """
+        frame = self.frame if columns is None else self.frame[columns]
+        return frame.iloc[self.positions(bitset)]
@@ -0,0 +1,353 @@
+"""
+Build graph module for Podes 2024 dashboard
+Make-like rebuild of the derived data artifacts: every node declares the
+files it reads, the code it runs and the nodes it depends on, and is rebuilt
+only when the content hash of those inputs changed or its outputs were
+changed or removed since it was built. Independent nodes run in parallel,
+and a node rebuilt to identical outputs does not trigger its dependents
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+
+BUILD_STATE_PATH = 'data/cache/build_state.json'
+BUILD_STATE_FORMAT = 1
+
+# File yang diubah dalam jendela ini (detik) selalu di-hash ulang: ukuran dan
+# waktu modifikasinya belum cukup membuktikan isinya tidak berubah
+RACY_SECONDS = 2.0
+
+Paths = Union[List[str], Callable[[], List[str]]]
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+class FileHasher:
+    """
+    Content hashes of files, directories and glob patterns
+
+    File hashes are cached by size and modification time, so files that did
+    not change since the previous build are not read again.
+    """
+
+    def __init__(self, cache: Optional[Dict[str, list]] = None):
+        self.cache = dict(cache or {})
+
+    def file(self, path: str) -> Optional[str]:
+        """SHA-256 prefix of a file's content, None when it does not exist"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        cached = self.cache.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        value = digest.hexdigest()[:16]
+        if time.time() - stat.st_mtime_ns / 1e9 > RACY_SECONDS:
+            self.cache[path] = [stat.st_size, stat.st_mtime_ns, value]
+        return value
+
+    def expand(self, patterns: Iterable[str]) -> List[str]:
+        """Files matched by paths, directories (walked recursively) and glob patterns"""
+        files = []
+        for pattern in patterns:
+            for path in sorted(glob.glob(pattern)) or [pattern]:
+                if os.path.isdir(path):
+                    for directory, subdirs, names in os.walk(path):
+                        subdirs.sort()
+                        files.extend(os.path.join(directory, name) for name in sorted(names))
+                else:
+                    files.append(path)
+        return files
+
+    def paths(self, patterns: Iterable[str]) -> str:
+        """
+        Combined hash of every file under a set of patterns
+
+        Args:
+            patterns: Paths, directories or glob patterns
+
+        Returns:
+            str: Hash of the (path, content hash) pairs; missing files count as missing
+        """
+        return _digest([(path, self.file(path)) for path in self.expand(patterns)])
+
+    def prune(self) -> None:
+        """Forget files that no longer exist"""
+        self.cache = {path: entry for path, entry in self.cache.items() if os.path.exists(path)}
+
+
+class BuildNode:
+    """
+    One derived artifact and the recipe that produces it
+
+    The action runs in a worker process as action(**params); it must be a
+    module-level function and read its inputs from disk.
+    """
+
+    def __init__(self, name: str, action: Callable[..., Any], params: Optional[Dict[str, Any]] = None,
+                 deps: Iterable[str] = (), sources: Iterable[str] = (), code: Iterable[str] = (),
+                 outputs: Paths = (), fingerprint: Optional[Callable[['FileHasher'], Optional[str]]] = None):
+        """
+        Args:
+            name: Node name, e.g. 'ranks'
+            action: Function that (re)builds the outputs
+            params: Keyword arguments of the action; part of the input hash
+            deps: Names of the nodes whose outputs the action reads
+            sources: Files read by the action that no node builds (raw data, logs)
+            code: Source files of the recipe; editing them rebuilds the node
+            outputs: Files, directories or glob patterns written by the action,
+                or a function returning them once the dependencies are built
+                (for paths that contain the dataset version)
+            fingerprint: Function of a FileHasher returning a fingerprint of
+                the outputs, used instead of hashing every output file (e.g.
+                when an output carries a build timestamp)
+        """
+        self.name = name
+        self.action = action
+        self.params = dict(params or {})
+        self.deps = list(deps)
+        self.sources = list(sources)
+        self.code = list(code)
+        self.outputs = outputs
+        self.fingerprint = fingerprint
+
+    def output_paths(self) -> List[str]:
+        return list(self.outputs()) if callable(self.outputs) else list(self.outputs)
+
+
+def _run_action(action: Callable[..., Any], params: Dict[str, Any]) -> float:
+    """Run one action and return its duration (executed in a worker process)"""
+    start = time.perf_counter()
+    action(**params)
+    return time.perf_counter() - start
+
+
+class BuildGraph:
+    """
+    Dependency graph of build nodes with a persistent record of the last build
+
+    For every node the record keeps the hash of its inputs (source files,
+    recipe code, parameters and the fingerprints of its dependencies) and the
+    fingerprint of its outputs. A node is up to date when both still match.
+    """
+
+    def __init__(self, nodes: List[BuildNode], state_path: str = BUILD_STATE_PATH):
+        self.nodes = {node.name: node for node in nodes}
+        self.state_path = state_path
+        if len(self.nodes) != len(nodes):
+            raise ValueError("Nama node build harus unik")
+        for node in nodes:
+            unknown = [dep for dep in node.deps if dep not in self.nodes]
+            if unknown:
+                raise ValueError(f"Node '{node.name}' bergantung pada node yang tidak ada: {', '.join(unknown)}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        indegree = {name: len(node.deps) for name, node in self.nodes.items()}
+        dependents: Dict[str, List[str]] = {name: [] for name in self.nodes}
+        for name, node in self.nodes.items():
+            for dep in node.deps:
+                dependents[dep].append(name)
+        ready = [name for name in self.nodes if indegree[name] == 0]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for dependent in dependents[name]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(self.nodes):
+            cycle = sorted(name for name in self.nodes if name not in order)
+            raise ValueError(f"Graf build memiliki siklus di antara: {', '.join(cycle)}")
+        return order
+
+    def select(self, targets: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Nodes needed for some targets: the targets and everything upstream
+
+        Args:
+            targets: Node names; all nodes when omitted
+
+        Returns:
+            List[str]: Node names in build order
+        """
+        if targets is None:
+            return list(self.order)
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.nodes:
+                raise KeyError(f"Node build '{name}' tidak ada")
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.nodes[name].deps)
+        return [name for name in self.order if name in needed]
+
+    def load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {}
+        if state.get('format') != BUILD_STATE_FORMAT:
+            state = {'format': BUILD_STATE_FORMAT, 'nodes': {}, 'files': {}}
+        return state
+
+    def _save_state(self, state: Dict[str, Any], hasher: FileHasher) -> None:
+        state['files'] = hasher.cache
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def _input_hash(self, node: BuildNode, hasher: FileHasher, fingerprints: Dict[str, str]) -> str:
+        return _digest({
+            'node': node.name,
+            'params': node.params,
+            'sources': hasher.paths(node.sources),
+            'code': hasher.paths(node.code),
+            'deps': {dep: fingerprints[dep] for dep in node.deps}
+        })
+
+    def _output_fingerprint(self, node: BuildNode, hasher: FileHasher, input_hash: str) -> Optional[str]:
+        outputs = node.output_paths()
+        if any(not glob.glob(pattern) for pattern in outputs):
+            return None
+        if node.fingerprint is not None:
+            return node.fingerprint(hasher)
+        # Node tanpa keluaran (mis. pembersihan) diwakili hash masukannya
+        return hasher.paths(outputs) if outputs else input_hash
+
+    def run(self, targets: Optional[Iterable[str]] = None, workers: int = 1,
+            force: Union[bool, Iterable[str]] = False,
+            dry_run: bool = False, progress: Optional[Callable[[str, Dict[str, Any]], None]] = None
+            ) -> Dict[str, Dict[str, Any]]:
+        """
+        Bring nodes up to date
+
+        Ready nodes are dispatched to a process pool as soon as their last
+        dependency finishes. A node whose dependency failed is skipped.
+
+        Args:
+            targets: Node names to build with everything upstream; all nodes when omitted
+            workers: Parallel worker processes; 1 runs the actions in this process
+            force: Rebuild every selected node, or only the named nodes
+            dry_run: Only report which nodes are out of date; nodes downstream
+                of an out-of-date node are reported as out of date as well
+            progress: Called with (node name, result) when a node is settled
+
+        Returns:
+            Dict: Node name -> {status: 'fresh', 'built', 'stale', 'failed'
+            or 'skipped', seconds, changed (built nodes), reason, error}
+        """
+        state = self.load_state()
+        hasher = FileHasher(state['files'])
+        pending = self.select(targets)
+        forced = set(pending) if force is True else set(force or ())
+        results: Dict[str, Dict[str, Any]] = {}
+        fingerprints: Dict[str, str] = {}
+        inputs: Dict[str, str] = {}
+        running: Dict[Any, str] = {}
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and not dry_run else None
+
+        def settle(name: str, result: Dict[str, Any]) -> None:
+            results[name] = result
+            if progress is not None:
+                progress(name, result)
+
+        def finish(name: str, seconds: Optional[float], error: Optional[BaseException]) -> None:
+            node = self.nodes[name]
+            if error is not None:
+                settle(name, {'status': 'failed', 'error': f"{type(error).__name__}: {error}"})
+                return
+            fingerprint = self._output_fingerprint(node, hasher, inputs[name])
+            if fingerprint is None:
+                settle(name, {'status': 'failed', 'error': "keluaran tidak terbentuk"})
+                return
+            previous = state['nodes'].get(name, {})
+            fingerprints[name] = fingerprint
+            state['nodes'][name] = {
+                'input': inputs[name],
+                'output': fingerprint,
+                'built_at': datetime.now().isoformat(timespec='seconds'),
+                'seconds': round(seconds, 3)
+            }
+            # Disimpan per node agar build yang terputus tidak mengulang node yang sudah selesai
+            self._save_state(state, hasher)
+            settle(name, {'status': 'built', 'seconds': seconds, 'changed': previous.get('output') != fingerprint})
+
+        try:
+            while pending or running:
+                for name in list(pending):
+                    node = self.nodes[name]
+                    dep_status = [results[dep]['status'] for dep in node.deps if dep in results]
+                    if any(status in ('failed', 'skipped') for status in dep_status):
+                        pending.remove(name)
+                        settle(name, {'status': 'skipped', 'reason': "dependensi gagal"})
+                        continue
+                    if len(dep_status) < len(node.deps):
+                        continue
+                    pending.remove(name)
+
+                    if 'stale' in dep_status:
+                        settle(name, {'status': 'stale', 'reason': "dependensi berubah"})
+                        continue
+                    inputs[name] = self._input_hash(node, hasher, fingerprints)
+                    previous = state['nodes'].get(name)
+                    reason = (
+                        "dipaksa" if name in forced
+                        else "belum pernah dibangun" if previous is None
+                        else "masukan berubah" if previous['input'] != inputs[name]
+                        else None
+                    )
+                    if reason is None:
+                        fingerprint = self._output_fingerprint(node, hasher, inputs[name])
+                        if fingerprint == previous['output']:
+                            fingerprints[name] = fingerprint
+                            settle(name, {'status': 'fresh'})
+                            continue
+                        reason = "keluaran hilang" if fingerprint is None else "keluaran diubah di luar build"
+
+                    if dry_run:
+                        settle(name, {'status': 'stale', 'reason': reason})
+                    elif executor is None:
+                        try:
+                            seconds, error = _run_action(node.action, node.params), None
+                        except Exception as exc:
+                            seconds, error = None, exc
+                        finish(name, seconds, error)
+                    else:
+                        running[executor.submit(_run_action, node.action, node.params)] = name
+
+                if running:
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        error = future.exception()
+                        finish(name, None if error else future.result(), error)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if not dry_run:
+                hasher.prune()
+                self._save_state(state, hasher)
+        return results
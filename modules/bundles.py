@@ -0,0 +1,337 @@
+"""
+View bundle module for Podes 2024 dashboard
+Precomputed KPIs, figures and tables of the "Semua" indicator view for every
+(category, kecamatan) pair, stored per kecamatan version so the dashboard can
+serve the most common states without rebuilding any figure
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from modules.analysis import filter_and_analyze_data, get_updated_category_indicators
+from modules.code_matrix import CodeMatrix, summarize_frame
+from modules.hierarchy import AdminHierarchy
+from modules.reports import scope_slug
+
+
+BUNDLES_DIR = 'data/cache/bundles'
+BUNDLE_FORMAT = 1
+ALL_KECAMATAN = 'Semua Kecamatan'
+
+
+def bundle_dir(version: str, category: str, kecamatan: str, cache_dir: str = BUNDLES_DIR) -> str:
+    """
+    Directory of one view bundle
+
+    Args:
+        version: Bundle version, see bundle_version
+        category: Indicator category
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+        cache_dir: Bundle cache directory
+
+    Returns:
+        str: <cache_dir>/<version>/<category>__<kecamatan>
+    """
+    return os.path.join(cache_dir, version, f"{scope_slug(category)}__{scope_slug(kecamatan)}")
+
+
+def _encode(value: Any, tables: Dict[str, pd.DataFrame], name: str) -> Any:
+    """JSON form of a figures dict; frames are collected into tables for Parquet"""
+    if isinstance(value, go.Figure):
+        return {'__figure__': json.loads(value.to_json())}
+    if isinstance(value, pd.DataFrame):
+        file_name = f"{name}.parquet"
+        tables[file_name] = value
+        return {'__table__': file_name}
+    if isinstance(value, pd.Series):
+        return {'__series__': {
+            'name': value.name, 'index_name': value.index.name,
+            'index': [_encode(item, tables, name) for item in value.index],
+            'values': [_encode(item, tables, name) for item in value.to_numpy()]
+        }}
+    if isinstance(value, dict):
+        return {
+            str(key): _encode(item, tables, f"{name}__{position}")
+            for position, (key, item) in enumerate(value.items())
+        }
+    if isinstance(value, (list, tuple)):
+        return [_encode(item, tables, name) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(value: Any, directory: str) -> Any:
+    """Inverse of _encode"""
+    if isinstance(value, dict):
+        if '__figure__' in value:
+            return pio.from_json(json.dumps(value['__figure__']))
+        if '__table__' in value:
+            return pd.read_parquet(os.path.join(directory, value['__table__']))
+        if '__series__' in value:
+            data = value['__series__']
+            return pd.Series(data['values'], index=pd.Index(data['index'], name=data['index_name']),
+                             name=data['name'])
+        return {key: _decode(item, directory) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item, directory) for item in value]
+    return value
+
+
+def build_indicator_view(df: pd.DataFrame, key: str, label: str,
+                         rank_tables: Optional[Dict[str, pd.DataFrame]] = None,
+                         summary: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Compute the figures and tables of one indicator over a filtered frame
+
+    Args:
+        df: Filtered Podes data
+        key: Indicator column
+        label: Indicator label
+        rank_tables: Precomputed ranks, see data_loader.get_rank_tables()
+        summary: Counts of the indicator over df, see CodeMatrix.summarize;
+            computed here when omitted
+
+    Returns:
+        Dict: {kind: 'quantitative' or 'qualitative', figures}
+    """
+    from enhanced_viz import build_quantitative_figures, build_qualitative_figures
+
+    if summary is None:
+        summary = summarize_frame(df, [key])[key]
+    if summary['kind'] == 'quantitative':
+        return {'kind': 'quantitative', 'figures': build_quantitative_figures(df, key, label, rank_tables, summary)}
+    return {'kind': 'qualitative', 'figures': build_qualitative_figures(df, key, label, summary)}
+
+
+def build_view_bundle(df: pd.DataFrame, category: str, kecamatan: str,
+                      category_indicators: Dict[str, Dict[str, str]],
+                      rank_tables: Optional[Dict[str, pd.DataFrame]] = None,
+                      hierarchy: Optional[AdminHierarchy] = None,
+                      matrix: Optional[CodeMatrix] = None) -> Dict[str, Any]:
+    """
+    Compute the "Semua" indicator view of one category and kecamatan
+
+    Uses the same functions as the dashboard, so a served bundle renders
+    exactly what live computation would. The counts of every indicator of
+    the category come from one pass over the code matrix.
+
+    Args:
+        df: Full Podes data
+        category: Indicator category
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+        category_indicators: Category -> {indicator: label}
+        rank_tables: Precomputed ranks, see data_loader.get_rank_tables()
+        hierarchy: Administrative tree of df
+        matrix: Code matrix of df; built from the filtered frame when omitted
+
+    Returns:
+        Dict: {kpis, indicators: {key: {kind, figures}}}
+    """
+    filtered_df, kpis = filter_and_analyze_data(
+        df, kecamatan, [], 'Semua', category_indicators, category, hierarchy=hierarchy
+    )
+    keys = [key for key in category_indicators[category] if key in filtered_df.columns]
+    if filtered_df.empty:
+        summaries = {}
+    elif matrix is not None:
+        summaries = matrix.summarize(keys, matrix.rows_of(filtered_df))
+    else:
+        summaries = summarize_frame(filtered_df, keys)
+    indicators = {
+        key: build_indicator_view(filtered_df, key, category_indicators[category][key], rank_tables, summaries[key])
+        for key in keys if key in summaries
+    }
+    return {'kpis': kpis, 'indicators': indicators}
+
+
+def write_view_bundle(bundle: Dict[str, Any], version: str, category: str, kecamatan: str,
+                      cache_dir: str = BUNDLES_DIR) -> str:
+    """
+    Store a view bundle: bundle.json plus one Parquet file per table
+
+    Args:
+        bundle: Output of build_view_bundle
+        version: Version the bundle is stored under, see bundle_version
+        category: Indicator category
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+        cache_dir: Bundle cache directory
+
+    Returns:
+        str: Bundle directory
+    """
+    target = bundle_dir(version, category, kecamatan, cache_dir)
+    tmp_dir = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    tables: Dict[str, pd.DataFrame] = {}
+    content = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'category': category,
+        'kecamatan': kecamatan,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'kpis': _encode(bundle['kpis'], tables, 'kpis'),
+        'indicators': {
+            key: {'kind': entry['kind'], 'figures': _encode(entry['figures'], tables, key)}
+            for key, entry in bundle['indicators'].items()
+        }
+    }
+    for file_name, table in tables.items():
+        table.to_parquet(os.path.join(tmp_dir, file_name))
+    with open(os.path.join(tmp_dir, 'bundle.json'), 'w', encoding='utf-8') as file:
+        json.dump(content, file, ensure_ascii=False)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+    return target
+
+
+def load_view_bundle(version: str, category: str, kecamatan: str,
+                     cache_dir: str = BUNDLES_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Read a stored view bundle
+
+    Args:
+        version: Current bundle version, see bundle_version
+        category: Indicator category
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+        cache_dir: Bundle cache directory
+
+    Returns:
+        Dict: Bundle like build_view_bundle's, or None when it is missing,
+        of another format or built from another version
+    """
+    directory = bundle_dir(version, category, kecamatan, cache_dir)
+    try:
+        with open(os.path.join(directory, 'bundle.json'), 'r', encoding='utf-8') as file:
+            content = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if content.get('format') != BUNDLE_FORMAT or content.get('version') != version:
+        return None
+    return {
+        'kpis': _decode(content['kpis'], directory),
+        'indicators': {
+            key: {'kind': entry['kind'], 'figures': _decode(entry['figures'], directory)}
+            for key, entry in content['indicators'].items()
+        }
+    }
+
+
+def bundle_figures(bundle: Optional[Dict[str, Any]], key: str) -> Optional[Dict[str, Any]]:
+    """Precomputed figures of one indicator, or None to build them live"""
+    if bundle is None or key not in bundle['indicators']:
+        return None
+    return bundle['indicators'][key]['figures']
+
+
+def bundle_scopes(df: pd.DataFrame) -> List[str]:
+    """Kecamatan scopes that get a bundle: the whole dataset first (default state)"""
+    return [ALL_KECAMATAN] + sorted(df['nama_kecamatan'].dropna().unique().tolist())
+
+
+def bundle_version(version: str, kecamatan: str, scope_versions: Optional[Dict[str, str]] = None) -> str:
+    """
+    Version a bundle is stored under
+
+    A kecamatan bundle only depends on that kecamatan's rows, so it is keyed
+    on the kecamatan's own version (see manifest.scope_version) and survives
+    corrections elsewhere; the whole-city bundle is keyed on the dataset version.
+
+    Args:
+        version: Dataset version
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+        scope_versions: Version per kecamatan name, from manifest.kecamatan_versions
+
+    Returns:
+        str: Bundle version
+    """
+    return (scope_versions or {}).get(kecamatan) or version
+
+
+def has_view_bundle(version: str, category: str, kecamatan: str, cache_dir: str = BUNDLES_DIR) -> bool:
+    """True when a bundle of the current format is stored for this version"""
+    try:
+        with open(os.path.join(bundle_dir(version, category, kecamatan, cache_dir), 'bundle.json'),
+                  'r', encoding='utf-8') as file:
+            content = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    return content.get('format') == BUNDLE_FORMAT and content.get('version') == version
+
+
+def build_view_bundles(df: pd.DataFrame, version: str, cache_dir: str = BUNDLES_DIR,
+                       rank_tables: Optional[Dict[str, pd.DataFrame]] = None,
+                       categories: Optional[List[str]] = None,
+                       scope_versions: Optional[Dict[str, str]] = None,
+                       scopes: Optional[List[str]] = None,
+                       skip_current: bool = False) -> int:
+    """
+    Precompute the (category, kecamatan) bundles of a dataset version
+
+    Args:
+        df: Full Podes data
+        version: Dataset version
+        cache_dir: Bundle cache directory
+        rank_tables: Precomputed ranks; scopes are ranked on the spot when omitted
+        categories: Categories to build; all categories when omitted
+        scope_versions: Version per kecamatan name (manifest.kecamatan_versions);
+            kecamatan bundles are keyed on the dataset version when omitted
+        scopes: Kecamatan scopes to build (e.g. the corrected ones and
+            'Semua Kecamatan'); every scope of df when omitted
+        skip_current: Leave bundles already stored under their version, so
+            after a correction only the changed kecamatan are rebuilt
+
+    Returns:
+        int: Number of bundles written
+    """
+    category_indicators = get_updated_category_indicators()
+    pending = [
+        (category, kecamatan, bundle_version(version, kecamatan, scope_versions))
+        for category in categories or list(category_indicators)
+        for kecamatan in scopes or bundle_scopes(df)
+    ]
+    if skip_current:
+        pending = [(category, kecamatan, key) for category, kecamatan, key in pending
+                   if not has_view_bundle(key, category, kecamatan, cache_dir)]
+    if not pending:
+        return 0
+
+    hierarchy = AdminHierarchy(df)
+    matrix = CodeMatrix(df)
+    for category, kecamatan, key in pending:
+        bundle = build_view_bundle(df, category, kecamatan, category_indicators, rank_tables, hierarchy, matrix)
+        write_view_bundle(bundle, key, category, kecamatan, cache_dir)
+    return len(pending)
+
+
+def prune_view_bundles(version: str, cache_dir: str = BUNDLES_DIR,
+                       scope_versions: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    Remove the bundles of every other dataset and kecamatan version
+
+    Args:
+        version: Dataset version to keep
+        cache_dir: Bundle cache directory
+        scope_versions: Per-kecamatan versions to keep (see bundle_version)
+
+    Returns:
+        List[str]: Removed version directories
+    """
+    keep = {version} | set((scope_versions or {}).values())
+    removed = []
+    for name in sorted(os.listdir(cache_dir)) if os.path.isdir(cache_dir) else []:
+        if name not in keep:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+            removed.append(name)
+    return removed
@@ -0,0 +1,429 @@
+"""
+Cache governor module for Podes 2024 dashboard
+One byte budget for the process-wide result caches (cross tabulations, view
+bundles, change tables, exports): the real size of every entry is measured,
+the least valuable entries are evicted first (GreedyDual-Size: rebuild cost
+per byte, aged so idle entries eventually go) and occupancy, hit rate and
+evictions are reported per cache and per session. The st.cache_resource
+loaders (dataset, hierarchy, indexes) are measured too, for the report only
+"""
+
+import heapq
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+# Anggaran memori semua cache yang diatur (MB)
+CACHE_BUDGET_MB = float(os.environ.get('PODES_CACHE_BUDGET_MB', '256'))
+# Sesi tanpa rerun selama ini (detik) tidak lagi dilaporkan
+SESSION_IDLE_SECONDS = 30 * 60
+
+_NO_SESSION = '-'
+
+
+def object_size(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Approximate memory held by a cached value, in bytes
+
+    Frames and series are measured with memory_usage(deep=True), arrays by
+    their buffers, figures by their serialized JSON (what is kept alive and
+    sent to browsers), bytes (e.g. XLSX files) by their length; containers
+    and plain objects are walked recursively, shared objects counted once.
+
+    Args:
+        value: Object to measure
+
+    Returns:
+        int: Size in bytes
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if type(value).__module__.startswith('plotly.'):
+        # Grafik Plotly: ukuran JSON yang disimpan dan dikirim ke browser
+        return len(value.to_json())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            object_size(key, seen) + object_size(item, seen) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(object_size(item, seen) for item in value)
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + object_size(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+def current_session_id() -> str:
+    """Id of the Streamlit session running this code, '-' outside a script run"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else _NO_SESSION
+
+
+class _Entry:
+    """One cached value with its size, rebuild cost and eviction priority"""
+
+    __slots__ = ('value', 'nbytes', 'cost', 'priority', 'last_used', 'owner')
+
+    def __init__(self, value: Any, nbytes: int, cost: float, priority: float, last_used: int, owner: str):
+        self.value = value
+        self.nbytes = nbytes
+        self.cost = cost
+        self.priority = priority
+        self.last_used = last_used
+        self.owner = owner
+
+
+class CacheGovernor:
+    """
+    Byte-budgeted store shared by every governed cache of the process
+
+    Eviction is GreedyDual-Size: an entry's priority is the inflation value
+    L plus its rebuild cost (seconds) per MB, refreshed on every hit. The
+    entry with the lowest priority goes first and L rises to that priority,
+    so entries that are cheap to rebuild, large or long unused are evicted
+    before expensive small ones. Ties go to the least recently used entry.
+
+    Priorities live in a heap with lazy deletion: a hit or a replacement
+    pushes a new item and leaves the old one, which is skipped when it
+    reaches the top because its last_used no longer matches the entry.
+
+    Resident values (the st.cache_resource loaders) are only measured: they
+    are owned by Streamlit, so they are reported but neither evicted nor
+    counted against the budget.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, _Entry] = {}
+        # (prioritas, last_used, kunci); item usang dilewati saat diambil
+        self._heap: List[tuple] = []
+        # Kunci yang sedang dibangun: [lock, jumlah thread yang menunggu/membangun]
+        self._flights: Dict[tuple, list] = {}
+        self._residents: Dict[str, Dict[str, float]] = {}
+        self._inflation = 0.0
+        self._clock = 0
+        self._bytes = 0
+        self._caches: Dict[str, Dict[str, float]] = {}
+        self._sessions: Dict[str, Dict[str, float]] = {}
+
+    def _cache_stats(self, cache: str) -> Dict[str, float]:
+        return self._caches.setdefault(cache, {
+            'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'rejected': 0, 'build_s': 0.0
+        })
+
+    def _session_stats(self, session: str) -> Dict[str, float]:
+        stats = self._sessions.setdefault(session, {
+            'bytes': 0, 'hits': 0, 'misses': 0, 'state_bytes': 0, 'last_seen': 0.0
+        })
+        stats['last_seen'] = time.time()
+        return stats
+
+    def _priority(self, cost: float, nbytes: int) -> float:
+        return self._inflation + cost / max(nbytes / 1e6, 1e-6)
+
+    def _touch(self, full_key: tuple, entry: _Entry) -> None:
+        """Give an entry a fresh priority and push it; its older heap items become stale"""
+        self._clock += 1
+        entry.last_used = self._clock
+        entry.priority = self._priority(entry.cost, entry.nbytes)
+        heapq.heappush(self._heap, (entry.priority, entry.last_used, full_key))
+        # Item usang menumpuk karena hit; bangun ulang heap bila jauh lebih besar dari jumlah entri
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(item.priority, item.last_used, k) for k, item in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_victim(self) -> tuple:
+        """Key of the entry with the lowest priority, skipping stale heap items"""
+        while True:
+            priority, last_used, full_key = heapq.heappop(self._heap)
+            entry = self._entries.get(full_key)
+            if entry is not None and entry.last_used == last_used:
+                return full_key
+
+    def get(self, cache: str, key: Hashable, count: bool = True) -> tuple:
+        """
+        Look up an entry and count the hit or miss
+
+        Args:
+            cache: Cache name
+            key: Entry key within the cache
+            count: Count the lookup in the statistics; False for the second
+                look of a caller that waited for another build of the key
+
+        Returns:
+            tuple: (True, value) on a hit, (False, None) on a miss
+        """
+        session = current_session_id()
+        with self._lock:
+            entry = self._entries.get((cache, key))
+            if count:
+                counter = 'hits' if entry is not None else 'misses'
+                self._cache_stats(cache)[counter] += 1
+                self._session_stats(session)[counter] += 1
+            if entry is None:
+                return False, None
+            self._touch((cache, key), entry)
+            return True, entry.value
+
+    @contextmanager
+    def single_flight(self, cache: str, key: Hashable) -> Iterator[None]:
+        """
+        Hold the build lock of one key
+
+        Sessions that miss the same key at the same time build it once: the
+        others wait here and then find the value with get(..., count=False).
+
+        Args:
+            cache: Cache name
+            key: Entry key within the cache
+        """
+        full_key = (cache, key)
+        with self._lock:
+            flight = self._flights.setdefault(full_key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0]:
+                yield
+        finally:
+            with self._lock:
+                flight[1] -= 1
+                if flight[1] == 0:
+                    del self._flights[full_key]
+
+    def put(self, cache: str, key: Hashable, value: Any, cost: float, nbytes: Optional[int] = None) -> bool:
+        """
+        Store an entry, evicting others until the budget holds
+
+        Args:
+            cache: Cache name
+            key: Entry key within the cache
+            value: Value to keep
+            cost: Seconds it took to build the value
+            nbytes: Size of the value; measured with object_size when omitted
+
+        Returns:
+            bool: False when the value alone exceeds the budget and was not kept
+        """
+        nbytes = object_size(value) if nbytes is None else nbytes
+        session = current_session_id()
+        with self._lock:
+            stats = self._cache_stats(cache)
+            stats['build_s'] += cost
+            if nbytes > self.budget_bytes:
+                stats['rejected'] += 1
+                return False
+            self._remove((cache, key))
+            entry = _Entry(value, nbytes, cost, 0.0, 0, session)
+            self._entries[(cache, key)] = entry
+            self._touch((cache, key), entry)
+            self._account((cache, key), +1)
+            while self._bytes > self.budget_bytes:
+                victim = self._pop_victim()
+                self._inflation = self._entries[victim].priority
+                self._cache_stats(victim[0])['evictions'] += 1
+                self._remove(victim)
+            return True
+
+    def _account(self, full_key: tuple, sign: int) -> None:
+        entry = self._entries[full_key]
+        self._bytes += sign * entry.nbytes
+        stats = self._cache_stats(full_key[0])
+        stats['entries'] += sign
+        stats['bytes'] += sign * entry.nbytes
+        if sign > 0:
+            self._session_stats(entry.owner)['bytes'] += entry.nbytes
+        elif entry.owner in self._sessions:
+            self._sessions[entry.owner]['bytes'] -= entry.nbytes
+
+    def _remove(self, full_key: tuple) -> None:
+        if full_key in self._entries:
+            self._account(full_key, -1)
+            del self._entries[full_key]
+
+    def clear(self, cache: Optional[str] = None) -> None:
+        """
+        Drop the entries of one cache, or of every cache
+
+        Args:
+            cache: Cache name; all caches when omitted
+        """
+        with self._lock:
+            for full_key in [k for k in self._entries if cache is None or k[0] == cache]:
+                self._remove(full_key)
+            if cache is None:
+                self._heap = []
+
+    def record_resident(self, name: str, nbytes: int, cost: float) -> None:
+        """
+        Remember the size of a value held by a st.cache_resource loader
+
+        Each loader keeps one value (max_entries=1), so a new load replaces
+        the previous size of the same name.
+
+        Args:
+            name: Loader name in the reports, e.g. 'dataset'
+            nbytes: Measured size in bytes
+            cost: Seconds the load took
+        """
+        with self._lock:
+            stats = self._residents.setdefault(name, {'bytes': 0, 'loads': 0, 'build_s': 0.0})
+            stats['bytes'] = nbytes
+            stats['loads'] += 1
+            stats['build_s'] += cost
+
+    def record_session_state(self, session: str, nbytes: int) -> None:
+        """
+        Remember the size of a session's st.session_state
+
+        Args:
+            session: Session id
+            nbytes: Measured size in bytes
+        """
+        with self._lock:
+            self._session_stats(session)['state_bytes'] = nbytes
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return int(sum(stats['bytes'] for stats in self._residents.values()))
+
+    def resident_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Size of every measured st.cache_resource value
+
+        Returns:
+            Dict: loader name -> {bytes, loads, build_s}
+        """
+        with self._lock:
+            return {name: dict(values) for name, values in self._residents.items()}
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Occupancy and effectiveness of every governed cache
+
+        Returns:
+            Dict: cache name -> {entries, bytes, hits, misses, hit_rate,
+            evictions, rejected, build_s}
+        """
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._caches.items()}
+        for values in stats.values():
+            lookups = values['hits'] + values['misses']
+            values['hit_rate'] = values['hits'] / lookups if lookups else None
+        return stats
+
+    def session_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Memory and cache use of the sessions active recently
+
+        Returns:
+            Dict: session id -> {bytes (cache entries it built), state_bytes,
+            hits, misses, last_seen}
+        """
+        cutoff = time.time() - SESSION_IDLE_SECONDS
+        with self._lock:
+            for session in [s for s, values in self._sessions.items()
+                            if values['last_seen'] < cutoff and values['bytes'] <= 0]:
+                del self._sessions[session]
+            return {session: dict(values) for session, values in self._sessions.items()
+                    if values['last_seen'] >= cutoff}
+
+
+governor = CacheGovernor(int(CACHE_BUDGET_MB * 1024 * 1024))
+
+
+def governed_cache(name: str) -> Callable:
+    """
+    Decorator that memoizes a function in the governed, byte-budgeted store
+
+    Like st.cache_resource, every caller receives the same object: treat
+    results as read-only. Arguments must be hashable and form the key.
+    Concurrent misses of one key build it once (see single_flight).
+
+    Args:
+        name: Cache name in the reports, e.g. 'cross_tab'
+
+    Returns:
+        Callable: Decorator; the wrapped function gets a clear() method
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+            hit, value = governor.get(name, key)
+            if hit:
+                return value
+            with governor.single_flight(name, key):
+                # Sesi lain mungkin baru selesai membangun kunci yang sama
+                hit, value = governor.get(name, key, count=False)
+                if hit:
+                    return value
+                start = time.perf_counter()
+                value = func(*args, **kwargs)
+                cost = time.perf_counter() - start
+                governor.put(name, key, value, cost)
+            return value
+
+        wrapper.clear = lambda: governor.clear(name)
+        return wrapper
+    return decorator
+
+
+def resident(name: str) -> Callable:
+    """
+    Decorator that reports the size of a loader's result to the governor
+
+    Place it under @st.cache_resource so it only runs when the loader
+    actually loads; the value is returned unchanged.
+
+    Args:
+        name: Loader name in the reports, e.g. 'hierarchy'
+
+    Returns:
+        Callable: Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            value = func(*args, **kwargs)
+            governor.record_resident(name, object_size(value), time.perf_counter() - start)
+            return value
+        return wrapper
+    return decorator
+
+
+def account_session_state() -> None:
+    """Measure st.session_state of the current session for the per-session report"""
+    session = current_session_id()
+    if session == _NO_SESSION:
+        return
+    nbytes = sum(object_size(value) for value in st.session_state.to_dict().values())
+    governor.record_session_state(session, nbytes)
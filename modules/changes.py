@@ -0,0 +1,256 @@
+"""
+Change analysis module for Podes 2024 dashboard
+Year-over-year deltas and category transitions between two PODES editions,
+precomputed per edition pair so the change view only reads small tables
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.aggregates import ID_COLUMNS
+from modules.editions import edition_version, load_edition
+from modules.podes_schema import UNDEFINED_LABEL
+
+
+CHANGES_CACHE_DIR = 'data/cache/changes'
+CHANGES_FORMAT = 2
+ALL_KECAMATAN = 'Semua Kecamatan'
+
+# Tabel hasil per pasangan edisi (satu file Parquet per tabel)
+CHANGE_TABLES = [
+    'village_deltas', 'kecamatan_deltas', 'transitions', 'village_transitions', 'coverage'
+]
+
+
+def align_editions(old_df: pd.DataFrame, new_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Join two editions on the integer village id
+
+    Args:
+        old_df: Earlier edition
+        new_df: Later edition
+
+    Returns:
+        Tuple: Row positions in old_df and new_df of the villages present in both,
+        in id_desa order
+    """
+    old_ids = old_df['id_desa'].to_numpy(dtype='int64')
+    new_ids = new_df['id_desa'].to_numpy(dtype='int64')
+    _, old_positions, new_positions = np.intersect1d(old_ids, new_ids, assume_unique=True, return_indices=True)
+    return old_positions, new_positions
+
+
+def _indicator_columns(old_df: pd.DataFrame, new_df: pd.DataFrame) -> Tuple[List[str], List[str]]:
+    """Numeric and categorical indicator columns present in both editions"""
+    common = [col for col in new_df.columns if col in old_df.columns and col not in ID_COLUMNS]
+    numeric = [
+        col for col in common
+        if pd.api.types.is_numeric_dtype(new_df[col]) and pd.api.types.is_numeric_dtype(old_df[col])
+    ]
+    return numeric, [col for col in common if col not in numeric]
+
+
+def transition_counts(old_values: pd.Series, new_values: pd.Series, groups: np.ndarray,
+                      group_count: int) -> Tuple[pd.Index, np.ndarray]:
+    """
+    Category transition matrix per group with a single bincount
+
+    Args:
+        old_values: Answers in the earlier edition (aligned villages)
+        new_values: Answers in the later edition (same order)
+        groups: Integer group code of each village (e.g. kecamatan)
+        group_count: Number of groups
+
+    Returns:
+        Tuple: (answer labels, counts array of shape (groups, labels, labels)
+        indexed [group, from, to])
+    """
+    old_values = old_values.fillna(UNDEFINED_LABEL).astype(str)
+    new_values = new_values.fillna(UNDEFINED_LABEL).astype(str)
+    labels = pd.Index(sorted(set(old_values.unique()) | set(new_values.unique())))
+    size = len(labels)
+
+    old_codes = labels.get_indexer(old_values)
+    new_codes = labels.get_indexer(new_values)
+    flat = (groups.astype('int64') * size + old_codes) * size + new_codes
+    counts = np.bincount(flat, minlength=group_count * size * size)
+    return labels, counts.reshape(group_count, size, size)
+
+
+def build_edition_changes(old_df: pd.DataFrame, new_df: pd.DataFrame,
+                          old_year: int, new_year: int) -> Dict[str, pd.DataFrame]:
+    """
+    Compute all change tables of an edition pair
+
+    Kecamatan and village names are taken from the later edition.
+
+    Args:
+        old_df: Earlier edition sorted by id_desa
+        new_df: Later edition sorted by id_desa
+        old_year: Earlier edition year
+        new_year: Later edition year
+
+    Returns:
+        Dict: Table name (see CHANGE_TABLES) -> DataFrame
+    """
+    old_positions, new_positions = align_editions(old_df, new_df)
+    old_rows = old_df.iloc[old_positions].reset_index(drop=True)
+    new_rows = new_df.iloc[new_positions].reset_index(drop=True)
+    numeric, categorical = _indicator_columns(old_df, new_df)
+    villages = len(new_rows)
+
+    # --- Selisih nilai jumlah per desa (format panjang: satu baris per desa x indikator) ---
+    # Matriks float menyimpan nilai kosong sebagai NaN; selisihnya ikut kosong, bukan angka sampah
+    old_matrix = old_rows[numeric].to_numpy(dtype='float64') if numeric else np.empty((villages, 0))
+    new_matrix = new_rows[numeric].to_numpy(dtype='float64') if numeric else np.empty((villages, 0))
+    village_deltas = pd.DataFrame({
+        'id_desa': np.repeat(new_rows['id_desa'].to_numpy(), len(numeric)),
+        'nama_kecamatan': np.repeat(new_rows['nama_kecamatan'].astype(str).to_numpy(), len(numeric)),
+        'nama_desa': np.repeat(new_rows['nama_desa'].astype(str).to_numpy(), len(numeric)),
+        'indikator': np.tile(np.array(numeric, dtype=object), villages),
+        'nilai_lama': pd.array(old_matrix.ravel(), dtype='Int64'),
+        'nilai_baru': pd.array(new_matrix.ravel(), dtype='Int64')
+    })
+    village_deltas['selisih'] = village_deltas['nilai_baru'] - village_deltas['nilai_lama']
+
+    # Jumlah per kecamatan hanya dari desa yang bernilai; desa tanpa selisih dihitung terpisah
+    grouped = village_deltas.groupby(['nama_kecamatan', 'indikator'], sort=True)
+    kecamatan_deltas = grouped[['nilai_lama', 'nilai_baru', 'selisih']].sum(min_count=1)
+    kecamatan_deltas['desa_tanpa_nilai'] = grouped['selisih'].size() - grouped['selisih'].count()
+    kecamatan_deltas = kecamatan_deltas.reset_index()
+
+    # --- Matriks transisi kategori per kecamatan dan seluruh kota ---
+    kecamatan_codes, kecamatan_names = pd.factorize(new_rows['nama_kecamatan'].astype(str), sort=True)
+    transition_parts, changed_parts = [], []
+    for col in categorical:
+        labels, counts = transition_counts(old_rows[col], new_rows[col], kecamatan_codes, len(kecamatan_names))
+        for scope_names, scope_counts in (
+            (kecamatan_names, counts),
+            (pd.Index([ALL_KECAMATAN]), counts.sum(axis=0, keepdims=True))
+        ):
+            group, source, target = np.nonzero(scope_counts)
+            transition_parts.append(pd.DataFrame({
+                'indikator': col,
+                'nama_kecamatan': scope_names[group],
+                'dari': labels[source],
+                'ke': labels[target],
+                'jumlah_desa': scope_counts[group, source, target]
+            }))
+
+        old_values = old_rows[col].fillna(UNDEFINED_LABEL).astype(str)
+        new_values = new_rows[col].fillna(UNDEFINED_LABEL).astype(str)
+        changed = (old_values != new_values).to_numpy()
+        changed_parts.append(pd.DataFrame({
+            'id_desa': new_rows['id_desa'].to_numpy()[changed],
+            'nama_kecamatan': new_rows['nama_kecamatan'].astype(str).to_numpy()[changed],
+            'nama_desa': new_rows['nama_desa'].astype(str).to_numpy()[changed],
+            'indikator': col,
+            'dari': old_values.to_numpy()[changed],
+            'ke': new_values.to_numpy()[changed]
+        }))
+
+    transitions = pd.concat(transition_parts, ignore_index=True) if transition_parts else pd.DataFrame(
+        columns=['indikator', 'nama_kecamatan', 'dari', 'ke', 'jumlah_desa'])
+    village_transitions = pd.concat(changed_parts, ignore_index=True) if changed_parts else pd.DataFrame(
+        columns=['id_desa', 'nama_kecamatan', 'nama_desa', 'indikator', 'dari', 'ke'])
+
+    # --- Desa yang hanya ada di salah satu edisi ---
+    only_old = np.setdiff1d(np.arange(len(old_df)), old_positions)
+    only_new = np.setdiff1d(np.arange(len(new_df)), new_positions)
+    coverage = pd.concat([
+        old_df.iloc[only_old][['id_desa', 'nama_kecamatan', 'nama_desa']].assign(status=f"Hanya di {old_year}"),
+        new_df.iloc[only_new][['id_desa', 'nama_kecamatan', 'nama_desa']].assign(status=f"Hanya di {new_year}")
+    ], ignore_index=True).astype({'nama_kecamatan': str, 'nama_desa': str})
+
+    return {
+        'village_deltas': village_deltas,
+        'kecamatan_deltas': kecamatan_deltas,
+        'transitions': transitions,
+        'village_transitions': village_transitions,
+        'coverage': coverage
+    }
+
+
+def _pair_dir(old_year: int, new_year: int, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{old_year}-{new_year}")
+
+
+def _pair_versions(old_year: int, new_year: int) -> Dict[str, Any]:
+    return {'old': edition_version(old_year), 'new': edition_version(new_year)}
+
+
+def precompute_edition_changes(old_year: int, new_year: int,
+                               cache_dir: str = CHANGES_CACHE_DIR) -> str:
+    """
+    Compute and store the change tables of an edition pair
+
+    Tables are written to a temporary directory that replaces the previous
+    result for the pair, together with the edition versions they came from.
+
+    Args:
+        old_year: Earlier edition year
+        new_year: Later edition year
+        cache_dir: Change cache directory
+
+    Returns:
+        str: Directory holding the pair's tables
+    """
+    tables = build_edition_changes(load_edition(old_year), load_edition(new_year), old_year, new_year)
+
+    target = _pair_dir(old_year, new_year, cache_dir)
+    tmp_dir = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, table in tables.items():
+        table.to_parquet(os.path.join(tmp_dir, f"{name}.parquet"), index=False)
+
+    meta = {
+        'format': CHANGES_FORMAT,
+        'old_year': old_year,
+        'new_year': new_year,
+        'versions': _pair_versions(old_year, new_year),
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': {name: int(len(table)) for name, table in tables.items()}
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump(meta, file, indent=2)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+    return target
+
+
+def load_edition_changes(old_year: int, new_year: int,
+                         cache_dir: str = CHANGES_CACHE_DIR) -> Dict[str, pd.DataFrame]:
+    """
+    Read the precomputed change tables of an edition pair
+
+    The tables are recomputed first when missing, when written by another
+    format, or when either edition's version no longer matches the one they
+    were built from.
+
+    Args:
+        old_year: Earlier edition year
+        new_year: Later edition year
+        cache_dir: Change cache directory
+
+    Returns:
+        Dict: Table name -> DataFrame
+    """
+    target = _pair_dir(old_year, new_year, cache_dir)
+    try:
+        with open(os.path.join(target, 'meta.json'), 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        fresh = meta.get('format') == CHANGES_FORMAT and meta.get('versions') == _pair_versions(old_year, new_year)
+    except (FileNotFoundError, json.JSONDecodeError):
+        fresh = False
+
+    if not fresh:
+        precompute_edition_changes(old_year, new_year, cache_dir)
+    return {name: pd.read_parquet(os.path.join(target, f"{name}.parquet")) for name in CHANGE_TABLES}
@@ -0,0 +1,197 @@
+"""
+Code matrix module for Podes 2024 dashboard
+The indicators stored as one dense village x indicator matrix of small
+integer codes (int8 or int16) with a label table per column, so the answer
+counts, per-kecamatan distributions and numeric summaries of every indicator
+of a category come from a single bincount over the matrix instead of one
+value_counts, crosstab and describe per indicator
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.pivot import encode_dimension
+
+
+ID_COLUMNS = ('id_desa', 'nama_kecamatan', 'nama_desa')
+
+# Kolom dengan nilai unik lebih dari ini ditampilkan sebagai indikator kuantitatif
+# (sama dengan analysis.is_quantitative)
+QUALITATIVE_MAX_VALUES = 10
+QUANTITATIVE_DTYPES = ('int64', 'float64')
+
+
+def _code_dtype(largest: int) -> np.dtype:
+    """Smallest signed integer type holding codes 0..largest-1 and -1 for missing values"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if largest <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class CodeMatrix:
+    """
+    Dense code matrix of the indicators of a dataset
+
+    Column j of the matrix holds the codes of one indicator (-1 for missing
+    answers), labels[column] its sorted values; numeric indicators are coded
+    by their sorted distinct values, so sums, extremes and distributions are
+    derived from the counts. Kecamatan codes are kept apart as the grouping
+    key of the per-kecamatan distributions.
+    """
+
+    def __init__(self, df: pd.DataFrame, encoded: Optional[Dict[str, Tuple[np.ndarray, pd.Index]]] = None,
+                 columns: Optional[List[str]] = None):
+        """
+        Build the matrix
+
+        Args:
+            df: Podes data
+            encoded: Integer-coded columns of df (see modules/pivot.py), reused
+                instead of encoding the columns again
+            columns: Indicator columns to store; every non-identifier column
+                when omitted
+        """
+        encoded = encoded or {}
+        columns = columns if columns is not None else [col for col in df.columns if col not in ID_COLUMNS]
+
+        def encode(col: str) -> Tuple[np.ndarray, pd.Index]:
+            return encoded.get(col) or encode_dimension(df[col])
+
+        coded = {col: encode(col) for col in columns}
+        self.columns = list(columns)
+        self.labels: Dict[str, pd.Index] = {col: labels for col, (_, labels) in coded.items()}
+        self.dtypes: Dict[str, str] = {col: str(df[col].dtype) for col in columns}
+        self._position = {col: j for j, col in enumerate(self.columns)}
+
+        dtype = _code_dtype(max((len(labels) for labels in self.labels.values()), default=0))
+        self.matrix = np.empty((len(df), len(self.columns)), dtype=dtype)
+        for j, col in enumerate(self.columns):
+            self.matrix[:, j] = coded[col][0]
+
+        self.kecamatan_codes, self.kecamatan_labels = (
+            encode('nama_kecamatan') if 'nama_kecamatan' in df.columns
+            else (np.zeros(len(df), dtype='int32'), pd.Index([], name='nama_kecamatan'))
+        )
+        self._ids = pd.Index(df['id_desa']) if 'id_desa' in df.columns else None
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the code matrix"""
+        return int(self.matrix.nbytes + self.kecamatan_codes.nbytes)
+
+    def rows_of(self, frame: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        Matrix rows of a filtered frame, matched by id_desa
+
+        Args:
+            frame: Subset of the data the matrix was built from
+
+        Returns:
+            np.ndarray: Row positions, or None when frame holds every village
+        """
+        if len(frame) == len(self.matrix) or self._ids is None:
+            return None
+        return self._ids.get_indexer(frame['id_desa'])
+
+    def summarize(self, columns: List[str], rows: Optional[np.ndarray] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Counts and summaries of several indicators in one pass
+
+        Every (kecamatan, column, code) triple of the selected rows is mapped
+        to one slot of a flat counter, so a single bincount yields the answer
+        counts of every column per kecamatan; totals, value_counts order and
+        numeric statistics are derived from that count matrix.
+
+        Args:
+            columns: Indicator columns; columns not in the matrix are skipped
+            rows: Row positions of the scope (see rows_of); all rows when None
+
+        Returns:
+            Dict: Column -> {
+                kind: 'quantitative' or 'qualitative' (as analysis.is_quantitative),
+                counts: answer counts, most frequent first (as value_counts),
+                count_codes: codes of the counts entries,
+                codes: code of every row of the scope (-1 for missing),
+                values: counts of the values present, in value order,
+                kecamatan: kecamatan x value counts (as pivot.cross_tabulate),
+                stats: {valid, nunique, min, max, sum} (extremes and sum for
+                    numeric columns only)
+            }
+        """
+        columns = [col for col in columns if col in self._position]
+        if not columns:
+            return {}
+        positions = [self._position[col] for col in columns]
+        codes = self.matrix[:, positions] if rows is None else self.matrix[rows][:, positions]
+        kecamatan = self.kecamatan_codes if rows is None else self.kecamatan_codes[rows]
+
+        # Tiap kolom punya size + 1 slot; slot pertama menampung jawaban kosong (kode -1)
+        sizes = np.array([len(self.labels[col]) for col in columns], dtype='int64')
+        offsets = np.concatenate([[0], np.cumsum(sizes + 1)[:-1]]) + 1
+        width = int((sizes + 1).sum())
+        # Desa tanpa kecamatan dihitung di baris tambahan (indeks terakhir)
+        groups = len(self.kecamatan_labels) + 1
+        slot_dtype = 'int32' if groups * width < np.iinfo(np.int32).max else 'int64'
+        group = np.where(kecamatan >= 0, kecamatan, groups - 1).astype(slot_dtype)
+
+        slots = codes.astype(slot_dtype) + offsets.astype(slot_dtype)
+        slots += group[:, None] * width
+        per_group = np.bincount(slots.ravel(), minlength=groups * width).reshape(groups, width)
+        totals = per_group.sum(axis=0)
+
+        summaries = {}
+        for j, (col, offset, size) in enumerate(zip(columns, offsets, sizes)):
+            labels = self.labels[col]
+            counts = totals[offset:offset + size]
+            present = np.flatnonzero(counts)
+            order = present[np.argsort(-counts[present], kind='stable')]
+            if len(np.unique(counts[present])) < len(present):
+                # Urutan value_counts untuk jumlah yang sama: kemunculan pertama
+                found, first_row = np.unique(codes[:, j], return_index=True)
+                first = np.empty(size, dtype='int64')
+                first[found[found >= 0]] = first_row[found >= 0]
+                order = present[np.lexsort((first[present], -counts[present]))]
+
+            kecamatan_counts = per_group[:-1, offset:offset + size]
+            kecamatan_rows = kecamatan_counts.sum(axis=1) > 0
+            kecamatan_columns = kecamatan_counts.sum(axis=0) > 0
+            kecamatan_table = pd.DataFrame(
+                kecamatan_counts[np.ix_(kecamatan_rows, kecamatan_columns)],
+                index=self.kecamatan_labels[kecamatan_rows],
+                columns=labels[kecamatan_columns]
+            )
+
+            stats = {'valid': int(counts.sum()), 'nunique': len(present)}
+            if pd.api.types.is_numeric_dtype(labels) and len(present):
+                values = labels.to_numpy(dtype='float64')[present]
+                stats.update({'min': values[0], 'max': values[-1], 'sum': float(values @ counts[present])})
+
+            summaries[col] = {
+                'kind': 'quantitative' if len(present) > QUALITATIVE_MAX_VALUES
+                        or self.dtypes[col] in QUANTITATIVE_DTYPES else 'qualitative',
+                'counts': pd.Series(counts[order], index=labels[order], name='count'),
+                'count_codes': order,
+                'codes': codes[:, j],
+                'values': pd.Series(counts[present], index=labels[present], name='count'),
+                'kecamatan': kecamatan_table,
+                'stats': stats
+            }
+        return summaries
+
+
+def summarize_frame(df: pd.DataFrame, columns: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Summaries of indicators of a frame without a prebuilt matrix
+
+    Args:
+        df: Podes data, any scope
+        columns: Indicator columns
+
+    Returns:
+        Dict: Column -> summary, see CodeMatrix.summarize
+    """
+    columns = [col for col in columns if col in df.columns]
+    return CodeMatrix(df, columns=columns).summarize(columns)
@@ -0,0 +1,297 @@
+"""
+Corrections module for Podes 2024 dashboard
+Applies BPS correction deltas (id_desa, column, value) to the columnar store
+and patches the derived files without reprocessing the whole dataset
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+import pandas as pd
+
+from modules.aggregates import (
+    AGGREGATES_PATH, apply_cell_changes, build_aggregates, load_aggregates, update_sketches,
+    write_aggregates
+)
+from modules.manifest import (
+    MANIFEST_PATH, build_manifest, combine_versions, load_manifest, scope_versions, write_manifest
+)
+from modules.podes_schema import (
+    CATEGORICAL_COLUMNS, CONTINUOUS_COLUMNS, NUMERIC_RANGES, UNDEFINED_LABEL
+)
+from modules.ranks import RANKS_PATH, load_rank_table, update_rank_table, write_rank_table
+from modules.store import STORE_DIR, kabupaten_code, kecamatan_code, list_partitions, read_store, write_partition
+
+
+CORRECTIONS_LOG_PATH = 'data/corrections_log.jsonl'
+DELTA_COLUMNS = ['id_desa', 'column', 'value']
+
+# Kode wilayah dan kecamatan tidak boleh dikoreksi lewat delta
+PROTECTED_COLUMNS = ('id_desa', 'nama_kecamatan')
+
+
+def read_corrections(path: str) -> pd.DataFrame:
+    """
+    Read a correction delta file
+
+    Args:
+        path: CSV with columns id_desa, column, value, or a JSON list of
+            objects with the same keys
+
+    Returns:
+        pd.DataFrame: Delta rows with all values as text
+    """
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as file:
+            delta = pd.DataFrame(json.load(file))
+    else:
+        delta = pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    missing = [col for col in DELTA_COLUMNS if col not in delta.columns]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ada di file koreksi: {', '.join(missing)}")
+    return delta[DELTA_COLUMNS].astype(str).apply(lambda col: col.str.strip())
+
+
+def _column_rules() -> Tuple[Dict[str, Tuple[int, int]], Dict[str, set]]:
+    """Allowed numeric range and allowed labels per clean column"""
+    ranges = {clean: NUMERIC_RANGES[raw] for raw, clean in CONTINUOUS_COLUMNS.items() if raw in NUMERIC_RANGES}
+    labels = {
+        clean: set(mapping.values()) | {UNDEFINED_LABEL}
+        for clean, mapping in CATEGORICAL_COLUMNS.values()
+    }
+    return ranges, labels
+
+
+def validate_corrections(delta: pd.DataFrame, columns: List[str]) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Check and type a correction delta
+
+    Args:
+        delta: Rows from read_corrections
+        columns: Columns of the cleaned dataset
+
+    Returns:
+        Tuple: (typed delta with id_desa as int and value as int or str,
+        list of error messages; empty when the delta can be applied)
+    """
+    ranges, labels = _column_rules()
+    errors, rows = [], []
+
+    for line, row in enumerate(delta.itertuples(index=False), start=2):
+        where = f"baris {line} ({row.id_desa}, {row.column})"
+        if not row.id_desa.isdigit():
+            errors.append(f"{where}: id_desa bukan angka")
+            continue
+        if row.column not in columns:
+            errors.append(f"{where}: kolom tidak dikenal")
+            continue
+        if row.column in PROTECTED_COLUMNS:
+            errors.append(f"{where}: kolom ini tidak dapat dikoreksi")
+            continue
+
+        value: Any = row.value
+        if row.column in ranges:
+            try:
+                value = int(float(row.value))
+            except ValueError:
+                errors.append(f"{where}: nilai '{row.value}' bukan angka")
+                continue
+            low, high = ranges[row.column]
+            if not low <= value <= high:
+                errors.append(f"{where}: nilai {value} di luar rentang {low}-{high}")
+                continue
+        elif row.column in labels and value not in labels[row.column]:
+            errors.append(f"{where}: nilai '{value}' tidak valid; pilihan: {', '.join(sorted(labels[row.column]))}")
+            continue
+        rows.append({'id_desa': int(row.id_desa), 'column': row.column, 'value': value})
+
+    typed = pd.DataFrame(rows, columns=DELTA_COLUMNS)
+    conflicts = typed.drop_duplicates().duplicated(['id_desa', 'column'], keep=False)
+    for id_desa, column in typed.drop_duplicates()[conflicts][['id_desa', 'column']].drop_duplicates().itertuples(index=False):
+        errors.append(f"({id_desa}, {column}): lebih dari satu nilai koreksi yang berbeda")
+    return typed.drop_duplicates(['id_desa', 'column']), errors
+
+
+def apply_corrections(delta: pd.DataFrame,
+                      root: str = STORE_DIR,
+                      manifest_path: str = MANIFEST_PATH,
+                      aggregates_path: str = AGGREGATES_PATH,
+                      log_path: str = CORRECTIONS_LOG_PATH,
+                      ranks_path: str = RANKS_PATH,
+                      source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Apply a correction delta to the store and patch the derived files
+
+    Only the kabupaten/kota partitions containing corrected villages are read
+    and rewritten. Aggregates are patched per changed cell, and only the
+    affected kecamatan get new quantile sketches and are re-hashed to bump
+    the dataset version, so caches keyed on the version of another kecamatan
+    (see manifest.scope_version) stay valid. Nothing is written when any row
+    of the delta is invalid, and the derived files are computed before any
+    file is replaced.
+
+    Args:
+        delta: Rows from read_corrections
+        root: Store root directory
+        manifest_path: Manifest file to update
+        aggregates_path: Aggregates file to update
+        log_path: JSON lines audit log of applied corrections
+        ranks_path: Rank table to update; skipped when missing or stale
+        source: Delta file name recorded in the log
+
+    Returns:
+        Dict: Summary with changes, kecamatan, partitions, version_before, version_after
+    """
+    available = list_partitions(root)
+    if not available:
+        raise ValueError(f"Penyimpanan kolumnar '{root}' belum dibuat; jalankan data/ProsesData.py terlebih dahulu")
+
+    ids = pd.to_numeric(delta['id_desa'], errors='coerce').dropna().astype('int64')
+    codes = sorted(kabupaten_code(ids).unique())
+    missing_codes = [code for code in codes if code not in available]
+    parts = {code: read_store(root, [code]) for code in codes if code in available}
+    columns = list(next(iter(parts.values())).columns) if parts else list(read_store(root, available[:1]).columns)
+
+    typed, errors = validate_corrections(delta, columns)
+    errors += [f"kabupaten/kota {code} tidak ada di penyimpanan" for code in missing_codes]
+
+    # Posisi baris setiap desa di partisinya
+    locations = {}
+    for code, part in parts.items():
+        for position, id_desa in enumerate(part['id_desa'].tolist()):
+            locations[id_desa] = (code, position)
+    errors += [f"id_desa {id_desa} tidak ditemukan" for id_desa in typed['id_desa'].unique()
+               if id_desa not in locations and str(id_desa).zfill(10)[:4] in parts]
+    if errors:
+        raise ValueError('\n'.join(errors))
+
+    changes = []
+    for row in typed.itertuples(index=False):
+        code, position = locations[row.id_desa]
+        part = parts[code]
+        old_value = part.at[position, row.column]
+        new_value = row.value if isinstance(row.value, str) else type(old_value)(row.value)
+        if old_value == new_value:
+            continue
+        part.loc[position, row.column] = new_value
+        changes.append({
+            'id_desa': int(row.id_desa),
+            'nama_kecamatan': str(part.at[position, 'nama_kecamatan']),
+            'column': row.column,
+            'old_value': old_value.item() if hasattr(old_value, 'item') else old_value,
+            'new_value': new_value.item() if hasattr(new_value, 'item') else new_value
+        })
+
+    manifest = load_manifest(manifest_path)
+    summary = {
+        'changes': len(changes),
+        'unchanged': len(typed) - len(changes),
+        'kecamatan': sorted({change['nama_kecamatan'] for change in changes}),
+        'partitions': sorted({locations[change['id_desa']][0] for change in changes}),
+        'version_before': manifest.get('version'),
+        'version_after': manifest.get('version')
+    }
+    if not changes:
+        return summary
+
+    change_frame = pd.DataFrame(changes)
+
+    def patched_store() -> pd.DataFrame:
+        """Whole dataset with the corrected partitions, before anything is written"""
+        others = [code for code in available if code not in parts]
+        frames = ([read_store(root, others)] if others else []) + [parts[code] for code in sorted(parts)]
+        return pd.concat(frames, ignore_index=True).sort_values('id_desa', kind='stable', ignore_index=True)
+
+    # Semua file turunan dihitung di memori dahulu: kegagalan di tahap ini tidak menyentuh disk
+    # --- Agregat per kecamatan: O(sel yang berubah) ---
+    aggregates = load_aggregates(aggregates_path)
+    if aggregates:
+        apply_cell_changes(aggregates, change_frame)
+    else:
+        aggregates = build_aggregates(patched_store())
+
+    # Seluruh desa dari kecamatan yang terdampak; kode kecamatan diawali kode kabupaten/kota,
+    # jadi semua desanya ada di partisi yang sudah dibaca
+    touched = pd.concat([parts[code] for code in summary['partitions']], ignore_index=True)
+    touched = touched[kecamatan_code(touched['id_desa']).isin(kecamatan_code(change_frame['id_desa']))]
+
+    # Sketsa kuantil tidak bisa dikurangi per sel: bangun ulang per kecamatan terdampak
+    update_sketches(aggregates, touched)
+
+    # --- Versi data: hitung ulang hash kecamatan yang terdampak saja ---
+    if manifest.get('scope_versions'):
+        versions = dict(manifest['scope_versions'])
+        versions.update(scope_versions(touched))
+        manifest.update({
+            'version': combine_versions(versions, manifest['columns']),
+            'scope_versions': versions,
+            'corrected_at': datetime.now().isoformat(timespec='seconds')
+        })
+    else:
+        manifest = build_manifest(patched_store(), source=root)
+    summary['version_after'] = manifest['version']
+
+    # --- Peringkat: urutkan ulang indikator yang berubah saja ---
+    ranks = load_rank_table(ranks_path, summary['version_before'])
+    if ranks is not None:
+        ranks = update_rank_table(ranks, change_frame)
+
+    # --- Tulis: partisi yang berubah, file turunan, lalu manifest ---
+    # Manifest terakhir: dashboard berpindah ke versi baru setelah semua file siap
+    for code in summary['partitions']:
+        write_partition(parts[code], code, root)
+    write_aggregates(aggregates, aggregates_path)
+    if ranks is not None:
+        write_rank_table(ranks, manifest['version'], ranks_path)
+    write_manifest(manifest, manifest_path)
+
+    log_entry = {
+        'applied_at': datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+        'version_before': summary['version_before'],
+        'version_after': summary['version_after'],
+        'changes': changes
+    }
+    with open(log_path, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+
+    return summary
+
+
+def replay_corrections(df: pd.DataFrame, log_path: str = CORRECTIONS_LOG_PATH) -> pd.DataFrame:
+    """
+    Re-apply every logged correction to a freshly ingested dataset
+
+    Rebuilding the store from the raw files would otherwise drop the
+    corrections applied since; the log holds the final value of each cell,
+    applied in log order so a later correction of a cell wins.
+
+    Args:
+        df: Cleaned dataframe from the raw files
+        log_path: JSON lines log written by apply_corrections
+
+    Returns:
+        pd.DataFrame: Corrected copy, or df itself when there is no log
+    """
+    if not os.path.exists(log_path):
+        return df
+
+    latest: Dict[Tuple[int, str], Any] = {}
+    with open(log_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                for change in json.loads(line)['changes']:
+                    latest[(int(change['id_desa']), change['column'])] = change['new_value']
+    if not latest:
+        return df
+
+    df = df.copy()
+    positions = pd.Index(pd.to_numeric(df['id_desa']).astype('int64'))
+    for (id_desa, column), value in latest.items():
+        position = positions.get_indexer([id_desa])[0]
+        if position >= 0 and column in df.columns:
+            df.iloc[position, df.columns.get_loc(column)] = value
+    return df
@@ -4,36 +4,206 @@ Handles data loading, caching, and basic preprocessing
 """
 
 import json
+import os
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 import streamlit as st
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
+from modules.aggregates import AGGREGATES_PATH, build_aggregates, load_aggregates
+from modules.analysis import filter_and_analyze_data, get_updated_category_indicators
+from modules.bitmap_index import BitmapIndex
+from modules.bundles import build_indicator_view, load_view_bundle
+from modules.cache_governor import governed_cache, resident
+from modules.code_matrix import CodeMatrix
+from modules.hierarchy import AdminHierarchy
+from modules.manifest import MANIFEST_PATH, dataset_version, load_manifest, scope_version
+from modules.pivot import encode_frame
+from modules.ranks import RANKS_PATH, build_rank_table, build_top_villages, load_rank_table, split_rank_table
+from modules.shared_store import load_shared_dataset, shared_dataset_enabled
+from modules.store import STORE_DIR, list_partitions, read_store
+from modules.village_search import VillageSearchIndex
 
-@st.cache_data
-def load_podes_data() -> pd.DataFrame:
+
+DATA_JSON_PATH = 'data/data_podes_2024.json'
+
+
+def dataset_source() -> str:
     """
-    Load and cache Podes 2024 data from JSON file
+    Path the dashboard dataset is read from
+    
+    Returns:
+        str: Columnar store directory if built, otherwise the JSON file
+    """
+    return STORE_DIR if list_partitions(STORE_DIR) else DATA_JSON_PATH
+
+
+def read_podes_data() -> pd.DataFrame:
+    """
+    Read Podes 2024 data from the columnar store, or from the JSON file when
+    the store has not been built yet (uncached)
     
     Returns:
         pd.DataFrame: Cleaned and processed Podes data
     """
-    try:
-        with open('data/data_podes_2024.json', 'r', encoding='utf-8') as file:
+    if dataset_source() == STORE_DIR:
+        df = read_store(STORE_DIR)
+    else:
+        with open(DATA_JSON_PATH, 'r', encoding='utf-8') as file:
             data = json.load(file)
         
         # Convert to DataFrame
         df = pd.DataFrame(data)
+    
+    # Ensure numeric columns are properly typed
+    numeric_columns = [
+        'jumlah_tk', 'jumlah_sd', 'jumlah_smp', 'jumlah_sma',
+        'jumlah_rs', 'jumlah_puskesmas'
+    ]
+    
+    for col in numeric_columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    
+    return df
+
+
+@st.cache_data
+def load_podes_data() -> pd.DataFrame:
+    """
+    Load and cache Podes 2024 data from the columnar store, or from the JSON
+    file when the store has not been built yet
+    
+    Returns:
+        pd.DataFrame: Cleaned and processed Podes data
+    """
+    try:
+        return read_podes_data()
+    
+    except FileNotFoundError:
+        st.error("File data/data_podes_2024.json tidak ditemukan!")
+        return pd.DataFrame()
+    except Exception as e:
+        st.error(f"Error loading data: {str(e)}")
+        return pd.DataFrame()
+
+
+def freeze_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Copy a frame once into read-only column arrays
+    
+    NumPy-backed columns get their writeable flag cleared, so writing into the
+    buffers raises instead of silently changing data other sessions see.
+    Arrow-backed string columns are immutable already.
+    
+    Args:
+        df: Frame to freeze
         
-        # Ensure numeric columns are properly typed
-        numeric_columns = [
-            'jumlah_tk', 'jumlah_sd', 'jumlah_smp', 'jumlah_sma',
-            'jumlah_rs', 'jumlah_puskesmas'
-        ]
-        
-        for col in numeric_columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        return df
+    Returns:
+        pd.DataFrame: Frame whose column buffers cannot be modified in place
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, np.dtype):
+            values = series.to_numpy(copy=True)
+            values.flags.writeable = False
+            series = pd.Series(values, name=col, copy=False)
+        columns[col] = series
+    
+    frozen = pd.DataFrame(columns, copy=False)
+    frozen.attrs.update(df.attrs)
+    return frozen
+
+
+@lru_cache(maxsize=4)
+def _manifest_version(modified_at: float) -> Optional[str]:
+    """Manifest version, re-read only when the manifest file changes"""
+    return load_manifest(MANIFEST_PATH).get('version')
+
+
+def current_dataset_version() -> Optional[str]:
+    """
+    Version of the published dataset according to the manifest
+    
+    Returns:
+        str: Manifest version, None when no manifest has been written
+    """
+    try:
+        return _manifest_version(os.path.getmtime(MANIFEST_PATH))
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=256)
+def _manifest_scope_version(modified_at: float, kecamatan: str) -> Optional[str]:
+    """Version of one kecamatan's rows, re-read only when the manifest file changes"""
+    return scope_version(load_manifest(MANIFEST_PATH), kecamatan)
+
+
+def current_scope_version(kecamatan: str) -> Optional[str]:
+    """
+    Version of one kecamatan of the published dataset according to the manifest
+    
+    Caches of a single kecamatan are keyed on it, so a correction in another
+    kecamatan does not invalidate them.
+    
+    Args:
+        kecamatan: Kecamatan name or 'Semua Kecamatan' (the dataset version)
+    
+    Returns:
+        str: Scope version, None when no manifest has been written
+    """
+    try:
+        return _manifest_scope_version(os.path.getmtime(MANIFEST_PATH), kecamatan)
+    except OSError:
+        return None
+
+
+@st.cache_resource(max_entries=1)
+@resident('dataset')
+def load_podes_dataset(version: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load Podes 2024 data once per process as an immutable dataset handle
+    
+    Unlike load_podes_data, every caller receives the same object instead of
+    a deep copy, so handing out the frame costs nothing per rerun. Callers must
+    treat it as read-only; its column buffers are frozen (see freeze_frame).
+    
+    Args:
+        version: Dataset version; a new version (e.g. after corrections) loads
+            the data again and replaces the previous handle
+    
+    Returns:
+        pd.DataFrame: Read-only Podes data shared by all sessions
+    """
+    try:
+        return freeze_frame(read_podes_data())
+    
+    except FileNotFoundError:
+        st.error("File data/data_podes_2024.json tidak ditemukan!")
+        return pd.DataFrame()
+    except Exception as e:
+        st.error(f"Error loading data: {str(e)}")
+        return pd.DataFrame()
+
+
+@st.cache_resource(max_entries=1)
+@resident('shared_dataset')
+def load_shared_podes_data(version: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load Podes 2024 data as a read-only frame memory-mapped from the shared
+    dataset file, cached once per process and handed out without copying
+    
+    Args:
+        version: Dataset version from the manifest
+    
+    Returns:
+        pd.DataFrame: Read-only Podes data shared by all sessions and processes
+    """
+    try:
+        return load_shared_dataset(read_podes_data, version=version)
     
     except FileNotFoundError:
         st.error("File data/data_podes_2024.json tidak ditemukan!")
@@ -43,6 +213,373 @@ def load_podes_data() -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def get_podes_data() -> pd.DataFrame:
+    """
+    Dataset for the dashboard pages: the shared memory-mapped frame when
+    PODES_SHARED_DATASET=1, otherwise the per-process immutable handle
+    
+    Returns:
+        pd.DataFrame: Read-only Podes data
+    """
+    version = current_dataset_version()
+    if shared_dataset_enabled():
+        return load_shared_podes_data(version)
+    return load_podes_dataset(version)
+
+
+def get_dataset_version(df: pd.DataFrame) -> str:
+    """
+    Version identifier of the served dataset, used to key on-disk caches
+    
+    Args:
+        df: Dataset returned by get_podes_data
+        
+    Returns:
+        str: Manifest version, or the content hash when no manifest exists
+    """
+    return current_dataset_version() or dataset_version(df)
+
+
+@st.cache_resource(max_entries=1)
+@resident('rank_tables')
+def load_rank_tables(version: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Load the precomputed rank tables once per process and dataset version
+    
+    Reads data/ranks.parquet when it was built for this version, otherwise
+    ranks the served dataset once.
+    
+    Args:
+        version: Dataset version from the manifest
+    
+    Returns:
+        Dict: Indicator column -> read-only ranks in display order
+    """
+    table = load_rank_table(RANKS_PATH, version) if version else None
+    if table is None:
+        df = get_podes_data()
+        if df.empty:
+            return {}
+        table = build_rank_table(df)
+    return {key: freeze_frame(rankings) for key, rankings in split_rank_table(table).items()}
+
+
+def get_rank_tables() -> Dict[str, pd.DataFrame]:
+    """
+    Precomputed rank tables of the served dataset
+    
+    Returns:
+        Dict: Indicator column -> ranks, see modules/ranks.py
+    """
+    return load_rank_tables(current_dataset_version())
+
+
+@st.cache_resource(max_entries=1)
+@resident('top_villages')
+def load_top_villages(version: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Compute the top villages of every kecamatan once per process and dataset version
+    
+    Args:
+        version: Dataset version from the manifest
+    
+    Returns:
+        Dict: Indicator column -> read-only top rows in kecamatan and rank order
+    """
+    df = get_podes_data()
+    if df.empty:
+        return {}
+    top = build_top_villages(df)
+    return {
+        str(indicator): freeze_frame(rows.drop(columns='indikator').reset_index(drop=True))
+        for indicator, rows in top.groupby('indikator', sort=False)
+    }
+
+
+def get_top_villages() -> Dict[str, pd.DataFrame]:
+    """
+    Precomputed top villages per kecamatan of the served dataset
+    
+    Returns:
+        Dict: Indicator column -> top rows, see modules/ranks.py
+    """
+    return load_top_villages(current_dataset_version())
+
+
+@st.cache_resource(max_entries=1)
+@resident('encoded_dimensions')
+def load_encoded_dimensions(version: Optional[str] = None) -> Dict[str, Tuple[np.ndarray, pd.Index]]:
+    """
+    Dictionary-encode every column once per process and dataset version, so
+    cross tabulations only count integer codes
+    
+    Args:
+        version: Dataset version from the manifest
+    
+    Returns:
+        Dict: Column -> (int32 codes, labels), see modules/pivot.py
+    """
+    df = get_podes_data()
+    if df.empty:
+        return {}
+    encoded = encode_frame(df)
+    for codes, _ in encoded.values():
+        codes.flags.writeable = False
+    return encoded
+
+
+def get_encoded_dimensions() -> Dict[str, Tuple[np.ndarray, pd.Index]]:
+    """
+    Integer-coded columns of the served dataset
+    
+    Returns:
+        Dict: Column -> (codes, labels)
+    """
+    return load_encoded_dimensions(current_dataset_version())
+
+
+@st.cache_resource(max_entries=1)
+@resident('hierarchy')
+def load_hierarchy(version: Optional[str] = None) -> AdminHierarchy:
+    """
+    Build the administrative tree and its rollups once per process and
+    dataset version
+    
+    Args:
+        version: Dataset version from the manifest
+    
+    Returns:
+        AdminHierarchy: Tree of row ranges over the served dataset
+    """
+    return AdminHierarchy(get_podes_data())
+
+
+def get_hierarchy() -> AdminHierarchy:
+    """
+    Administrative tree of the served dataset
+    
+    Returns:
+        AdminHierarchy: Tree used to slice kecamatan and desa scopes
+    """
+    return load_hierarchy(current_dataset_version())
+
+
+@st.cache_resource(max_entries=1)
+@resident('village_index')
+def load_village_index(version: Optional[str] = None) -> VillageSearchIndex:
+    """
+    Build the village search index once per process and dataset version
+    
+    Args:
+        version: Dataset version from the manifest
+    
+    Returns:
+        VillageSearchIndex: Prefix/trigram index over village names
+    """
+    return VillageSearchIndex.from_frame(get_podes_data())
+
+
+def get_village_index() -> VillageSearchIndex:
+    """
+    Village search index of the served dataset
+    
+    Returns:
+        VillageSearchIndex: Index used by the village pickers
+    """
+    return load_village_index(current_dataset_version())
+
+
+@st.cache_resource(max_entries=1)
+@resident('bitmap_index')
+def load_bitmap_index(version: Optional[str] = None) -> BitmapIndex:
+    """
+    Build the bitmap indexes of the query builder once per process and
+    dataset version, reusing the encoded dimensions
+    
+    Args:
+        version: Dataset version from the manifest
+    
+    Returns:
+        BitmapIndex: Per-value and range bitsets over the served dataset
+    """
+    return BitmapIndex(get_podes_data(), load_encoded_dimensions(version))
+
+
+def get_bitmap_index() -> BitmapIndex:
+    """
+    Bitmap indexes of the served dataset
+    
+    Returns:
+        BitmapIndex: Index used by the village query builder
+    """
+    return load_bitmap_index(current_dataset_version())
+
+
+@st.cache_resource(max_entries=1)
+@resident('code_matrix')
+def load_code_matrix(version: Optional[str] = None) -> CodeMatrix:
+    """
+    Build the indicator code matrix once per process and dataset version,
+    reusing the encoded dimensions
+    
+    Args:
+        version: Dataset version from the manifest
+    
+    Returns:
+        CodeMatrix: Village x indicator codes of the served dataset
+    """
+    return CodeMatrix(get_podes_data(), load_encoded_dimensions(version))
+
+
+def get_code_matrix() -> CodeMatrix:
+    """
+    Indicator code matrix of the served dataset
+    
+    Returns:
+        CodeMatrix: Matrix used to summarize every indicator of a category at once
+    """
+    return load_code_matrix(current_dataset_version())
+
+
+@governed_cache('view_bundle')
+def load_cached_view_bundle(version: Optional[str], category: str, kecamatan: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a precomputed view bundle once per process, shared by all sessions;
+    bundles stay in memory while the cache budget allows
+    
+    Args:
+        version: Bundle version, see current_scope_version
+        category: Indicator category
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+    
+    Returns:
+        Dict: Bundle, or None when none was built for this version
+    """
+    if version is None:
+        return None
+    return load_view_bundle(version, category, kecamatan)
+
+
+def get_view_bundle(category: str, kecamatan: str) -> Optional[Dict[str, Any]]:
+    """
+    Precomputed "Semua" indicator view of a category and kecamatan
+    
+    Args:
+        category: Indicator category
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+    
+    Returns:
+        Dict: Bundle (see modules/bundles.py), or None to compute the view live
+    """
+    return load_cached_view_bundle(current_scope_version(kecamatan), category, kecamatan)
+
+
+@governed_cache('indicator_view')
+def load_indicator_view(version: Optional[str], category: str, indicator: str,
+                        kecamatan: str) -> Optional[Dict[str, Any]]:
+    """
+    Build the figures of a single indicator for a kecamatan (or the whole
+    city) once per process and scope version, shared by all sessions
+    
+    Args:
+        version: Version of the kecamatan (see current_scope_version); part of the cache key
+        category: Indicator category
+        indicator: Indicator column
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+    
+    Returns:
+        Dict: {kind, figures} like a bundle entry, or None when the scope is
+        empty or the indicator is not in the data
+    """
+    category_indicators = get_updated_category_indicators()
+    filtered_df, _ = filter_and_analyze_data(
+        get_podes_data(), kecamatan, [], indicator, category_indicators, category, hierarchy=get_hierarchy()
+    )
+    if filtered_df.empty or indicator not in filtered_df.columns:
+        return None
+    matrix = get_code_matrix()
+    summary = matrix.summarize([indicator], matrix.rows_of(filtered_df)).get(indicator)
+    return build_indicator_view(filtered_df, indicator, category_indicators[category][indicator], get_rank_tables(),
+                                summary)
+
+
+def get_indicator_view(category: str, indicator: str, kecamatan: str) -> Optional[Dict[str, Any]]:
+    """
+    Figures of a single indicator for a kecamatan or the whole city
+    
+    Args:
+        category: Indicator category
+        indicator: Indicator column
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+    
+    Returns:
+        Dict: {kind, figures}, or None to compute the view live
+    """
+    return load_indicator_view(current_scope_version(kecamatan), category, indicator, kecamatan)
+
+
+@st.cache_resource(max_entries=1)
+@resident('aggregates')
+def load_dataset_aggregates(version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load the per-kecamatan aggregates (sums, counts, quantile sketches) once
+    per process and dataset version
+    
+    Reads data/aggregates.json, or builds the aggregates from the served
+    dataset when the file is missing or of an older format.
+    
+    Args:
+        version: Dataset version from the manifest
+    
+    Returns:
+        Dict: Aggregates, see modules/aggregates.py
+    """
+    aggregates = load_aggregates(AGGREGATES_PATH)
+    if not aggregates:
+        df = get_podes_data()
+        aggregates = build_aggregates(df) if not df.empty else {}
+    return aggregates
+
+
+def get_aggregates() -> Dict[str, Any]:
+    """
+    Per-kecamatan aggregates of the served dataset
+    
+    Returns:
+        Dict: Aggregates, see modules/aggregates.py
+    """
+    return load_dataset_aggregates(current_dataset_version())
+
+
+@st.cache_data(max_entries=1)
+def load_quality_report(version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load and cache the data quality report written by data/ProsesData.py
+    once per dataset version
+    
+    Args:
+        version: Dataset version from the manifest
+    
+    Returns:
+        Dict: Quality report, or empty dict if it has not been generated yet
+    """
+    try:
+        with open('data/quality_report.json', 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def get_quality_report() -> Dict[str, Any]:
+    """
+    Data quality report of the served dataset
+    
+    Returns:
+        Dict: Quality report, see modules/validation.py
+    """
+    return load_quality_report(current_dataset_version())
+
+
 def get_category_indicators() -> Dict[str, Dict[str, str]]:
     """
     Define indicator mapping for each category (Updated structure)
@@ -139,7 +676,7 @@ def filter_data(df: pd.DataFrame,
     if df.empty:
         return df
     
-    filtered_df = df.copy()
+    filtered_df = df
     
     # Filter by kecamatan
     if selected_kecamatan != "Semua Kecamatan":
@@ -0,0 +1,83 @@
+"""
+Editions module for Podes 2024 dashboard
+Registry of the PODES editions (survey years) available on disk, each with
+its own columnar store and manifest, all keyed on id_desa
+"""
+
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from modules.manifest import MANIFEST_PATH, load_manifest
+from modules.store import STORE_DIR, list_partitions, read_store
+
+
+# Edisi yang dilayani dashboard utama; memakai data/store dan data/manifest.json
+DEFAULT_EDITION = 2024
+EDITIONS_DIR = 'data/editions'
+
+
+def edition_paths(year: int) -> Dict[str, str]:
+    """
+    Store directory and manifest file of an edition
+
+    Args:
+        year: Edition year, e.g. 2021
+
+    Returns:
+        Dict: {'store': directory, 'manifest': file}
+    """
+    if year == DEFAULT_EDITION:
+        return {'store': STORE_DIR, 'manifest': MANIFEST_PATH}
+    root = os.path.join(EDITIONS_DIR, str(year))
+    return {'store': os.path.join(root, 'store'), 'manifest': os.path.join(root, 'manifest.json')}
+
+
+def list_editions() -> List[int]:
+    """
+    Edition years with data on disk
+
+    The default edition is always listed, since the dashboard can fall back
+    to its JSON file when the store has not been built.
+
+    Returns:
+        List[int]: Sorted edition years
+    """
+    years = {DEFAULT_EDITION}
+    if os.path.isdir(EDITIONS_DIR):
+        for name in os.listdir(EDITIONS_DIR):
+            if name.isdigit() and list_partitions(edition_paths(int(name))['store']):
+                years.add(int(name))
+    return sorted(years)
+
+
+def edition_version(year: int) -> Optional[str]:
+    """
+    Dataset version of an edition from its manifest
+
+    Args:
+        year: Edition year
+
+    Returns:
+        str: Version, None when the edition has no manifest
+    """
+    return load_manifest(edition_paths(year)['manifest']).get('version')
+
+
+def load_edition(year: int) -> pd.DataFrame:
+    """
+    Read the cleaned data of an edition
+
+    Args:
+        year: Edition year
+
+    Returns:
+        pd.DataFrame: Cleaned data sorted by id_desa
+    """
+    if year == DEFAULT_EDITION:
+        from modules.data_loader import read_podes_data
+        df = read_podes_data()
+    else:
+        df = read_store(edition_paths(year)['store'])
+    return df.sort_values('id_desa', kind='stable').reset_index(drop=True)
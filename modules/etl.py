@@ -0,0 +1,303 @@
+"""
+ETL module for Podes 2024 dashboard
+Per-file transform of raw PODES exports and the parallel multi-file ingest
+"""
+
+import importlib.util
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+from modules.podes_schema import (
+    ID_COLUMNS, CONTINUOUS_COLUMNS, CATEGORICAL_COLUMNS, UNDEFINED_LABEL,
+    RAW_BLANK, RAW_TOKEN, RAW_NEGATIVE, RAW_DTYPES
+)
+from modules.validation import check_unmapped_column, merge_column_reports, merge_quality_reports, validate_raw_data
+
+
+# Urutan pelebaran kolom kode mentah yang nilainya melebihi tipe skema
+INTEGER_DTYPES = ['int8', 'int16', 'int32', 'int64']
+
+# Baris per potongan saat memindai kolom mentah yang tidak dipetakan
+UNMAPPED_CHUNK_ROWS = 50000
+
+
+def decode_raw_codes(raw: pd.Series, dtype: str) -> Tuple[pd.Series, Dict[str, int], pd.Series]:
+    """
+    Convert a dictionary-encoded raw column into small integer codes
+
+    The conversion works on the (few) distinct raw values only and then gathers
+    through the category codes, so it never touches individual rows in Python.
+    Blanks become RAW_BLANK, non-numeric or fractional tokens become RAW_TOKEN
+    and negative numbers RAW_NEGATIVE. Values beyond the target dtype widen the
+    column to the next integer dtype instead of being narrowed, so they reach
+    the cleaned data and the quality report unchanged.
+
+    Args:
+        raw: Categorical series as read from CSV
+        dtype: Target numpy integer dtype (e.g. 'int8')
+
+    Returns:
+        Tuple of (integer series, text -> count of the tokens and negative
+        numbers, text of every RAW_TOKEN / RAW_NEGATIVE cell indexed like raw)
+    """
+    categories = pd.Series(raw.cat.categories.astype(str), dtype=object).str.strip()
+    values = pd.to_numeric(categories, errors='coerce').to_numpy(dtype='float64')
+
+    is_blank = (categories == '').to_numpy()
+    is_token = ~is_blank & (np.isnan(values) | (values % 1 != 0) | (values > np.iinfo('int64').max))
+    is_negative = ~is_blank & ~is_token & (values < 0)
+
+    # Lebarkan tipe bila ada nilai di luar batasnya; jangan pernah memotong nilai
+    largest = values[~is_blank & ~is_token].max(initial=0)
+    widths = INTEGER_DTYPES[INTEGER_DTYPES.index(dtype):]
+    dtype = next(width for width in widths if largest <= np.iinfo(width).max)
+
+    lookup = np.nan_to_num(values)
+    lookup[is_blank] = RAW_BLANK
+    lookup[is_token] = RAW_TOKEN
+    lookup[is_negative] = RAW_NEGATIVE
+    # Kode -1 dari kategori pandas (nilai hilang) diarahkan ke elemen terakhir
+    lookup = np.append(lookup, RAW_BLANK).astype(dtype)
+
+    codes = raw.cat.codes.to_numpy()
+    decoded = pd.Series(lookup[codes], index=raw.index, name=raw.name)
+
+    # Teks asli sel sentinel (jarang): contoh laporan kualitas dan pembeda duplikat
+    is_text = is_token | is_negative
+    text_rows = np.flatnonzero(np.append(is_text, False)[codes])
+    cells = pd.Series(np.asarray(raw.cat.categories.astype(str))[codes[text_rows]], dtype=object,
+                      index=raw.index[text_rows], name=raw.name).str.strip()
+
+    tokens = {}
+    if is_text.any():
+        counts = raw.value_counts(sort=False)
+        for text in raw.cat.categories[is_text]:
+            if counts[text] > 0:
+                tokens[str(text).strip()] = int(counts[text])
+
+    return decoded, tokens, cells
+
+
+def read_raw_csv(path: str, engine: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read a raw PODES CSV export with the declared raw schema
+
+    Only the identity columns and the R-codes the pipeline maps are read (the
+    other columns are checked for validation by scan_unmapped_columns). Code
+    columns are parsed dictionary-encoded and converted to small integers with
+    explicit sentinels (see RAW_BLANK / RAW_TOKEN / RAW_NEGATIVE in
+    podes_schema); the text of every non-numeric token and negative number is
+    kept for validation: counts per column in df.attrs['raw_tokens'], the text
+    of each such cell in df.attrs['raw_token_cells'].
+    The pyarrow CSV engine is used when pyarrow is installed.
+
+    Args:
+        path: Path to a raw CSV export
+        engine: Optional pandas CSV engine override
+
+    Returns:
+        pd.DataFrame: Typed raw dataframe
+    """
+    if engine is None:
+        engine = 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
+
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [col for col in RAW_DTYPES if col in header]
+    read_dtypes = {col: ('int64' if RAW_DTYPES[col] == 'int64' else 'category') for col in usecols}
+
+    df = pd.read_csv(path, engine=engine, usecols=usecols, dtype=read_dtypes,
+                     keep_default_na=False, na_values=[])
+    df = df[usecols]
+
+    raw_tokens, token_cells = {}, {}
+    for col in usecols:
+        if col in CATEGORICAL_COLUMNS or col in CONTINUOUS_COLUMNS:
+            df[col], tokens, cells = decode_raw_codes(df[col], RAW_DTYPES[col])
+            if tokens:
+                raw_tokens[col] = tokens
+                token_cells[col] = cells
+
+    df.attrs['raw_tokens'] = raw_tokens
+    df.attrs['raw_token_cells'] = token_cells
+    return df
+
+
+def scan_unmapped_columns(path: str, chunksize: int = UNMAPPED_CHUNK_ROWS) -> Optional[Dict[str, Any]]:
+    """
+    Check the raw columns read_raw_csv leaves out, without keeping them
+
+    The pipeline does not map these R-codes, but the quality report still
+    checks them for blanks and tokens and the duplicate check compares whole
+    rows. They are read as text in chunks (C engine; the pyarrow engine
+    cannot chunk) and each chunk is reduced to its column checks and one
+    64-bit hash per row, so only 8 bytes per row outlive the chunk.
+
+    Args:
+        path: Path to a raw CSV export
+        chunksize: Rows read per chunk
+
+    Returns:
+        Dict: 'columns' (per-column quality counts in file order) and
+        'row_hash' (np.ndarray aligned with read_raw_csv's rows); None when
+        the file has no other columns
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    unmapped = [col for col in header if col not in RAW_DTYPES]
+    if not unmapped:
+        return None
+
+    column_reports, hashes = [], []
+    chunks = pd.read_csv(path, usecols=unmapped, dtype=str, keep_default_na=False, na_values=[],
+                         chunksize=chunksize)
+    for chunk in chunks:
+        chunk = chunk[unmapped]
+        column_reports.append([check_unmapped_column(chunk[col]) for col in unmapped if col.startswith('R')])
+        hashes.append(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+
+    return {
+        'columns': merge_column_reports(column_reports),
+        'row_hash': np.concatenate(hashes) if hashes else np.empty(0, dtype='uint64')
+    }
+
+
+def transform_raw_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn a raw PODES frame into the cleaned dashboard frame
+
+    Deduplicates on IDDESA (keeping the first row), renames identity and
+    continuous columns and maps categorical codes to labels. Accepts both the
+    typed frame from read_raw_csv and a plain pd.read_csv frame.
+
+    Args:
+        df: Raw dataframe as read from a cleaned PODES CSV export
+
+    Returns:
+        pd.DataFrame: Cleaned dataframe with one row per village
+    """
+    df_unique = df.drop_duplicates(subset='IDDESA', keep='first')
+    sentinel_coded = 'raw_tokens' in df.attrs
+
+    df_final = pd.DataFrame(index=df_unique.index)
+
+    # Salin kolom identitas
+    for raw_col, clean_col in ID_COLUMNS.items():
+        df_final[clean_col] = df_unique[raw_col]
+    df_final['id_desa'] = df_final['id_desa'].astype('int64')
+    df_final['nama_kecamatan'] = df_final['nama_kecamatan'].astype(str)
+    df_final['nama_desa'] = df_final['nama_desa'].astype(str)
+
+    # Kolom kontinu (hanya rename, dengan tipe angka)
+    for raw_col, clean_col in CONTINUOUS_COLUMNS.items():
+        values = pd.to_numeric(df_unique[raw_col], errors='coerce')
+        if sentinel_coded:
+            values = values.where(values >= 0)
+        df_final[clean_col] = values.astype('int64') if values.notna().all() else values
+
+    # Kolom kategori (rename dan mapping nilai)
+    for raw_col, (clean_col, mapping) in CATEGORICAL_COLUMNS.items():
+        codes = pd.to_numeric(df_unique[raw_col], errors='coerce')
+        df_final[clean_col] = codes.map(mapping).fillna(UNDEFINED_LABEL)
+
+    return df_final.reset_index(drop=True)
+
+
+def process_raw_file(path: str) -> Tuple[str, pd.DataFrame, Dict[str, Any], float]:
+    """
+    Read, validate and transform one raw PODES file (process pool worker)
+
+    Args:
+        path: Path to a raw CSV export
+
+    Returns:
+        Tuple of (path, cleaned dataframe, quality report, elapsed seconds)
+    """
+    start = time.perf_counter()
+    df = read_raw_csv(path)
+    report = validate_raw_data(df, source=path, unmapped=scan_unmapped_columns(path))
+    df_final = transform_raw_frame(df)
+    return path, df_final, report, time.perf_counter() - start
+
+
+def find_cross_file_duplicates(frames: List[Tuple[str, pd.DataFrame]]) -> Dict[str, List[str]]:
+    """
+    Find village ids that appear in more than one input file
+
+    Args:
+        frames: (path, cleaned dataframe) pairs
+
+    Returns:
+        Dict: id_desa -> list of files containing it
+    """
+    if not frames:
+        return {}
+
+    sources = pd.concat(
+        [pd.DataFrame({'id_desa': frame['id_desa'].to_numpy(), 'source': path}) for path, frame in frames],
+        ignore_index=True
+    )
+    duplicated = sources[sources['id_desa'].duplicated(keep=False)]
+    return {
+        str(id_desa): group['source'].tolist()
+        for id_desa, group in duplicated.groupby('id_desa', sort=True)
+    }
+
+
+def ingest_files(paths: List[str],
+                 workers: Optional[int] = None,
+                 progress: Optional[Callable[[int, int, str, int, float], None]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Transform many raw files across a process pool and merge the results
+
+    Files are processed in parallel but merged in sorted path order and then by
+    id_desa, so the output does not depend on completion order. When an id_desa
+    appears in several files the row from the first file (in path order) wins
+    and the conflict is recorded in the quality report.
+
+    Args:
+        paths: Raw CSV file paths
+        workers: Process pool size, defaults to the number of CPUs
+        progress: Optional callback(done, total, path, rows, seconds)
+
+    Returns:
+        Tuple of merged cleaned dataframe and merged quality report
+    """
+    ordered_paths = sorted(set(paths))
+    if not ordered_paths:
+        return pd.DataFrame(), {}
+
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(ordered_paths)))
+
+    results: Dict[str, Tuple[pd.DataFrame, Dict[str, Any]]] = {}
+
+    if workers == 1:
+        for done, path in enumerate(ordered_paths, start=1):
+            _, df_final, report, elapsed = process_raw_file(path)
+            results[path] = (df_final, report)
+            if progress:
+                progress(done, len(ordered_paths), path, len(df_final), elapsed)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_raw_file, path) for path in ordered_paths]
+            for done, future in enumerate(as_completed(futures), start=1):
+                path, df_final, report, elapsed = future.result()
+                results[path] = (df_final, report)
+                if progress:
+                    progress(done, len(ordered_paths), path, len(df_final), elapsed)
+
+    frames = [(path, results[path][0]) for path in ordered_paths]
+    cross_file = find_cross_file_duplicates(frames)
+
+    merged = pd.concat([frame for _, frame in frames], ignore_index=True)
+    merged = merged.drop_duplicates(subset='id_desa', keep='first')
+    merged = merged.sort_values('id_desa', kind='stable').reset_index(drop=True)
+
+    report = merge_quality_reports([results[path][1] for path in ordered_paths])
+    report['unique_desa'] = int(len(merged))
+    report['duplicates']['cross_file_ids'] = cross_file
+
+    return merged, report
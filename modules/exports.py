@@ -0,0 +1,273 @@
+"""
+Export module for Podes 2024 dashboard
+Builds Excel files for the download buttons and the batch reporter
+"""
+
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, Iterator, List
+
+import pandas as pd
+
+from modules.profiling import timed
+
+
+EXPORT_CACHE_DIR = 'data/cache/exports'
+
+# Satu kunci per file cache: sesi Streamlit adalah thread dalam satu proses
+_path_locks: Dict[str, threading.Lock] = {}
+_path_locks_guard = threading.Lock()
+
+
+def _path_lock(path: str) -> threading.Lock:
+    """Lock serializing the builds of one cache file within this process"""
+    with _path_locks_guard:
+        return _path_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def _temporary_path(path: str) -> str:
+    """
+    Unique temporary file next to path, renamed into place when complete
+
+    The name keeps the target's extension (the Excel writer checks it) and
+    contains '.tmp.', so cache cleanup can tell unfinished files apart.
+    """
+    base, extension = os.path.splitext(path)
+    handle, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(base)}.", suffix=f".tmp{extension}",
+                                        dir=os.path.dirname(path) or '.')
+    os.close(handle)
+    return tmp_path
+
+
+def _autosize_columns(worksheet) -> None:
+    """Set each column width from its longest cell value (capped at 50)"""
+    for column in worksheet.columns:
+        max_length = 0
+        column_letter = column[0].column_letter
+        for cell in column:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        adjusted_width = min(max_length + 2, 50)
+        worksheet.column_dimensions[column_letter].width = adjusted_width
+
+
+@timed('export.excel')
+def build_excel_bytes(df: pd.DataFrame, sheet_name: str = 'Data') -> bytes:
+    """
+    Build an Excel workbook with auto-sized columns in memory
+
+    io and the openpyxl engine are only imported here, i.e. when a user actually
+    clicks a download button.
+
+    Args:
+        df: DataFrame to export
+        sheet_name: Worksheet name
+
+    Returns:
+        bytes: .xlsx file contents
+    """
+    import io
+
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name=sheet_name)
+
+        # Auto-adjust column widths
+        _autosize_columns(writer.sheets[sheet_name])
+
+    return output.getvalue()
+
+
+def write_excel_workbook(sheets: Dict[str, pd.DataFrame], path: str) -> str:
+    """
+    Write several DataFrames as one auto-sized workbook, one sheet each
+
+    The workbook is written next to the target and renamed into place.
+
+    Args:
+        sheets: Sheet name -> DataFrame, in sheet order (names max. 31 characters)
+        path: Output .xlsx path
+
+    Returns:
+        str: Path of the written workbook
+    """
+    tmp_path = _temporary_path(path)
+    with pd.ExcelWriter(tmp_path, engine='openpyxl') as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, index=False, sheet_name=sheet_name)
+            _autosize_columns(writer.sheets[sheet_name])
+    os.replace(tmp_path, path)
+    return path
+
+
+def _sheet_title(name: str, used: set) -> str:
+    """Valid, unique worksheet title (max. 31 characters, no []:*?/\\)"""
+    base = re.sub(r'[\[\]:*?/\\]', ' ', name).strip()[:31] or 'Sheet'
+    title, counter = base, 2
+    while title.lower() in used:
+        suffix = f" ({counter})"
+        title, counter = base[:31 - len(suffix)] + suffix, counter + 1
+    used.add(title.lower())
+    return title
+
+
+def _stream_frame(workbook, title: str, df: pd.DataFrame) -> None:
+    """
+    Append a DataFrame to a write-only workbook row by row
+
+    Column widths are computed up front from the column values (write-only
+    sheets cannot be revisited), so no per-cell pass over a finished sheet.
+    """
+    from openpyxl.utils import get_column_letter
+
+    worksheet = workbook.create_sheet(title)
+    for position, column in enumerate(df.columns, start=1):
+        lengths = df[column].astype(str).str.len()
+        max_length = max(len(str(column)), int(lengths.max()) if len(lengths) else 0)
+        worksheet.column_dimensions[get_column_letter(position)].width = min(max_length + 2, 50)
+
+    worksheet.append([str(column) for column in df.columns])
+    for row in _rows(df):
+        worksheet.append(row)
+
+
+def _rows(df: pd.DataFrame) -> Iterator[List]:
+    """Rows as plain lists with missing values as empty cells"""
+    for row in df.itertuples(index=False, name=None):
+        yield [None if pd.isna(value) else value for value in row]
+
+
+def kecamatan_summary_frame(df: pd.DataFrame, category_indicators: Dict[str, Dict[str, str]]) -> pd.DataFrame:
+    """
+    Long-format indicator summary for every kecamatan
+
+    Quantitative indicators get Total/Median/Tertinggi/Terendah rows,
+    qualitative indicators one row per answer with village count and share.
+
+    Args:
+        df: Cleaned Podes dataframe
+        category_indicators: Category -> {indicator column: label}
+
+    Returns:
+        pd.DataFrame: Kecamatan, Kategori, Indikator, Ukuran, Nilai, Persentase (%)
+    """
+    groups = df.groupby('nama_kecamatan', sort=True)
+    village_counts = groups.size()
+    parts = []
+
+    for category, indicators in category_indicators.items():
+        for key, label in indicators.items():
+            if key not in df.columns:
+                continue
+            if pd.api.types.is_numeric_dtype(df[key]):
+                stats = groups[key].agg(['sum', 'median', 'max', 'min'])
+                stats.columns = ['Total', 'Median', 'Tertinggi', 'Terendah']
+                long = stats.stack().rename('Nilai').reset_index()
+                long.columns = ['Kecamatan', 'Ukuran', 'Nilai']
+                long['Persentase (%)'] = None
+            else:
+                counts = df.groupby(['nama_kecamatan', key], sort=True).size().rename('Nilai').reset_index()
+                counts.columns = ['Kecamatan', 'Ukuran', 'Nilai']
+                totals = counts['Kecamatan'].map(village_counts)
+                counts['Persentase (%)'] = (counts['Nilai'] / totals * 100).round(1)
+                long = counts
+            long.insert(1, 'Kategori', category)
+            long.insert(2, 'Indikator', label)
+            parts.append(long)
+
+    if not parts:
+        return pd.DataFrame(columns=['Kecamatan', 'Kategori', 'Indikator', 'Ukuran', 'Nilai', 'Persentase (%)'])
+    return pd.concat(parts, ignore_index=True)
+
+
+def all_categories_export_path(version: str, cache_dir: str = EXPORT_CACHE_DIR) -> str:
+    """
+    Cache path of the all-categories workbook for a dataset version
+
+    Args:
+        version: Dataset version from the manifest
+        cache_dir: Export cache directory
+
+    Returns:
+        str: .xlsx path
+    """
+    return os.path.join(cache_dir, f"podes_semua_kategori_{version}.xlsx")
+
+
+@timed('export.all_categories')
+def build_all_categories_workbook(df: pd.DataFrame, version: str,
+                                  cache_dir: str = EXPORT_CACHE_DIR) -> str:
+    """
+    Write (or reuse) the workbook with every category and kecamatan summary
+
+    One sheet per category from get_updated_category_indicators, then one
+    summary sheet per kecamatan. The workbook is streamed with openpyxl's
+    write-only mode, so memory stays constant in the number of rows, and is
+    written to a temporary file that is renamed into the per-version cache.
+
+    Args:
+        df: Cleaned Podes dataframe
+        version: Dataset version, part of the cache file name
+        cache_dir: Export cache directory
+
+    Returns:
+        str: Path of the cached workbook
+    """
+    path = all_categories_export_path(version, cache_dir)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Sesi lain yang meminta versi yang sama menunggu lalu memakai file yang sama
+    with _path_lock(path):
+        if os.path.exists(path):
+            return path
+        _write_all_categories_workbook(df, path)
+
+    # Hanya versi data terbaru yang perlu disimpan; file sementara dan file yang sedang
+    # dibangun sesi lain dibiarkan
+    for name in os.listdir(cache_dir):
+        other = os.path.join(cache_dir, name)
+        if (name.startswith('podes_semua_kategori_') and name.endswith('.xlsx') and '.tmp.' not in name
+                and other != path and not _path_lock(other).locked()):
+            try:
+                os.remove(other)
+            except FileNotFoundError:
+                # Sudah dihapus oleh sesi lain
+                pass
+    return path
+
+
+def _write_all_categories_workbook(df: pd.DataFrame, path: str) -> None:
+    """Stream the all-categories workbook to a temporary file and rename it to path"""
+    from openpyxl import Workbook
+    from modules.analysis import get_updated_category_indicators
+
+    category_indicators = get_updated_category_indicators()
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+
+    base_columns = {'id_desa': 'ID Desa', 'nama_kecamatan': 'Kecamatan', 'nama_desa': 'Desa'}
+    ordered = df.sort_values(['nama_kecamatan', 'nama_desa'])
+    for category, indicators in category_indicators.items():
+        columns = list(base_columns) + [key for key in indicators if key in ordered.columns]
+        sheet = ordered[columns].rename(columns={**base_columns, **indicators})
+        _stream_frame(workbook, _sheet_title(category, used_titles), sheet)
+
+    summary = kecamatan_summary_frame(df, category_indicators)
+    for kecamatan, part in summary.groupby('Kecamatan', sort=True):
+        _stream_frame(workbook, _sheet_title(f"Kec {kecamatan}", used_titles),
+                      part.drop(columns='Kecamatan'))
+
+    tmp_path = _temporary_path(path)
+    try:
+        workbook.save(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,288 @@
+"""
+Hierarchy module for Podes 2024 dashboard
+Administrative tree (provinsi → kabupaten/kota → kecamatan → desa) parsed
+from the 10-digit id_desa; with the data sorted by id every node is a
+contiguous row range, and rollups are precomputed for every node
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from modules.aggregates import ID_COLUMNS
+
+
+# Tingkat wilayah dan jumlah digit kode id_desa yang menandainya
+LEVELS = (
+    ('provinsi', 2),
+    ('kabupaten', 4),
+    ('kecamatan', 7),
+    ('desa', 10)
+)
+
+# Nama wilayah di atas kecamatan tidak ada di data Podes
+REGION_NAMES = {
+    '35': 'JAWA TIMUR',
+    '3579': 'KOTA BATU'
+}
+
+
+class ScopeNode:
+    """
+    One region of the tree
+
+    Rows of the region are hierarchy.frame.iloc[start:stop].
+    """
+
+    def __init__(self, code: str, level: str, name: str, start: int, stop: int,
+                 parent: Optional[str]):
+        self.code = code
+        self.level = level
+        self.name = name
+        self.start = start
+        self.stop = stop
+        self.parent = parent
+        self.children: List[str] = []
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __repr__(self) -> str:
+        return f"ScopeNode({self.code}, {self.level}, {self.name!r}, rows {self.start}:{self.stop})"
+
+
+class AdminHierarchy:
+    """
+    Tree of regions over the dataset sorted by id_desa
+
+    Rollups hold, for every node, the number of villages, the sum, minimum
+    and maximum of each numeric indicator and the answer counts of each
+    categorical indicator. They are built once with one reduceat/bincount
+    per level, so moving up or down the tree is a dict lookup plus a slice.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Build the tree and its rollups
+
+        Args:
+            df: Podes data with id_desa, nama_kecamatan and nama_desa
+        """
+        # Data yang sudah urut (seperti keluaran ETL) dipakai tanpa disalin
+        frame = df if df['id_desa'].is_monotonic_increasing else df.sort_values('id_desa', kind='stable')
+        frame = frame.reset_index(drop=True)
+        self.frame = frame
+        self.nodes: Dict[str, ScopeNode] = {}
+
+        indicators = [col for col in frame.columns if col not in ID_COLUMNS]
+        self.numeric = [col for col in indicators if pd.api.types.is_numeric_dtype(frame[col])]
+        self.categorical = [col for col in indicators if col not in self.numeric]
+
+        ids = frame['id_desa'].to_numpy(dtype='int64')
+        values = frame[self.numeric].to_numpy(dtype='float64')
+        answers = {col: pd.factorize(frame[col], sort=True) for col in self.categorical}
+
+        sums, minimums, maximums, counts, sizes, codes = [], [], [], {col: [] for col in self.categorical}, [], []
+        parents: Optional[np.ndarray] = None
+        for level, digits in LEVELS if len(frame) else ():
+            level_codes = ids // 10 ** (10 - digits)
+            starts = np.flatnonzero(np.r_[True, level_codes[1:] != level_codes[:-1]])
+            stops = np.r_[starts[1:], len(frame)]
+            labels = [str(code).zfill(digits) for code in level_codes[starts]]
+
+            # Agregat semua node satu tingkat sekaligus
+            sums.append(np.add.reduceat(np.nan_to_num(values), starts, axis=0))
+            minimums.append(np.fmin.reduceat(values, starts, axis=0))
+            maximums.append(np.fmax.reduceat(values, starts, axis=0))
+            node_of_row = np.repeat(np.arange(len(starts)), stops - starts)
+            for col, (answer_codes, answer_labels) in answers.items():
+                valid = answer_codes >= 0
+                flat = node_of_row[valid] * len(answer_labels) + answer_codes[valid]
+                table = np.bincount(flat, minlength=len(starts) * len(answer_labels))
+                counts[col].append(table.reshape(len(starts), len(answer_labels)))
+            sizes.append(stops - starts)
+            codes.extend(labels)
+
+            for position, code in enumerate(labels):
+                parent = None if parents is None else parents[starts[position]]
+                self.nodes[code] = ScopeNode(code, level, self._region_name(level, code, starts[position]),
+                                             int(starts[position]), int(stops[position]), parent)
+                if parent is not None:
+                    self.nodes[parent].children.append(code)
+            parents = np.repeat(np.asarray(labels, dtype=object), stops - starts)
+
+        roots = [code for code, node in self.nodes.items() if node.parent is None]
+        self.root = roots[0] if len(roots) == 1 else None
+
+        # Wilayah terkecil yang memuat semua data (mis. KOTA BATU), cakupan "Semua Kecamatan"
+        self.base = self.root
+        while (self.base is not None and len(self.nodes[self.base].children) == 1
+               and self.nodes[self.base].level != 'kecamatan'):
+            self.base = self.nodes[self.base].children[0]
+
+        index = pd.Index(codes, name='kode_wilayah')
+        self.rollups = pd.DataFrame(
+            np.vstack(sums) if sums else np.empty((0, len(self.numeric))), index=index, columns=self.numeric
+        )
+        self.rollups.insert(0, 'jumlah_desa', np.concatenate(sizes) if sizes else np.empty(0, dtype='int64'))
+        self.minimums = pd.DataFrame(
+            np.vstack(minimums) if minimums else np.empty((0, len(self.numeric))), index=index, columns=self.numeric
+        )
+        self.maximums = pd.DataFrame(
+            np.vstack(maximums) if maximums else np.empty((0, len(self.numeric))), index=index, columns=self.numeric
+        )
+        self.value_counts = {
+            col: pd.DataFrame(np.vstack(tables) if tables else np.empty((0, len(answers[col][1])), dtype='int64'),
+                              index=index, columns=answers[col][1])
+            for col, tables in counts.items()
+        }
+
+        # Nama -> kode untuk filter sidebar
+        self._kecamatan_codes: Dict[str, List[str]] = {}
+        self._desa_codes: Dict[str, List[str]] = {}
+        for code, node in self.nodes.items():
+            if node.level == 'kecamatan':
+                self._kecamatan_codes.setdefault(node.name, []).append(code)
+            elif node.level == 'desa':
+                self._desa_codes.setdefault(node.name, []).append(code)
+
+    def _region_name(self, level: str, code: str, row: int) -> str:
+        if level == 'kecamatan':
+            return str(self.frame.at[row, 'nama_kecamatan'])
+        if level == 'desa':
+            return str(self.frame.at[row, 'nama_desa'])
+        return REGION_NAMES.get(code, f"{level.upper()} {code}")
+
+    def node(self, code: str) -> ScopeNode:
+        """Node of a region code (2, 4, 7 or 10 digits)"""
+        return self.nodes[code]
+
+    def rows(self, code: str) -> pd.DataFrame:
+        """
+        Villages of a region, as a slice of the sorted frame (no masking)
+
+        Args:
+            code: Region code
+
+        Returns:
+            pd.DataFrame: Rows of the region
+        """
+        node = self.nodes[code]
+        return self.frame.iloc[node.start:node.stop]
+
+    def rollup(self, code: str) -> pd.Series:
+        """
+        Precomputed village count and indicator sums of a region
+
+        Args:
+            code: Region code
+
+        Returns:
+            pd.Series: jumlah_desa and one sum per numeric indicator
+        """
+        return self.rollups.loc[code]
+
+    def answer_counts(self, code: str, column: str) -> pd.Series:
+        """
+        Precomputed answer counts of a categorical indicator in a region
+
+        Args:
+            code: Region code
+            column: Categorical indicator column
+
+        Returns:
+            pd.Series: Count per answer, most common first, zeros dropped
+        """
+        counts = self.value_counts[column].loc[code]
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+    def indicator_rollup(self, code: str, column: str) -> Dict[str, Any]:
+        """
+        Precomputed KPI inputs of one indicator in a region
+
+        Args:
+            code: Region code
+            column: Indicator column
+
+        Returns:
+            Dict: total, min_value and max_value for numeric indicators,
+            value_counts for categorical ones; empty for unknown columns
+        """
+        if column in self.numeric:
+            return {
+                'total': self.rollups.at[code, column],
+                'min_value': self.minimums.at[code, column],
+                'max_value': self.maximums.at[code, column]
+            }
+        if column in self.value_counts:
+            return {'value_counts': self.answer_counts(code, column)}
+        return {}
+
+    def path(self, code: str) -> List[ScopeNode]:
+        """
+        Nodes from the root down to a region, for breadcrumbs
+
+        Args:
+            code: Region code
+
+        Returns:
+            List[ScopeNode]: Root first
+        """
+        path = []
+        while code is not None:
+            node = self.nodes[code]
+            path.append(node)
+            code = node.parent
+        return path[::-1]
+
+    def children(self, code: str) -> List[ScopeNode]:
+        """Child regions of a node, in id order"""
+        return [self.nodes[child] for child in self.nodes[code].children]
+
+    def descendants(self, code: str, level: str) -> List[ScopeNode]:
+        """
+        Regions of a given level under a node, or its ancestor at that
+        level when the node lies deeper
+
+        Args:
+            code: Region code
+            level: Level name from LEVELS
+
+        Returns:
+            List[ScopeNode]: Regions in id order
+        """
+        ancestors = [node for node in self.path(code) if node.level == level]
+        if ancestors:
+            return ancestors
+        nodes = [self.nodes[code]]
+        while nodes and nodes[0].level != level:
+            nodes = [child for node in nodes for child in self.children(node.code)]
+        return nodes
+
+    def scope_code(self, kecamatan: Optional[str] = None,
+                   desa: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Region code of a sidebar filter
+
+        Args:
+            kecamatan: Kecamatan name, or None/'Semua Kecamatan' for all the data
+            desa: Selected village names
+
+        Returns:
+            str: Code of the region, or None when the filter is not a single
+            region (several villages, an ambiguous name or a missing region)
+        """
+        code = self.base
+        if kecamatan and kecamatan != "Semua Kecamatan":
+            # Nama kecamatan yang sama di beberapa kabupaten/kota bukan satu wilayah
+            matches = self._kecamatan_codes.get(kecamatan, [])
+            code = matches[0] if len(matches) == 1 else None
+        if code is None or not desa:
+            return code
+        if isinstance(desa, str):
+            desa = [desa]
+        if len(desa) != 1:
+            return None
+        matches = [match for match in self._desa_codes.get(desa[0], []) if match.startswith(code)]
+        return matches[0] if len(matches) == 1 else None
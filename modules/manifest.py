@@ -0,0 +1,205 @@
+"""
+Dataset manifest module for Podes 2024 dashboard
+Small precomputed summary of the served dataset (counts, kecamatan, version)
+
+This module is imported by the landing page, so it only depends on the
+standard library at import time; pandas is imported inside the build helpers.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
+
+
+MANIFEST_PATH = 'data/manifest.json'
+MANIFEST_FORMAT = 3
+
+
+def _frame_digest(df) -> str:
+    """Hash of a frame's rows (in id_desa order when present) and column names"""
+    import pandas as pd
+
+    if 'id_desa' in df.columns:
+        df = df.sort_values('id_desa', kind='stable')
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest = hashlib.sha256(row_hashes.tobytes())
+    digest.update(','.join(map(str, df.columns)).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def scope_versions(df) -> Dict[str, str]:
+    """
+    Content hash of every kecamatan's rows
+
+    A correction of one village only changes the version of its kecamatan.
+
+    Args:
+        df: Cleaned Podes dataframe
+
+    Returns:
+        Dict: 7-digit kecamatan code -> 16 hex characters
+    """
+    from modules.store import kecamatan_code
+
+    return {str(code): _frame_digest(part) for code, part in df.groupby(kecamatan_code(df['id_desa']), sort=True)}
+
+
+def combine_versions(versions: Dict[str, str], columns: Iterable[str]) -> str:
+    """
+    Dataset version from the per-kecamatan versions
+
+    Args:
+        versions: kecamatan code -> scope version
+        columns: Dataset column names
+
+    Returns:
+        str: 16 hex characters
+    """
+    digest = hashlib.sha256()
+    for name in sorted(versions):
+        digest.update(f"{name}={versions[name]};".encode('utf-8'))
+    digest.update(','.join(map(str, columns)).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def dataset_version(df) -> str:
+    """
+    Content hash of the cleaned dataset, used as its version identifier
+
+    Built from the per-kecamatan hashes, so it can be updated after a
+    correction by re-hashing only the affected kecamatan.
+
+    Args:
+        df: Cleaned Podes dataframe (or any subset of it)
+
+    Returns:
+        str: 16 hex characters that change whenever any cell changes
+    """
+    if 'id_desa' not in df.columns:
+        return _frame_digest(df)
+    return combine_versions(scope_versions(df), df.columns)
+
+
+def kecamatan_versions(manifest: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Version of every kecamatan name offered by the sidebar filter
+
+    A name used by one kecamatan gets that kecamatan's version; a name shared
+    by kecamatan of several kabupaten/kota selects all of them, so its version
+    combines theirs.
+
+    Args:
+        manifest: Manifest from load_manifest
+
+    Returns:
+        Dict: kecamatan name -> version
+    """
+    versions = manifest.get('scope_versions') or {}
+    codes: Dict[str, List[str]] = {}
+    for entry in manifest.get('kecamatan', []):
+        codes.setdefault(entry['nama'], []).append(entry['kode'])
+    return {
+        name: versions[members[0]] if len(members) == 1 else combine_versions(
+            {code: versions[code] for code in members}, ())
+        for name, members in codes.items()
+        if all(code in versions for code in members)
+    }
+
+
+def scope_version(manifest: Dict[str, Any], kecamatan: str) -> Optional[str]:
+    """
+    Version a cache entry of one kecamatan is keyed on
+
+    Each kecamatan's rows are hashed on their own, so entries keyed on this
+    version stay valid when a correction touches another kecamatan. The whole
+    city, and kecamatan the manifest does not list, use the dataset version.
+
+    Args:
+        manifest: Manifest from load_manifest
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+
+    Returns:
+        str: Scope version, None when there is no manifest
+    """
+    return kecamatan_versions(manifest).get(kecamatan) or manifest.get('version')
+
+
+def build_manifest(df, source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the manifest for a cleaned dataset
+
+    Args:
+        df: Cleaned Podes dataframe
+        source: Path of the file or store the dataset was read from
+
+    Returns:
+        Dict: Manifest contents
+    """
+    from modules.analysis import get_updated_category_indicators
+    from modules.store import kecamatan_code
+
+    category_indicators = get_updated_category_indicators()
+    # Satu entri per kode kecamatan; nama hanya untuk tampilan
+    kecamatan = df.groupby(kecamatan_code(df['id_desa']), sort=True)['nama_kecamatan'].agg(['first', 'size'])
+
+    source_modified_at = None
+    if source and os.path.exists(source):
+        source_modified_at = datetime.fromtimestamp(os.path.getmtime(source)).isoformat(timespec='seconds')
+
+    versions = scope_versions(df)
+
+    return {
+        'format': MANIFEST_FORMAT,
+        'version': combine_versions(versions, df.columns),
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+        'source_modified_at': source_modified_at,
+        'total_desa': int(len(df)),
+        'total_kecamatan': int(len(kecamatan)),
+        'kecamatan': [
+            {'kode': str(code), 'nama': str(name), 'jumlah_desa': int(count)}
+            for code, name, count in zip(kecamatan.index, kecamatan['first'], kecamatan['size'])
+        ],
+        'category_count': len(category_indicators),
+        'indicator_count': sum(len(indicators) for indicators in category_indicators.values()),
+        'columns': [str(col) for col in df.columns],
+        'scope_versions': versions
+    }
+
+
+def write_manifest(manifest: Dict[str, Any], path: str = MANIFEST_PATH) -> str:
+    """
+    Write the manifest atomically
+
+    Args:
+        manifest: Manifest produced by build_manifest
+        path: Output file path
+
+    Returns:
+        str: Path of the written manifest
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, Any]:
+    """
+    Read the manifest without touching the dataset itself
+
+    Args:
+        path: Manifest file path
+
+    Returns:
+        Dict: Manifest contents, or empty dict if missing or unreadable
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return manifest if manifest.get('format') == MANIFEST_FORMAT else {}
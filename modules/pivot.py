@@ -0,0 +1,169 @@
+"""
+Pivot module for Podes 2024 dashboard
+Two-way cross tabulation of any two dimensions (kecamatan, indicators) from
+integer codes with a single bincount; margins and percentages are derived
+from the count matrix
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+TOTAL_LABEL = 'Total'
+
+# Cara menampilkan tabulasi: label -> arah normalisasi (None = jumlah desa)
+PERCENTAGE_MODES = {
+    'Jumlah Desa': None,
+    '% per Baris': 'index',
+    '% per Kolom': 'columns',
+    '% dari Total': 'all'
+}
+
+Encoded = Tuple[np.ndarray, pd.Index]
+
+
+def encode_dimension(values: pd.Series) -> Encoded:
+    """
+    Dictionary-encode a column into integer codes
+
+    Args:
+        values: Column to encode
+
+    Returns:
+        Tuple: (int32 codes with -1 for missing values, sorted labels)
+    """
+    codes, labels = pd.factorize(values, sort=True)
+    return codes.astype('int32'), pd.Index(labels, name=values.name)
+
+
+def encode_frame(df: pd.DataFrame, columns: Optional[List[str]] = None) -> Dict[str, Encoded]:
+    """
+    Encode several columns once so every later pivot only counts integers
+
+    Args:
+        df: Podes data
+        columns: Columns to encode; all columns except id_desa when omitted
+
+    Returns:
+        Dict: Column -> (codes, labels)
+    """
+    columns = columns if columns is not None else [col for col in df.columns if col != 'id_desa']
+    return {col: encode_dimension(df[col]) for col in columns}
+
+
+def scope_mask(encoded: Dict[str, Encoded], filters: Dict[str, List]) -> Optional[np.ndarray]:
+    """
+    Row mask of a filter scope, evaluated on the codes
+
+    Args:
+        encoded: Output of encode_frame
+        filters: Column -> allowed values; empty lists are ignored
+
+    Returns:
+        np.ndarray: Boolean mask, or None when nothing is filtered
+    """
+    mask = None
+    for col, values in filters.items():
+        if not values:
+            continue
+        codes, labels = encoded[col]
+        allowed = labels.get_indexer(pd.Index(values))
+        column_mask = np.isin(codes, allowed[allowed >= 0])
+        mask = column_mask if mask is None else mask & column_mask
+    return mask
+
+
+def pivot_counts(rows: Encoded, columns: Encoded, mask: Optional[np.ndarray] = None,
+                 drop_empty: bool = True) -> pd.DataFrame:
+    """
+    Count rows per (row value, column value) pair with one bincount
+
+    Rows where either dimension is missing are left out, as in pd.crosstab.
+
+    Args:
+        rows: (codes, labels) of the row dimension
+        columns: (codes, labels) of the column dimension
+        mask: Optional boolean row filter
+        drop_empty: Drop rows and columns without any count
+
+    Returns:
+        pd.DataFrame: Counts indexed by row labels with column labels as columns
+    """
+    row_codes, row_labels = rows
+    column_codes, column_labels = columns
+
+    valid = (row_codes >= 0) & (column_codes >= 0)
+    if mask is not None:
+        valid &= mask
+    size = len(column_labels)
+    flat = row_codes[valid].astype('int64') * size + column_codes[valid]
+    counts = np.bincount(flat, minlength=len(row_labels) * size).reshape(len(row_labels), size)
+
+    table = pd.DataFrame(counts, index=row_labels, columns=column_labels)
+    if drop_empty:
+        table = table.loc[counts.sum(axis=1) > 0, counts.sum(axis=0) > 0]
+    return table
+
+
+def cross_tabulate(df: pd.DataFrame, row: str, column: str) -> pd.DataFrame:
+    """
+    Cross tabulation of two columns, equivalent to pd.crosstab without margins
+
+    Args:
+        df: Podes data
+        row: Row dimension column
+        column: Column dimension column
+
+    Returns:
+        pd.DataFrame: Counts
+    """
+    return pivot_counts(encode_dimension(df[row]), encode_dimension(df[column]))
+
+
+def add_margins(table: pd.DataFrame, label: str = TOTAL_LABEL) -> pd.DataFrame:
+    """
+    Append row and column totals computed from the count matrix
+
+    Args:
+        table: Counts from pivot_counts
+        label: Label of the total row and column
+
+    Returns:
+        pd.DataFrame: Counts with a total column and a total row
+    """
+    counts = table.to_numpy()
+    with_totals = np.zeros((counts.shape[0] + 1, counts.shape[1] + 1), dtype=counts.dtype)
+    with_totals[:-1, :-1] = counts
+    with_totals[:-1, -1] = counts.sum(axis=1)
+    with_totals[-1, :-1] = counts.sum(axis=0)
+    with_totals[-1, -1] = counts.sum()
+
+    index = pd.Index([*table.index.astype(str), label], name=table.index.name)
+    columns = pd.Index([*table.columns.astype(str), label], name=table.columns.name)
+    return pd.DataFrame(with_totals, index=index, columns=columns)
+
+
+def percentage_table(table: pd.DataFrame, normalize: str = 'index') -> pd.DataFrame:
+    """
+    Percentages derived from a count table with margins
+
+    Args:
+        table: Counts from add_margins
+        normalize: 'index' (each row sums to 100), 'columns' (each column
+            sums to 100) or 'all' (grand total is 100)
+
+    Returns:
+        pd.DataFrame: Percentages rounded to one decimal
+    """
+    counts = table.to_numpy(dtype='float64')
+    if normalize == 'index':
+        totals = counts[:, -1:]
+    elif normalize == 'columns':
+        totals = counts[-1:, :]
+    else:
+        totals = counts[-1, -1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(totals > 0, counts / totals * 100, 0.0)
+    return pd.DataFrame(percentages.round(1), index=table.index, columns=table.columns)
@@ -0,0 +1,110 @@
+"""
+Raw schema module for Podes 2024 dashboard
+Single source of truth for raw R-code columns, value mappings and valid ranges
+"""
+
+from typing import Dict, Tuple
+
+
+# Label untuk nilai kategori yang tidak ada di kamus pemetaan
+UNDEFINED_LABEL = 'Tidak Terdefinisi'
+
+# --- KAMUS PEMETAAN ---
+# Berdasarkan analisis kuesioner, berikut kamus untuk semua variabel kategori
+MAP_ADA_TIDAK = {1: 'Ada', 2: 'Tidak Ada'}
+MAP_ADA_TIDAK_DIGUNAKAN = {1: 'Ada, digunakan', 2: 'Ada, tidak digunakan', 3: 'Tidak ada'}
+MAP_LISTRIK = {1: 'Ya, sebagian besar', 2: 'Ya, sebagian kecil', 3: 'Tidak ada'}
+MAP_PENERANGAN_JALAN = {1: 'Ada, sebagian besar', 2: 'Ada, sebagian kecil', 3: 'Tidak Ada'}
+MAP_PEROLEHAN_KAYU = {1: 'Membeli', 2: 'Dari hutan', 3: 'Dari luar hutan', 4: 'Lainnya'}
+MAP_PEMILAHAN_SAMPAH = {1: 'Semua Keluarga', 2: 'Sebagian Besar Keluarga', 3: 'Sebagian Kecil Keluarga', 4: 'Tidak Ada'}
+MAP_LOKASI_SUMBER_PENCEMARAN_AIR = {1: 'Dalam desa/kelurahan ini', 2: 'Luar desa/kelurahan ini', 3: 'Luar dan dalam desa/kelurahan ini'}
+MAP_PENGOLAHAN_DAUR_ULANG = {1: 'Ada, sebagian warga terlibat', 2: 'Ada, warga tidak terlibat', 3: 'Tidak ada kegiatan'}
+MAP_YA_TIDAK = {1: 'Ya', 2: 'Tidak'}
+MAP_STATUS_AKTIF = {1: 'Ada, aktif', 2: 'Ada, tidak aktif', 3: 'Tidak ada'}
+MAP_KEJADIAN_BENCANA = {1: 'Ada', 2: 'Tidak ada'}
+MAP_SIMULASI_BENCANA = {1: 'Sebagian Besar Warga', 2: 'Sebagian Kecil Warga', 3: 'Tidak Ada'}
+MAP_KEKUATAN_SINYAL = {1: 'Sangat Kuat', 2: 'Kuat', 3: 'Lemah', 4: 'Tidak Ada Sinyal'}
+MAP_SINYAL_INTERNET = {1: '5G/4G/LTE', 2: '3G/H/H+/EVDO ', 3: '2,5G/E/GPRS', 4: 'Tidak Ada Internet'}
+
+# Kolom identitas: kode raw -> nama kolom bersih
+ID_COLUMNS: Dict[str, str] = {
+    'IDDESA': 'id_desa',
+    'NAMA_KEC': 'nama_kecamatan',
+    'NAMA_DESA': 'nama_desa'
+}
+
+# Kolom kontinu (hanya rename): kode raw -> nama kolom bersih
+CONTINUOUS_COLUMNS: Dict[str, str] = {
+    'R503A10': 'jumlah_keluarga_pengguna_kayu_bakar',
+    'R701BK2': 'jumlah_tk',
+    'R701DK2': 'jumlah_sd',
+    'R701FK2': 'jumlah_smp',
+    'R701HK2': 'jumlah_sma',
+    'R704AK2': 'jumlah_rs',
+    'R704CK2': 'jumlah_puskesmas_inap',
+    'R704DK2': 'jumlah_puskesmas',
+    'R1005A': 'jumlah_bts'
+}
+
+# Rentang nilai wajar untuk kolom kontinu (inklusif)
+NUMERIC_RANGES: Dict[str, Tuple[int, int]] = {
+    'R503A10': (0, 100000),
+    'R701BK2': (0, 200),
+    'R701DK2': (0, 200),
+    'R701FK2': (0, 200),
+    'R701HK2': (0, 200),
+    'R704AK2': (0, 100),
+    'R704CK2': (0, 100),
+    'R704DK2': (0, 100),
+    'R1005A': (0, 500)
+}
+
+# Kolom kategori (rename dan mapping nilai): kode raw -> (nama kolom bersih, kamus)
+CATEGORICAL_COLUMNS: Dict[str, Tuple[str, Dict[int, str]]] = {
+    'R502A': ('status_penerangan_jalan_surya', MAP_ADA_TIDAK),
+    'R502B': ('status_penerangan_jalan_utama', MAP_PENERANGAN_JALAN),
+    'R503C': ('cara_perolehan_kayu_bakar', MAP_PEROLEHAN_KAYU),
+    'R504A2': ('status_buang_sampah_dibakar', MAP_ADA_TIDAK),
+    'R504C': ('status_tps', MAP_ADA_TIDAK),
+    'R504D': ('status_tps3r', MAP_ADA_TIDAK_DIGUNAKAN),
+    'R504F1': ('status_dilakukan_pemilahan_sampah', MAP_ADA_TIDAK),
+    'R505': ('kebiasaan_pemilahan_sampah', MAP_PEMILAHAN_SAMPAH),
+    'R511C1': ('permukiman_bantaran_sungai', MAP_YA_TIDAK),
+    'R511C2A': ('sumber_pencemaran_air_dari_pabrik', MAP_YA_TIDAK),
+    'R511C2B': ('sumber_pencemaran_air_dari_rumah', MAP_YA_TIDAK),
+    'R511C2C': ('sumber_pencemaran_air_dari_lainnya', MAP_YA_TIDAK),
+    'R511C3': ('lokasi_sumber_pencemaran_air', MAP_LOKASI_SUMBER_PENCEMARAN_AIR),
+    'R515B': ('warga_terlibat_olah_sampah', MAP_PENGOLAHAN_DAUR_ULANG),
+    'R516': ('komunitas_lingkungan', MAP_STATUS_AKTIF),
+    'R517': ('kebiasaan_bakar_lahan', MAP_ADA_TIDAK),
+    'R601AK2': ('kejadian_tanah_longsor', MAP_KEJADIAN_BENCANA),
+    'R601BK2': ('kejadian_banjir', MAP_KEJADIAN_BENCANA),
+    'R601DK2': ('kejadian_gempa', MAP_KEJADIAN_BENCANA),
+    'R604A': ('status_peringatan_dini', MAP_ADA_TIDAK),
+    'R604C': ('status_alat_keselamatan', MAP_ADA_TIDAK),
+    'R604D': ('status_rambu_evakuasi', MAP_ADA_TIDAK),
+    'R6061': ('partisipasi_simulasi_bencana', MAP_SIMULASI_BENCANA),
+    'R6062': ('partisipasi_gladi_siaga_bencana', MAP_SIMULASI_BENCANA),
+    'R1005C': ('kekuatan_sinyal', MAP_KEKUATAN_SINYAL),
+    'R1005D': ('jenis_sinyal_internet', MAP_SINYAL_INTERNET)
+}
+
+# --- SKEMA BACA DATA MENTAH ---
+# Sentinel untuk sel mentah yang kosong, berisi token non-angka (mis. 'D') atau
+# angka negatif. Kolom kode dibaca sebagai integer kecil biasa, bukan float/objek,
+# sehingga nilai hilang diwakili oleh kode negatif ini (kode kuesioner tidak pernah
+# negatif; angka negatif di data mentah disimpan sebagai RAW_NEGATIVE dan teks
+# aslinya dicatat untuk laporan kualitas).
+RAW_BLANK = -1
+RAW_TOKEN = -2
+RAW_NEGATIVE = -3
+
+# Tipe data per kolom mentah yang dipakai pipeline
+RAW_DTYPES: Dict[str, str] = {
+    'IDDESA': 'int64',
+    'NAMA_KEC': 'category',
+    'NAMA_DESA': 'category',
+    **{raw_col: 'int8' for raw_col in CATEGORICAL_COLUMNS},
+    **{raw_col: 'int16' for raw_col in CONTINUOUS_COLUMNS},
+    'R503A10': 'int32'
+}
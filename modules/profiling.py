@@ -0,0 +1,392 @@
+"""
+Profiling module for Podes 2024 dashboard
+Timing spans per rerun, per session and per process, an opt-in sidebar panel
+and a periodically flushed metrics file for monitoring
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from modules.cache_governor import account_session_state, current_session_id, governor
+from modules.warmup import warmup_status
+
+
+# Metrics file: '.prom' -> Prometheus text format, '.jsonl' -> JSON lines snapshots
+METRICS_FILE = os.environ.get('PODES_METRICS_FILE', 'metrics/podes_metrics.prom')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('PODES_METRICS_INTERVAL', '30'))
+PROFILING_DEFAULT_ON = os.environ.get('PODES_PROFILING', '0') == '1'
+# Anggaran payload tabel per rerun (KB); panel memberi peringatan bila terlampaui
+TABLE_PAYLOAD_BUDGET_KB = float(os.environ.get('PODES_TABLE_BUDGET_KB', '1024'))
+
+_SESSION_KEY = '_profiling_spans'
+_RERUN_KEY = '_profiling_rerun'
+_RERUN_START_KEY = '_profiling_rerun_start'
+_PAYLOAD_KEY = '_profiling_payloads'
+
+_lock = threading.Lock()
+_process_spans: Dict[str, Dict[str, float]] = {}
+_process_payloads: Dict[str, Dict[str, float]] = {}
+_last_flush = time.monotonic()
+
+
+def _add_sample(table: Dict[str, Dict[str, float]], name: str, elapsed: float) -> None:
+    """Accumulate one timing sample into a span statistics table"""
+    stats = table.get(name)
+    if stats is None:
+        table[name] = {'count': 1, 'total': elapsed, 'max': elapsed, 'last': elapsed}
+    else:
+        stats['count'] += 1
+        stats['total'] += elapsed
+        stats['max'] = max(stats['max'], elapsed)
+        stats['last'] = elapsed
+
+
+def _has_session() -> bool:
+    """True when running inside a Streamlit script run (session state available)"""
+    return get_script_run_ctx(suppress_warning=True) is not None
+
+
+def record_span(name: str, elapsed: float) -> None:
+    """
+    Record a finished span in the process, session and current-rerun tables
+
+    Args:
+        name: Span name
+        elapsed: Duration in seconds
+    """
+    with _lock:
+        _add_sample(_process_spans, name, elapsed)
+
+    if _has_session():
+        session_spans = st.session_state.setdefault(_SESSION_KEY, {})
+        _add_sample(session_spans, name, elapsed)
+        st.session_state.setdefault(_RERUN_KEY, []).append((name, elapsed))
+
+    maybe_flush_metrics()
+
+
+def record_payload(name: str, nbytes: int, rows: int) -> None:
+    """
+    Record the serialized size of a table sent to the browser
+
+    Args:
+        name: Table name
+        nbytes: Payload size in bytes
+        rows: Number of rows sent
+    """
+    with _lock:
+        _add_sample(_process_payloads, name, nbytes)
+
+    if _has_session():
+        st.session_state.setdefault(_PAYLOAD_KEY, []).append((name, nbytes, rows))
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block of code
+
+    Args:
+        name: Span name, e.g. 'load_podes_data' or 'figure.quantitative'
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """
+    Decorator that wraps every call of a function in a span
+
+    Args:
+        name: Span name, defaults to the function name
+
+    Returns:
+        Callable: Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_rerun() -> None:
+    """Reset the current-rerun span list and start the rerun clock; call once at the top of a page run"""
+    if _has_session():
+        st.session_state[_RERUN_START_KEY] = time.perf_counter()
+        st.session_state[_RERUN_KEY] = []
+        st.session_state[_PAYLOAD_KEY] = []
+        account_session_state()
+
+
+def get_process_spans() -> Dict[str, Dict[str, float]]:
+    """
+    Snapshot of span statistics accumulated by this server process
+
+    Returns:
+        Dict: span name -> {count, total, max, last}
+    """
+    with _lock:
+        return {name: dict(stats) for name, stats in _process_spans.items()}
+
+
+def get_process_payloads() -> Dict[str, Dict[str, float]]:
+    """
+    Snapshot of table payload statistics accumulated by this server process
+
+    Returns:
+        Dict: table name -> {count, total, max, last} in bytes
+    """
+    with _lock:
+        return {name: dict(stats) for name, stats in _process_payloads.items()}
+
+
+def _spans_frame(spans: Dict[str, Dict[str, float]]) -> pd.DataFrame:
+    """Span statistics table for display, slowest total first"""
+    if not spans:
+        return pd.DataFrame()
+    frame = pd.DataFrame.from_dict(spans, orient='index')
+    frame['mean'] = frame['total'] / frame['count']
+    for col in ['total', 'max', 'last', 'mean']:
+        frame[col] = (frame[col] * 1000).round(1)
+    frame = frame.rename(columns={
+        'count': 'Panggilan', 'total': 'Total (ms)', 'max': 'Maks (ms)',
+        'last': 'Terakhir (ms)', 'mean': 'Rata-rata (ms)'
+    })
+    frame.index.name = 'Span'
+    return frame.sort_values('Total (ms)', ascending=False).reset_index()
+
+
+def _payloads_frame(payloads: List[Tuple[str, int, int]]) -> pd.DataFrame:
+    """Table payloads of one rerun for display, largest first"""
+    if not payloads:
+        return pd.DataFrame()
+    frame = pd.DataFrame(payloads, columns=['Tabel', 'Bytes', 'Baris'])
+    frame['KB'] = (frame['Bytes'] / 1024).round(1)
+    return frame[['Tabel', 'Baris', 'KB']].sort_values('KB', ascending=False)
+
+
+def _caches_frame(caches: Dict[str, Dict[str, float]]) -> pd.DataFrame:
+    """Governed cache statistics for display, largest first"""
+    if not caches:
+        return pd.DataFrame()
+    frame = pd.DataFrame.from_dict(caches, orient='index')
+    frame['MB'] = (frame['bytes'] / 2 ** 20).round(2)
+    frame['Hit rate (%)'] = (frame['hit_rate'].astype(float) * 100).round(1)
+    frame['build_s'] = frame['build_s'].round(2)
+    frame = frame.rename(columns={
+        'entries': 'Entri', 'hits': 'Hit', 'misses': 'Miss', 'evictions': 'Eviksi', 'build_s': 'Build (s)'
+    })
+    frame.index.name = 'Cache'
+    columns = ['Entri', 'MB', 'Hit rate (%)', 'Hit', 'Miss', 'Eviksi', 'Build (s)']
+    return frame[columns].sort_values('MB', ascending=False).reset_index()
+
+
+def _sessions_frame(sessions: Dict[str, Dict[str, float]]) -> pd.DataFrame:
+    """Per-session cache and session state memory for display, largest first"""
+    if not sessions:
+        return pd.DataFrame()
+    current = current_session_id()
+    frame = pd.DataFrame.from_dict(sessions, orient='index')
+    return pd.DataFrame({
+        'Sesi': [('▶ ' if session == current else '') + session[:8] for session in frame.index],
+        'Cache (MB)': (frame['bytes'] / 2 ** 20).round(2),
+        'Session state (KB)': (frame['state_bytes'] / 1024).round(1),
+        'Hit': frame['hits'],
+        'Miss': frame['misses']
+    }).sort_values('Cache (MB)', ascending=False)
+
+
+def _residents_frame(residents: Dict[str, Dict[str, float]]) -> pd.DataFrame:
+    """Sizes of the st.cache_resource values for display, largest first"""
+    if not residents:
+        return pd.DataFrame()
+    frame = pd.DataFrame.from_dict(residents, orient='index')
+    return pd.DataFrame({
+        'Data': frame.index,
+        'MB': (frame['bytes'] / 2 ** 20).round(2),
+        'Dimuat': frame['loads'],
+        'Build (s)': frame['build_s'].round(2)
+    }).sort_values('MB', ascending=False)
+
+
+def _prometheus_text(spans: Dict[str, Dict[str, float]],
+                     payloads: Optional[Dict[str, Dict[str, float]]] = None,
+                     caches: Optional[Dict[str, Dict[str, float]]] = None,
+                     residents: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+    """Render span, table payload and cache statistics in the Prometheus text exposition format"""
+    lines = [
+        '# HELP podes_span_seconds_total Total time spent in instrumented dashboard spans.',
+        '# TYPE podes_span_seconds_total counter'
+    ]
+    lines += [f'podes_span_seconds_total{{span="{name}"}} {stats["total"]:.6f}' for name, stats in sorted(spans.items())]
+    lines += [
+        '# HELP podes_span_calls_total Number of times each dashboard span ran.',
+        '# TYPE podes_span_calls_total counter'
+    ]
+    lines += [f'podes_span_calls_total{{span="{name}"}} {int(stats["count"])}' for name, stats in sorted(spans.items())]
+    lines += [
+        '# HELP podes_span_seconds_max Slowest observed run of each dashboard span.',
+        '# TYPE podes_span_seconds_max gauge'
+    ]
+    lines += [f'podes_span_seconds_max{{span="{name}"}} {stats["max"]:.6f}' for name, stats in sorted(spans.items())]
+    if payloads:
+        lines += [
+            '# HELP podes_table_payload_bytes_total Bytes of table data sent to browsers.',
+            '# TYPE podes_table_payload_bytes_total counter'
+        ]
+        lines += [
+            f'podes_table_payload_bytes_total{{table="{name}"}} {int(stats["total"])}'
+            for name, stats in sorted(payloads.items())
+        ]
+    if caches:
+        lines += [
+            '# HELP podes_cache_budget_bytes Memory budget of the governed caches.',
+            '# TYPE podes_cache_budget_bytes gauge',
+            f'podes_cache_budget_bytes {governor.budget_bytes}'
+        ]
+        for metric, field, kind, text in [
+            ('podes_cache_bytes', 'bytes', 'gauge', 'Bytes held by each governed cache.'),
+            ('podes_cache_entries', 'entries', 'gauge', 'Entries held by each governed cache.'),
+            ('podes_cache_hits_total', 'hits', 'counter', 'Lookups answered from each governed cache.'),
+            ('podes_cache_misses_total', 'misses', 'counter', 'Lookups that had to build the value.'),
+            ('podes_cache_evictions_total', 'evictions', 'counter', 'Entries evicted to stay within the budget.')
+        ]:
+            lines += [f'# HELP {metric} {text}', f'# TYPE {metric} {kind}']
+            lines += [f'{metric}{{cache="{name}"}} {int(stats[field])}' for name, stats in sorted(caches.items())]
+    if residents:
+        lines += [
+            '# HELP podes_resident_bytes Bytes held by each st.cache_resource loader (outside the budget).',
+            '# TYPE podes_resident_bytes gauge'
+        ]
+        lines += [f'podes_resident_bytes{{resource="{name}"}} {int(stats["bytes"])}'
+                  for name, stats in sorted(residents.items())]
+    return '\n'.join(lines) + '\n'
+
+
+def flush_metrics(path: str = METRICS_FILE) -> None:
+    """
+    Write the process span statistics to the local metrics file
+
+    Prometheus files are replaced atomically so a scraper never sees a partial
+    file; JSON lines files get one snapshot appended per flush.
+
+    Args:
+        path: Metrics file path ('.prom' or '.jsonl')
+    """
+    global _last_flush
+    spans = get_process_spans()
+    payloads = get_process_payloads()
+    caches = governor.cache_stats()
+    residents = governor.resident_stats()
+    _last_flush = time.monotonic()
+    if not spans:
+        return
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if path.endswith('.jsonl'):
+        snapshot = {'timestamp': time.time(), 'pid': os.getpid(), 'spans': spans, 'table_payloads': payloads,
+                    'caches': caches, 'residents': residents}
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(snapshot) + '\n')
+    else:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(_prometheus_text(spans, payloads, caches, residents))
+        os.replace(tmp_path, path)
+
+
+def maybe_flush_metrics() -> None:
+    """Flush the metrics file when the flush interval has elapsed"""
+    if METRICS_FLUSH_INTERVAL <= 0 or time.monotonic() - _last_flush < METRICS_FLUSH_INTERVAL:
+        return
+    try:
+        flush_metrics()
+    except OSError:
+        # Monitoring must never break the dashboard
+        pass
+
+
+def render_profiling_panel() -> None:
+    """Opt-in sidebar panel with span timings for this rerun, session and process"""
+    enabled = st.sidebar.toggle(
+        "⏱️ Panel Profiling",
+        value=PROFILING_DEFAULT_ON,
+        key='profiling_enabled',
+        help="Tampilkan waktu eksekusi setiap bagian dashboard"
+    )
+    if not enabled:
+        return
+
+    with st.sidebar.expander("⏱️ Profiling", expanded=True):
+        rerun = st.session_state.get(_RERUN_KEY, [])
+        started = st.session_state.get(_RERUN_START_KEY)
+        if started is not None:
+            # Span bersarang (mis. loader di dalam view_bundle.load) tidak boleh dijumlahkan: ukur rerunnya langsung
+            st.metric("Rerun ini", f"{(time.perf_counter() - started) * 1000:.0f} ms",
+                      help="Waktu sejak awal rerun sampai panel ini; span di tab Rerun dapat bersarang")
+
+        payloads = st.session_state.get(_PAYLOAD_KEY, [])
+        payload_kb = sum(nbytes for _, nbytes, _ in payloads) / 1024
+        st.metric(
+            "Payload tabel rerun ini", f"{payload_kb:,.1f} KB",
+            help=f"Ukuran Arrow semua tabel yang dikirim ke browser; anggaran {TABLE_PAYLOAD_BUDGET_KB:,.0f} KB"
+        )
+        if payload_kb > TABLE_PAYLOAD_BUDGET_KB:
+            st.warning(f"⚠️ Payload tabel melebihi anggaran {TABLE_PAYLOAD_BUDGET_KB:,.0f} KB")
+
+        st.metric(
+            "Cache terkelola", f"{governor.total_bytes / 2 ** 20:,.1f} MB",
+            help=f"Semua cache hasil di proses ini; anggaran {governor.budget_bytes / 2 ** 20:,.0f} MB "
+                 f"(PODES_CACHE_BUDGET_MB), entri bernilai terendah dikeluarkan lebih dulu"
+        )
+        st.metric(
+            "Data residen", f"{governor.resident_bytes / 2 ** 20:,.1f} MB",
+            help="Dataset, hierarki dan indeks yang dimuat sekali per versi data (st.cache_resource); "
+                 "dilaporkan saja, di luar anggaran cache"
+        )
+
+        tab_rerun, tab_session, tab_process, tab_tables, tab_caches = st.tabs(
+            ["Rerun", "Sesi", "Proses", "Tabel", "Cache"]
+        )
+        with tab_rerun:
+            rerun_spans: Dict[str, Dict[str, float]] = {}
+            for name, elapsed in rerun:
+                _add_sample(rerun_spans, name, elapsed)
+            st.dataframe(_spans_frame(rerun_spans), hide_index=True, width="stretch")
+        with tab_session:
+            st.dataframe(_spans_frame(st.session_state.get(_SESSION_KEY, {})), hide_index=True, width="stretch")
+        with tab_process:
+            st.dataframe(_spans_frame(get_process_spans()), hide_index=True, width="stretch")
+            st.caption(f"Metrik disimpan ke `{METRICS_FILE}` setiap {METRICS_FLUSH_INTERVAL:.0f} detik")
+            for version, status in warmup_status().items():
+                state = "selesai" if status['finished'] else "berjalan"
+                st.caption(f"Warmup versi `{version}`: {status['done']}/{status['total']} state, {state}"
+                           + (f", {len(status['errors'])} gagal" if status['errors'] else ""))
+        with tab_tables:
+            st.dataframe(_payloads_frame(payloads), hide_index=True, width="stretch")
+        with tab_caches:
+            st.dataframe(_caches_frame(governor.cache_stats()), hide_index=True, width="stretch")
+            st.caption("Data residen per loader")
+            st.dataframe(_residents_frame(governor.resident_stats()), hide_index=True, width="stretch")
+            st.caption("Memori per sesi: entri cache yang dibangun sesi dan isi session state")
+            st.dataframe(_sessions_frame(governor.session_stats()), hide_index=True, width="stretch")
@@ -0,0 +1,308 @@
+"""
+Ranks module for Podes 2024 dashboard
+Rank and percentile of every village for every numeric indicator, at city
+and kecamatan scope, computed once per dataset version so ranking views only
+look rows up
+"""
+
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from modules.aggregates import ID_COLUMNS
+from modules.store import kecamatan_code
+
+
+RANKS_PATH = 'data/ranks.parquet'
+RANKS_FORMAT = 2
+
+# Cakupan peringkat: jumlah digit kode wilayah dari id_desa (None = seluruh data);
+# nama kecamatan bisa sama di beberapa kabupaten/kota, kodenya tidak
+RANK_SCOPES = {'kota': None, 'kecamatan': 7}
+
+# Jumlah peringkat teratas per kecamatan yang dihitung sebelumnya
+TOP_K = 10
+
+# Urutan tampilan: nilai tertinggi dulu, nilai sama diurutkan menurut nama desa
+DISPLAY_ORDER = (['indikator', 'nilai', 'nama_desa', 'id_desa'], [True, False, True, True])
+
+
+def _rank_scopes(table: pd.DataFrame) -> pd.DataFrame:
+    """Fill the rank and percentile columns of a long rank table in place"""
+    for scope, digits in RANK_SCOPES.items():
+        keys = [table['indikator']]
+        if digits is not None:
+            keys.append(table['id_desa'] // 10 ** (10 - digits))
+        values = table.groupby(keys, sort=False)['nilai']
+        # Peringkat "min" (1, 1, 3) untuk label, "padat" (1, 1, 2) untuk jumlah tingkat
+        table[f'peringkat_{scope}'] = values.rank(method='min', ascending=False).astype('int32')
+        table[f'peringkat_padat_{scope}'] = values.rank(method='dense', ascending=False).astype('int32')
+        # Persentase desa dalam cakupan yang nilainya tidak lebih tinggi
+        table[f'persentil_{scope}'] = (values.rank(method='max', pct=True) * 100).round(1)
+    return table
+
+
+def build_rank_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rank every village on every numeric indicator
+
+    Ties share the same rank. Villages without a value for an indicator are
+    left out of that indicator's ranking.
+
+    Args:
+        df: Cleaned Podes dataframe
+
+    Returns:
+        pd.DataFrame: One row per village x indicator with id_desa,
+        nama_kecamatan, nama_desa, indikator, nilai and, per scope (kota,
+        kecamatan), peringkat_*, peringkat_padat_* and persentil_*, sorted by
+        indicator then rank
+    """
+    numeric = [
+        col for col in df.columns
+        if col not in ID_COLUMNS and pd.api.types.is_numeric_dtype(df[col])
+    ]
+    table = df[list(ID_COLUMNS) + numeric].melt(
+        id_vars=list(ID_COLUMNS), var_name='indikator', value_name='nilai'
+    ).dropna(subset=['nilai'])
+    table = table.astype({'nama_kecamatan': str, 'nama_desa': str, 'indikator': str})
+    return sort_rank_table(_rank_scopes(table))
+
+
+def sort_rank_table(table: pd.DataFrame) -> pd.DataFrame:
+    """Sort a rank table into display order (see DISPLAY_ORDER)"""
+    columns, ascending = DISPLAY_ORDER
+    return table.sort_values(columns, ascending=ascending, kind='stable').reset_index(drop=True)
+
+
+def update_rank_table(table: pd.DataFrame, changes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Apply changed cells to a rank table and re-rank the affected indicators
+
+    Only the rows of indicators with a changed value are re-ranked; other
+    indicators keep their ranks untouched.
+
+    Args:
+        table: Table from build_rank_table
+        changes: Rows with id_desa, column, new_value
+
+    Returns:
+        pd.DataFrame: Updated table in display order
+    """
+    changes = changes[changes['column'].isin(table['indikator'].unique())]
+    if changes.empty:
+        return table
+
+    indicators = changes['column'].unique()
+    affected = table['indikator'].isin(indicators)
+    patched = table[affected].copy()
+    new_values = changes.set_index(['id_desa', 'column'])['new_value'].astype(patched['nilai'].dtype)
+    keys = pd.MultiIndex.from_frame(patched[['id_desa', 'indikator']])
+    found = keys.isin(new_values.index)
+    patched.loc[found, 'nilai'] = new_values.reindex(keys[found]).to_numpy()
+
+    return sort_rank_table(pd.concat([table[~affected], _rank_scopes(patched)], ignore_index=True))
+
+
+def write_rank_table(table: pd.DataFrame, version: Optional[str],
+                     path: str = RANKS_PATH) -> str:
+    """
+    Write a rank table atomically, tagged with the dataset version it ranks
+
+    Args:
+        table: Table from build_rank_table
+        version: Dataset version from the manifest
+        path: Output Parquet file
+
+    Returns:
+        str: Path of the written file
+    """
+    arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+    metadata = dict(arrow_table.schema.metadata or {})
+    metadata.update({b'podes_ranks_format': str(RANKS_FORMAT).encode(),
+                     b'podes_dataset_version': (version or '').encode()})
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(arrow_table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_rank_table(path: str = RANKS_PATH, version: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Read a rank table written by write_rank_table
+
+    Args:
+        path: Rank table file
+        version: Expected dataset version; None accepts any version
+
+    Returns:
+        pd.DataFrame: The table, or None when missing, of another format or
+        built from another dataset version
+    """
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    if metadata.get(b'podes_ranks_format') != str(RANKS_FORMAT).encode():
+        return None
+    if version is not None and metadata.get(b'podes_dataset_version') != version.encode():
+        return None
+    return pd.read_parquet(path)
+
+
+def split_rank_table(table: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Split a rank table into one frame per indicator, keeping display order
+
+    Args:
+        table: Table from build_rank_table
+
+    Returns:
+        Dict: Indicator column -> its rows
+    """
+    return {
+        str(indicator): rows.drop(columns='indikator').reset_index(drop=True)
+        for indicator, rows in table.groupby('indikator', sort=False)
+    }
+
+
+def scope_rankings(rankings: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Look up the ranks of the villages in a filtered view
+
+    A view of a single kecamatan gets ranks within that kecamatan, any wider
+    view gets city ranks. The rows are already in rank order, so no sorting
+    happens here; the index is renumbered so the result does not depend on
+    whether the ranks were precomputed or computed on the spot.
+
+    Args:
+        rankings: One indicator's frame from split_rank_table
+        df: Filtered Podes data being displayed
+
+    Returns:
+        pd.DataFrame: id_desa, nama_kecamatan, nama_desa, nilai, peringkat,
+        peringkat_padat, persentil for the villages of df, best first
+    """
+    scope = 'kecamatan' if (df['id_desa'] // 10 ** (10 - RANK_SCOPES['kecamatan'])).nunique() == 1 else 'kota'
+    rows = rankings[rankings['id_desa'].isin(df['id_desa'].to_numpy())]
+    return rows[list(ID_COLUMNS) + ['nilai']].assign(
+        peringkat=rows[f'peringkat_{scope}'],
+        peringkat_padat=rows[f'peringkat_padat_{scope}'],
+        persentil=rows[f'persentil_{scope}']
+    ).reset_index(drop=True)
+
+
+def indicator_rankings(df: pd.DataFrame, column: str,
+                       rank_tables: Optional[Dict[str, pd.DataFrame]] = None) -> pd.DataFrame:
+    """
+    Ranks of the villages in df for one indicator
+
+    Args:
+        df: Filtered Podes data being displayed
+        column: Numeric indicator column
+        rank_tables: Precomputed tables from split_rank_table; when omitted
+            (e.g. in the batch reporter) df is ranked on the spot
+
+    Returns:
+        pd.DataFrame: Rows as returned by scope_rankings
+    """
+    if rank_tables is not None and column in rank_tables:
+        return scope_rankings(rank_tables[column], df)
+    local = build_rank_table(df[list(ID_COLUMNS) + [column]])
+    return scope_rankings(local.drop(columns='indikator'), df)
+
+
+def build_top_villages(df: pd.DataFrame, k: int = TOP_K) -> pd.DataFrame:
+    """
+    Top k villages of every kecamatan for every numeric indicator
+
+    The villages are grouped by kecamatan with one argsort shared by every
+    indicator; within a kecamatan a partial sort (np.partition) over all
+    indicator columns at once finds each indicator's k-th largest value, and
+    only the villages at or above it are kept and ordered. Villages tied with
+    the k-th place are all included, so a kecamatan can have more than k
+    rows; the rows equal those of the rank table with peringkat_kecamatan <= k.
+
+    Args:
+        df: Cleaned Podes dataframe
+        k: Number of top ranks per kecamatan
+
+    Returns:
+        pd.DataFrame: indikator, kode_kecamatan, nama_kecamatan, peringkat,
+        nama_desa, id_desa, nilai, ordered by indicator, kecamatan code,
+        then rank
+    """
+    numeric = [
+        col for col in df.columns
+        if col not in ID_COLUMNS and pd.api.types.is_numeric_dtype(df[col])
+    ]
+    columns = ['indikator', 'kode_kecamatan', 'nama_kecamatan', 'peringkat', 'nama_desa', 'id_desa', 'nilai']
+    if not numeric or df.empty:
+        return pd.DataFrame(columns=columns)
+
+    values = df[numeric].to_numpy(dtype='float64', na_value=np.nan)
+    # Nilai kosong tidak ikut peringkat; -inf tidak pernah mencapai ambang
+    values[np.isnan(values)] = -np.inf
+    codes, kecamatan = pd.factorize(kecamatan_code(df['id_desa']), sort=True)
+
+    order = np.argsort(codes, kind='stable')
+    sizes = np.bincount(codes, minlength=len(kecamatan))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    thresholds = np.full((len(kecamatan), len(numeric)), -np.inf)
+    for group, (start, size) in enumerate(zip(starts, sizes)):
+        if size > k:
+            block = values[order[start:start + size]]
+            thresholds[group] = np.partition(block, size - k, axis=0)[size - k]
+
+    rows, cols = np.nonzero((values >= thresholds[codes]) & (values > -np.inf))
+    top = pd.DataFrame({
+        'indikator': np.array(numeric, dtype=object)[cols],
+        'kode_kecamatan': kecamatan.to_numpy()[codes[rows]],
+        'nama_kecamatan': df['nama_kecamatan'].astype(str).to_numpy()[rows],
+        'nama_desa': df['nama_desa'].astype(str).to_numpy()[rows],
+        'id_desa': df['id_desa'].to_numpy()[rows],
+        # Tipe nilai sama dengan tabel peringkat (hasil melt)
+        'nilai': values[rows, cols].astype(np.result_type(*df[numeric].dtypes))
+    })
+    top['peringkat'] = top.groupby(['indikator', 'kode_kecamatan'])['nilai'].rank(
+        method='min', ascending=False).astype('int32')
+    top = top.sort_values(['indikator', 'kode_kecamatan', 'nilai', 'nama_desa', 'id_desa'],
+                          ascending=[True, True, False, True, True], kind='stable')
+    return top[columns].reset_index(drop=True)
+
+
+def top_villages_grid(rows: pd.DataFrame, k: int = TOP_K) -> pd.DataFrame:
+    """
+    Side-by-side view of one indicator's top villages
+
+    The rows are already in kecamatan and rank order, so cells are placed by
+    position without sorting.
+
+    Args:
+        rows: One indicator's rows of build_top_villages
+        k: Highest rank to show (at most the k the table was built with)
+
+    Returns:
+        pd.DataFrame: One column per kecamatan, one row per place, cells
+        '<rank>. <village> (<value>)'; empty cells are ''. Columns are
+        named after the kecamatan, with the code added to a name shared by
+        several kecamatan
+    """
+    rows = rows[rows['peringkat'] <= k]
+    kecamatan, first = np.unique(rows['kode_kecamatan'].to_numpy(), return_index=True)
+    column = pd.Index(kecamatan).get_indexer(rows['kode_kecamatan'])
+    position = rows.groupby('kode_kecamatan', sort=False).cumcount().to_numpy()
+    names = rows['nama_kecamatan'].to_numpy()[first]
+    shared = pd.Index(names).duplicated(keep=False)
+    labels = [f"{name} ({code})" if repeated else name for name, code, repeated in zip(names, kecamatan, shared)]
+
+    cells = np.full((int(position.max()) + 1 if len(rows) else 0, len(kecamatan)), '', dtype=object)
+    cells[position, column] = [
+        f"{rank}. {desa} ({value:g})" for rank, desa, value in zip(rows['peringkat'], rows['nama_desa'], rows['nilai'])
+    ]
+    return pd.DataFrame(cells, index=pd.RangeIndex(1, len(cells) + 1, name='Urutan'), columns=labels)
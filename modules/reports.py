@@ -0,0 +1,275 @@
+"""
+Batch report module for Podes 2024 dashboard
+Builds self-contained HTML and multi-sheet Excel reports per kecamatan or per
+kabupaten/kota, reusing the dashboard's analysis and figure builders
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Tuple
+
+import pandas as pd
+
+from modules.analysis import calculate_kpi_metrics, get_updated_category_indicators
+from modules.exports import write_excel_workbook
+from modules.manifest import dataset_version
+from modules.store import kabupaten_code, kecamatan_code
+
+
+REPORTS_DIR = 'reports'
+REPORT_INDEX = 'index.json'
+
+# Naikkan bila isi/format laporan berubah agar semua laporan dibuat ulang
+REPORT_FORMAT = 1
+
+SCOPES = {
+    'kecamatan': 'Kecamatan',
+    'kabupaten': 'Kabupaten/Kota'
+}
+
+_HTML_STYLE = """
+body { font-family: -apple-system, 'Segoe UI', Roboto, sans-serif; margin: 0 auto; max-width: 1200px; padding: 24px; color: #262730; }
+h1 { color: #2E86AB; }
+h2 { border-bottom: 2px solid #2E86AB; padding-bottom: 4px; margin-top: 40px; }
+.kpi { display: flex; gap: 16px; flex-wrap: wrap; margin: 8px 0 16px; }
+.kpi div { background: #f0f2f6; border-radius: 8px; padding: 8px 16px; }
+.kpi span { display: block; font-size: 12px; color: #555; }
+.figures { display: grid; grid-template-columns: 1fr 1fr; gap: 16px; }
+table { border-collapse: collapse; font-size: 13px; margin: 8px 0; }
+th, td { border: 1px solid #ddd; padding: 4px 8px; text-align: left; }
+th { background: #f0f2f6; }
+footer { margin-top: 40px; font-size: 12px; color: #777; }
+"""
+
+
+def scope_slug(label: str) -> str:
+    """
+    File-name friendly identifier for a scope label
+
+    Args:
+        label: Scope label, e.g. 'Kecamatan BUMIAJI'
+
+    Returns:
+        str: Lower-case slug, e.g. 'kecamatan_bumiaji'
+    """
+    return re.sub(r'[^a-z0-9]+', '_', label.lower()).strip('_')
+
+
+def split_scopes(df: pd.DataFrame, scope: str = 'kecamatan') -> List[Tuple[str, pd.DataFrame]]:
+    """
+    Split the dataset into report scopes
+
+    Args:
+        df: Cleaned Podes dataframe
+        scope: 'kecamatan' or 'kabupaten'
+
+    Returns:
+        List: (scope label, scope dataframe) sorted by label. Kecamatan are
+        split on their code and labelled by name, with the code added to a
+        name shared by several kecamatan
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"Cakupan laporan tidak dikenal: {scope}")
+
+    keys = kecamatan_code(df['id_desa']) if scope == 'kecamatan' else kabupaten_code(df['id_desa'])
+    parts = [(str(key), part.reset_index(drop=True)) for key, part in df.groupby(keys, sort=True)]
+    if scope == 'kabupaten':
+        return [(f"{SCOPES[scope]} {key}", part) for key, part in parts]
+
+    names = pd.Series([str(part.at[0, 'nama_kecamatan']) for _, part in parts], dtype=object)
+    shared = names.duplicated(keep=False).to_numpy()
+    labels = [f"{SCOPES[scope]} {name} ({key})" if repeated else f"{SCOPES[scope]} {name}"
+              for (key, _), name, repeated in zip(parts, names, shared)]
+    return sorted(zip(labels, [part for _, part in parts]), key=lambda item: item[0])
+
+
+def scope_hash(df: pd.DataFrame) -> str:
+    """
+    Content hash of a scope's data and the report format
+
+    Args:
+        df: Scope dataframe
+
+    Returns:
+        str: Hash that changes when any cell of the scope or REPORT_FORMAT changes
+    """
+    return hashlib.sha256(f"{REPORT_FORMAT}:{dataset_version(df)}".encode('utf-8')).hexdigest()[:16]
+
+
+def load_report_index(output_dir: str = REPORTS_DIR) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the index of previously generated reports
+
+    Args:
+        output_dir: Report output directory
+
+    Returns:
+        Dict: slug -> {label, hash, html, xlsx, generated_at}
+    """
+    try:
+        with open(os.path.join(output_dir, REPORT_INDEX), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_report_index(index: Dict[str, Dict[str, Any]], output_dir: str = REPORTS_DIR) -> str:
+    """
+    Write the report index atomically
+
+    Args:
+        index: slug -> report entry
+        output_dir: Report output directory
+
+    Returns:
+        str: Path of the index file
+    """
+    path = os.path.join(output_dir, REPORT_INDEX)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(index, file, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _markdown_html(text: str) -> str:
+    """Escape text and turn **bold** markers into <strong>"""
+    return re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html.escape(str(text)))
+
+
+def _kpi_html(items: List[Tuple[str, Any]]) -> str:
+    cells = ''.join(f"<div><span>{html.escape(label)}</span>{html.escape(str(value))}</div>" for label, value in items)
+    return f'<div class="kpi">{cells}</div>'
+
+
+def _figure_html(figure) -> str:
+    return figure.to_html(full_html=False, include_plotlyjs=False) if figure is not None else ''
+
+
+def _indicator_section(df: pd.DataFrame, key: str, label: str) -> Tuple[str, Dict[str, Any]]:
+    """HTML section and summary row for one indicator"""
+    from enhanced_viz import build_quantitative_figures, build_qualitative_figures
+
+    kpis = calculate_kpi_metrics(df, key, label)
+    parts = [f"<h3>{html.escape(label)}</h3>"]
+    summary = {'Indikator': label}
+
+    if kpis.get('type') == 'quantitative':
+        summary.update({
+            'Total': kpis['total'], 'Median': kpis['median'],
+            'Tertinggi': kpis['max_value'], 'Terendah': kpis['min_value'],
+            'Desa Teratas': kpis['top_village']
+        })
+        parts.append(_kpi_html([
+            ('Total', kpis['total']), ('Median', kpis['median']), ('Tertinggi', kpis['max_value']),
+            ('Terendah', kpis['min_value']), ('Desa Teratas', kpis['top_village'])
+        ]))
+        figures = build_quantitative_figures(df, key, label)
+        if figures is not None:
+            parts.append(f'<div class="figures"><div>{_figure_html(figures["ranking_figure"])}</div>'
+                         f'<div>{_figure_html(figures["distribution_figure"])}</div></div>')
+            parts.append('<ul>' + ''.join(f"<li>{_markdown_html(line)}</li>" for line in figures['insights']) + '</ul>')
+            parts.append(figures['table'].to_html(index=False, border=0))
+    elif kpis.get('type') == 'qualitative':
+        most_common_pct = kpis['percentages'].get(kpis['most_common'], 0)
+        summary.update({
+            'Kategori Dominan': kpis['most_common'],
+            'Jumlah Desa Dominan': int(kpis['most_common_count']),
+            'Persentase Dominan (%)': most_common_pct
+        })
+        parts.append(_kpi_html([
+            ('Kategori Dominan', kpis['most_common']), ('Jumlah Desa', int(kpis['most_common_count'])),
+            ('Persentase', f"{most_common_pct}%")
+        ]))
+        figures = build_qualitative_figures(df, key, label)
+        if figures is not None:
+            parts.append(f'<div class="figures"><div>{_figure_html(figures["donut_figure"])}</div>'
+                         f'<div>{_figure_html(figures["ranking_figure"])}</div></div>')
+            if not figures['kecamatan_summary'].empty:
+                parts.append(figures['kecamatan_summary'].to_html(border=0))
+    else:
+        parts.append("<p>Tidak ada data untuk indikator ini.</p>")
+
+    return '\n'.join(parts), summary
+
+
+def _category_sheet(df: pd.DataFrame, indicators: Dict[str, str]) -> pd.DataFrame:
+    """Village rows with the category's indicators under their readable names"""
+    columns = ['id_desa', 'nama_kecamatan', 'nama_desa'] + [key for key in indicators if key in df.columns]
+    sheet = df[columns].rename(columns={'id_desa': 'ID Desa', 'nama_kecamatan': 'Kecamatan',
+                                        'nama_desa': 'Desa', **indicators})
+    return sheet.sort_values(['Kecamatan', 'Desa'])
+
+
+def build_scope_report(label: str, df: pd.DataFrame, output_dir: str = REPORTS_DIR) -> Dict[str, Any]:
+    """
+    Render the HTML and Excel report of one scope
+
+    The HTML embeds plotly.js once, so it opens offline without the dashboard.
+    The workbook has a summary sheet plus one sheet per category.
+
+    Args:
+        label: Scope label, e.g. 'Kecamatan BATU'
+        df: Scope dataframe
+        output_dir: Report output directory
+
+    Returns:
+        Dict: Report index entry (label, hash, file names, generated_at, seconds)
+    """
+    from plotly.offline import get_plotlyjs
+
+    start = time.perf_counter()
+    slug = scope_slug(label)
+    generated_at = datetime.now().isoformat(timespec='seconds')
+    content_hash = scope_hash(df)
+
+    sections, summary_rows, sheets = [], [], {}
+    for category, indicators in get_updated_category_indicators().items():
+        sections.append(f"<h2>{html.escape(category)}</h2>")
+        for key, indicator_label in indicators.items():
+            section, summary = _indicator_section(df, key, indicator_label)
+            sections.append(section)
+            summary_rows.append({'Kategori': category, **summary})
+        sheets[category[:31]] = _category_sheet(df, indicators)
+
+    document = f"""<!DOCTYPE html>
+<html lang="id">
+<head>
+<meta charset="utf-8">
+<title>Laporan Podes 2024 - {html.escape(label)}</title>
+<style>{_HTML_STYLE}</style>
+<script type="text/javascript">{get_plotlyjs()}</script>
+</head>
+<body>
+<h1>Laporan Podes 2024 &mdash; {html.escape(label)}</h1>
+{_kpi_html([('Jumlah Desa/Kelurahan', len(df)), ('Jumlah Kecamatan', kecamatan_code(df['id_desa']).nunique())])}
+{''.join(sections)}
+<footer>Dibuat {generated_at} &bull; versi data {content_hash}</footer>
+</body>
+</html>
+"""
+
+    os.makedirs(output_dir, exist_ok=True)
+    html_name, xlsx_name = f"{slug}.html", f"{slug}.xlsx"
+
+    html_path = os.path.join(output_dir, html_name)
+    tmp_path = f"{html_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(document)
+    os.replace(tmp_path, html_path)
+
+    write_excel_workbook({'Ringkasan': pd.DataFrame(summary_rows), **sheets}, os.path.join(output_dir, xlsx_name))
+
+    return {
+        'label': label,
+        'hash': content_hash,
+        'html': html_name,
+        'xlsx': xlsx_name,
+        'generated_at': generated_at,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
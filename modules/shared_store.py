@@ -0,0 +1,153 @@
+"""
+Shared dataset module for Podes 2024 dashboard
+Read-only, memory-mapped Arrow IPC copy of the cleaned dataset that every
+server process maps instead of holding its own copy
+
+The file is written once per dataset version. Each process memory-maps it and
+builds a DataFrame whose columns are zero-copy views of the mapped pages, so
+the operating system keeps a single copy in its page cache no matter how many
+workers and sessions read it. Numeric columns are read-only NumPy views; any
+in-place write raises ``ValueError: assignment destination is read-only``.
+"""
+
+import os
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from modules.manifest import dataset_version
+
+
+SHARED_DIR = 'data/shared'
+SHARED_ENV_VAR = 'PODES_SHARED_DATASET'
+
+
+def shared_dataset_enabled() -> bool:
+    """
+    Whether the dashboard should serve the shared memory-mapped dataset
+
+    Returns:
+        bool: True when PODES_SHARED_DATASET=1
+    """
+    return os.environ.get(SHARED_ENV_VAR, '0') == '1'
+
+
+def shared_dataset_path(version: str, root: str = SHARED_DIR) -> str:
+    """
+    Path of the shared dataset file for a dataset version
+
+    Args:
+        version: Dataset version from the manifest
+        root: Shared dataset directory
+
+    Returns:
+        str: Arrow IPC file path
+    """
+    return os.path.join(root, f'podes_{version}.arrow')
+
+
+def publish_shared_dataset(df: pd.DataFrame, version: Optional[str] = None,
+                           root: str = SHARED_DIR) -> str:
+    """
+    Write the cleaned dataset as an uncompressed Arrow IPC file
+
+    Every column is stored as a single contiguous chunk so it can be mapped
+    without copying. The file is written under a per-process temporary name and
+    renamed into place, so processes racing to publish the same version never
+    see a partial file.
+
+    Args:
+        df: Cleaned Podes dataframe
+        version: Dataset version, computed from the data when omitted
+        root: Shared dataset directory
+
+    Returns:
+        str: Path of the shared dataset file
+    """
+    version = version or dataset_version(df)
+    path = shared_dataset_path(version, root)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(root, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+    # Versi lama dihapus; proses yang masih memetakannya tetap aman (unlink)
+    for name in os.listdir(root):
+        if name.startswith('podes_') and name.endswith('.arrow') and os.path.join(root, name) != path:
+            os.remove(os.path.join(root, name))
+    return path
+
+
+def _column_view(column: pa.ChunkedArray):
+    """Zero-copy pandas-compatible view of one mapped column"""
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        try:
+            dtype = pd.StringDtype('pyarrow', na_value=np.nan)
+        except TypeError:
+            # pandas < 2.3 only has the pd.NA flavoured arrow string dtype
+            dtype = pd.StringDtype('pyarrow')
+        return pd.arrays.ArrowStringArray(column, dtype=dtype)
+
+    chunk = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    try:
+        return chunk.to_numpy(zero_copy_only=True)
+    except pa.ArrowInvalid:
+        pass
+
+    # Nulls and booleans cannot be viewed as NumPy without a copy; keep the copy read-only too
+    values = chunk.to_numpy(zero_copy_only=False)
+    values.flags.writeable = False
+    return values
+
+
+def open_shared_dataset(path: str) -> pd.DataFrame:
+    """
+    Memory-map a shared dataset file as a read-only DataFrame
+
+    Args:
+        path: Arrow IPC file written by publish_shared_dataset
+
+    Returns:
+        pd.DataFrame: Frame whose columns are views of the mapped file
+    """
+    source = pa.memory_map(path, 'r')
+    table = pa.ipc.open_file(source).read_all()
+
+    columns = {
+        name: pd.Series(_column_view(table.column(name)), name=name, copy=False)
+        for name in table.column_names
+    }
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs['shared_path'] = path
+    return df
+
+
+def load_shared_dataset(loader: Callable[[], pd.DataFrame], version: Optional[str] = None,
+                        root: str = SHARED_DIR) -> pd.DataFrame:
+    """
+    Open the shared dataset for a version, publishing it first if needed
+
+    Args:
+        loader: Returns the cleaned dataframe; only called when the file is missing
+        version: Dataset version from the manifest
+        root: Shared dataset directory
+
+    Returns:
+        pd.DataFrame: Read-only frame backed by the shared file
+    """
+    if version and os.path.exists(shared_dataset_path(version, root)):
+        return open_shared_dataset(shared_dataset_path(version, root))
+
+    df = loader()
+    if df.empty:
+        return df
+    return open_shared_dataset(publish_shared_dataset(df, version, root))
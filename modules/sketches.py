@@ -0,0 +1,186 @@
+"""
+Quantile sketch module for Podes 2024 dashboard
+Mergeable KLL sketches, so medians and quartiles of any set of kecamatan can
+be answered by merging small per-kecamatan summaries instead of scanning rows
+"""
+
+import math
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+
+# Ukuran sketsa: kesalahan peringkat kira-kira 1.7 / k (k=200 -> < 1%)
+DEFAULT_K = 200
+
+
+class QuantileSketch:
+    """
+    KLL sketch of a numeric column
+
+    Items live in levels; an item in level h stands for 2**h original values.
+    When a level outgrows its capacity its items are sorted and every other
+    one is promoted to the next level, which keeps the total weight exact.
+    While no level has been compacted the sketch holds every value and
+    answers quantiles exactly, with the same linear interpolation as pandas.
+    """
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._compactions: List[int] = [0]
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], k: int = DEFAULT_K) -> 'QuantileSketch':
+        """
+        Build a sketch of a column
+
+        Args:
+            values: Numeric values; NaN is ignored
+            k: Sketch size
+
+        Returns:
+            QuantileSketch: Sketch of the values
+        """
+        sketch = cls(k)
+        sketch.update(values)
+        return sketch
+
+    @property
+    def is_exact(self) -> bool:
+        """Whether the sketch still holds every value (nothing compacted)"""
+        return len(self.levels) == 1
+
+    def update(self, values: Iterable[float]) -> 'QuantileSketch':
+        """
+        Add values to the sketch
+
+        Args:
+            values: Numeric values; NaN is ignored
+
+        Returns:
+            QuantileSketch: self
+        """
+        values = np.asarray(values, dtype='float64').ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress()
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """
+        Merge another sketch into this one
+
+        Args:
+            other: Sketch of another part of the data
+
+        Returns:
+            QuantileSketch: self, now summarising both parts
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+            self._compactions.append(0)
+        for height, items in enumerate(other.levels):
+            self.levels[height] = np.concatenate([self.levels[height], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _capacity(self, height: int) -> int:
+        """Items a level may hold; lower levels get geometrically less room"""
+        depth = len(self.levels) - 1 - height
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        height = 0
+        while height < len(self.levels):
+            items = self.levels[height]
+            if len(items) > self._capacity(height):
+                if height + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                    self._compactions.append(0)
+                items = np.sort(items)
+                # Satu item tersisa bila jumlahnya ganjil; sisanya dipasangkan
+                leftover = len(items) % 2
+                # Offset bergantian agar pembulatan tidak condong ke satu arah
+                offset = self._compactions[height] % 2
+                self._compactions[height] += 1
+                promoted = items[leftover + offset::2]
+                self.levels[height] = items[:leftover]
+                self.levels[height + 1] = np.concatenate([self.levels[height + 1], promoted])
+            height += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile
+
+        Args:
+            q: Quantile between 0 and 1, e.g. 0.5 for the median
+
+        Returns:
+            float: Estimated value, NaN for an empty sketch
+        """
+        if self.count == 0:
+            return math.nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(items), 2 ** height, dtype='int64') for height, items in enumerate(self.levels)
+        ])
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        # Peringkat terakhir (0-based) yang diwakili setiap item
+        last_rank = np.cumsum(weights[order]) - 1
+
+        position = q * (self.count - 1)
+        low, high = math.floor(position), math.ceil(position)
+        low_value = values[np.searchsorted(last_rank, low)]
+        high_value = values[np.searchsorted(last_rank, high)]
+        return float(low_value + (position - low) * (high_value - low_value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable form of the sketch"""
+        return {
+            'k': self.k,
+            'count': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'levels': [
+                [int(value) if float(value).is_integer() else float(value) for value in items]
+                for items in self.levels
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuantileSketch':
+        """
+        Rebuild a sketch from to_dict output
+
+        Args:
+            data: Serialised sketch
+
+        Returns:
+            QuantileSketch: The sketch
+        """
+        sketch = cls(data['k'])
+        sketch.levels = [np.asarray(items, dtype='float64') for items in data['levels']] or [np.empty(0)]
+        sketch._compactions = [0] * len(sketch.levels)
+        sketch.count = data['count']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
@@ -0,0 +1,147 @@
+"""
+Columnar store module for Podes 2024 dashboard
+Reads and writes the cleaned dataset as Parquet partitioned by kabupaten/kota
+"""
+
+import os
+import shutil
+import pandas as pd
+from typing import List, Optional
+
+
+STORE_DIR = 'data/store'
+PARTITION_COLUMN = 'kode_kab'
+
+
+def kabupaten_code(id_desa: pd.Series) -> pd.Series:
+    """
+    Derive the 4-digit kabupaten/kota code from the 10-digit village id
+
+    Args:
+        id_desa: Series of village ids
+
+    Returns:
+        pd.Series: Kabupaten/kota codes as zero-padded strings
+    """
+    return (id_desa.astype('int64') // 1_000_000).astype(str).str.zfill(4)
+
+
+def kecamatan_code(id_desa: pd.Series) -> pd.Series:
+    """
+    Derive the 7-digit kecamatan code from the 10-digit village id
+
+    Kecamatan names repeat across kabupaten/kota, so scopes are keyed on
+    this code and the name is only displayed.
+
+    Args:
+        id_desa: Series of village ids
+
+    Returns:
+        pd.Series: Kecamatan codes as zero-padded strings
+    """
+    return (id_desa.astype('int64') // 1_000).astype(str).str.zfill(7)
+
+
+def write_store(df: pd.DataFrame, root: str = STORE_DIR) -> List[str]:
+    """
+    Write the cleaned dataset as one Parquet file per kabupaten/kota
+
+    Partitions are written in code order with rows sorted by id_desa and a fixed
+    file name, so identical input always produces identical files. The new store
+    is built next to the old one and swapped in at the end.
+
+    Args:
+        df: Cleaned dataframe containing id_desa
+        root: Store root directory
+
+    Returns:
+        List[str]: Written partition file paths
+    """
+    tmp_root = f"{root}.tmp"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    os.makedirs(tmp_root)
+
+    ordered = df.sort_values('id_desa', kind='stable').reset_index(drop=True)
+    codes = kabupaten_code(ordered['id_desa'])
+
+    written = []
+    for code, part in ordered.groupby(codes, sort=True):
+        part_dir = os.path.join(tmp_root, f"{PARTITION_COLUMN}={code}")
+        os.makedirs(part_dir)
+        part.to_parquet(partition_path(code, tmp_root), index=False)
+        written.append(partition_path(code, root))
+
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp_root, root)
+    return written
+
+
+def partition_path(code: str, root: str = STORE_DIR) -> str:
+    """
+    Parquet file of one kabupaten/kota partition
+
+    Args:
+        code: 4-digit kabupaten/kota code
+        root: Store root directory
+
+    Returns:
+        str: Partition file path
+    """
+    return os.path.join(root, f"{PARTITION_COLUMN}={code}", 'part-0.parquet')
+
+
+def write_partition(part: pd.DataFrame, code: str, root: str = STORE_DIR) -> str:
+    """
+    Replace a single partition of an existing store
+
+    Used by the corrections ingest so only changed kabupaten/kota files are
+    rewritten. The file is written next to the old one and renamed into place.
+
+    Args:
+        part: All rows of the kabupaten/kota
+        code: 4-digit kabupaten/kota code
+        root: Store root directory
+
+    Returns:
+        str: Written partition file path
+    """
+    path = partition_path(code, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    part.sort_values('id_desa', kind='stable').to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def list_partitions(root: str = STORE_DIR) -> List[str]:
+    """
+    List the kabupaten/kota codes present in the store
+
+    Args:
+        root: Store root directory
+
+    Returns:
+        List[str]: Sorted partition codes
+    """
+    if not os.path.isdir(root):
+        return []
+    prefix = f"{PARTITION_COLUMN}="
+    return sorted(name[len(prefix):] for name in os.listdir(root) if name.startswith(prefix))
+
+
+def read_store(root: str = STORE_DIR, partitions: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read the columnar store back into a single dataframe
+
+    Args:
+        root: Store root directory
+        partitions: Optional subset of kabupaten/kota codes to read
+
+    Returns:
+        pd.DataFrame: Concatenated partitions in code order, empty if no store exists
+    """
+    codes = partitions if partitions is not None else list_partitions(root)
+    frames = [pd.read_parquet(partition_path(code, root)) for code in sorted(codes)]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
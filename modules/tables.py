@@ -0,0 +1,100 @@
+"""
+Table emission module for Podes 2024 dashboard
+Trims frames before they are serialized for the browser: only the shown
+columns, the smallest lossless numeric types, dictionary-encoded repeated
+strings and no index. The payload size of every table is recorded for the
+profiling panel.
+"""
+
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from modules.profiling import record_payload
+
+
+# String dengan nilai unik <= proporsi ini dari jumlah baris dikodekan sebagai kamus
+DICTIONARY_MAX_UNIQUE_RATIO = 0.5
+
+
+def _downcast(series: pd.Series) -> pd.Series:
+    """Smallest numeric type that keeps every value, or a dictionary for repeated strings"""
+    if pd.api.types.is_bool_dtype(series):
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        if np.array_equal(values.astype('float32').astype('float64'), values, equal_nan=True):
+            return series.astype('float32')
+        return series
+    if (pd.api.types.is_string_dtype(series) or series.dtype == object) and len(series):
+        if series.nunique(dropna=True) <= len(series) * DICTIONARY_MAX_UNIQUE_RATIO:
+            return series.astype(str).where(series.notna()).astype('category')
+    return series
+
+
+def prepare_table(df: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Trim a frame for display
+
+    A named or non-integer index (e.g. kecamatan of a summary) becomes the
+    first column; a positional index is dropped.
+
+    Args:
+        df: Frame to show
+        columns: Displayed columns; all columns when omitted
+
+    Returns:
+        pd.DataFrame: Projected, downcast frame with a fresh positional index
+    """
+    if df.index.name is not None or not pd.api.types.is_integer_dtype(df.index):
+        df = df.reset_index()
+    if columns is not None:
+        df = df[columns]
+    return pd.DataFrame(
+        {str(col): _downcast(df[col]).reset_index(drop=True) for col in df.columns}, copy=False
+    )
+
+
+def to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Arrow table of a prepared frame, without the pandas index"""
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def payload_size(table: pa.Table) -> int:
+    """
+    Bytes of the Arrow IPC stream that carries a table to the browser
+
+    Args:
+        table: Arrow table
+
+    Returns:
+        int: Serialized size in bytes
+    """
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+def show_table(df: pd.DataFrame, name: str, columns: Optional[List[str]] = None, **kwargs: Any):
+    """
+    Trim a frame, record its payload and show it with st.dataframe
+
+    Args:
+        df: Frame to show
+        name: Table name in the profiling panel, e.g. 'ranking'
+        columns: Displayed columns; all columns when omitted
+        **kwargs: Passed to st.dataframe (width, height, column_config, ...)
+
+    Returns:
+        The st.dataframe element
+    """
+    table = to_arrow(prepare_table(df, columns))
+    record_payload(name, payload_size(table), table.num_rows)
+    kwargs.setdefault('hide_index', True)
+    return st.dataframe(table, **kwargs)
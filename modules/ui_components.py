@@ -9,6 +9,8 @@ import plotly.express as px
 import plotly.graph_objects as go
 from typing import List, Dict, Any, Tuple
 
+from modules.tables import show_table
+
 
 def create_sidebar_filters(df: pd.DataFrame, 
                           category_indicators: Dict[str, Dict[str, str]]) -> Tuple[str, str, str, List[str], List[str]]:
@@ -127,8 +129,8 @@ def display_data_table(filtered_df: pd.DataFrame,
         st.warning("Tidak ada data yang sesuai dengan filter yang dipilih.")
         return filtered_df
     
-    # Prepare display dataframe with readable column names
-    display_df = filtered_df.copy()
+    # Prepare display dataframe with readable column names (rename returns a new frame)
+    display_df = filtered_df
     
     # Rename columns to more readable format
     column_mapping = {
@@ -159,11 +161,7 @@ def display_data_table(filtered_df: pd.DataFrame,
     st.info("💡 Klik pada header kolom untuk mengurutkan data (ranking otomatis)")
     
     # Display the interactive dataframe
-    st.dataframe(
-        display_df,
-        width='stretch',
-        hide_index=True
-    )
+    show_table(display_df, 'data_table', width='stretch')
     
     # Display data summary
     col1, col2, col3 = st.columns(3)
@@ -327,7 +325,7 @@ def display_data_insights(filtered_df: pd.DataFrame,
                 }
                 top_villages = top_villages.rename(columns=display_cols)
                 
-                st.dataframe(top_villages, hide_index=True, width='stretch')
+                show_table(top_villages, 'top_villages', width='stretch')
         
         # For categorical data, show distribution
         else:
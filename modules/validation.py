@@ -0,0 +1,384 @@
+"""
+Validation module for Podes 2024 dashboard
+Vectorized quality checks for the raw PODES export and the quality report artifact
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from modules.podes_schema import (
+    CATEGORICAL_COLUMNS, CONTINUOUS_COLUMNS, ID_COLUMNS, NUMERIC_RANGES, RAW_BLANK, RAW_TOKEN
+)
+
+
+QUALITY_REPORT_PATH = 'data/quality_report.json'
+
+# Jumlah contoh nilai bermasalah yang disimpan per kolom
+MAX_EXAMPLES = 5
+
+# Hitungan per kolom yang dijumlahkan saat laporan digabung
+COUNT_KEYS = ('valid', 'blank', 'invalid_token', 'out_of_domain', 'out_of_range')
+
+
+def _split_raw_values(raw: pd.Series, sentinel_coded: bool = False) -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """
+    Split a raw column into blanks, non-numeric tokens and parsed numeric codes
+
+    Args:
+        raw: Raw column as read from CSV
+        sentinel_coded: True when blanks/tokens are encoded as RAW_BLANK/RAW_TOKEN
+            (frames produced by etl.read_raw_csv)
+
+    Returns:
+        Tuple of (blank mask, token mask, numeric codes)
+    """
+    if sentinel_coded and pd.api.types.is_integer_dtype(raw):
+        blank = raw == RAW_BLANK
+        token = raw == RAW_TOKEN
+        return blank, token, raw.astype('float64').where(~(blank | token))
+
+    if pd.api.types.is_numeric_dtype(raw):
+        codes = raw.astype('float64')
+        blank = raw.isna()
+        return blank, pd.Series(False, index=raw.index), codes
+
+    as_text = raw.astype('string').str.strip()
+    blank = as_text.isna() | (as_text == '')
+    codes = pd.to_numeric(as_text, errors='coerce')
+    token = ~blank & codes.isna()
+    return blank, token, codes
+
+
+def _examples(raw: pd.Series, mask: pd.Series, tokens: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Most frequent offending raw values for a column"""
+    examples = dict(tokens or {})
+    if tokens is not None:
+        # Sel sentinel (token, angka negatif) sudah diwakili teks aslinya di tokens
+        mask = mask & (raw >= 0)
+    if mask.any():
+        counts = raw[mask].astype(str).value_counts()
+        for value, count in counts.items():
+            examples[str(value)] = examples.get(str(value), 0) + int(count)
+    top = sorted(examples.items(), key=lambda item: -item[1])[:MAX_EXAMPLES]
+    return dict(top)
+
+
+def check_categorical_column(raw: pd.Series, target: str, mapping: Dict[int, str],
+                             tokens: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Check a categorical R-code column against the codes allowed by its mapping
+
+    Args:
+        raw: Raw column values
+        target: Name of the cleaned output column
+        mapping: Value mapping dictionary (code -> label)
+        tokens: Token and negative number counts recorded by etl.read_raw_csv,
+            if the column is sentinel coded
+
+    Returns:
+        Dict: Per-column quality counts
+    """
+    blank, token, codes = _split_raw_values(raw, tokens is not None)
+    out_of_domain = codes.notna() & ~codes.isin(list(mapping.keys()))
+
+    return {
+        'column': raw.name,
+        'target': target,
+        'kind': 'kategori',
+        'allowed': sorted(mapping.keys()),
+        'valid': int((~blank & ~token & ~out_of_domain).sum()),
+        'blank': int(blank.sum()),
+        'invalid_token': int(token.sum()),
+        'out_of_domain': int(out_of_domain.sum()),
+        'out_of_range': 0,
+        'examples': _examples(raw, out_of_domain, tokens) if tokens is not None
+                    else _examples(raw, token | out_of_domain)
+    }
+
+
+def check_numeric_column(raw: pd.Series, target: str, value_range: Tuple[int, int],
+                         tokens: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Check a continuous R-code column for tokens, fractions and out-of-range values
+
+    Args:
+        raw: Raw column values
+        target: Name of the cleaned output column
+        value_range: Inclusive (minimum, maximum) range
+        tokens: Token and negative number counts recorded by etl.read_raw_csv,
+            if the column is sentinel coded
+
+    Returns:
+        Dict: Per-column quality counts
+    """
+    blank, token, codes = _split_raw_values(raw, tokens is not None)
+    low, high = value_range
+    out_of_range = codes.notna() & ((codes < low) | (codes > high) | (codes % 1 != 0))
+
+    return {
+        'column': raw.name,
+        'target': target,
+        'kind': 'kontinu',
+        'range': [low, high],
+        'valid': int((~blank & ~token & ~out_of_range).sum()),
+        'blank': int(blank.sum()),
+        'invalid_token': int(token.sum()),
+        'out_of_domain': 0,
+        'out_of_range': int(out_of_range.sum()),
+        'examples': _examples(raw, out_of_range, tokens) if tokens is not None
+                    else _examples(raw, token | out_of_range)
+    }
+
+
+def check_unmapped_column(raw: pd.Series) -> Dict[str, Any]:
+    """
+    Check a raw column that the pipeline does not map (blanks and tokens only)
+
+    Args:
+        raw: Raw column values
+
+    Returns:
+        Dict: Per-column quality counts
+    """
+    blank, token, _ = _split_raw_values(raw)
+
+    return {
+        'column': raw.name,
+        'target': None,
+        'kind': 'tidak dipetakan',
+        'valid': int((~blank & ~token).sum()),
+        'blank': int(blank.sum()),
+        'invalid_token': int(token.sum()),
+        'out_of_domain': 0,
+        'out_of_range': 0,
+        'examples': _examples(raw, token)
+    }
+
+
+def check_duplicates(df: pd.DataFrame, id_column: str = 'IDDESA',
+                     token_cells: Optional[Dict[str, pd.Series]] = None,
+                     row_hash: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Detect duplicate IDDESA rows and whether the duplicates disagree
+
+    Only rows whose id occurs more than once are hashed, each to a 64-bit
+    content hash, so conflicting duplicates are ids that map to more than one
+    distinct hash.
+
+    Args:
+        df: Raw dataframe
+        id_column: Village id column
+        token_cells: Token text of the RAW_TOKEN cells of a sentinel-coded df
+            (df.attrs['raw_token_cells']), hashed in place of the sentinel so
+            rows that differ only in token text count as conflicting
+        row_hash: Per-row hash of columns not in df (see
+            etl.scan_unmapped_columns), compared along with df's columns
+
+    Returns:
+        Dict: Duplicate statistics including conflicting ids
+    """
+    repeated = df[id_column].duplicated(keep=False).to_numpy()
+    rows = df[repeated]
+    extra = {f"{col}:teks": cells.reindex(rows.index) for col, cells in (token_cells or {}).items()}
+    if row_hash is not None:
+        extra['tidak_dipetakan:hash'] = row_hash[repeated]
+    if extra:
+        rows = pd.concat([rows, pd.DataFrame(extra, index=rows.index)], axis=1)
+    hashes = pd.util.hash_pandas_object(rows, index=False)
+    pairs = pd.DataFrame({'id': rows[id_column].to_numpy(), 'hash': hashes.to_numpy()})
+
+    distinct_pairs = pairs.drop_duplicates()
+    conflicting_ids = distinct_pairs.loc[distinct_pairs['id'].duplicated(), 'id'].unique()
+    duplicate_rows = int(pairs['id'].duplicated().sum())
+    identical_rows = int(pairs.duplicated().sum())
+
+    return {
+        'duplicate_rows': duplicate_rows,
+        'identical_duplicates': identical_rows,
+        'conflicting_duplicates': duplicate_rows - identical_rows,
+        'conflicting_ids': sorted(str(value) for value in conflicting_ids)
+    }
+
+
+def validate_raw_data(df: pd.DataFrame, source: Optional[str] = None,
+                      unmapped: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Run every quality check over the raw PODES dataframe
+
+    All checks are column-wise vectorized operations; there is no per-row Python.
+
+    Args:
+        df: Raw dataframe as read from the cleaned CSV export
+        source: Optional source file path recorded in the report
+        unmapped: Checks and row hashes of the columns left out of a typed
+            df (see etl.scan_unmapped_columns)
+
+    Returns:
+        Dict: Compact quality report
+    """
+    columns: List[Dict[str, Any]] = []
+    checked = set(ID_COLUMNS)
+
+    # Frame dari etl.read_raw_csv: sel kosong/token sudah diganti sentinel
+    raw_tokens = df.attrs.get('raw_tokens')
+
+    def column_tokens(raw_col: str) -> Optional[Dict[str, int]]:
+        return None if raw_tokens is None else raw_tokens.get(raw_col, {})
+
+    for raw_col, (target, mapping) in CATEGORICAL_COLUMNS.items():
+        if raw_col in df.columns:
+            columns.append(check_categorical_column(df[raw_col], target, mapping, column_tokens(raw_col)))
+            checked.add(raw_col)
+
+    for raw_col, target in CONTINUOUS_COLUMNS.items():
+        if raw_col in df.columns:
+            columns.append(check_numeric_column(df[raw_col], target, NUMERIC_RANGES[raw_col],
+                                                column_tokens(raw_col)))
+            checked.add(raw_col)
+
+    for raw_col in df.columns:
+        if raw_col not in checked and raw_col.startswith('R'):
+            columns.append(check_unmapped_column(df[raw_col]))
+    if unmapped is not None:
+        columns.extend(unmapped['columns'])
+
+    expected = list(ID_COLUMNS) + list(CATEGORICAL_COLUMNS) + list(CONTINUOUS_COLUMNS)
+    missing_columns = [col for col in expected if col not in df.columns]
+
+    issue_keys = ('blank', 'invalid_token', 'out_of_domain', 'out_of_range')
+    issue_cells = sum(col[key] for col in columns for key in issue_keys)
+    columns_with_issues = sum(1 for col in columns if any(col[key] for key in issue_keys))
+
+    duplicates = (check_duplicates(df, token_cells=df.attrs.get('raw_token_cells'),
+                                   row_hash=None if unmapped is None else unmapped['row_hash'])
+                  if 'IDDESA' in df.columns else {})
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+        'total_rows': int(len(df)),
+        'unique_desa': int(df['IDDESA'].nunique()) if 'IDDESA' in df.columns else 0,
+        'missing_columns': missing_columns,
+        'duplicates': duplicates,
+        'summary': {
+            'columns_checked': len(columns),
+            'columns_with_issues': columns_with_issues,
+            'issue_cells': int(issue_cells)
+        },
+        'columns': columns
+    }
+
+
+def merge_column_reports(column_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Combine per-column quality counts of several parts of the data
+
+    Counts are summed and examples merged, keeping the most frequent ones.
+
+    Args:
+        column_lists: 'columns' sections, one per file or chunk
+
+    Returns:
+        List: One entry per column, in order of first appearance
+    """
+    columns: Dict[str, Dict[str, Any]] = {}
+    for column_list in column_lists:
+        for col in column_list:
+            if col['column'] not in columns:
+                columns[col['column']] = {**col, 'examples': dict(col['examples'])}
+                continue
+            target = columns[col['column']]
+            for key in COUNT_KEYS:
+                target[key] += col[key]
+            for value, count in col['examples'].items():
+                target['examples'][value] = target['examples'].get(value, 0) + count
+
+    for col in columns.values():
+        top = sorted(col['examples'].items(), key=lambda item: -item[1])[:MAX_EXAMPLES]
+        col['examples'] = dict(top)
+    return list(columns.values())
+
+
+def merge_quality_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine per-file quality reports into one report
+
+    Per-column counts are summed and examples merged; duplicate statistics are
+    summed per file (cross-file duplicates are added by the caller).
+
+    Args:
+        reports: Reports produced by validate_raw_data, one per input file
+
+    Returns:
+        Dict: Combined quality report
+    """
+    if len(reports) == 1:
+        merged = dict(reports[0])
+        merged['duplicates'] = dict(merged.get('duplicates', {}))
+        merged['sources'] = [merged.get('source')]
+        return merged
+
+    merged_columns = merge_column_reports([report.get('columns', []) for report in reports])
+    issue_keys = COUNT_KEYS[1:]
+    duplicate_keys = ('duplicate_rows', 'identical_duplicates', 'conflicting_duplicates')
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'source': f"{len(reports)} file",
+        'sources': [report.get('source') for report in reports],
+        'total_rows': sum(report.get('total_rows', 0) for report in reports),
+        'unique_desa': sum(report.get('unique_desa', 0) for report in reports),
+        'missing_columns': sorted({col for report in reports for col in report.get('missing_columns', [])}),
+        'duplicates': {
+            **{key: sum(report.get('duplicates', {}).get(key, 0) for report in reports) for key in duplicate_keys},
+            'conflicting_ids': sorted({value for report in reports
+                                       for value in report.get('duplicates', {}).get('conflicting_ids', [])})
+        },
+        'summary': {
+            'columns_checked': len(merged_columns),
+            'columns_with_issues': sum(1 for col in merged_columns if any(col[key] for key in issue_keys)),
+            'issue_cells': int(sum(col[key] for col in merged_columns for key in issue_keys))
+        },
+        'columns': merged_columns
+    }
+
+
+def write_quality_report(report: Dict[str, Any], path: str = QUALITY_REPORT_PATH) -> str:
+    """
+    Write the quality report artifact as JSON
+
+    Args:
+        report: Report produced by validate_raw_data
+        path: Output file path
+
+    Returns:
+        str: Path of the written report
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    return path
+
+
+def quality_report_frame(report: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Flatten the per-column section of a quality report for display
+
+    Args:
+        report: Quality report dictionary
+
+    Returns:
+        pd.DataFrame: One row per checked column
+    """
+    rows = report.get('columns', [])
+    if not rows:
+        return pd.DataFrame()
+
+    frame = pd.DataFrame(rows)
+    frame['examples'] = frame['examples'].map(
+        lambda values: ', '.join(f"{value} ({count})" for value, count in values.items())
+    )
+    return frame[['column', 'target', 'kind', 'valid', 'blank', 'invalid_token',
+                  'out_of_domain', 'out_of_range', 'examples']]
@@ -0,0 +1,153 @@
+"""
+Village search module for Podes 2024 dashboard
+Prefix and trigram index over village and kecamatan names, built once per
+dataset version, so pickers only send the best matches to the browser
+"""
+
+import bisect
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+
+# Jumlah hasil maksimum yang dikirim ke browser per pencarian
+DEFAULT_LIMIT = 20
+
+# Kemiripan trigram minimum agar salah ketik masih ditemukan
+MIN_SIMILARITY = 0.35
+
+
+def normalize_name(text: str) -> str:
+    """Upper-case a name and reduce punctuation and repeated spaces to one space"""
+    return re.sub(r'[^0-9A-Z]+', ' ', str(text).upper()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Character trigrams of a normalised name, padded so word starts count
+
+    Args:
+        text: Normalised name
+
+    Returns:
+        Set[str]: Trigrams, e.g. '  S', ' SI', 'SIS', ... for 'SISIR'
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def village_label(nama_desa: str, nama_kecamatan: str) -> str:
+    """Label of a village in pickers: 'DESA (KECAMATAN)'"""
+    return f"{nama_desa} ({nama_kecamatan})"
+
+
+def label_desa(label: str) -> str:
+    """Village name of a picker label"""
+    return label.rsplit(' (', 1)[0]
+
+
+class VillageSearchIndex:
+    """
+    Search-as-you-type index over villages
+
+    Queries are matched first by prefix on the village name (binary search
+    over the sorted names), then by trigram overlap with "village kecamatan",
+    which tolerates typos and spacing differences such as 'BUMI AJI'.
+    """
+
+    def __init__(self, ids: np.ndarray, desa: List[str], kecamatan: List[str]):
+        self.ids = ids
+        self.desa = desa
+        self.kecamatan = kecamatan
+        self.labels = [village_label(name, kec) for name, kec in zip(desa, kecamatan)]
+        self._kecamatan_codes, self._kecamatan_names = pd.factorize(pd.Series(kecamatan, dtype=object))
+
+        # Indeks awalan: nama desa ternormalisasi yang diurutkan
+        normalized = [normalize_name(name) for name in desa]
+        self._prefix_order = sorted(range(len(desa)), key=lambda i: (normalized[i], self.labels[i]))
+        self._prefix_keys = [normalized[i] for i in self._prefix_order]
+
+        # Indeks trigram: trigram -> posisi entri
+        postings: Dict[str, List[int]] = defaultdict(list)
+        sizes = np.zeros(len(desa), dtype='int32')
+        for position, (name, kec) in enumerate(zip(normalized, kecamatan)):
+            grams = trigrams(name) | trigrams(normalize_name(kec))
+            sizes[position] = len(grams)
+            for gram in grams:
+                postings[gram].append(position)
+        self._postings = {gram: np.asarray(items, dtype='int32') for gram, items in postings.items()}
+        self._sizes = sizes
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'VillageSearchIndex':
+        """
+        Build the index from the Podes data
+
+        Args:
+            df: Podes data with id_desa, nama_desa and nama_kecamatan
+
+        Returns:
+            VillageSearchIndex: Index over every village
+        """
+        return cls(
+            df['id_desa'].to_numpy(),
+            df['nama_desa'].astype(str).tolist(),
+            df['nama_kecamatan'].astype(str).tolist()
+        )
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def _prefix_matches(self, query: str) -> List[int]:
+        start = bisect.bisect_left(self._prefix_keys, query)
+        end = bisect.bisect_left(self._prefix_keys, query + '\uffff')
+        return self._prefix_order[start:end]
+
+    def search(self, query: str, kecamatan: Optional[str] = None, limit: int = DEFAULT_LIMIT,
+               allowed_ids: Optional[np.ndarray] = None) -> List[int]:
+        """
+        Best matching villages for a query
+
+        Args:
+            query: Text typed by the user; empty lists villages alphabetically
+            kecamatan: Only return villages of this kecamatan
+            limit: Maximum number of results
+            allowed_ids: Only return villages with these id_desa
+
+        Returns:
+            List[int]: Entry positions, best match first
+        """
+        query = normalize_name(query)
+        allowed = np.ones(len(self), dtype=bool)
+        if kecamatan is not None:
+            allowed &= self._kecamatan_codes == self._kecamatan_names.get_indexer([kecamatan])[0]
+        if allowed_ids is not None:
+            allowed &= np.isin(self.ids, allowed_ids)
+
+        # Awalan nama desa lebih dulu, urut abjad
+        results = [position for position in self._prefix_matches(query) if allowed[position]][:limit]
+        if len(results) >= limit or len(query) < 3:
+            return results
+
+        # Sisanya menurut kemiripan trigram (bagian trigram kueri yang ditemukan)
+        grams = trigrams(query)
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists:
+            return results
+        shared = np.bincount(np.concatenate(lists), minlength=len(self))
+        similarity = shared / len(grams)
+        candidates = np.flatnonzero((similarity >= MIN_SIMILARITY) & allowed)
+        candidates = candidates[~np.isin(candidates, results)]
+
+        # Urutkan: kemiripan tertinggi, lalu entri yang lebih pendek (Jaccard), lalu label
+        jaccard = shared[candidates] / (len(grams) + self._sizes[candidates] - shared[candidates])
+        order = sorted(range(len(candidates)),
+                       key=lambda i: (-similarity[candidates[i]], -jaccard[i], self.labels[candidates[i]]))
+        return results + [int(candidates[i]) for i in order[:limit - len(results)]]
+
+    def search_labels(self, query: str, **kwargs) -> List[str]:
+        """Like search, returning 'DESA (KECAMATAN)' labels"""
+        return [self.labels[position] for position in self.search(query, **kwargs)]
@@ -0,0 +1,236 @@
+"""
+Warmup module for Podes 2024 dashboard
+Records which dashboard states are requested in a small SQLite log and, when
+a server process starts or a new dataset version is published, prepares the
+most popular states in low-priority background threads so the first users
+do not pay the cold cost of loading data and building figures
+
+Only the standard library is imported at module level: the landing page
+starts the warmup without loading pandas or plotly itself.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+
+USAGE_DB_PATH = os.environ.get('PODES_USAGE_DB', 'data/cache/usage.sqlite')
+WARMUP_ENABLED = os.environ.get('PODES_WARMUP', '1') == '1'
+# Jumlah state terpopuler yang disiapkan per versi data
+WARMUP_TOP_STATES = int(os.environ.get('PODES_WARMUP_TOP', '20'))
+WARMUP_WORKERS = int(os.environ.get('PODES_WARMUP_WORKERS', '1'))
+# Jeda antar state (detik) agar sesi interaktif tetap didahulukan
+WARMUP_PAUSE_SECONDS = float(os.environ.get('PODES_WARMUP_PAUSE', '0.2'))
+# Hanya permintaan dalam jendela ini (hari) yang dihitung
+USAGE_WINDOW_DAYS = 30
+
+DEFAULT_STATE = ('Pendidikan', 'Semua', 'Semua Kecamatan')
+
+_SESSION_KEY = '_warmup_last_state'
+
+_lock = threading.Lock()
+_warmed_versions: Dict[str, Dict[str, Any]] = {}
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=1.0)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS view_usage ("
+        " category TEXT NOT NULL, indicator TEXT NOT NULL, kecamatan TEXT NOT NULL,"
+        " hits INTEGER NOT NULL DEFAULT 0, last_seen REAL NOT NULL,"
+        " PRIMARY KEY (category, indicator, kecamatan))"
+    )
+    return connection
+
+
+def record_state(category: str, indicator: str, kecamatan: str, path: str = USAGE_DB_PATH) -> None:
+    """
+    Count one request of a dashboard state
+
+    Args:
+        category: Indicator category
+        indicator: Indicator column or 'Semua'
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+        path: Usage log path
+    """
+    try:
+        with _connect(path) as connection:
+            connection.execute(
+                "INSERT INTO view_usage (category, indicator, kecamatan, hits, last_seen) VALUES (?, ?, ?, 1, ?)"
+                " ON CONFLICT (category, indicator, kecamatan)"
+                " DO UPDATE SET hits = hits + 1, last_seen = excluded.last_seen",
+                (category, indicator, kecamatan, time.time())
+            )
+        connection.close()
+    except sqlite3.Error:
+        # Log pemakaian tidak boleh mengganggu dashboard
+        pass
+
+
+def record_view(category: str, indicator: str, kecamatan: str) -> None:
+    """
+    Count the state of the current session when it changed since its last rerun
+
+    Reruns that keep the filters (e.g. choosing villages to compare) are not
+    counted again.
+
+    Args:
+        category: Indicator category
+        indicator: Indicator column or 'Semua'
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+    """
+    import streamlit as st
+
+    state = (category, indicator, kecamatan)
+    if st.session_state.get(_SESSION_KEY) == state:
+        return
+    st.session_state[_SESSION_KEY] = state
+    record_state(category, indicator, kecamatan)
+
+
+def popular_states(limit: int = WARMUP_TOP_STATES, path: str = USAGE_DB_PATH) -> List[Tuple[str, str, str]]:
+    """
+    Most requested states of the last USAGE_WINDOW_DAYS days
+
+    Args:
+        limit: Maximum number of states
+        path: Usage log path
+
+    Returns:
+        List[Tuple]: (category, indicator, kecamatan), most requested first;
+        the default dashboard state is always included
+    """
+    states = [DEFAULT_STATE]
+    try:
+        connection = _connect(path)
+        rows = connection.execute(
+            "SELECT category, indicator, kecamatan FROM view_usage WHERE last_seen >= ?"
+            " ORDER BY hits DESC, last_seen DESC LIMIT ?",
+            (time.time() - USAGE_WINDOW_DAYS * 86400, limit)
+        ).fetchall()
+        connection.close()
+    except sqlite3.Error:
+        rows = []
+    states += [tuple(row) for row in rows if tuple(row) != DEFAULT_STATE]
+    return states[:limit]
+
+
+def warm_state(category: str, indicator: str, kecamatan: str) -> None:
+    """
+    Prepare one state in this process: the precomputed "Semua" bundle or the
+    shared single-indicator figures
+
+    Args:
+        category: Indicator category
+        indicator: Indicator column or 'Semua'
+        kecamatan: Kecamatan name or 'Semua Kecamatan'
+    """
+    from modules.data_loader import get_indicator_view, get_view_bundle
+
+    if indicator == 'Semua':
+        get_view_bundle(category, kecamatan)
+    else:
+        get_indicator_view(category, indicator, kecamatan)
+
+
+def _lower_thread_priority() -> None:
+    """Give the calling thread the lowest CPU priority (Linux threads can be reniced)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+def _run_warmup(version: str, states: List[Tuple[str, str, str]]) -> None:
+    """Warm the shared caches, then each state, recording spans for the profiling panel"""
+    from modules.analysis import get_updated_category_indicators
+    from modules.data_loader import (
+        get_aggregates, get_bitmap_index, get_code_matrix, get_encoded_dimensions, get_hierarchy, get_podes_data,
+        get_rank_tables, get_top_villages, get_village_index
+    )
+    from modules.profiling import span
+
+    status = _warmed_versions[version]
+    start = time.perf_counter()
+    with span('warmup.datasets'):
+        get_podes_data()
+        get_rank_tables()
+        get_hierarchy()
+        get_aggregates()
+        get_village_index()
+        get_encoded_dimensions()
+        get_bitmap_index()
+        get_code_matrix()
+        get_top_villages()
+
+    category_indicators = get_updated_category_indicators()
+    states = [state for state in states
+              if state[0] in category_indicators
+              and (state[1] == 'Semua' or state[1] in category_indicators[state[0]])]
+    status['total'] = len(states)
+
+    def warm(state: Tuple[str, str, str]) -> None:
+        time.sleep(WARMUP_PAUSE_SECONDS)
+        try:
+            with span('warmup.state'):
+                warm_state(*state)
+        except Exception as error:
+            status['errors'].append(f"{state}: {error}")
+        with _lock:
+            status['done'] += 1
+
+    with ThreadPoolExecutor(max_workers=max(1, WARMUP_WORKERS), thread_name_prefix='podes-warmup',
+                            initializer=_lower_thread_priority) as pool:
+        list(pool.map(warm, states))
+    status['seconds'] = time.perf_counter() - start
+    status['finished'] = True
+
+
+def start_warmup(version: Optional[str]) -> bool:
+    """
+    Start warming the caches for a dataset version, once per process and version
+
+    Called on every page run; returns immediately. A new manifest version
+    (data published by ProsesData.py or ProsesKoreksi.py) starts a new warmup.
+
+    Args:
+        version: Dataset version from the manifest; nothing is warmed without one
+
+    Returns:
+        bool: True when a warmup was started by this call
+    """
+    if not WARMUP_ENABLED or version is None:
+        return False
+    with _lock:
+        if version in _warmed_versions:
+            return False
+        _warmed_versions[version] = {'started_at': time.time(), 'total': 0, 'done': 0,
+                                     'errors': [], 'finished': False}
+
+    def run() -> None:
+        _lower_thread_priority()
+        try:
+            _run_warmup(version, popular_states())
+        except Exception as error:
+            _warmed_versions[version]['errors'].append(str(error))
+            _warmed_versions[version]['finished'] = True
+
+    threading.Thread(target=run, name='podes-warmup', daemon=True).start()
+    return True
+
+
+def warmup_status() -> Dict[str, Dict[str, Any]]:
+    """
+    Progress of the warmups of this process
+
+    Returns:
+        Dict: version -> {started_at, total, done, errors, finished, seconds}
+    """
+    with _lock:
+        return {version: dict(status) for version, status in _warmed_versions.items()}
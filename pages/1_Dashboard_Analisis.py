@@ -3,22 +3,37 @@ Dashboard Analisis - Halaman Utama Analisis Data Podes 2024
 """
 
 import streamlit as st
+import time
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
-import io
 from datetime import datetime
-from modules.data_loader import load_podes_data, get_kecamatan_list, get_desa_list
+from modules.data_loader import (
+    get_podes_data, get_dataset_version, get_rank_tables, get_aggregates, get_encoded_dimensions,
+    get_hierarchy, get_village_index, get_view_bundle, get_indicator_view, get_bitmap_index, get_code_matrix,
+    get_top_villages,
+    get_quality_report,
+    current_dataset_version, current_scope_version,
+    get_kecamatan_list
+)
 from modules.analysis import (
     get_updated_category_indicators,
+    filter_rows,
     filter_and_analyze_data,
     create_comparison_analysis,
     get_ranking_data,
+    is_quantitative,
     reset_filters
 )
-from enhanced_viz import create_enhanced_quantitative_visualization, create_enhanced_qualitative_visualization
+from modules.bitmap_index import NUMERIC_OPERATORS
+from modules.bundles import bundle_figures
+from modules.cache_governor import governed_cache
+from modules.pivot import PERCENTAGE_MODES, add_margins, percentage_table, pivot_counts, scope_mask
+from modules.ranks import TOP_K, indicator_rankings, top_villages_grid
+from modules.tables import show_table
+from modules.validation import quality_report_frame
+from modules.village_search import label_desa
+from modules.profiling import span, timed, start_rerun, render_profiling_panel
+from modules.exports import build_excel_bytes, build_all_categories_workbook
+from modules.warmup import record_view, start_warmup
 
 # Page configuration
 st.set_page_config(
@@ -39,25 +54,6 @@ def create_excel_download_button(df: pd.DataFrame, filename_prefix: str, button_
     if df.empty:
         return
     
-    # Create Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Data')
-        
-        # Auto-adjust column widths
-        worksheet = writer.sheets['Data']
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
-    
     # Generate filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{filename_prefix}_{timestamp}.xlsx"
@@ -88,11 +84,12 @@ def create_excel_download_button(df: pd.DataFrame, filename_prefix: str, button_
     # Create clean download button
     st.download_button(
         label=f"📥 {button_label}",
-        data=output.getvalue(),
+        # Workbook is only built when the button is clicked
+        data=lambda: build_excel_bytes(df),
         file_name=filename,
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         help=f"Download {len(df)} baris data dalam format Excel (.xlsx)",
-        use_container_width=True
+        width="stretch"
     )
     
     # Add simple info about the download
@@ -102,6 +99,7 @@ def create_excel_download_button(df: pd.DataFrame, filename_prefix: str, button_
     </div>
     """, unsafe_allow_html=True)
 
+@timed('section.sidebar_controls')
 def create_sidebar_controls(df: pd.DataFrame, category_indicators: dict):
     """Create sidebar controls with all filters and reset button"""
     
@@ -169,28 +167,64 @@ def create_sidebar_controls(df: pd.DataFrame, category_indicators: dict):
     
     st.session_state.filters['kecamatan'] = selected_kecamatan
     
-    # Desa filter  
-    desa_list = get_desa_list(df, selected_kecamatan)
+    # Desa filter: search-as-you-type, only the best matches are sent to the browser
+    village_index = get_village_index()
+    kecamatan_scope = None if selected_kecamatan == "Semua Kecamatan" else selected_kecamatan
+    desa_query = st.sidebar.text_input(
+        "🔎 Cari Desa/Kelurahan:",
+        key='desa_query',
+        placeholder="Ketik nama desa...",
+        help="Ketik sebagian nama desa; salah ketik kecil tetap ditemukan"
+    )
+    desa_options = ["Semua Desa/Kelurahan"]
     
-    # Determine default index for selectbox
-    default_index = 0  # Default to "Semua Desa/Kelurahan"
-    if st.session_state.filters['desa'] and len(st.session_state.filters['desa']) > 0:
-        if st.session_state.filters['desa'][0] in desa_list:
-            default_index = desa_list.index(st.session_state.filters['desa'][0])
+    # Keep the current selection available while it belongs to the chosen kecamatan
+    if st.session_state.filters['desa']:
+        current = village_index.search_labels(st.session_state.filters['desa'][0], kecamatan=kecamatan_scope, limit=1)
+        if current and label_desa(current[0]) == st.session_state.filters['desa'][0]:
+            desa_options += current
+    desa_options += [label for label in village_index.search_labels(desa_query, kecamatan=kecamatan_scope)
+                     if label not in desa_options]
     
-    selected_desa = st.sidebar.selectbox(
+    selected_desa_label = st.sidebar.selectbox(
         "Desa/Kelurahan:",
-        desa_list,
-        index=default_index,
+        desa_options,
+        index=1 if len(desa_options) > 1 and st.session_state.filters['desa']
+        and label_desa(desa_options[1]) == st.session_state.filters['desa'][0] else 0,
         help="Pilih desa untuk analisis spesifik atau 'Semua Desa/Kelurahan' untuk melihat semua desa"
     )
     
     # Convert to list format for compatibility with existing code
-    if selected_desa == "Semua Desa/Kelurahan":
+    if selected_desa_label == "Semua Desa/Kelurahan":
+        selected_desa = selected_desa_label
         st.session_state.filters['desa'] = []
     else:
+        selected_desa = label_desa(selected_desa_label)
         st.session_state.filters['desa'] = [selected_desa]
     
+    # Breadcrumb of the administrative scope; drilling up is a parent lookup
+    hierarchy = get_hierarchy()
+    scope_code = hierarchy.scope_code(selected_kecamatan, st.session_state.filters['desa'])
+    if scope_code is not None:
+        path = hierarchy.path(scope_code)
+        st.sidebar.caption("📍 " + " › ".join(node.name for node in path))
+        if path[-1].level in ('kecamatan', 'desa') and st.sidebar.button(
+            "⬆️ Naik Satu Tingkat", help=f"Kembali ke {path[-2].name}"
+        ):
+            if path[-1].level == 'desa':
+                st.session_state.filters['desa'] = []
+            else:
+                st.session_state.filters['kecamatan'] = "Semua Kecamatan"
+            st.rerun()
+    
+    # Median mode: merged per-kecamatan sketches by default, exact on request
+    st.session_state.filters['median_eksak'] = st.sidebar.toggle(
+        "🎯 Median Eksak",
+        value=st.session_state.filters.get('median_eksak', False),
+        help="Hitung median dari seluruh baris data (cocok untuk cakupan kecil). "
+             "Jika nonaktif, median digabung dari sketsa kuantil per kecamatan."
+    )
+    
     # Info about comparison feature
     st.sidebar.info("💡 Untuk perbandingan antar desa, scroll ke bawah ke bagian 'Perbandingan Antar Desa'")
     
@@ -245,7 +279,7 @@ def display_kpi_cards(kpis: dict, indicator_label: str):
     
     elif kpis['type'] == 'quantitative':
         # Quantitative KPIs
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         
         with col1:
             st.metric(
@@ -255,6 +289,14 @@ def display_kpi_cards(kpis: dict, indicator_label: str):
             )
         
         with col2:
+            median_source = "eksak" if kpis.get('median_exact', True) else "perkiraan dari sketsa kuantil per kecamatan"
+            st.metric(
+                "Median per Desa",
+                f"{'' if kpis.get('median_exact', True) else '≈ '}{kpis['median']:,}",
+                help=f"Kuartil 1: {kpis['q1']:,} · Kuartil 3: {kpis['q3']:,} ({median_source})"
+            )
+        
+        with col3:
             st.metric(
                 "Desa Terbaik",
                 kpis.get('top_village', 'Tidak ada'),
@@ -319,11 +361,7 @@ def display_all_indicators_table(filtered_df: pd.DataFrame, selected_category: s
     display_df = display_df.rename(columns=column_mapping)
     
     # Display the table
-    st.dataframe(
-        display_df,
-        width="stretch",
-        hide_index=True
-    )
+    show_table(display_df, 'all_indicators', width="stretch")
     
     # Add dedicated Excel download section
     st.markdown("---")  # Separator line
@@ -355,7 +393,7 @@ def display_all_indicators_table(filtered_df: pd.DataFrame, selected_category: s
             })
         
         summary_df = pd.DataFrame(summary_data)
-        st.dataframe(summary_df, width="stretch", hide_index=True)
+        show_table(summary_df, 'all_indicators_summary', width="stretch")
 
 
 def display_ranking_table(filtered_df: pd.DataFrame, selected_indicator: str, indicator_label: str):
@@ -387,6 +425,19 @@ def display_ranking_table(filtered_df: pd.DataFrame, selected_indicator: str, in
         
         st.info("📝 Untuk melihat data spesifik, silakan pilih indikator tertentu dari filter di sidebar")
         
+    elif pd.api.types.is_numeric_dtype(filtered_df[selected_indicator]):
+        st.info("💡 Data sudah diurutkan menurut peringkat; desa dengan nilai sama berbagi peringkat")
+        
+        # Ranks are looked up from the precomputed table, already in order
+        rankings = indicator_rankings(filtered_df, selected_indicator, get_rank_tables())
+        display_df = rankings[['peringkat', 'nama_kecamatan', 'nama_desa', 'nilai', 'persentil']].rename(columns={
+            'peringkat': 'Peringkat',
+            'nama_kecamatan': 'Kecamatan',
+            'nama_desa': 'Desa',
+            'nilai': indicator_label,
+            'persentil': 'Persentil'
+        })
+        
     else:
         st.info("💡 Klik pada header kolom untuk mengurutkan data dan melihat peringkat")
         
@@ -403,11 +454,7 @@ def display_ranking_table(filtered_df: pd.DataFrame, selected_indicator: str, in
         display_df = display_df.rename(columns=column_mapping)
     
     # Display the table
-    st.dataframe(
-        display_df,
-        width="stretch",
-        hide_index=True
-    )
+    show_table(display_df, 'ranking', width="stretch")
     
     # Add dedicated Excel download section
     st.markdown("---")  # Separator line
@@ -427,15 +474,16 @@ def display_ranking_table(filtered_df: pd.DataFrame, selected_indicator: str, in
     # Show additional ranking info for numeric data (only for specific indicators)
     if selected_indicator != "Semua" and pd.api.types.is_numeric_dtype(filtered_df[selected_indicator]):
         st.subheader("🏆 Top 5 Peringkat")
-        top_5 = get_ranking_data(filtered_df, selected_indicator, 5)
+        top_5 = get_ranking_data(filtered_df, selected_indicator, 5, get_rank_tables())
         
         if not top_5.empty:
             top_5_display = top_5.rename(columns={
+                'peringkat': 'Peringkat',
                 'nama_kecamatan': 'Kecamatan',
                 'nama_desa': 'Desa',
                 selected_indicator: indicator_label
             })
-            st.dataframe(top_5_display, hide_index=True, width="stretch")
+            show_table(top_5_display, 'top_5', width="stretch")
             
             # Add dedicated download section for Top 5
             st.markdown("---")  # Separator line
@@ -447,6 +495,7 @@ def display_ranking_table(filtered_df: pd.DataFrame, selected_indicator: str, in
             )
 
 
+@timed('section.village_comparison')
 def display_village_comparison(filtered_df: pd.DataFrame, 
                              indicator_columns: list,
                              category_indicators: dict):
@@ -454,15 +503,20 @@ def display_village_comparison(filtered_df: pd.DataFrame,
     
     st.markdown("#### 🔍 **Perbandingan Antar Desa**")
     
-    # Village selection with dedicated filter
-    available_villages = []
-    for _, row in filtered_df.iterrows():
-        village_label = f"{row['nama_desa']} ({row['nama_kecamatan']})"
-        available_villages.append(village_label)
+    # Village selection with dedicated search; only matches within the filter are offered
+    village_query = st.text_input(
+        "🔎 Cari desa untuk dibandingkan:",
+        key='compare_query',
+        placeholder="Ketik nama desa atau kecamatan...",
+        help="Ketik sebagian nama desa atau kecamatan; salah ketik kecil tetap ditemukan"
+    )
+    selected_so_far = st.session_state.get('compare_villages', [])
+    matches = get_village_index().search_labels(village_query, allowed_ids=filtered_df['id_desa'].to_numpy())
     
     selected_villages = st.multiselect(
         "Pilih desa untuk dibandingkan (maksimal 4):",
-        options=sorted(list(set(available_villages))),
+        options=selected_so_far + [label for label in matches if label not in selected_so_far],
+        key='compare_villages',
         max_selections=4,
         help="Pilih 2-4 desa untuk perbandingan yang optimal"
     )
@@ -472,7 +526,7 @@ def display_village_comparison(filtered_df: pd.DataFrame,
         return
     
     # Get data for selected villages
-    selected_village_names = [village.split(' (')[0] for village in selected_villages]
+    selected_village_names = [label_desa(village) for village in selected_villages]
     comparison_df = filtered_df[filtered_df['nama_desa'].isin(selected_village_names)].copy()
     
     if comparison_df.empty:
@@ -517,6 +571,9 @@ def display_village_comparison(filtered_df: pd.DataFrame,
         st.info("ℹ️ Pilih minimal 1 indikator untuk perbandingan.")
         return
     
+    # Plotly is only needed once a comparison is actually drawn
+    import plotly.express as px
+    
     # Create village labels for display
     comparison_df['village_label'] = comparison_df['nama_desa'] + ' (' + comparison_df['nama_kecamatan'] + ')'
     
@@ -569,7 +626,7 @@ def display_village_comparison(filtered_df: pd.DataFrame,
                 xaxis={'tickangle': 45}
             )
             
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, width="stretch")
             
             # Summary table for quantitative
             with st.expander("📋 **Tabel Data Kuantitatif**"):
@@ -585,7 +642,7 @@ def display_village_comparison(filtered_df: pd.DataFrame,
                 
                 if summary_data:
                     summary_df = pd.DataFrame(list(summary_data.values()))
-                    st.dataframe(summary_df, use_container_width=True)
+                    show_table(summary_df, 'comparison_quantitative', width="stretch")
                     
                     # Add dedicated download section for comparison table
                     st.markdown("---")  # Separator line
@@ -636,10 +693,10 @@ def display_village_comparison(filtered_df: pd.DataFrame,
                         yaxis={'showticklabels': False}
                     )
                     
-                    st.plotly_chart(fig_qual, use_container_width=True)
+                    st.plotly_chart(fig_qual, width="stretch")
                     
                     # Show simple comparison table
-                    st.dataframe(indicator_df, use_container_width=True, height=200)
+                    show_table(indicator_df, 'comparison_qualitative', width="stretch", height=200)
                     
                     # Add dedicated download section for qualitative comparison
                     st.markdown("---")  # Separator line
@@ -656,7 +713,7 @@ def display_village_comparison(filtered_df: pd.DataFrame,
     with st.expander("📊 **Ringkasan Lengkap Perbandingan**"):
         summary_comparison = comparison_df[['village_label'] + selected_indicator_keys].copy()
         summary_comparison.columns = ['Desa'] + [available_indicators[key] for key in selected_indicator_keys]
-        st.dataframe(summary_comparison, use_container_width=True)
+        show_table(summary_comparison, 'comparison_summary', width="stretch")
         
         # Add dedicated download section for complete comparison summary
         st.markdown("---")  # Separator line
@@ -668,6 +725,317 @@ def display_village_comparison(filtered_df: pd.DataFrame,
         )
 
 
+@governed_cache('export')
+def get_all_categories_workbook(version: str) -> bytes:
+    """
+    Bytes of the all-categories workbook, kept in memory while the cache budget allows
+    
+    Args:
+        version: Dataset version; the workbook file is built once per version
+        
+    Returns:
+        bytes: XLSX file content
+    """
+    # Built once per dataset version into a cached file, streamed row by row
+    with open(build_all_categories_workbook(get_podes_data(), version), 'rb') as file:
+        return file.read()
+
+
+def display_full_export(df: pd.DataFrame):
+    """Sidebar button that downloads every category and kecamatan summary in one workbook"""
+    
+    version = get_dataset_version(df)
+    
+    st.sidebar.markdown("---")
+    st.sidebar.download_button(
+        label="📦 Download Semua Kategori",
+        data=lambda: get_all_categories_workbook(version),
+        file_name=f"Podes2024_Semua_Kategori_{version}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        help="Satu file Excel: satu sheet per kategori dan ringkasan per kecamatan",
+        width="stretch"
+    )
+
+
+@governed_cache('cross_tab')
+def get_cross_tabulation(version: str, kecamatan: str, desa: tuple, row: str, column: str) -> pd.DataFrame:
+    """
+    Cross tabulation with margins of two dimensions, cached per scope
+    
+    Args:
+        version: Version of the kecamatan, or of the dataset for the whole city; part of the cache key
+        kecamatan: Selected kecamatan or "Semua Kecamatan"
+        desa: Selected villages (empty for all)
+        row: Row dimension column
+        column: Column dimension column
+        
+    Returns:
+        pd.DataFrame: Village counts with a Total row and column
+    """
+    encoded = get_encoded_dimensions()
+    mask = scope_mask(encoded, {
+        'nama_kecamatan': [] if kecamatan == "Semua Kecamatan" else [kecamatan],
+        'nama_desa': list(desa)
+    })
+    return add_margins(pivot_counts(encoded[row], encoded[column], mask))
+
+
+@timed('section.cross_tabulation')
+def display_cross_tabulation(df: pd.DataFrame, selected_kecamatan: str, selected_indicator: str,
+                             category: str, category_indicators: dict):
+    """Display a cross tabulation of any two dimensions picked by the user"""
+    import plotly.express as px
+    
+    encoded = get_encoded_dimensions()
+    dimensions = ['nama_kecamatan'] + [
+        key for indicators in category_indicators.values() for key in indicators if key in encoded
+    ]
+    
+    def format_dimension(key):
+        return "Kecamatan" if key == 'nama_kecamatan' else get_indicator_label(key, category_indicators)
+    
+    with st.expander("🧮 **Tabulasi Silang Dua Dimensi**"):
+        default_column = selected_indicator if selected_indicator in dimensions else next(iter(category_indicators[category]))
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            row = st.selectbox("Baris:", dimensions, format_func=format_dimension, key='pivot_row')
+        with col2:
+            column = st.selectbox("Kolom:", dimensions, format_func=format_dimension, key='pivot_column',
+                                  index=dimensions.index(default_column) if default_column in dimensions else 1)
+        with col3:
+            mode = st.selectbox("Tampilkan:", list(PERCENTAGE_MODES), key='pivot_mode')
+        
+        if row == column:
+            st.info("💡 Pilih dua dimensi yang berbeda untuk baris dan kolom.")
+            return
+        
+        table = get_cross_tabulation(
+            current_scope_version(selected_kecamatan) or get_dataset_version(df), selected_kecamatan,
+            tuple(st.session_state.filters['desa']), row, column
+        )
+        if table.shape[0] <= 1:
+            st.warning("Tidak ada data untuk kombinasi dimensi ini.")
+            return
+        
+        normalize = PERCENTAGE_MODES[mode]
+        shown = table if normalize is None else percentage_table(table, normalize)
+        shown = shown.rename_axis(index=format_dimension(row), columns=format_dimension(column))
+        
+        fig = px.imshow(
+            shown.iloc[:-1, :-1],
+            text_auto=True,
+            aspect='auto',
+            color_continuous_scale='Blues',
+            title=f"{format_dimension(row)} × {format_dimension(column)}"
+        )
+        fig.update_layout(coloraxis_showscale=False, height=max(300, 40 * shown.shape[0] + 150))
+        st.plotly_chart(fig, width="stretch")
+        show_table(shown, 'cross_tabulation', width="stretch")
+
+
+QUERY_OPERATOR_LABELS = {
+    '==': "sama dengan", '!=': "tidak sama dengan", '>=': "minimal", '>': "lebih dari",
+    '<=': "maksimal", '<': "kurang dari", 'between': "antara"
+}
+
+
+def query_condition_widgets(position: int, index, dimensions: list, format_dimension) -> dict:
+    """Widgets of one query builder condition; returns the condition dict, or None while it is incomplete"""
+    col1, col2, col3, col4 = st.columns([3, 2, 4, 1])
+    with col1:
+        column = st.selectbox("Kolom:", dimensions, format_func=format_dimension, key=f'query_column_{position}')
+    
+    if index.is_numeric(column):
+        edges = index.edges[column]
+        low, high = (float(edges[0]), float(edges[-1])) if len(edges) else (0.0, 0.0)
+        with col2:
+            op = st.selectbox("Operator:", NUMERIC_OPERATORS, format_func=QUERY_OPERATOR_LABELS.get,
+                              key=f'query_op_{position}')
+        with col3:
+            if op == 'between':
+                value = st.slider("Nilai:", low, max(high, low + 1), (low, high), key=f'query_range_{position}')
+            else:
+                value = st.number_input("Nilai:", value=low, key=f'query_value_{position}')
+        condition = {'column': column, 'op': op, 'value': value}
+    else:
+        with col2:
+            op = st.selectbox("Operator:", ['in', 'not in'],
+                              format_func=lambda op: "salah satu" if op == 'in' else "bukan",
+                              key=f'query_op_{position}')
+        with col3:
+            values = st.multiselect("Nilai:", index.labels[column].tolist(), key=f'query_values_{position}')
+        if not values:
+            return None
+        condition = {'column': column, 'op': op, 'values': values}
+    
+    with col4:
+        negate = st.checkbox("NOT", key=f'query_not_{position}', help="Kecualikan desa yang memenuhi kondisi ini")
+    return {'not': condition} if negate else condition
+
+
+@timed('section.village_query')
+def display_village_query(selected_kecamatan: str, category_indicators: dict):
+    """Display a query builder that combines conditions on any columns with AND/OR/NOT"""
+    index = get_bitmap_index()
+    dimensions = ['nama_kecamatan'] + [
+        key for indicators in category_indicators.values() for key in indicators if key in index.columns
+    ]
+    
+    def format_dimension(key):
+        return "Kecamatan" if key == 'nama_kecamatan' else get_indicator_label(key, category_indicators)
+    
+    with st.expander("🔎 **Penyusun Kueri Desa**"):
+        st.caption("Gabungkan kondisi pada indikator mana pun; jumlah desa dihitung langsung dari indeks bitmap.")
+        if 'query_conditions' not in st.session_state:
+            st.session_state.query_conditions = 1
+        
+        conditions = [
+            query_condition_widgets(position, index, dimensions, format_dimension)
+            for position in range(st.session_state.query_conditions)
+        ]
+        conditions = [condition for condition in conditions if condition is not None]
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            if st.button("➕ Tambah Kondisi", key='query_add', width="stretch"):
+                st.session_state.query_conditions += 1
+                st.rerun()
+        with col2:
+            if st.button("➖ Hapus Kondisi", key='query_remove', width="stretch",
+                         disabled=st.session_state.query_conditions <= 1):
+                st.session_state.query_conditions -= 1
+                st.rerun()
+        with col3:
+            combine = st.radio("Gabungkan dengan:", ['and', 'or'], horizontal=True, key='query_combine',
+                               format_func=lambda op: "DAN (semua kondisi)" if op == 'and' else "ATAU (salah satu)")
+        with col4:
+            in_scope = st.checkbox("Hanya kecamatan terpilih", key='query_in_scope',
+                                   disabled=selected_kecamatan == "Semua Kecamatan")
+        
+        query = {combine: conditions} if conditions else None
+        if in_scope and selected_kecamatan != "Semua Kecamatan":
+            scope = {'column': 'nama_kecamatan', 'op': 'in', 'values': [selected_kecamatan]}
+            query = {'and': [scope] + ([query] if query else [])}
+        
+        start = time.perf_counter()
+        with span('query.evaluate'):
+            bitset = index.evaluate(query)
+            count = index.count(bitset)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Desa Memenuhi", f"{count:,}", help=f"Dari {index.size:,} desa")
+        with col2:
+            st.metric("Waktu Kueri", f"{elapsed_ms:.2f} ms")
+        
+        if count and st.toggle("Tampilkan daftar desa", key='query_show_rows'):
+            queried = [condition.get('not', condition)['column'] for condition in conditions]
+            columns = list(dict.fromkeys(['nama_kecamatan', 'nama_desa'] + queried))
+            rows = index.rows(bitset, columns)
+            rows = rows.rename(columns={key: format_dimension(key) for key in rows.columns if key != 'nama_desa'})
+            rows = rows.rename(columns={'nama_desa': "Desa"})
+            show_table(rows, 'village_query', width="stretch", height=400)
+            create_excel_download_button(rows, "kueri_desa", "Download Hasil Kueri")
+
+
+@timed('section.top_villages')
+def display_top_villages(selected_indicator: str, category_indicators: dict):
+    """Display the top villages of every kecamatan side by side, from the precomputed table"""
+    top_villages = get_top_villages()
+    indicators = [
+        key for indicators in category_indicators.values() for key in indicators if key in top_villages
+    ]
+    if not indicators:
+        return
+    
+    with st.expander("🏆 **Top Desa per Kecamatan**"):
+        st.caption("Desa dengan nilai tertinggi di setiap kecamatan, diambil dari tabel yang dihitung sekali "
+                   "per versi data; desa dengan nilai sama berbagi peringkat.")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            indicator = st.selectbox(
+                "Indikator:", indicators, key='top_indicator',
+                index=indicators.index(selected_indicator) if selected_indicator in indicators else 0,
+                format_func=lambda key: get_indicator_label(key, category_indicators)
+            )
+        with col2:
+            k = st.number_input("Jumlah peringkat:", min_value=1, max_value=TOP_K, value=3, key='top_k')
+        
+        label = get_indicator_label(indicator, category_indicators)
+        with span('top_villages.grid'):
+            grid = top_villages_grid(top_villages[indicator], int(k))
+        show_table(grid, 'top_villages', width="stretch")
+        
+        rows = top_villages[indicator]
+        rows = rows[rows['peringkat'] <= k].rename(columns={
+            'kode_kecamatan': 'Kode Kecamatan', 'nama_kecamatan': 'Kecamatan', 'peringkat': 'Peringkat',
+            'nama_desa': 'Desa', 'nilai': label
+        }).drop(columns='id_desa')
+        create_excel_download_button(rows, f"Top_{int(k)}_per_Kecamatan_{indicator}", f"Download Top {int(k)} {label}")
+
+
+def display_quality_report():
+    """Display the data quality report produced by the ETL validation stage"""
+    
+    report = get_quality_report()
+    
+    with st.expander("🧪 **Laporan Kualitas Data**"):
+        if not report:
+            st.info("ℹ️ Laporan kualitas data belum tersedia. Jalankan `python data/ProsesData.py` untuk membuatnya.")
+            return
+        
+        summary = report.get('summary', {})
+        duplicates = report.get('duplicates', {})
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Baris Mentah", f"{report.get('total_rows', 0):,}")
+        with col2:
+            st.metric("Desa Unik", f"{report.get('unique_desa', 0):,}")
+        with col3:
+            st.metric(
+                "Kolom Bermasalah",
+                f"{summary.get('columns_with_issues', 0)} / {summary.get('columns_checked', 0)}",
+                help="Kolom dengan nilai kosong, token non-angka, kode di luar kamus, atau nilai di luar rentang"
+            )
+        with col4:
+            st.metric(
+                "Duplikat Berbeda Isi",
+                len(duplicates.get('conflicting_ids', [])),
+                help="IDDESA yang muncul lebih dari sekali dengan isi baris yang berbeda"
+            )
+        
+        if duplicates.get('conflicting_ids'):
+            st.warning(f"⚠️ IDDESA dengan duplikat berbeda isi: {', '.join(duplicates['conflicting_ids'])}")
+        
+        if duplicates.get('cross_file_ids'):
+            st.warning(f"⚠️ {len(duplicates['cross_file_ids'])} IDDESA muncul di lebih dari satu file mentah; "
+                       f"baris dari file pertama yang dipakai.")
+        
+        if report.get('missing_columns'):
+            st.warning(f"⚠️ Kolom tidak ditemukan di data mentah: {', '.join(report['missing_columns'])}")
+        
+        quality_df = quality_report_frame(report)
+        if not quality_df.empty:
+            issue_columns = ['blank', 'invalid_token', 'out_of_domain', 'out_of_range']
+            quality_df = quality_df[quality_df[issue_columns].sum(axis=1) > 0]
+            quality_df = quality_df.rename(columns={
+                'column': 'Kolom Mentah',
+                'target': 'Kolom Bersih',
+                'kind': 'Jenis',
+                'valid': 'Valid',
+                'blank': 'Kosong',
+                'invalid_token': 'Token Tidak Valid',
+                'out_of_domain': 'Kode di Luar Kamus',
+                'out_of_range': 'Di Luar Rentang',
+                'examples': 'Contoh Nilai'
+            })
+            show_table(quality_df, 'quality_report', width="stretch")
+        
+        st.caption(f"Sumber: {report.get('source', '-')} • Dibuat: {report.get('generated_at', '-')}")
+
+
 def get_indicator_label(indicator_key: str, category_indicators: dict) -> str:
     """Helper function to get indicator label from category indicators"""
     for category, indicators in category_indicators.items():
@@ -679,13 +1047,25 @@ def get_indicator_label(indicator_key: str, category_indicators: dict) -> str:
 def main():
     """Main dashboard function"""
     
+    start_rerun()
+    start_warmup(current_dataset_version())
+    try:
+        render_dashboard()
+    finally:
+        # Rendered last so the panel includes every span of this rerun
+        render_profiling_panel()
+
+
+def render_dashboard():
+    """Render the dashboard content for the current filters"""
+    
     # Header
     st.title("📊 Dashboard Analisis Data Podes 2024")
     st.markdown("### Analisis Interaktif Potensi Desa Kota Batu")
     
     # Load data
-    with st.spinner('Memuat data...'):
-        df = load_podes_data()
+    with st.spinner('Memuat data...'), span('load_podes_data'):
+        df = get_podes_data()
     
     if df.empty:
         st.error("❌ Gagal memuat data. Pastikan file data tersedia.")
@@ -700,6 +1080,12 @@ def main():
      selected_kecamatan, 
      selected_desa) = create_sidebar_controls(df, category_indicators)
     
+    display_full_export(df)
+    
+    # Requested states feed the background warmup (modules/warmup.py)
+    if not st.session_state.filters['desa']:
+        record_view(selected_category, selected_indicator_key, selected_kecamatan)
+    
     # Get indicator label and title
     if selected_indicator_key == "Semua":
         indicator_label = f"Semua Indikator {selected_category}"
@@ -716,10 +1102,30 @@ def main():
     dynamic_title = " ".join(title_parts)
     st.header(dynamic_title)
     
-    # Filter and analyze data
-    filtered_df, kpis = filter_and_analyze_data(
-        df, selected_kecamatan, st.session_state.filters['desa'], selected_indicator_key, category_indicators, selected_category
-    )
+    # The "Semua" view of a whole kecamatan or the city is served from a
+    # precomputed bundle when one exists for this dataset version
+    bundle = None
+    if selected_indicator_key == "Semua" and not st.session_state.filters['desa']:
+        with span('view_bundle.load'):
+            bundle = get_view_bundle(selected_category, selected_kecamatan)
+    
+    # A single indicator of a whole kecamatan or the city is built once per
+    # process and shared (and prepared by the background warmup)
+    indicator_view = None
+    if selected_indicator_key != "Semua" and not st.session_state.filters['desa']:
+        with span('indicator_view.load'):
+            indicator_view = get_indicator_view(selected_category, selected_indicator_key, selected_kecamatan)
+    
+    # Filter and analyze data; a bundle already carries the KPIs, so only its rows are sliced
+    if bundle is not None:
+        filtered_df = filter_rows(df, selected_kecamatan, st.session_state.filters['desa'], get_hierarchy())
+        kpis = bundle['kpis']
+    else:
+        filtered_df, kpis = filter_and_analyze_data(
+            df, selected_kecamatan, st.session_state.filters['desa'], selected_indicator_key, category_indicators, selected_category,
+            aggregates=get_aggregates(), exact_median=st.session_state.filters['median_eksak'],
+            hierarchy=get_hierarchy()
+        )
     
     if filtered_df.empty:
         st.warning("⚠️ Tidak ada data yang sesuai dengan filter yang dipilih.")
@@ -734,9 +1140,14 @@ def main():
     
     # Main content: Dynamic Visualization Flow
     if selected_indicator_key == "Semua":
-        display_all_indicators_overview(filtered_df, selected_category, category_indicators)
+        display_all_indicators_overview(filtered_df, selected_category, category_indicators, bundle)
     else:
-        display_single_indicator_analysis(filtered_df, selected_indicator_key, indicator_label, category_indicators)
+        display_single_indicator_analysis(filtered_df, selected_indicator_key, indicator_label, category_indicators,
+                                          indicator_view)
+    
+    display_cross_tabulation(df, selected_kecamatan, selected_indicator_key, selected_category, category_indicators)
+    display_village_query(selected_kecamatan, category_indicators)
+    display_top_villages(selected_indicator_key, category_indicators)
     
     # Footer
     st.divider()
@@ -748,39 +1159,60 @@ def main():
         st.markdown(f"**📊 Total Desa Dianalisis:** {len(filtered_df)}")
     with col3:
         st.markdown(f"**🎯 Kategori:** {selected_category}")
+    
+    display_quality_report()
 
 
-def display_all_indicators_overview(df, category, category_indicators):
-    """Display overview of all indicators in a category"""
+@timed('section.all_indicators')
+def display_all_indicators_overview(df, category, category_indicators, bundle=None):
+    """Display overview of all indicators in a category, from a precomputed view bundle when given"""
+    from enhanced_viz import create_enhanced_quantitative_visualization, create_enhanced_qualitative_visualization
+    
     st.markdown("### 📊 **Ringkasan Seluruh Indikator**")
     
     indicators = category_indicators[category]
     
+    # Indicators without precomputed figures are counted together in one pass over the code matrix
+    missing = [key for key in indicators if bundle_figures(bundle, key) is None and key in df.columns]
+    summaries = {}
+    if missing and not df.empty:
+        with span('overview.summarize'):
+            matrix = get_code_matrix()
+            summaries = matrix.summarize(missing, matrix.rows_of(df))
+    
     # Split into quantitative and qualitative
     quantitative_indicators = {}
     qualitative_indicators = {}
     
     for key, label in indicators.items():
-        if key in df.columns:
-            unique_values = df[key].nunique()
-            if unique_values > 10 or df[key].dtype in ['int64', 'float64']:
-                quantitative_indicators[key] = label
-            else:
-                qualitative_indicators[key] = label
+        if bundle is not None and key in bundle['indicators']:
+            is_quantitative_key = bundle['indicators'][key]['kind'] == 'quantitative'
+        elif key in summaries:
+            is_quantitative_key = summaries[key]['kind'] == 'quantitative'
+        elif key in df.columns:
+            is_quantitative_key = is_quantitative(df[key])
+        else:
+            continue
+        if is_quantitative_key:
+            quantitative_indicators[key] = label
+        else:
+            qualitative_indicators[key] = label
     
     # Display quantitative indicators
     if quantitative_indicators:
         st.markdown("#### 📈 **Indikator Kuantitatif**")
         for key, label in quantitative_indicators.items():
             with st.expander(f"📊 {label}"):
-                create_enhanced_quantitative_visualization(df, key, label)
+                create_enhanced_quantitative_visualization(df, key, label, get_rank_tables(), bundle_figures(bundle, key),
+                                                           summaries.get(key))
     
     # Display qualitative indicators  
     if qualitative_indicators:
         st.markdown("#### 📋 **Indikator Kualitatif**")
         for key, label in qualitative_indicators.items():
             with st.expander(f"🎯 {label}"):
-                create_enhanced_qualitative_visualization(df, key, label)
+                create_enhanced_qualitative_visualization(df, key, label, bundle_figures(bundle, key),
+                                                          summaries.get(key))
     
     # Add village comparison section for all indicators view
     st.markdown("---")
@@ -792,23 +1224,23 @@ def display_all_indicators_overview(df, category, category_indicators):
     display_village_comparison(df, all_indicator_keys, category_indicators)
 
 
-def display_single_indicator_analysis(df, indicator_key, indicator_label, category_indicators):
+@timed('section.single_indicator')
+def display_single_indicator_analysis(df, indicator_key, indicator_label, category_indicators, view=None):
     """Display detailed analysis for a single indicator"""
+    from enhanced_viz import create_enhanced_quantitative_visualization, create_enhanced_qualitative_visualization
+    
     st.markdown(f"### 🎯 **Analisis: {indicator_label}**")
     
     if indicator_key not in df.columns:
         st.error(f"Kolom '{indicator_key}' tidak ditemukan dalam data.")
         return
     
-    # Determine if indicator is quantitative or qualitative
-    unique_values = df[indicator_key].nunique()
-    is_quantitative = unique_values > 10 or df[indicator_key].dtype in ['int64', 'float64']
-    
-    # Display appropriate visualization
-    if is_quantitative:
-        create_enhanced_quantitative_visualization(df, indicator_key, indicator_label)
+    # Display appropriate visualization; figures may come from the shared indicator view
+    figures = view['figures'] if view is not None else None
+    if is_quantitative(df[indicator_key]):
+        create_enhanced_quantitative_visualization(df, indicator_key, indicator_label, get_rank_tables(), figures)
     else:
-        create_enhanced_qualitative_visualization(df, indicator_key, indicator_label)
+        create_enhanced_qualitative_visualization(df, indicator_key, indicator_label, figures)
     
     # Add village comparison section
     st.markdown("---")
@@ -826,6 +1258,8 @@ def display_single_indicator_analysis(df, indicator_key, indicator_label, catego
 
 def create_quantitative_visualization(df, column, title):
     """Create visualizations for quantitative indicators"""
+    import plotly.express as px
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -902,7 +1336,7 @@ def create_quantitative_visualization(df, column, title):
             showlegend=True
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, width="stretch")
     
     with col2:
         # Histogram: Distribution analysis
@@ -926,15 +1360,14 @@ def create_quantitative_visualization(df, column, title):
             bargap=0.1
         )
         
-        st.plotly_chart(fig_hist, use_container_width=True)
+        st.plotly_chart(fig_hist, width="stretch")
     
     # Optional data table in expander
     with st.expander("📋 **Lihat Data Lengkap**"):
-        display_df = sorted_df[['nama_desa', 'nama_kecamatan', column]].copy()
-        display_df['Peringkat'] = range(1, len(display_df) + 1)
-        display_df = display_df[['Peringkat', 'nama_desa', 'nama_kecamatan', column]]
+        rankings = indicator_rankings(df, column, get_rank_tables())
+        display_df = rankings[['peringkat', 'nama_desa', 'nama_kecamatan', 'nilai']].copy()
         display_df.columns = ['Peringkat', 'Desa', 'Kecamatan', title]
-        st.dataframe(display_df, use_container_width=True, height=400)
+        show_table(display_df, 'indicator_detail', width="stretch", height=400)
         
         # Add download button for detailed ranking
         col1, col2 = st.columns([1, 4])
@@ -949,6 +1382,9 @@ def create_quantitative_visualization(df, column, title):
 
 def create_qualitative_visualization(df, column, title):
     """Create visualizations for qualitative indicators"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -977,7 +1413,7 @@ def create_qualitative_visualization(df, column, title):
             height=400
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, width="stretch")
         
         # Add summary statistics
         st.markdown("#### 📊 **Ringkasan**")
@@ -1007,7 +1443,7 @@ def create_qualitative_visualization(df, column, title):
             showlegend=False
         )
         
-        st.plotly_chart(fig_bar, use_container_width=True)
+        st.plotly_chart(fig_bar, width="stretch")
         
         # Percentage breakdown
         st.markdown("#### 🎯 **Persentase Detail**")
@@ -1026,7 +1462,7 @@ def create_qualitative_visualization(df, column, title):
             category_df = display_df[display_df[title] == category]
             if not category_df.empty:
                 st.markdown(f"**{category}** ({len(category_df)} desa)")
-                st.dataframe(category_df, use_container_width=True, height=200)
+                show_table(category_df, 'indicator_category', width="stretch", height=200)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,256 @@
+"""
+Perubahan Antar Edisi - Perbandingan Data Podes antar Tahun
+"""
+
+import streamlit as st
+import pandas as pd
+from typing import Dict, Optional, Tuple
+
+from modules.analysis import get_updated_category_indicators
+from modules.cache_governor import governed_cache
+from modules.changes import ALL_KECAMATAN, load_edition_changes
+from modules.editions import DEFAULT_EDITION, edition_version, list_editions
+from modules.profiling import span, timed, start_rerun, render_profiling_panel
+from modules.tables import show_table
+
+# Page configuration
+st.set_page_config(
+    page_title="Perubahan Antar Edisi - Podes",
+    page_icon="🔄",
+    layout="wide"
+)
+
+
+@governed_cache('edition_changes')
+def get_edition_changes(old_year: int, new_year: int,
+                        versions: Tuple[Optional[str], Optional[str]]) -> Dict[str, pd.DataFrame]:
+    """
+    Load and cache the precomputed change tables of an edition pair, shared
+    read-only by all sessions
+
+    Args:
+        old_year: Earlier edition
+        new_year: Later edition
+        versions: Edition versions; part of the cache key so new data is picked up
+
+    Returns:
+        Dict: Table name -> DataFrame
+    """
+    return load_edition_changes(old_year, new_year)
+
+
+def get_indicator_labels() -> Dict[str, str]:
+    """Readable label of every indicator column, across all categories"""
+    labels = {}
+    for indicators in get_updated_category_indicators().values():
+        labels.update(indicators)
+    return labels
+
+
+def format_indicator(key: str, labels: Dict[str, str]) -> str:
+    return labels.get(key, key.replace('_', ' ').title())
+
+
+@timed('section.count_changes')
+def display_count_changes(tables: Dict[str, pd.DataFrame], scope: str, labels: Dict[str, str],
+                          old_year: int, new_year: int):
+    """Display deltas of the count indicators per kecamatan and per village"""
+    import plotly.express as px
+
+    kecamatan_deltas = tables['kecamatan_deltas']
+    if kecamatan_deltas.empty:
+        st.info("Tidak ada indikator jumlah yang tersedia di kedua edisi.")
+        return
+
+    if scope == ALL_KECAMATAN:
+        grouped = kecamatan_deltas.groupby('indikator', sort=False)
+        scope_deltas = grouped[['nilai_lama', 'nilai_baru', 'selisih']].sum(min_count=1).assign(
+            desa_tanpa_nilai=grouped['desa_tanpa_nilai'].sum()
+        ).reset_index()
+    else:
+        scope_deltas = kecamatan_deltas[kecamatan_deltas['nama_kecamatan'] == scope]
+
+    summary = scope_deltas.assign(Indikator=scope_deltas['indikator'].map(lambda key: format_indicator(key, labels)))
+    summary = summary.rename(columns={'nilai_lama': str(old_year), 'nilai_baru': str(new_year), 'selisih': 'Selisih',
+                                      'desa_tanpa_nilai': 'Desa Tanpa Nilai'})
+
+    fig = px.bar(
+        summary.astype({'Selisih': 'float64'}),
+        x='Selisih',
+        y='Indikator',
+        orientation='h',
+        color='Selisih',
+        color_continuous_scale='RdYlGn',
+        title=f"Perubahan Jumlah {old_year} → {new_year}: {scope}"
+    )
+    fig.update_layout(yaxis_title="", coloraxis_showscale=False, height=max(350, len(summary) * 35))
+    st.plotly_chart(fig, width="stretch")
+
+    show_table(summary, 'change_summary', columns=['Indikator', str(old_year), str(new_year), 'Selisih', 'Desa Tanpa Nilai'],
+               width="stretch")
+
+    # Per-village detail for one indicator
+    indicator = st.selectbox(
+        "Rincian per desa untuk indikator:",
+        summary['indikator'].tolist(),
+        format_func=lambda key: format_indicator(key, labels),
+        key='change_count_indicator'
+    )
+    village_deltas = tables['village_deltas']
+    # Desa yang nilainya kosong di salah satu edisi ikut ditampilkan (selisih kosong)
+    detail = village_deltas[(village_deltas['indikator'] == indicator) & (village_deltas['selisih'] != 0).fillna(True)]
+    if scope != ALL_KECAMATAN:
+        detail = detail[detail['nama_kecamatan'] == scope]
+
+    if detail.empty:
+        st.success("✅ Tidak ada desa yang nilainya berubah untuk indikator ini.")
+        return
+
+    detail = detail.reindex(detail['selisih'].abs().sort_values(ascending=False).index)
+    show_table(
+        detail[['nama_desa', 'nama_kecamatan', 'nilai_lama', 'nilai_baru', 'selisih']].rename(columns={
+            'nama_desa': 'Desa', 'nama_kecamatan': 'Kecamatan',
+            'nilai_lama': str(old_year), 'nilai_baru': str(new_year), 'selisih': 'Selisih'
+        }),
+        'change_villages',
+        width="stretch"
+    )
+
+
+@timed('section.category_transitions')
+def display_category_transitions(tables: Dict[str, pd.DataFrame], scope: str, labels: Dict[str, str],
+                                 old_year: int, new_year: int):
+    """Display the transition matrix of a categorical indicator"""
+    import plotly.express as px
+
+    transitions = tables['transitions']
+    if transitions.empty:
+        st.info("Tidak ada indikator kategori yang tersedia di kedua edisi.")
+        return
+
+    indicators = sorted(transitions['indikator'].unique(), key=lambda key: format_indicator(key, labels))
+    indicator = st.selectbox(
+        "Indikator kategori:",
+        indicators,
+        format_func=lambda key: format_indicator(key, labels),
+        key='change_transition_indicator'
+    )
+    label = format_indicator(indicator, labels)
+
+    scope_transitions = transitions[(transitions['indikator'] == indicator) & (transitions['nama_kecamatan'] == scope)]
+    matrix = scope_transitions.pivot_table(index='dari', columns='ke', values='jumlah_desa', aggfunc='sum', fill_value=0)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        fig = px.imshow(
+            matrix,
+            text_auto=True,
+            color_continuous_scale='Blues',
+            labels={'x': f"Edisi {new_year}", 'y': f"Edisi {old_year}", 'color': 'Jumlah Desa'},
+            title=f"Transisi {label}: {scope}"
+        )
+        st.plotly_chart(fig, width="stretch")
+
+    with col2:
+        changed = scope_transitions[scope_transitions['dari'] != scope_transitions['ke']]
+        stayed = int(scope_transitions.loc[scope_transitions['dari'] == scope_transitions['ke'], 'jumlah_desa'].sum())
+        st.metric("🔄 Desa Berubah Kategori", int(changed['jumlah_desa'].sum()))
+        st.metric("⏸️ Desa Tetap", stayed)
+        if not changed.empty:
+            show_table(
+                changed.sort_values('jumlah_desa', ascending=False)[['dari', 'ke', 'jumlah_desa']].rename(columns={
+                    'dari': str(old_year), 'ke': str(new_year), 'jumlah_desa': 'Jumlah Desa'
+                }),
+                'transition_summary',
+                width="stretch"
+            )
+
+    village_transitions = tables['village_transitions']
+    villages = village_transitions[village_transitions['indikator'] == indicator]
+    if scope != ALL_KECAMATAN:
+        villages = villages[villages['nama_kecamatan'] == scope]
+    if not villages.empty:
+        with st.expander(f"📋 Desa yang berubah kategori ({len(villages)})"):
+            show_table(
+                villages[['nama_desa', 'nama_kecamatan', 'dari', 'ke']].rename(columns={
+                    'nama_desa': 'Desa', 'nama_kecamatan': 'Kecamatan',
+                    'dari': str(old_year), 'ke': str(new_year)
+                }),
+                'transition_villages',
+                width="stretch"
+            )
+
+
+def main():
+    """Main change analysis function"""
+
+    start_rerun()
+    try:
+        render_changes()
+    finally:
+        render_profiling_panel()
+
+
+def render_changes():
+    """Render the change analysis for the selected edition pair"""
+
+    st.title("🔄 Perubahan Antar Edisi Podes")
+    st.markdown("### Perbandingan data desa/kelurahan antar tahun pendataan")
+
+    editions = list_editions()
+    if len(editions) < 2:
+        st.info(
+            f"💡 Baru tersedia edisi {', '.join(map(str, editions))}. Tambahkan edisi lain dengan "
+            f"`python data/ProsesData.py <file mentah> --edition 2021` untuk melihat perubahannya."
+        )
+        return
+
+    st.sidebar.header("🎛️ Panel Kontrol")
+    old_year = st.sidebar.selectbox("📅 Edisi Awal:", editions[:-1], index=len(editions) - 2)
+    new_options = [year for year in editions if year > old_year]
+    new_year = st.sidebar.selectbox(
+        "📅 Edisi Akhir:",
+        new_options,
+        index=new_options.index(DEFAULT_EDITION) if DEFAULT_EDITION in new_options else len(new_options) - 1
+    )
+
+    with st.spinner('Memuat perubahan antar edisi...'), span('load_edition_changes'):
+        tables = get_edition_changes(old_year, new_year, (edition_version(old_year), edition_version(new_year)))
+
+    kecamatan_options = [ALL_KECAMATAN] + sorted(tables['kecamatan_deltas']['nama_kecamatan'].unique().tolist())
+    scope = st.sidebar.selectbox("🏘️ Kecamatan:", kecamatan_options)
+    labels = get_indicator_labels()
+
+    st.header(f"Perubahan {old_year} → {new_year}: {'Kota Batu' if scope == ALL_KECAMATAN else f'Kecamatan {scope}'}")
+
+    coverage = tables['coverage']
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("🏘️ Desa di Kedua Edisi", tables['village_deltas']['id_desa'].nunique())
+    with col2:
+        st.metric(f"➖ Hanya di {old_year}", int((coverage['status'] == f"Hanya di {old_year}").sum()))
+    with col3:
+        st.metric(f"➕ Hanya di {new_year}", int((coverage['status'] == f"Hanya di {new_year}").sum()))
+
+    tab_counts, tab_transitions, tab_coverage = st.tabs(
+        ["📈 Perubahan Jumlah", "🔄 Transisi Kategori", "🏘️ Cakupan Desa"]
+    )
+    with tab_counts:
+        display_count_changes(tables, scope, labels, old_year, new_year)
+    with tab_transitions:
+        display_category_transitions(tables, scope, labels, old_year, new_year)
+    with tab_coverage:
+        if coverage.empty:
+            st.success("✅ Semua desa ada di kedua edisi.")
+        else:
+            show_table(
+                coverage.rename(columns={'id_desa': 'ID Desa', 'nama_kecamatan': 'Kecamatan',
+                                         'nama_desa': 'Desa', 'status': 'Status'}),
+                'edition_coverage',
+                width="stretch"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Shared fixtures of the test suite
+The Kota Batu sample shipped in data/ is cleaned once per session; tests
+that need several kabupaten/kota get a copy of it under a second code, so
+kecamatan names repeat across kabupaten as in the national data
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from modules.aggregates import ID_COLUMNS  # noqa: E402
+from modules.etl import read_raw_csv, transform_raw_frame  # noqa: E402
+
+SAMPLE_CSV = os.path.join(ROOT, 'data', 'cleaned_podes_data.csv')
+
+# Kode kabupaten salinan data contoh (KOTA BATU = 3579)
+OTHER_KABUPATEN = 3501
+
+
+def numeric_columns(df: pd.DataFrame) -> list:
+    """Numeric indicator columns of a cleaned frame"""
+    return [col for col in df.columns if col not in ID_COLUMNS and pd.api.types.is_numeric_dtype(df[col])]
+
+
+@pytest.fixture(scope='session')
+def batu_frame() -> pd.DataFrame:
+    """Cleaned Kota Batu sample, sorted by id_desa"""
+    df = transform_raw_frame(read_raw_csv(SAMPLE_CSV))
+    return df.sort_values('id_desa', kind='stable', ignore_index=True)
+
+
+@pytest.fixture
+def podes_frame(batu_frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Kota Batu plus a perturbed copy under kabupaten 3501, sorted by id_desa
+
+    The copy keeps the kecamatan names, so every name belongs to two
+    kecamatan codes. One count column has blanks.
+    """
+    rng = np.random.default_rng(7)
+    other = batu_frame.copy()
+    other['id_desa'] = other['id_desa'] - (3579 - OTHER_KABUPATEN) * 1_000_000
+    for col in numeric_columns(other):
+        other[col] = other[col] + rng.integers(0, 5, len(other))
+
+    df = pd.concat([other, batu_frame], ignore_index=True).sort_values('id_desa', kind='stable', ignore_index=True)
+    df['jumlah_sd'] = df['jumlah_sd'].astype('float64')
+    df.loc[[1, len(df) - 2], 'jumlah_sd'] = np.nan
+    return df
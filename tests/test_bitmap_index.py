@@ -0,0 +1,104 @@
+"""Bitmap index queries against the same filters written in pandas"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.bitmap_index import MAX_RANGE_BINS, BitmapIndex
+
+
+@pytest.fixture(scope='module')
+def frame() -> pd.DataFrame:
+    """Villages with an exactly indexed count, a binned count (with blanks) and two categories"""
+    rng = np.random.default_rng(3)
+    size = 1000
+    population = rng.integers(0, 5000, size).astype('float64')
+    population[rng.choice(size, 40, replace=False)] = np.nan
+    status = rng.choice(['Ada', 'Tidak Ada', None], size, p=[0.6, 0.35, 0.05])
+    return pd.DataFrame({
+        'id_desa': np.arange(size) + 3579010001,
+        'nama_kecamatan': rng.choice(['BATU', 'BUMIAJI', 'JUNREJO'], size),
+        'nama_desa': [f"DESA {i}" for i in range(size)],
+        'jumlah_sd': rng.integers(0, 6, size),
+        'jumlah_penduduk': population,
+        'status_tps': pd.Series(status, dtype=object)
+    })
+
+
+@pytest.fixture(scope='module')
+def index(frame: pd.DataFrame) -> BitmapIndex:
+    return BitmapIndex(frame)
+
+
+def expected_positions(mask: pd.Series) -> np.ndarray:
+    return np.flatnonzero(mask.fillna(False).to_numpy(dtype=bool))
+
+
+def test_binned_column_uses_ranges(index: BitmapIndex):
+    assert index._exact['jumlah_sd']
+    assert not index._exact['jumlah_penduduk']
+    assert len(index.edges['jumlah_penduduk']) <= MAX_RANGE_BINS
+
+
+@pytest.mark.parametrize('column', ['jumlah_sd', 'jumlah_penduduk'])
+@pytest.mark.parametrize('op', ['==', '!=', '>=', '>', '<=', '<'])
+@pytest.mark.parametrize('value', [0, 2, 2.5, 1234, 4999, -1, 10000])
+def test_numeric_comparisons(frame, index, column, op, value):
+    values = frame[column]
+    expected = {
+        '==': values == value, '!=': (values != value) & values.notna(), '>=': values >= value,
+        '>': values > value, '<=': values <= value, '<': values < value
+    }[op]
+    result = index.evaluate({'column': column, 'op': op, 'value': value})
+    np.testing.assert_array_equal(index.positions(result), expected_positions(expected))
+    assert index.count(result) == int(expected.sum())
+
+
+@pytest.mark.parametrize('low, high', [(0, 0), (1, 3), (100, 2500), (2500, 100), (-5, 99999)])
+def test_between(frame, index, low, high):
+    for column in ('jumlah_sd', 'jumlah_penduduk'):
+        result = index.evaluate({'column': column, 'op': 'between', 'value': [low, high]})
+        expected = frame[column].between(low, high)
+        np.testing.assert_array_equal(index.positions(result), expected_positions(expected))
+
+
+def test_categorical_in_and_not_in(frame, index):
+    status = frame['status_tps']
+    result = index.evaluate({'column': 'status_tps', 'op': 'in', 'values': ['Tidak Ada']})
+    np.testing.assert_array_equal(index.positions(result), expected_positions(status == 'Tidak Ada'))
+
+    # Nilai kosong tidak termasuk "bukan X"
+    result = index.evaluate({'column': 'status_tps', 'op': 'not in', 'values': ['Tidak Ada']})
+    np.testing.assert_array_equal(index.positions(result),
+                                  expected_positions((status != 'Tidak Ada') & status.notna()))
+
+
+def test_sparse_values_match(frame, index):
+    # Satu kecamatan di antara ribuan desa bisa disimpan sebagai daftar posisi
+    for name in frame['nama_kecamatan'].unique():
+        result = index.evaluate({'column': 'nama_kecamatan', 'value': name})
+        np.testing.assert_array_equal(index.positions(result), expected_positions(frame['nama_kecamatan'] == name))
+
+
+def test_nested_query(frame, index):
+    query = {'and': [
+        {'or': [
+            {'column': 'nama_kecamatan', 'op': 'in', 'values': ['BATU', 'JUNREJO']},
+            {'column': 'jumlah_sd', 'op': '>=', 'value': 5}
+        ]},
+        {'not': {'column': 'status_tps', 'op': 'in', 'values': ['Ada']}},
+        {'column': 'jumlah_penduduk', 'op': 'between', 'value': [500, 4000]}
+    ]}
+    expected = (
+        (frame['nama_kecamatan'].isin(['BATU', 'JUNREJO']) | (frame['jumlah_sd'] >= 5))
+        & ~(frame['status_tps'] == 'Ada')
+        & frame['jumlah_penduduk'].between(500, 4000)
+    )
+    result = index.evaluate(query)
+    np.testing.assert_array_equal(index.positions(result), expected_positions(expected))
+    pd.testing.assert_frame_equal(index.rows(result), frame[expected.fillna(False).to_numpy(dtype=bool)])
+
+
+def test_unknown_column_raises(index):
+    with pytest.raises(KeyError):
+        index.evaluate({'column': 'tidak_ada', 'value': 1})
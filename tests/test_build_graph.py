@@ -0,0 +1,136 @@
+"""Build graph rebuild decisions on a two-node graph of small text files"""
+
+import os
+
+import pytest
+
+from modules.build_graph import BuildGraph, BuildNode
+
+
+def upper_case(source: str, target: str, log: str) -> None:
+    with open(source, encoding='utf-8') as file:
+        text = file.read()
+    with open(target, 'w', encoding='utf-8') as file:
+        file.write(text.upper())
+    with open(log, 'a', encoding='utf-8') as file:
+        file.write('upper\n')
+
+
+def count_words(source: str, target: str, log: str) -> None:
+    with open(source, encoding='utf-8') as file:
+        words = len(file.read().split())
+    with open(target, 'w', encoding='utf-8') as file:
+        file.write(str(words))
+    with open(log, 'a', encoding='utf-8') as file:
+        file.write('count\n')
+
+
+def fail(target: str) -> None:
+    raise RuntimeError("gagal")
+
+
+def write(path, text: str) -> None:
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+
+
+@pytest.fixture
+def files(tmp_path):
+    files = {name: str(tmp_path / name) for name in ('input.txt', 'upper.txt', 'count.txt', 'log.txt', 'state.json')}
+    write(files['input.txt'], "desa kelurahan desa")
+    return files
+
+
+def make_graph(files: dict, extra=()) -> BuildGraph:
+    return BuildGraph([
+        BuildNode('upper', upper_case,
+                  {'source': files['input.txt'], 'target': files['upper.txt'], 'log': files['log.txt']},
+                  sources=[files['input.txt']], outputs=[files['upper.txt']]),
+        BuildNode('count', count_words,
+                  {'source': files['upper.txt'], 'target': files['count.txt'], 'log': files['log.txt']},
+                  deps=['upper'], outputs=[files['count.txt']]),
+        *extra
+    ], state_path=files['state.json'])
+
+
+def built(files: dict) -> list:
+    if not os.path.exists(files['log.txt']):
+        return []
+    with open(files['log.txt'], encoding='utf-8') as file:
+        return file.read().split()
+
+
+def statuses(results: dict) -> dict:
+    return {name: result['status'] for name, result in results.items()}
+
+
+def test_first_build_then_fresh(files):
+    graph = make_graph(files)
+    results = graph.run()
+    assert statuses(results) == {'upper': 'built', 'count': 'built'}
+    assert results['upper']['changed']
+    with open(files['count.txt'], encoding='utf-8') as file:
+        assert file.read() == '3'
+
+    assert statuses(make_graph(files).run()) == {'upper': 'fresh', 'count': 'fresh'}
+    assert built(files) == ['upper', 'count']
+
+
+def test_unchanged_output_does_not_rebuild_dependents(files):
+    make_graph(files).run()
+    # Masukan berubah, tetapi keluaran huruf besarnya sama
+    write(files['input.txt'], "DESA kelurahan DESA")
+    results = make_graph(files).run()
+    assert statuses(results) == {'upper': 'built', 'count': 'fresh'}
+    assert not results['upper']['changed']
+
+    write(files['input.txt'], "desa kelurahan")
+    results = make_graph(files).run()
+    assert statuses(results) == {'upper': 'built', 'count': 'built'}
+    assert results['upper']['changed']
+    assert built(files) == ['upper', 'count', 'upper', 'upper', 'count']
+
+
+def test_changed_or_missing_output_is_rebuilt(files):
+    make_graph(files).run()
+    write(files['count.txt'], '99')
+    assert statuses(make_graph(files).run()) == {'upper': 'fresh', 'count': 'built'}
+    os.remove(files['upper.txt'])
+    results = make_graph(files).run(dry_run=True)
+    assert results['upper'] == {'status': 'stale', 'reason': "keluaran hilang"}
+    assert results['count']['status'] == 'stale'
+    assert not os.path.exists(files['upper.txt'])
+
+
+def test_dry_run_force_and_targets(files):
+    assert statuses(make_graph(files).run(dry_run=True)) == {'upper': 'stale', 'count': 'stale'}
+    assert built(files) == []
+
+    make_graph(files).run(targets=['upper'])
+    assert built(files) == ['upper']
+    assert statuses(make_graph(files).run(force=['count'])) == {'upper': 'fresh', 'count': 'built'}
+    assert statuses(make_graph(files).run(force=True, workers=2)) == {'upper': 'built', 'count': 'built'}
+    assert built(files) == ['upper', 'count', 'upper', 'count']
+
+
+def test_failure_skips_dependents(files):
+    broken = BuildNode('broken', fail, {'target': files['count.txt']}, deps=['upper'])
+    after = BuildNode('after', count_words,
+                      {'source': files['upper.txt'], 'target': files['count.txt'], 'log': files['log.txt']},
+                      deps=['broken'], outputs=[files['count.txt']])
+    results = make_graph(files, [broken, after]).run()
+    assert results['broken']['status'] == 'failed' and 'gagal' in results['broken']['error']
+    assert results['after']['status'] == 'skipped'
+    assert results['count']['status'] == 'built'
+
+
+def test_invalid_graphs(files):
+    node = BuildNode('a', upper_case, deps=['b'])
+    with pytest.raises(ValueError, match="siklus"):
+        BuildGraph([node, BuildNode('b', upper_case, deps=['a'])], files['state.json'])
+    with pytest.raises(ValueError, match="tidak ada"):
+        BuildGraph([node], files['state.json'])
+    with pytest.raises(ValueError, match="unik"):
+        BuildGraph([BuildNode('a', upper_case), BuildNode('a', upper_case)], files['state.json'])
+    with pytest.raises(KeyError):
+        make_graph(files).select(['tidak_ada'])
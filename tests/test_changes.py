@@ -0,0 +1,79 @@
+"""Edition change tables against a pandas merge of the two editions"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.changes import ALL_KECAMATAN, build_edition_changes
+from modules.podes_schema import UNDEFINED_LABEL
+
+from conftest import numeric_columns
+
+
+@pytest.fixture
+def editions(batu_frame):
+    """Earlier edition without the last village and with blanks; later one with new counts and answers"""
+    rng = np.random.default_rng(11)
+    old = batu_frame.iloc[:-1].copy()
+    old['jumlah_sd'] = old['jumlah_sd'].astype('float64')
+    old.loc[[1, 4], 'jumlah_sd'] = np.nan
+    new = batu_frame.iloc[1:].copy()
+    for col in numeric_columns(new):
+        new[col] = new[col] + rng.integers(-2, 3, len(new))
+    new['status_tps'] = rng.choice(['Ada', 'Tidak Ada'], len(new))
+    return old.reset_index(drop=True), new.reset_index(drop=True)
+
+
+def test_village_and_kecamatan_deltas(editions):
+    old, new = editions
+    tables = build_edition_changes(old, new, 2021, 2024)
+    deltas = tables['village_deltas']
+
+    columns = [col for col in numeric_columns(new) if col in old.columns]
+    merged = old.merge(new, on='id_desa', suffixes=('_lama', '_baru'))
+    expected = pd.concat([
+        pd.DataFrame({
+            'id_desa': merged['id_desa'],
+            'nama_kecamatan': merged['nama_kecamatan_baru'],
+            'indikator': col,
+            'selisih': merged[f"{col}_baru"] - merged[f"{col}_lama"]
+        }) for col in columns
+    ], ignore_index=True)
+    result = deltas.set_index(['id_desa', 'indikator'])['selisih']
+    reference = expected.set_index(['id_desa', 'indikator'])['selisih']
+    assert len(result) == len(reference)
+    result = result.loc[reference.index]
+
+    # Desa tanpa nilai lama tetap kosong, tidak menjadi angka sampah
+    assert result.isna().sum() == 2
+    np.testing.assert_array_equal(result.isna().to_numpy(), reference.isna().to_numpy())
+    np.testing.assert_array_equal(result.dropna().astype('int64').to_numpy(), reference.dropna().to_numpy())
+    assert result.dropna().abs().max() < 1_000_000
+
+    kecamatan = tables['kecamatan_deltas'].set_index(['nama_kecamatan', 'indikator'])
+    grouped = expected.groupby(['nama_kecamatan', 'indikator'])['selisih']
+    np.testing.assert_array_equal(kecamatan['selisih'].loc[grouped.sum().index].astype('float64').to_numpy(),
+                                  grouped.sum(min_count=1).to_numpy())
+    np.testing.assert_array_equal(kecamatan['desa_tanpa_nilai'].loc[grouped.sum().index].to_numpy(),
+                                  grouped.apply(lambda values: values.isna().sum()).to_numpy())
+
+
+def test_transitions_and_coverage(editions):
+    old, new = editions
+    tables = build_edition_changes(old, new, 2021, 2024)
+    merged = old.merge(new, on='id_desa', suffixes=('_lama', '_baru'))
+
+    transitions = tables['transitions']
+    transitions = transitions[(transitions['indikator'] == 'status_tps')
+                              & (transitions['nama_kecamatan'] == ALL_KECAMATAN)]
+    counts = transitions.set_index(['dari', 'ke'])['jumlah_desa']
+    expected = pd.crosstab(merged['status_tps_lama'].fillna(UNDEFINED_LABEL), merged['status_tps_baru']).stack()
+    assert counts.to_dict() == expected[expected > 0].to_dict()
+
+    changed = tables['village_transitions']
+    changed = changed[changed['indikator'] == 'status_tps']
+    assert sorted(changed['id_desa']) == sorted(merged.loc[merged['status_tps_lama'] != merged['status_tps_baru'],
+                                                           'id_desa'])
+
+    coverage = tables['coverage'].set_index('id_desa')['status']
+    assert coverage.to_dict() == {old['id_desa'].iloc[0]: "Hanya di 2021", new['id_desa'].iloc[-1]: "Hanya di 2024"}
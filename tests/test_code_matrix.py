@@ -0,0 +1,73 @@
+"""Code matrix summaries against value_counts, crosstab and pandas reductions"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.aggregates import ID_COLUMNS
+from modules.code_matrix import CodeMatrix, summarize_frame
+
+
+@pytest.fixture
+def frame(podes_frame: pd.DataFrame) -> pd.DataFrame:
+    df = podes_frame.copy()
+    df.loc[[3, 4], 'status_tps'] = None
+    return df
+
+
+def indicators(df: pd.DataFrame) -> list:
+    return [col for col in df.columns if col not in ID_COLUMNS]
+
+
+def assert_summary(summary: dict, values: pd.Series, kecamatan: pd.Series):
+    expected = values.value_counts()
+    # Urutan sama dengan value_counts, termasuk jumlah yang sama
+    assert list(summary['counts'].index) == list(expected.index)
+    np.testing.assert_array_equal(summary['counts'].to_numpy(), expected.to_numpy())
+
+    crosstab = pd.crosstab(kecamatan, values)
+    np.testing.assert_array_equal(summary['kecamatan'].to_numpy(), crosstab.to_numpy())
+    assert list(summary['kecamatan'].columns) == list(crosstab.columns)
+
+    stats = summary['stats']
+    assert stats['valid'] == values.notna().sum()
+    assert stats['nunique'] == values.nunique()
+    if pd.api.types.is_numeric_dtype(values):
+        assert stats['min'] == values.min()
+        assert stats['max'] == values.max()
+        assert stats['sum'] == pytest.approx(values.sum())
+
+
+def test_summaries_of_every_indicator(frame):
+    matrix = CodeMatrix(frame)
+    summaries = matrix.summarize(indicators(frame))
+    assert set(summaries) == set(indicators(frame))
+    for col, summary in summaries.items():
+        assert_summary(summary, frame[col], frame['nama_kecamatan'])
+        np.testing.assert_array_equal(summary['codes'] >= 0, frame[col].notna().to_numpy())
+
+
+def test_scope_rows(frame):
+    matrix = CodeMatrix(frame)
+    scope = frame[frame['nama_kecamatan'] == 'BUMIAJI']
+    rows = matrix.rows_of(scope)
+    summaries = matrix.summarize(['jumlah_sd', 'status_tps'], rows)
+    for col, summary in summaries.items():
+        assert_summary(summary, scope[col], scope['nama_kecamatan'])
+    assert matrix.rows_of(frame) is None
+
+
+def test_summarize_frame_matches_prebuilt_matrix(frame):
+    columns = ['jumlah_tk', 'status_tps', 'tidak_ada']
+    direct = summarize_frame(frame, columns)
+    prebuilt = CodeMatrix(frame).summarize(columns)
+    assert set(direct) == {'jumlah_tk', 'status_tps'}
+    for col in direct:
+        pd.testing.assert_series_equal(direct[col]['counts'], prebuilt[col]['counts'])
+        assert direct[col]['kind'] == prebuilt[col]['kind']
+
+
+def test_small_codes(frame):
+    matrix = CodeMatrix(frame)
+    assert matrix.matrix.dtype in (np.int8, np.int16)
+    assert matrix.matrix.shape == (len(frame), len(indicators(frame)))
@@ -0,0 +1,118 @@
+"""Incremental corrections against a full rebuild of the derived files"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.aggregates import build_aggregates, load_aggregates, write_aggregates
+from modules.corrections import apply_corrections, replay_corrections
+from modules.manifest import build_manifest, load_manifest, write_manifest
+from modules.ranks import build_rank_table, load_rank_table, write_rank_table
+from modules.store import partition_path, read_store, write_store
+
+from conftest import OTHER_KABUPATEN
+
+
+@pytest.fixture
+def paths(tmp_path, podes_frame):
+    """Store, manifest, aggregates and rank table of podes_frame under tmp_path"""
+    paths = {
+        'root': str(tmp_path / 'store'),
+        'manifest_path': str(tmp_path / 'manifest.json'),
+        'aggregates_path': str(tmp_path / 'aggregates.json'),
+        'log_path': str(tmp_path / 'corrections_log.jsonl'),
+        'ranks_path': str(tmp_path / 'ranks.parquet')
+    }
+    write_store(podes_frame, paths['root'])
+    df = read_store(paths['root'])
+    manifest = build_manifest(df, source=paths['root'])
+    write_manifest(manifest, paths['manifest_path'])
+    write_aggregates(build_aggregates(df), paths['aggregates_path'])
+    write_rank_table(build_rank_table(df), manifest['version'], paths['ranks_path'])
+    return paths
+
+
+def delta_frame(rows: list) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=['id_desa', 'column', 'value']).astype(str)
+
+
+def test_incremental_update_matches_rebuild(paths, podes_frame):
+    batu = podes_frame[podes_frame['id_desa'] // 1_000_000 == 3579].reset_index(drop=True)
+    other_partition = partition_path(str(OTHER_KABUPATEN), paths['root'])
+    with open(other_partition, 'rb') as file:
+        other_bytes = file.read()
+
+    answer = 'Tidak Ada' if batu.at[5, 'status_tps'] == 'Ada' else 'Ada'
+    delta = delta_frame([
+        (batu.at[0, 'id_desa'], 'jumlah_tk', 150),
+        (batu.at[5, 'id_desa'], 'status_tps', answer),
+        # Nilai yang sama tidak dihitung sebagai perubahan
+        (batu.at[7, 'id_desa'], 'jumlah_smp', int(batu.at[7, 'jumlah_smp']))
+    ])
+    summary = apply_corrections(delta, source='koreksi.csv', **paths)
+    assert summary['changes'] == 2 and summary['unchanged'] == 1
+    assert summary['partitions'] == ['3579']
+    assert summary['version_after'] != summary['version_before']
+
+    full = read_store(paths['root'])
+    row = full['id_desa'] == batu.at[0, 'id_desa']
+    assert full.loc[row, 'jumlah_tk'].item() == 150
+    with open(other_partition, 'rb') as file:
+        assert file.read() == other_bytes
+
+    manifest = load_manifest(paths['manifest_path'])
+    reference = build_manifest(full, source=paths['root'])
+    assert manifest['version'] == reference['version']
+    assert manifest['scope_versions'] == reference['scope_versions']
+    assert load_aggregates(paths['aggregates_path']) == json.loads(json.dumps(build_aggregates(full)))
+
+    ranks = load_rank_table(paths['ranks_path'], manifest['version'])
+    assert ranks is not None
+    pd.testing.assert_frame_equal(ranks.reset_index(drop=True), build_rank_table(full))
+
+
+def test_replay_restores_logged_values(paths, podes_frame):
+    id_desa = int(podes_frame.at[1, 'id_desa'])
+    assert np.isnan(podes_frame.at[1, 'jumlah_sd'])
+    delta = delta_frame([(id_desa, 'jumlah_sd', 3), (id_desa, 'jumlah_tk', 9)])
+    apply_corrections(delta, **paths)
+    apply_corrections(delta_frame([(id_desa, 'jumlah_tk', 4)]), **paths)
+
+    replayed = replay_corrections(podes_frame, paths['log_path'])
+    stored = read_store(paths['root'])
+    pd.testing.assert_frame_equal(replayed.reset_index(drop=True), stored, check_dtype=False)
+    assert replayed.loc[replayed['id_desa'] == id_desa, ['jumlah_sd', 'jumlah_tk']].values.tolist() == [[3, 4]]
+    assert replay_corrections(podes_frame, paths['log_path'] + '.tidak_ada') is podes_frame
+
+
+def snapshot(paths: dict) -> dict:
+    """Bytes of every file under the test directory"""
+    base = os.path.dirname(paths['root'])
+    files = {}
+    for folder, _, names in os.walk(base):
+        for name in names:
+            with open(os.path.join(folder, name), 'rb') as file:
+                files[os.path.relpath(os.path.join(folder, name), base)] = file.read()
+    return files
+
+
+def test_invalid_delta_writes_nothing(paths, podes_frame):
+    before = snapshot(paths)
+    delta = delta_frame([
+        (podes_frame.at[0, 'id_desa'], 'jumlah_tk', 150),
+        (podes_frame.at[0, 'id_desa'], 'jumlah_sd', 999),
+        (podes_frame.at[2, 'id_desa'], 'status_tps', 'Mungkin'),
+        (podes_frame.at[3, 'id_desa'], 'nama_kecamatan', 'BARU'),
+        ('9999999999', 'jumlah_tk', 1)
+    ])
+    with pytest.raises(ValueError) as error:
+        apply_corrections(delta, **paths)
+    message = str(error.value)
+    assert 'di luar rentang' in message and 'tidak valid' in message and 'tidak dapat dikoreksi' in message
+    assert 'kabupaten/kota 9999 tidak ada' in message
+
+    assert snapshot(paths) == before
+    assert not os.path.exists(paths['log_path'])
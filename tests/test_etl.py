@@ -0,0 +1,60 @@
+"""Raw code decoding and the quality report on edited copies of the sample CSV"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.etl import decode_raw_codes, process_raw_file
+from modules.podes_schema import RAW_BLANK, RAW_NEGATIVE, RAW_TOKEN, UNDEFINED_LABEL
+
+from conftest import SAMPLE_CSV
+
+
+@pytest.fixture
+def raw_frame() -> pd.DataFrame:
+    """Sample export as text, one row per village"""
+    raw = pd.read_csv(SAMPLE_CSV, dtype=str, keep_default_na=False)
+    return raw.drop_duplicates('IDDESA', ignore_index=True)
+
+
+def column_report(report: dict, column: str) -> dict:
+    return next(entry for entry in report['columns'] if entry['column'] == column)
+
+
+def test_decode_widens_instead_of_clipping():
+    raw = pd.Series(['3', '', ' 40000 ', 'D', '-2', '1.5', '3'], dtype='category')
+    decoded, tokens, cells = decode_raw_codes(raw, 'int8')
+    assert decoded.dtype == np.int32
+    assert decoded.tolist() == [3, RAW_BLANK, 40000, RAW_TOKEN, RAW_NEGATIVE, RAW_TOKEN, 3]
+    assert tokens == {'D': 1, '-2': 1, '1.5': 1}
+    assert cells.to_dict() == {3: 'D', 4: '-2', 5: '1.5'}
+
+    decoded, tokens, cells = decode_raw_codes(pd.Series(['1', '2'], dtype='category'), 'int8')
+    assert decoded.dtype == np.int8 and tokens == {} and cells.empty
+
+
+def test_out_of_range_values_reach_the_report(tmp_path, raw_frame):
+    raw = raw_frame.copy()
+    raw.loc[0:4, 'R701BK2'] = ['40000', '-1', '-2', 'D', '']
+    raw.loc[5:6, 'R1005C'] = ['300', '-7']
+    path = tmp_path / 'podes_uji.csv'
+    raw.to_csv(path, index=False)
+
+    _, df, report, _ = process_raw_file(str(path))
+    df = df.set_index('id_desa').loc[raw['IDDESA'].astype('int64')]
+
+    # Nilai besar tidak dipotong ke batas tipe; nilai tidak sah menjadi kosong
+    assert df['jumlah_tk'].iloc[0] == 40000
+    assert df['jumlah_tk'].iloc[1:5].isna().all()
+    expected = pd.to_numeric(raw.loc[5:, 'R701BK2'], errors='coerce').to_numpy()
+    np.testing.assert_array_equal(df['jumlah_tk'].iloc[5:].to_numpy(dtype='float64'), expected)
+
+    tk = column_report(report, 'R701BK2')
+    assert (tk['blank'], tk['invalid_token'], tk['out_of_range']) == (1, 1, 3)
+    assert tk['valid'] == len(raw) - 5
+    assert tk['examples'] == {'40000': 1, '-1': 1, '-2': 1, 'D': 1}
+
+    signal = column_report(report, 'R1005C')
+    assert signal['out_of_domain'] == 2
+    assert signal['examples'] == {'300': 1, '-7': 1}
+    assert (df['kekuatan_sinyal'].iloc[5:7] == UNDEFINED_LABEL).all()
@@ -0,0 +1,73 @@
+"""Hierarchy rollups against groupby on the id_desa code prefixes"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.hierarchy import LEVELS, AdminHierarchy
+
+from conftest import numeric_columns
+
+
+@pytest.fixture
+def hierarchy(podes_frame: pd.DataFrame) -> AdminHierarchy:
+    # Urutan acak: pohon harus mengurutkan sendiri menurut id_desa
+    return AdminHierarchy(podes_frame.sample(frac=1, random_state=0))
+
+
+def level_keys(df: pd.DataFrame, digits: int) -> pd.Series:
+    return (df['id_desa'] // 10 ** (10 - digits)).astype(str).str.zfill(digits)
+
+
+@pytest.mark.parametrize('level, digits', LEVELS)
+def test_rollups_match_groupby(podes_frame, hierarchy, level, digits):
+    columns = numeric_columns(podes_frame)
+    grouped = podes_frame.groupby(level_keys(podes_frame, digits))[columns]
+    codes = [node.code for node in hierarchy.nodes.values() if node.level == level]
+    assert sorted(codes) == sorted(grouped.groups)
+
+    # Nilai kosong dihitung 0 pada jumlah, diabaikan pada min/maks
+    np.testing.assert_allclose(hierarchy.rollups.loc[codes, columns].to_numpy(), grouped.sum().loc[codes].to_numpy())
+    np.testing.assert_array_equal(hierarchy.rollups.loc[codes, 'jumlah_desa'].to_numpy(),
+                                  grouped.size().loc[codes].to_numpy())
+    np.testing.assert_allclose(hierarchy.minimums.loc[codes].to_numpy(), grouped.min().loc[codes].to_numpy())
+    np.testing.assert_allclose(hierarchy.maximums.loc[codes].to_numpy(), grouped.max().loc[codes].to_numpy())
+
+
+def test_rows_and_answer_counts(podes_frame, hierarchy):
+    keys = level_keys(podes_frame, 7)
+    for code in keys.unique():
+        expected = podes_frame[keys == code]
+        pd.testing.assert_frame_equal(hierarchy.rows(code).reset_index(drop=True), expected.reset_index(drop=True))
+        counts = hierarchy.answer_counts(code, 'status_tps')
+        assert counts.to_dict() == expected['status_tps'].value_counts().to_dict()
+
+    node = hierarchy.node(keys.iloc[0])
+    assert [parent.level for parent in hierarchy.path(node.code)] == ['provinsi', 'kabupaten', 'kecamatan']
+
+
+def test_indicator_rollup(podes_frame, hierarchy):
+    code = str(podes_frame['id_desa'].iloc[-1] // 1000)
+    rows = podes_frame[podes_frame['id_desa'] // 1000 == int(code)]
+    summary = hierarchy.indicator_rollup(code, 'jumlah_sd')
+    assert summary['total'] == pytest.approx(rows['jumlah_sd'].sum())
+    assert summary['min_value'] == rows['jumlah_sd'].min()
+    assert summary['max_value'] == rows['jumlah_sd'].max()
+    assert hierarchy.indicator_rollup(code, 'tidak_ada') == {}
+
+
+def test_scope_code(batu_frame, podes_frame, hierarchy):
+    # Nama kecamatan yang muncul di dua kabupaten tidak menunjuk satu wilayah
+    assert hierarchy.scope_code('BATU') is None
+    assert hierarchy.base == '35'
+    assert [node.level for node in hierarchy.descendants('35', 'kabupaten')] == ['kabupaten', 'kabupaten']
+
+    batu = AdminHierarchy(batu_frame)
+    assert batu.base == '3579'
+    assert batu.scope_code("Semua Kecamatan") == '3579'
+    row = batu_frame.iloc[0]
+    kecamatan = batu.scope_code(row['nama_kecamatan'])
+    assert kecamatan == str(row['id_desa'] // 1000)
+    assert batu.scope_code(row['nama_kecamatan'], [row['nama_desa']]) == str(row['id_desa'])
+    assert batu.scope_code(row['nama_kecamatan'], list(batu_frame['nama_desa'].iloc[:2])) is None
+    assert len(batu.descendants(kecamatan, 'desa')) == len(batu.rows(kecamatan))
@@ -0,0 +1,57 @@
+"""Cross tabulations from integer codes against pd.crosstab"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.pivot import (
+    TOTAL_LABEL, add_margins, cross_tabulate, encode_frame, percentage_table, pivot_counts, scope_mask
+)
+
+
+@pytest.fixture
+def frame(podes_frame: pd.DataFrame) -> pd.DataFrame:
+    df = podes_frame.copy()
+    # Jawaban kosong tidak ikut dihitung, seperti di pd.crosstab
+    df.loc[[0, 5], 'status_tps'] = None
+    return df
+
+
+def test_cross_tabulate_matches_crosstab(frame):
+    for row, column in [('nama_kecamatan', 'status_tps'), ('status_tps', 'kekuatan_sinyal'),
+                        ('nama_kecamatan', 'jumlah_sd')]:
+        expected = pd.crosstab(frame[row], frame[column])
+        result = cross_tabulate(frame, row, column)
+        np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+        assert list(result.index) == list(expected.index)
+        assert list(result.columns) == list(expected.columns)
+
+
+def test_margins_and_percentages(frame):
+    counts = cross_tabulate(frame, 'nama_kecamatan', 'status_tps')
+    table = add_margins(counts)
+    expected = pd.crosstab(frame['nama_kecamatan'], frame['status_tps'], margins=True, margins_name=TOTAL_LABEL)
+    np.testing.assert_array_equal(table.to_numpy(), expected.to_numpy())
+
+    for normalize in ('index', 'columns', 'all'):
+        expected = pd.crosstab(frame['nama_kecamatan'], frame['status_tps'], margins=True,
+                               margins_name=TOTAL_LABEL, normalize=normalize) * 100
+        result = percentage_table(table, normalize)
+        if normalize == 'index':
+            result = result.iloc[:, :-1]
+        elif normalize == 'columns':
+            result = result.iloc[:-1, :]
+        np.testing.assert_allclose(result.to_numpy(), expected.round(1).to_numpy(), atol=0.051)
+
+
+def test_scope_mask_filters_before_counting(frame):
+    encoded = encode_frame(frame)
+    filters = {'nama_kecamatan': ['BATU', 'JUNREJO'], 'kekuatan_sinyal': [], 'status_tps': ['Ada', 'Tidak Dikenal']}
+    mask = scope_mask(encoded, filters)
+    expected_mask = frame['nama_kecamatan'].isin(['BATU', 'JUNREJO']) & frame['status_tps'].isin(['Ada'])
+    np.testing.assert_array_equal(mask, expected_mask.to_numpy())
+    assert scope_mask(encoded, {'nama_kecamatan': []}) is None
+
+    result = pivot_counts(encoded['nama_kecamatan'], encoded['kekuatan_sinyal'], mask)
+    expected = pd.crosstab(frame.loc[expected_mask, 'nama_kecamatan'], frame.loc[expected_mask, 'kekuatan_sinyal'])
+    np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
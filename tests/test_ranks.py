@@ -0,0 +1,31 @@
+"""Rank table and top villages against groupby ranks per kecamatan code"""
+
+import numpy as np
+import pandas as pd
+
+from modules.ranks import build_rank_table, build_top_villages
+
+from conftest import numeric_columns
+
+
+def test_ranks_match_groupby_rank(podes_frame):
+    table = build_rank_table(podes_frame).set_index(['id_desa', 'indikator'])
+    long = podes_frame.melt(id_vars=['id_desa'], value_vars=numeric_columns(podes_frame),
+                            var_name='indikator', value_name='nilai').dropna(subset=['nilai'])
+    # Kecamatan bernama sama di dua kabupaten diperingkat terpisah
+    kecamatan = long['id_desa'] // 1000
+    for scope, keys in (('kota', [long['indikator']]), ('kecamatan', [long['indikator'], kecamatan])):
+        expected = long.groupby(keys)['nilai'].rank(method='min', ascending=False)
+        expected.index = pd.MultiIndex.from_frame(long[['id_desa', 'indikator']])
+        assert len(table) == len(expected)
+        np.testing.assert_array_equal(table[f'peringkat_{scope}'].loc[expected.index].to_numpy(), expected.to_numpy())
+
+
+def test_top_villages_equal_rank_rows(podes_frame):
+    k = 3
+    top = build_top_villages(podes_frame, k)
+    table = build_rank_table(podes_frame)
+    expected = table[table['peringkat_kecamatan'] <= k]
+    assert sorted(zip(top['id_desa'], top['indikator'], top['peringkat'])) == sorted(
+        zip(expected['id_desa'], expected['indikator'], expected['peringkat_kecamatan']))
+    assert (top['kode_kecamatan'] == (top['id_desa'] // 1000).astype(str).str.zfill(7)).all()
@@ -0,0 +1,71 @@
+"""Quantile sketches against numpy/pandas quantiles"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.sketches import DEFAULT_K, QuantileSketch
+
+
+def rank_error(values: np.ndarray, estimate: float, q: float) -> float:
+    """Distance between q and the fraction of values at or below the estimate"""
+    ordered = np.sort(values)
+    low = np.searchsorted(ordered, estimate, side='left') / len(ordered)
+    high = np.searchsorted(ordered, estimate, side='right') / len(ordered)
+    return 0.0 if low <= q <= high else min(abs(q - low), abs(q - high))
+
+
+@pytest.mark.parametrize('q', [0.1, 0.25, 0.5, 0.75, 0.9])
+def test_small_sketch_is_exact(q):
+    values = pd.Series([5, 1, 9, 3, np.nan, 7, 2, 2])
+    sketch = QuantileSketch.from_values(values.to_numpy())
+    assert sketch.is_exact
+    assert sketch.count == 7
+    assert sketch.quantile(q) == pytest.approx(values.quantile(q))
+
+
+def test_extremes_and_empty():
+    sketch = QuantileSketch.from_values(np.arange(1, 101, dtype='float64'))
+    assert sketch.quantile(0) == 1
+    assert sketch.quantile(1) == 100
+    assert math.isnan(QuantileSketch.from_values([]).quantile(0.5))
+
+
+@pytest.mark.parametrize('q', [0.05, 0.25, 0.5, 0.75, 0.95])
+def test_large_sketch_rank_error(q):
+    values = np.random.default_rng(0).lognormal(3, 1, 100_000)
+    sketch = QuantileSketch.from_values(values)
+    assert not sketch.is_exact
+    assert sketch.count == len(values)
+    # Kesalahan peringkat sekitar 1.7 / k
+    assert rank_error(values, sketch.quantile(q), q) < 2.5 / DEFAULT_K
+
+
+def test_merge_matches_union():
+    rng = np.random.default_rng(1)
+    parts = [rng.integers(0, 1000, size).astype('float64') for size in (50, 20_000, 30_000)]
+    merged = QuantileSketch.from_values(parts[0])
+    for part in parts[1:]:
+        merged = merged.merge(QuantileSketch.from_values(part))
+    union = np.concatenate(parts)
+    assert merged.count == len(union)
+    assert merged.min == union.min() and merged.max == union.max()
+    for q in (0.1, 0.5, 0.9):
+        assert rank_error(union, merged.quantile(q), q) < 2.5 / DEFAULT_K
+
+
+def test_merge_of_exact_sketches_stays_exact():
+    left, right = np.array([1.0, 4.0, 9.0]), np.array([2.0, 3.0])
+    merged = QuantileSketch.from_values(left).merge(QuantileSketch.from_values(right))
+    assert merged.is_exact
+    assert merged.quantile(0.5) == pytest.approx(np.quantile(np.concatenate([left, right]), 0.5))
+
+
+def test_dict_round_trip():
+    sketch = QuantileSketch.from_values(np.random.default_rng(2).normal(size=5000))
+    restored = QuantileSketch.from_dict(sketch.to_dict())
+    assert restored.count == sketch.count
+    for q in (0.1, 0.5, 0.9):
+        assert restored.quantile(q) == sketch.quantile(q)
@@ -0,0 +1 @@
+# Command-line tools for Podes 2024 Dashboard
@@ -0,0 +1,81 @@
+"""
+Batch report generator for Podes 2024 dashboard
+One self-contained HTML report and one multi-sheet Excel workbook per
+kecamatan (or per kabupaten/kota), built in parallel; scopes whose data did
+not change since the last run are skipped
+
+Usage:
+    python -m tools.batch_report [--scope kecamatan|kabupaten] [--output reports] [--workers N] [--force]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any
+
+# Proses batch tidak boleh menimpa file metrik milik server dashboard
+os.environ.setdefault('PODES_METRICS_INTERVAL', '0')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from modules.data_loader import read_podes_data
+from modules.reports import (
+    REPORTS_DIR, SCOPES, build_scope_report, load_report_index, scope_hash, scope_slug,
+    split_scopes, write_report_index
+)
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Buat paket laporan HTML + Excel per wilayah")
+    parser.add_argument('--scope', choices=sorted(SCOPES), default='kecamatan',
+                        help="Cakupan laporan: per kecamatan atau per kabupaten/kota")
+    parser.add_argument('--output', default=REPORTS_DIR, help="Direktori hasil laporan")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Jumlah proses paralel (default: jumlah CPU)")
+    parser.add_argument('--force', action='store_true',
+                        help="Buat ulang semua laporan walaupun datanya tidak berubah")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT_DIR)
+    start = time.perf_counter()
+    df = read_podes_data()
+    scopes = split_scopes(df, args.scope)
+    print(f"-> {len(df)} desa, {len(scopes)} wilayah ({args.scope}).")
+
+    index = load_report_index(args.output)
+    pending = []
+    for label, part in scopes:
+        entry = index.get(scope_slug(label), {})
+        unchanged = (
+            entry.get('hash') == scope_hash(part)
+            and os.path.exists(os.path.join(args.output, entry.get('html', '')))
+            and os.path.exists(os.path.join(args.output, entry.get('xlsx', '')))
+        )
+        if unchanged and not args.force:
+            print(f"   {label}: tidak berubah, dilewati")
+        else:
+            pending.append((label, part))
+
+    if pending:
+        workers = min(args.workers or os.cpu_count() or 1, len(pending))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(build_scope_report, label, part, args.output) for label, part in pending]
+            for done, future in enumerate(as_completed(futures), start=1):
+                entry = future.result()
+                index[scope_slug(entry['label'])] = entry
+                # Indeks ditulis setiap laporan selesai agar hasil tidak hilang bila proses terhenti
+                write_report_index(index, args.output)
+                print(f"   [{done}/{len(pending)}] {entry['label']}: {entry['html']}, {entry['xlsx']} "
+                      f"({entry['seconds']:.2f} detik)")
+
+    elapsed = time.perf_counter() - start
+    print(f"-> {len(pending)} laporan dibuat, {len(scopes) - len(pending)} dilewati "
+          f"dalam {elapsed:.2f} detik. Hasil di '{args.output}'.")
+    return {'generated': len(pending), 'skipped': len(scopes) - len(pending), 'seconds': elapsed}
+
+
+if __name__ == '__main__':
+    main()
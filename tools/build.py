@@ -0,0 +1,290 @@
+"""
+Incremental builder for the Podes 2024 dashboard data
+Brings every derived artifact of the default edition up to date: columnar
+store, quality report and manifest, per-kecamatan aggregates, rank table,
+shared Arrow dataset, view bundles per kecamatan scope and the edition
+change tables. Each artifact is rebuilt only when one of its inputs (raw
+files, corrections log, recipe code or an upstream artifact) changed, so a
+correction rebuilds only the bundles of the kecamatan it touched; independent
+artifacts are built in parallel, and the record of the last build is kept in
+data/cache/build_state.json
+
+Usage:
+    python -m tools.build [inputs ...] [--workers N] [--force] [--dry-run] [--target NODE ...]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# Proses batch tidak boleh menimpa file metrik milik server dashboard
+os.environ.setdefault('PODES_METRICS_INTERVAL', '0')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from modules.analysis import get_updated_category_indicators
+from modules.build_graph import BUILD_STATE_PATH, BuildGraph, BuildNode
+from modules.bundles import ALL_KECAMATAN, BUNDLES_DIR, bundle_dir, bundle_version
+from modules.changes import CHANGES_CACHE_DIR
+from modules.corrections import CORRECTIONS_LOG_PATH
+from modules.editions import DEFAULT_EDITION, edition_paths, list_editions
+from modules.manifest import MANIFEST_PATH, kecamatan_versions, load_manifest, scope_version
+from modules.aggregates import AGGREGATES_PATH
+from modules.ranks import RANKS_PATH
+from modules.reports import scope_slug
+from modules.shared_store import SHARED_DIR, shared_dataset_path
+from modules.store import STORE_DIR
+from modules.validation import QUALITY_REPORT_PATH
+
+
+DEFAULT_INPUTS = ['data/cleaned_podes_data.csv']
+
+# Kode resep tiap artefak; mengubah file ini membangun ulang artefaknya
+DATASET_CODE = ['modules/etl.py', 'modules/podes_schema.py', 'modules/validation.py', 'modules/store.py',
+                'modules/corrections.py', 'modules/manifest.py']
+READ_CODE = ['modules/data_loader.py', 'modules/store.py']
+BUNDLE_CODE = ['modules/bundles.py', 'modules/code_matrix.py', 'modules/pivot.py', 'modules/hierarchy.py',
+               'modules/analysis.py', 'modules/ranks.py', 'enhanced_viz.py']
+
+
+def _version() -> Optional[str]:
+    return load_manifest(MANIFEST_PATH).get('version')
+
+
+# --- Aksi: fungsi tingkat modul agar dapat dijalankan di proses pekerja ---
+
+def build_dataset(inputs: List[str]) -> None:
+    """Ingest the raw files, replay the logged corrections, write the store, report and manifest"""
+    from modules.corrections import replay_corrections
+    from modules.etl import ingest_files
+    from modules.manifest import build_manifest, write_manifest
+    from modules.store import write_store
+    from modules.validation import write_quality_report
+
+    df, report = ingest_files(inputs)
+    # Koreksi yang sudah diterapkan tidak boleh hilang saat penyimpanan dibangun ulang dari file mentah
+    df = replay_corrections(df, CORRECTIONS_LOG_PATH)
+    write_quality_report(report, QUALITY_REPORT_PATH)
+    write_store(df, STORE_DIR)
+    write_manifest(build_manifest(df, source=STORE_DIR), MANIFEST_PATH)
+
+
+def build_aggregates_file() -> None:
+    """Per-kecamatan aggregates of the store"""
+    from modules.aggregates import build_aggregates, write_aggregates
+    from modules.data_loader import read_podes_data
+
+    write_aggregates(build_aggregates(read_podes_data()), AGGREGATES_PATH)
+
+
+def build_ranks_file() -> None:
+    """Rank table of the store, tagged with the manifest version"""
+    from modules.data_loader import read_podes_data
+    from modules.ranks import build_rank_table, write_rank_table
+
+    write_rank_table(build_rank_table(read_podes_data()), _version(), RANKS_PATH)
+
+
+def build_shared_dataset() -> None:
+    """Arrow file mapped by the dashboard worker processes"""
+    from modules.data_loader import read_podes_data
+    from modules.shared_store import publish_shared_dataset
+
+    publish_shared_dataset(read_podes_data(), _version(), SHARED_DIR)
+
+
+def check_scope(kecamatan: str) -> None:
+    """Fail when the kecamatan is no longer part of the published dataset"""
+    if kecamatan not in kecamatan_versions(load_manifest(MANIFEST_PATH)):
+        raise KeyError(f"Kecamatan '{kecamatan}' tidak ada di manifest")
+
+
+def build_scope_bundles(kecamatan: str) -> None:
+    """View bundles of every category for one kecamatan scope"""
+    from modules.bundles import build_view_bundles
+    from modules.data_loader import read_podes_data
+    from modules.ranks import load_rank_table, split_rank_table
+
+    manifest = load_manifest(MANIFEST_PATH)
+    df = read_podes_data()
+    rank_tables = None
+    if kecamatan == ALL_KECAMATAN:
+        table = load_rank_table(RANKS_PATH, manifest['version'])
+        rank_tables = split_rank_table(table) if table is not None else None
+    else:
+        # Peringkat dalam kecamatan cukup dihitung dari desanya sendiri, sehingga bundel ini
+        # tidak bergantung pada tabel peringkat seluruh kota
+        df = df[df['nama_kecamatan'] == kecamatan]
+    build_view_bundles(df, manifest['version'], BUNDLES_DIR, rank_tables,
+                       scope_versions=kecamatan_versions(manifest), scopes=[kecamatan])
+
+
+def prune_bundles() -> None:
+    """Remove the bundles of older dataset and kecamatan versions"""
+    from modules.bundles import prune_view_bundles
+
+    manifest = load_manifest(MANIFEST_PATH)
+    prune_view_bundles(manifest.get('version'), BUNDLES_DIR, kecamatan_versions(manifest))
+
+
+def build_changes(old_year: int, new_year: int) -> None:
+    """Change tables of an edition pair"""
+    from modules.changes import precompute_edition_changes
+
+    precompute_edition_changes(old_year, new_year, CHANGES_CACHE_DIR)
+
+
+# --- Graf ---
+
+def build_nodes(inputs: List[str]) -> List[BuildNode]:
+    """
+    Nodes of the dashboard data build
+
+    In-memory indexes (hierarchy, search, bitmap index, code matrix) are not
+    nodes: each dashboard process builds them from the store at load time.
+    Kecamatan bundles depend on a per-kecamatan scope node fingerprinted by
+    the manifest scope version, so they rebuild only when their rows change;
+    the kecamatan list is read from the current manifest.
+
+    Args:
+        inputs: Raw CSV files of the default edition
+
+    Returns:
+        List[BuildNode]: Nodes in declaration order
+    """
+    categories = list(get_updated_category_indicators())
+    scope_versions = kecamatan_versions(load_manifest(MANIFEST_PATH))
+
+    def scope_outputs(kecamatan: str):
+        def outputs():
+            manifest = load_manifest(MANIFEST_PATH)
+            key = bundle_version(manifest.get('version') or 'unknown', kecamatan, kecamatan_versions(manifest))
+            return [bundle_dir(key, category, kecamatan) for category in categories]
+        return outputs
+
+    nodes = [
+        BuildNode(
+            'dataset', build_dataset, {'inputs': inputs},
+            sources=inputs + [CORRECTIONS_LOG_PATH],
+            code=DATASET_CODE,
+            outputs=[STORE_DIR, QUALITY_REPORT_PATH, MANIFEST_PATH],
+            # Laporan kualitas dan manifest memuat waktu build; isi data diwakili partisi penyimpanan
+            fingerprint=lambda hasher: hasher.paths([STORE_DIR])
+        ),
+        BuildNode('aggregates', build_aggregates_file, deps=['dataset'],
+                  code=READ_CODE + ['modules/aggregates.py', 'modules/sketches.py'], outputs=[AGGREGATES_PATH]),
+        BuildNode('ranks', build_ranks_file, deps=['dataset'],
+                  code=READ_CODE + ['modules/ranks.py'], outputs=[RANKS_PATH]),
+        BuildNode('shared', build_shared_dataset, deps=['dataset'],
+                  code=READ_CODE + ['modules/shared_store.py'],
+                  outputs=lambda: [shared_dataset_path(_version() or 'unknown', SHARED_DIR)])
+    ]
+
+    bundle_nodes = []
+    for kecamatan in [ALL_KECAMATAN] + sorted(scope_versions):
+        deps = ['ranks']
+        if kecamatan != ALL_KECAMATAN:
+            deps = [f"scope:{scope_slug(kecamatan)}"]
+            nodes.append(BuildNode(
+                deps[0], check_scope, {'kecamatan': kecamatan}, deps=['dataset'],
+                code=['modules/manifest.py'],
+                fingerprint=lambda hasher, kecamatan=kecamatan: scope_version(load_manifest(MANIFEST_PATH), kecamatan)
+            ))
+        name = f"bundles:{scope_slug(kecamatan)}"
+        bundle_nodes.append(name)
+        nodes.append(BuildNode(
+            name, build_scope_bundles, {'kecamatan': kecamatan}, deps=deps,
+            code=READ_CODE + BUNDLE_CODE,
+            outputs=scope_outputs(kecamatan),
+            # bundle.json memuat waktu build; tabel figur mewakili isi bundel
+            fingerprint=lambda hasher, outputs=scope_outputs(kecamatan): hasher.paths([
+                os.path.join(path, '*.parquet') for path in outputs()
+            ])
+        ))
+    nodes.append(BuildNode('bundles_prune', prune_bundles, deps=bundle_nodes, code=['modules/bundles.py']))
+
+    for other in list_editions():
+        if other == DEFAULT_EDITION:
+            continue
+        old_year, new_year = sorted((other, DEFAULT_EDITION))
+        nodes.append(BuildNode(
+            f"changes:{old_year}-{new_year}", build_changes, {'old_year': old_year, 'new_year': new_year},
+            deps=['dataset'],
+            sources=[edition_paths(other)['store']],
+            code=['modules/changes.py', 'modules/editions.py'],
+            outputs=[os.path.join(CHANGES_CACHE_DIR, f"{old_year}-{new_year}")]
+        ))
+    return nodes
+
+
+STATUS_LABELS = {
+    'fresh': "mutakhir",
+    'built': "dibangun",
+    'stale': "perlu dibangun",
+    'failed': "GAGAL",
+    'skipped': "dilewati"
+}
+
+
+def report_node(name: str, result: Dict[str, Any]) -> None:
+    status = result['status']
+    if status == 'fresh':
+        return
+    detail = ''
+    if status == 'built':
+        detail = f" ({result['seconds']:.2f} detik{'' if result['changed'] else ', hasil sama'})"
+    elif result.get('reason') or result.get('error'):
+        detail = f" ({result.get('reason') or result.get('error')})"
+    print(f"   {name}: {STATUS_LABELS[status]}{detail}")
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Perbarui semua data turunan dashboard yang sudah usang")
+    parser.add_argument('inputs', nargs='*', default=DEFAULT_INPUTS,
+                        help="File CSV mentah edisi utama (boleh pola glob, mis. 'data/raw/*.csv')")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Jumlah proses paralel (default: jumlah CPU)")
+    parser.add_argument('--force', action='store_true', help="Bangun ulang semua artefak")
+    parser.add_argument('--dry-run', action='store_true', help="Hanya tampilkan artefak yang usang")
+    parser.add_argument('--target', nargs='+', default=None,
+                        help="Node yang dibangun beserta semua dependensinya (mis. ranks)")
+    parser.add_argument('--state', default=BUILD_STATE_PATH, help="File catatan build terakhir")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT_DIR)
+    inputs = sorted({path for pattern in args.inputs for path in (glob.glob(pattern) or [pattern])})
+    missing = [path for path in inputs if not os.path.exists(path)]
+    if missing:
+        print(f"ERROR: File '{missing[0]}' tidak ditemukan.")
+        return {'results': {}, 'seconds': 0.0}
+
+    workers = args.workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = {}
+    if not args.dry_run:
+        # Daftar kecamatan (node bundel per kecamatan) dibaca dari manifest, jadi dataset dibangun lebih dulu
+        results = BuildGraph(build_nodes(inputs), args.state).run(
+            ['dataset'], workers=workers, force=args.force, progress=report_node)
+    graph = BuildGraph(build_nodes(inputs), args.state)
+    selected = graph.select(args.target)
+    print(f"-> {len(selected)} node build, {workers} proses paralel.")
+    force = set(selected) - set(results) if args.force else False
+    # Hasil tahap dataset dipertahankan; pada tahap ini dataset sudah mutakhir
+    results = {**graph.run(args.target, workers=workers, force=force, dry_run=args.dry_run,
+                           progress=report_node), **results}
+    seconds = time.perf_counter() - start
+
+    counts = {status: sum(result['status'] == status for result in results.values()) for status in STATUS_LABELS}
+    print("-> " + ", ".join(f"{count} {STATUS_LABELS[status]}" for status, count in counts.items() if count)
+          + f" dalam {seconds:.2f} detik.")
+    return {'results': results, 'seconds': seconds}
+
+
+if __name__ == '__main__':
+    summary = main()
+    failed = any(result['status'] in ('failed', 'skipped') for result in summary['results'].values())
+    sys.exit(1 if failed or not summary['results'] else 0)
@@ -0,0 +1,73 @@
+"""
+View bundle builder for Podes 2024 dashboard
+Precomputes the KPIs, figures and tables of the "Semua" indicator view for
+every (category, kecamatan) pair of the published dataset version, in
+parallel per category; bundles of older versions are removed
+
+Usage:
+    python -m tools.build_bundles [--output data/cache/bundles] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any
+
+# Proses batch tidak boleh menimpa file metrik milik server dashboard
+os.environ.setdefault('PODES_METRICS_INTERVAL', '0')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from modules.analysis import get_updated_category_indicators
+from modules.bundles import BUNDLES_DIR, build_view_bundles, bundle_scopes, prune_view_bundles
+from modules.data_loader import read_podes_data
+from modules.manifest import MANIFEST_PATH, load_manifest
+from modules.ranks import RANKS_PATH, build_rank_table, load_rank_table, split_rank_table
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Hitung bundel tampilan dashboard per kategori dan kecamatan")
+    parser.add_argument('--output', default=BUNDLES_DIR, help="Direktori bundel tampilan")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Jumlah proses paralel (default: jumlah CPU)")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT_DIR)
+    start = time.perf_counter()
+    manifest = load_manifest(MANIFEST_PATH)
+    version, scope_versions = manifest.get('version'), manifest.get('scope_versions')
+    if not version:
+        print(f"ERROR: Manifest '{MANIFEST_PATH}' tidak ditemukan. Jalankan `python data/ProsesData.py` dahulu.")
+        return {'written': 0, 'seconds': 0.0}
+
+    df = read_podes_data()
+    table = load_rank_table(RANKS_PATH, version)
+    rank_tables = split_rank_table(table if table is not None else build_rank_table(df))
+    categories = list(get_updated_category_indicators())
+    print(f"-> Versi data {version}: {len(categories)} kategori x {len(bundle_scopes(df))} cakupan.")
+
+    written = 0
+    workers = min(args.workers or os.cpu_count() or 1, len(categories))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(build_view_bundles, df, version, args.output, rank_tables, [category],
+                            scope_versions): category
+            for category in categories
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            count = future.result()
+            written += count
+            print(f"   [{done}/{len(categories)}] {futures[future]}: {count} bundel")
+
+    removed = prune_view_bundles(version, args.output, scope_versions)
+    elapsed = time.perf_counter() - start
+    print(f"-> {written} bundel ditulis ke '{args.output}' dalam {elapsed:.2f} detik"
+          f"{f'; {len(removed)} versi lama dihapus' if removed else ''}.")
+    return {'written': written, 'removed': removed, 'seconds': elapsed}
+
+
+if __name__ == '__main__':
+    main()
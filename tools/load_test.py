@@ -0,0 +1,414 @@
+"""
+Load test for Podes 2024 dashboard
+Drives app.py and the analysis page headlessly with Streamlit's AppTest: N
+simulated sessions run click scripts concurrently in one process, like users
+of one server, and every rerun is timed. Latency percentiles, throughput, CPU
+and memory are reported per session count
+
+Usage:
+    python -m tools.load_test [--sessions 1,2,4,8] [--iterations 2]
+                              [--output metrics/load_test.jsonl]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+
+# Proses uji beban tidak boleh menimpa file metrik milik server dashboard
+os.environ.setdefault('PODES_METRICS_INTERVAL', '0')
+# Klik simulasi tidak boleh masuk log pemakaian yang menentukan warmup server
+os.environ.setdefault('PODES_USAGE_DB', os.path.join(tempfile.gettempdir(), f'podes_load_test_{os.getpid()}.sqlite'))
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+LANDING_PAGE = 'app.py'
+DASHBOARD_PAGE = 'pages/1_Dashboard_Analisis.py'
+
+# Skenario klik: (aksi, argumen); argumen None berarti pilihan acak
+CLICK_SCRIPTS: Dict[str, List[Tuple[str, Any]]] = {
+    'jelajah_kategori': [
+        ('kategori', None),
+        ('indikator', None),
+        ('kategori', None),
+        ('indikator', 'Semua')
+    ],
+    'filter_wilayah': [
+        ('kecamatan', None),
+        ('desa', None),
+        ('naik', None),
+        ('reset', None)
+    ],
+    'perbandingan': [
+        ('kecamatan', None),
+        ('bandingkan', 3),
+        ('indikator', None),
+        ('bandingkan', 2)
+    ],
+    'unduh': [
+        ('kategori', None),
+        ('unduh', 'Download Data Semua Indikator'),
+        ('kecamatan', None),
+        ('unduh', 'Download Semua Kategori')
+    ]
+}
+
+WIDGET_LABELS = {
+    'kategori': "📊 Filter Kategori Utama:",
+    'indikator': "📈 Filter Indikator Spesifik:",
+    'kecamatan': "Kecamatan:",
+    'desa': "Desa/Kelurahan:",
+    'naik': "⬆️ Naik Satu Tingkat",
+    'reset': "🔄 Reset Filter"
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+@contextmanager
+def _shared_runtime():
+    """
+    One runtime for every simulated session, like a real server
+
+    AppTest installs a fresh mock runtime and patches the config for each
+    run and removes them afterwards; with sessions running in threads one
+    session's cleanup would pull the runtime from under another. Here the
+    runtime (media files, caches) and the compiled-script cache are shared,
+    AppTest's per-run swaps are disabled and every session thread gets its
+    own session id, so one session's rerun does not revoke another's
+    pending downloads.
+
+    Yields:
+        MagicMock: The shared runtime; its media_file_mgr serves downloads
+    """
+    from unittest.mock import MagicMock, patch
+
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import build_mock_config_get_option
+    from streamlit import config
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    runtime.bidi_component_registry = BidiComponentManager()
+
+    class RuntimeSlot:
+        """Absorbs AppTest's per-run Runtime._instance assignments"""
+        _instance = None
+
+    script_cache = ScriptCache()
+    runner_init = local_script_runner.LocalScriptRunner.__init__
+
+    def session_runner_init(self, *args, **kwargs):
+        runner_init(self, *args, **kwargs)
+        self._session_id = threading.current_thread().name
+
+    previous = Runtime._instance
+    Runtime._instance = runtime
+    try:
+        with patch.object(app_test, 'Runtime', RuntimeSlot), \
+                patch.object(app_test, 'patch_config_options', lambda overrides: nullcontext()), \
+                patch.object(config, 'get_option', build_mock_config_get_option({'global.appTest': True})), \
+                patch.object(local_script_runner, 'ScriptCache', lambda: script_cache), \
+                patch.object(local_script_runner.LocalScriptRunner, '__init__', session_runner_init):
+            yield runtime
+    finally:
+        Runtime._instance = previous
+
+
+def _rss_mb() -> float:
+    """Current resident memory of the process in MB"""
+    try:
+        with open('/proc/self/status', 'r') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident memory of the process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _percentile(samples: List[float], percentile: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no samples"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * percentile // 100))
+    return ordered[int(rank) - 1]
+
+
+def _latency_summary(samples: List[float]) -> Dict[str, Any]:
+    summary = {'count': len(samples)}
+    for percentile in PERCENTILES:
+        value = _percentile(samples, percentile)
+        summary[f'p{percentile}_ms'] = None if value is None else round(value * 1000, 1)
+    summary['max_ms'] = round(max(samples) * 1000, 1) if samples else None
+    return summary
+
+
+class SimulatedSession:
+    """
+    One browser session: the landing page, then a click script on the
+    analysis page; every rerun and download is timed
+    """
+
+    def __init__(self, script: str, seed: int, timeout: float):
+        self.script = script
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.samples: List[Tuple[str, float]] = []
+        self.errors: List[str] = []
+        self.at = None
+
+    def _timed_run(self, action: str, widget=None):
+        start = time.perf_counter()
+        self.at = (self.at if widget is None else widget).run(timeout=self.timeout)
+        self.samples.append((action, time.perf_counter() - start))
+        self.errors.extend(f"{action}: {exception.value}" for exception in self.at.exception)
+
+    def _widget(self, elements, label: str):
+        return next((element for element in elements if element.label == label), None)
+
+    def open(self):
+        """Load the landing page and the analysis page"""
+        from streamlit.testing.v1 import AppTest
+
+        landing = AppTest.from_file(os.path.join(ROOT_DIR, LANDING_PAGE), default_timeout=self.timeout)
+        self._timed_run('beranda', landing)
+        self.at = AppTest.from_file(os.path.join(ROOT_DIR, DASHBOARD_PAGE), default_timeout=self.timeout)
+        self._timed_run('buka')
+
+    def step(self, action: str, argument: Any):
+        """Perform one click of the script"""
+        if action in ('kategori', 'indikator', 'kecamatan', 'desa'):
+            selectbox = self._widget(self.at.sidebar.selectbox, WIDGET_LABELS[action])
+            if selectbox is None:
+                return
+            options = self._indicator_options() if action == 'indikator' else list(selectbox.options)
+            if action == 'desa':
+                options = options[1:]
+            if argument is None and options:
+                argument = self.rng.choice(options)
+            if argument is None:
+                return
+            selectbox.set_value(argument)
+            self._timed_run(action)
+        elif action in ('naik', 'reset'):
+            button = self._widget(self.at.sidebar.button, WIDGET_LABELS[action])
+            if button is not None:
+                button.click()
+                self._timed_run(action)
+        elif action == 'bandingkan':
+            multiselect = next((element for element in self.at.multiselect if element.key == 'compare_villages'), None)
+            if multiselect is None:
+                return
+            options = list(multiselect.options)
+            multiselect.set_value(self.rng.sample(options, min(argument, len(options))))
+            self._timed_run(action)
+        elif action == 'unduh':
+            self._download(argument)
+
+    def _indicator_options(self) -> List[str]:
+        """Raw indicator values; the selectbox only exposes format_func labels"""
+        from modules.analysis import get_updated_category_indicators
+
+        category = self.at.session_state['filters']['kategori']
+        return ['Semua'] + list(get_updated_category_indicators()[category])
+
+    def _download(self, label: str):
+        """Generate a download like a click on the button does (deferred data)"""
+        from streamlit import runtime
+
+        buttons = [button for button in self.at.get('download_button') if label in button.proto.label]
+        if not buttons or not buttons[0].proto.deferred_file_id:
+            return
+        manager = runtime.get_instance().media_file_mgr
+        start = time.perf_counter()
+        try:
+            manager.execute_deferred(buttons[0].proto.deferred_file_id)
+        except Exception as error:
+            self.errors.append(f"unduh: {error}")
+        self.samples.append(('unduh', time.perf_counter() - start))
+
+    def run(self, iterations: int):
+        """Open the pages and repeat the click script"""
+        try:
+            self.open()
+            for _ in range(iterations):
+                for action, argument in CLICK_SCRIPTS[self.script]:
+                    self.step(action, argument)
+        except Exception as error:
+            self.errors.append(f"{type(error).__name__}: {error}")
+
+
+def run_level(sessions: int, iterations: int, seed: int, timeout: float) -> Dict[str, Any]:
+    """
+    Run a number of sessions concurrently and summarise their reruns
+
+    Sessions share the process like the users of one Streamlit server, so
+    cache_resource/cache_data entries are shared and compete for the GIL.
+
+    Args:
+        sessions: Concurrent simulated sessions
+        iterations: Repetitions of each session's click script
+        seed: Seed of the random choices
+        timeout: Timeout of one rerun in seconds
+
+    Returns:
+        Dict: Latency percentiles overall and per action, throughput, CPU and memory
+    """
+    scripts = list(CLICK_SCRIPTS)
+    simulated = [SimulatedSession(scripts[i % len(scripts)], seed * 1000 + i, timeout) for i in range(sessions)]
+    threads = [threading.Thread(target=session.run, args=(iterations,), name=f"sesi-{i}")
+               for i, session in enumerate(simulated)]
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    samples = [sample for session in simulated for sample in session.samples]
+    reruns = [duration for action, duration in samples if action != 'unduh']
+    actions = sorted({action for action, _ in samples})
+    errors = [error for session in simulated for error in session.errors]
+    from modules.cache_governor import governor
+    return {
+        'sessions': sessions,
+        'wall_s': round(wall, 3),
+        'reruns': _latency_summary(reruns),
+        'actions': {
+            action: _latency_summary([duration for name, duration in samples if name == action])
+            for action in actions
+        },
+        'throughput_rerun_per_s': round(len(reruns) / wall, 2) if wall else None,
+        'cpu_s': round(cpu, 3),
+        'cpu_utilization': round(cpu / wall, 3) if wall else None,
+        'rss_mb': round(_rss_mb(), 1),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'cache_mb': round(governor.total_bytes / 2 ** 20, 2),
+        'caches': governor.cache_stats(),
+        'resident_mb': round(governor.resident_bytes / 2 ** 20, 2),
+        'errors': len(errors),
+        'error_samples': errors[:5]
+    }
+
+
+def _previous_report(path: str) -> Optional[Dict[str, Any]]:
+    """Last report in a JSON lines file, None when there is none"""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            lines = [line for line in file if line.strip()]
+        return json.loads(lines[-1]) if lines else None
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Uji beban dashboard dengan sesi simulasi serentak")
+    parser.add_argument('--sessions', default='1,2,4,8',
+                        help="Jumlah sesi serentak per tahap, dipisah koma")
+    parser.add_argument('--iterations', type=int, default=2,
+                        help="Pengulangan skenario klik per sesi")
+    parser.add_argument('--seed', type=int, default=0, help="Seed pilihan acak")
+    parser.add_argument('--timeout', type=float, default=300, help="Batas waktu satu rerun (detik)")
+    parser.add_argument('--output', default='metrics/load_test.jsonl',
+                        help="File JSON lines tempat hasil ditambahkan")
+    args = parser.parse_args(argv)
+    levels = [int(value) for value in args.sessions.split(',') if value.strip()]
+
+    from streamlit import config
+    from streamlit.logger import set_log_level
+
+    # Peringatan deprecation per rerun menenggelamkan hasil; konfigurasi dibaca dulu
+    # agar level log tidak dikembalikan saat run pertama
+    config.get_config_options()
+    config.set_option('logger.level', 'error')
+    set_log_level('error')
+
+    os.chdir(ROOT_DIR)
+    from modules.data_loader import current_dataset_version
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'dataset_version': current_dataset_version(),
+        'iterations': args.iterations,
+        'scripts': {name: [action for action, _ in steps] for name, steps in CLICK_SCRIPTS.items()},
+        'levels': []
+    }
+
+    with _shared_runtime():
+        # Sesi pemanasan mengisi cache proses; cold start tidak masuk persentil
+        start = time.perf_counter()
+        warmup = run_level(len(CLICK_SCRIPTS), 1, args.seed, args.timeout)
+        report['warmup'] = {'wall_s': round(time.perf_counter() - start, 3), 'errors': warmup['errors'],
+                            'rss_mb': warmup['rss_mb']}
+        print(f"Pemanasan: {report['warmup']['wall_s']:.1f} s, RSS {warmup['rss_mb']:.0f} MB")
+
+        print(f"{'sesi':>5} {'rerun':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'rerun/s':>8} {'CPU':>6} {'RSS MB':>7} {'error':>6}")
+        for sessions in levels:
+            level = run_level(sessions, args.iterations, args.seed + sessions, args.timeout)
+            report['levels'].append(level)
+            reruns = level['reruns']
+            print(f"{sessions:>5} {reruns['count']:>6} {reruns['p50_ms'] or 0:>8.0f} {reruns['p95_ms'] or 0:>8.0f} "
+                  f"{reruns['p99_ms'] or 0:>8.0f} {level['throughput_rerun_per_s'] or 0:>8.2f} "
+                  f"{level['cpu_utilization'] or 0:>6.0%} {level['rss_mb']:>7.0f} {level['errors']:>6}")
+            for error in level['error_samples']:
+                print(f"      ⚠️ {error}")
+
+    output = os.path.join(ROOT_DIR, args.output)
+    previous = _previous_report(output)
+    if previous:
+        # Bandingkan p95 dengan laporan sebelumnya (build lain) per jumlah sesi
+        before = {level['sessions']: level['reruns']['p95_ms'] for level in previous.get('levels', [])}
+        print(f"Dibandingkan dengan {previous.get('commit')} ({previous.get('timestamp')}):")
+        for level in report['levels']:
+            old, new = before.get(level['sessions']), level['reruns']['p95_ms']
+            if old and new:
+                print(f"  {level['sessions']:>3} sesi: p95 {old:.0f} → {new:.0f} ms ({(new - old) / old:+.0%})")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(report) + '\n')
+    print(f"Hasil ditambahkan ke '{args.output}'.")
+    return report
+
+
+if __name__ == '__main__':
+    main()
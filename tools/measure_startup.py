@@ -0,0 +1,160 @@
+"""
+Startup measurement for Podes 2024 dashboard
+Import times of the app modules and cold-start time of each page, every sample
+taken in a fresh interpreter so module caches never hide the real cost
+
+Usage:
+    python -m tools.measure_startup [--runs 3] [--output metrics/startup.jsonl]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Any
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_TARGETS = [
+    'streamlit',
+    'pandas',
+    'plotly.express',
+    'modules.manifest',
+    'modules.data_loader',
+    'modules.analysis',
+    'enhanced_viz'
+]
+
+PAGES = ['app.py', 'pages/1_Dashboard_Analisis.py']
+
+# Modul berat yang seharusnya tidak dimuat oleh halaman muka
+HEAVY_MODULES = ['pandas', 'numpy', 'plotly', 'openpyxl', 'pyarrow']
+
+_IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+_PAGE_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness = time.perf_counter() - start
+before = set(sys.modules)
+run_start = time.perf_counter()
+at = AppTest.from_file({page!r}, default_timeout=300).run()
+first_run = time.perf_counter() - run_start
+loaded = sorted({{name.split('.')[0] for name in set(sys.modules) - before}})
+print(json.dumps({{
+    'first_run_s': first_run,
+    'harness_import_s': harness,
+    'exceptions': [str(e.value) for e in at.exception],
+    'loaded_top_level_modules': loaded
+}}))
+"""
+
+
+def _run_python(code: str) -> str:
+    """Run a snippet in a fresh interpreter from the project root"""
+    # Warmup latar belakang memuat modul berat di thread lain; yang diukur halaman itu sendiri
+    env = dict(os.environ, PODES_WARMUP='0')
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True, env=env
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def measure_imports(runs: int) -> Dict[str, Dict[str, float]]:
+    """
+    Median and best import time per module
+
+    Args:
+        runs: Fresh-interpreter samples per module
+
+    Returns:
+        Dict: module -> {median_s, min_s}
+    """
+    results = {}
+    for module in IMPORT_TARGETS:
+        samples = [float(_run_python(_IMPORT_SNIPPET.format(module=module))) for _ in range(runs)]
+        results[module] = {'median_s': statistics.median(samples), 'min_s': min(samples)}
+    return results
+
+
+def measure_pages(runs: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Cold-start time of each page: interpreter start plus first script run
+
+    Args:
+        runs: Fresh-interpreter samples per page
+
+    Returns:
+        Dict: page -> timings and heavy modules the first run imported
+    """
+    results = {}
+    for page in PAGES:
+        cold_samples, first_run_samples = [], []
+        last = {}
+        for _ in range(runs):
+            start = time.perf_counter()
+            last = json.loads(_run_python(_PAGE_SNIPPET.format(page=os.path.join(ROOT_DIR, page))))
+            cold_samples.append(time.perf_counter() - start)
+            first_run_samples.append(last['first_run_s'])
+        results[page] = {
+            'cold_start_median_s': statistics.median(cold_samples),
+            'first_run_median_s': statistics.median(first_run_samples),
+            'heavy_modules_loaded': [name for name in HEAVY_MODULES if name in last['loaded_top_level_modules']],
+            'exceptions': last['exceptions']
+        }
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Ukur waktu impor dan cold start dashboard")
+    parser.add_argument('--runs', type=int, default=3, help="Jumlah sampel per modul/halaman")
+    parser.add_argument('--output', default='metrics/startup.jsonl',
+                        help="File JSON lines tempat hasil ditambahkan")
+    args = parser.parse_args(argv)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'imports': measure_imports(args.runs),
+        'pages': measure_pages(args.runs)
+    }
+
+    print("Waktu impor (median):")
+    for module, timing in report['imports'].items():
+        print(f"  {module:<24} {timing['median_s'] * 1000:8.1f} ms")
+    print("Cold start halaman (median):")
+    for page, timing in report['pages'].items():
+        heavy = ', '.join(timing['heavy_modules_loaded']) or '-'
+        print(f"  {page:<32} {timing['cold_start_median_s']:6.2f} s "
+              f"(run pertama {timing['first_run_median_s']:.2f} s; modul berat: {heavy})")
+
+    output = os.path.join(ROOT_DIR, args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(report) + '\n')
+    print(f"Hasil ditambahkan ke '{args.output}'.")
+    return report
+
+
+if __name__ == '__main__':
+    main()